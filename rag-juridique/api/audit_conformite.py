@@ -8,29 +8,28 @@ Vérifie la validité des références légales et propose des mises à jour.
 import re
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
-import google.generativeai as genai
 from loguru import logger
 
 from api.models import AuditRequest, AuditResponse, AuditIssue, IssueSeverity
 from config.logging_config import setup_logging
 from config.settings import get_settings
+from rag.llm_gateway import get_llm_gateway
+from rag.token_budget import metered
 from rag.vertex_search import VertexSearchClient
+from utils.job_queue import report_progress
+from utils.timing import explained, stage
 
 setup_logging()
 settings = get_settings()
 
-# Configuration Gemini
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-
 
 # ==============================================================================
 # FONCTIONS D'EXTRACTION DE TEXTE
 # ==============================================================================
 
-def extract_text_from_pdf(file_path: str) -> str:
+def extract_text_from_pdf(file_path: str, stream: bytes | memoryview | None = None) -> str:
     """
     Extrait le texte d'un fichier PDF avec haute précision
     
@@ -38,7 +37,8 @@ def extract_text_from_pdf(file_path: str) -> str:
     car il préserve la mise en forme et extrait le texte au caractère près.
     
     Args:
-        file_path: Chemin vers le fichier PDF
+        file_path: Chemin vers le fichier PDF (nom du fichier si stream est fourni)
+        stream: Contenu du PDF en mémoire ou projeté (upload), sans passage par un chemin
     
     Returns:
         Texte extrait du PDF
@@ -56,14 +56,17 @@ def extract_text_from_pdf(file_path: str) -> str:
         )
     
     file_path = Path(file_path)
-    if not file_path.exists():
+    if stream is None and not file_path.exists():
         raise FileNotFoundError(f"Fichier introuvable : {file_path}")
     
     logger.info(f"📄 Extraction du PDF : {file_path.name}")
     
     try:
         # Ouvrir le PDF
-        doc = fitz.open(str(file_path))
+        if stream is not None:
+            doc = fitz.open(stream=stream, filetype="pdf")
+        else:
+            doc = fitz.open(str(file_path))
         
         # Extraire le texte de toutes les pages
         text_parts = []
@@ -103,12 +106,13 @@ def extract_text_from_pdf(file_path: str) -> str:
         raise
 
 
-def extract_text_from_docx(file_path: str) -> str:
+def extract_text_from_docx(file_path: str, stream: IO[bytes] | None = None) -> str:
     """
     Extrait le texte d'un fichier DOCX
     
     Args:
-        file_path: Chemin vers le fichier DOCX
+        file_path: Chemin vers le fichier DOCX (nom du fichier si stream est fourni)
+        stream: Fichier ouvert (upload), lu sans passage par un chemin
     
     Returns:
         Texte extrait du DOCX
@@ -126,13 +130,13 @@ def extract_text_from_docx(file_path: str) -> str:
         )
     
     file_path = Path(file_path)
-    if not file_path.exists():
+    if stream is None and not file_path.exists():
         raise FileNotFoundError(f"Fichier introuvable : {file_path}")
     
     logger.info(f"📄 Extraction du DOCX : {file_path.name}")
     
     try:
-        doc = Document(str(file_path))
+        doc = Document(stream if stream is not None else str(file_path))
         
         # Extraire tous les paragraphes
         paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
@@ -147,6 +151,7 @@ def extract_text_from_docx(file_path: str) -> str:
         raise
 
 
+@stage("extract_text")
 def extract_text_from_file(file_path: str) -> str:
     """
     Détecte le type de fichier et extrait le texte approprié
@@ -189,13 +194,18 @@ class AuditConformite:
     - Incohérences temporelles
     """
     
-    def __init__(self):
-        """Initialise le système d'audit"""
-        self.vertex_client = VertexSearchClient()
+    def __init__(self, vertex_client: VertexSearchClient | None = None):
+        """
+        Initialise le système d'audit
+        
+        Args:
+            vertex_client: Client Vertex AI Search partagé (défaut : nouveau client)
+        """
+        self.vertex_client = vertex_client or VertexSearchClient()
         
         # Configuration Gemini
         if settings.GEMINI_API_KEY:
-            self.model = genai.GenerativeModel(settings.GEMINI_PRO_MODEL)
+            self.model = get_llm_gateway().model(settings.GEMINI_PRO_MODEL)
         else:
             logger.warning("⚠️ GEMINI_API_KEY non définie - recommandations désactivées")
             self.model = None
@@ -241,6 +251,8 @@ class AuditConformite:
         
         logger.info("✅ AuditConformite initialisé")
     
+    @metered
+    @explained("audit")
     def audit(self, request: AuditRequest) -> AuditResponse:
         """
         Audite un document juridique
@@ -318,6 +330,7 @@ class AuditConformite:
             )
         
             # 2. Extraire les références juridiques
+            report_progress(0.1, "Extraction des références")
             logger.info("📝 [AUDIT] Étape 2: Extraction des références juridiques...")
             try:
                 references = self._extract_legal_references(document_content)
@@ -343,6 +356,10 @@ class AuditConformite:
             
             try:
                 for i, ref in enumerate(references):
+                    report_progress(
+                        0.15 + 0.65 * i / len(references),
+                        f"Vérification des références ({i + 1}/{len(references)})",
+                    )
                     try:
                         issue = self._verify_reference(ref, document_date)
                         if issue:
@@ -367,6 +384,7 @@ class AuditConformite:
             logger.info(f"   ✅ Score: {conformity_score:.1f}%")
             
             # 6. Générer les recommandations avec Gemini
+            report_progress(0.85, "Génération des recommandations")
             logger.info("💡 [AUDIT] Étape 6: Génération des recommandations...")
             try:
                 recommendations = self._generate_recommendations(
@@ -418,6 +436,7 @@ class AuditConformite:
             # Relancer l'erreur pour qu'elle soit capturée par la route
             raise
     
+    @stage("extract_references")
     def _extract_legal_references(self, text: str) -> list[dict[str, Any]]:
         """
         Extrait les références juridiques du texte
@@ -553,6 +572,7 @@ class AuditConformite:
         
         return None
     
+    @stage("verify_reference")
     def _verify_reference(
         self,
         reference: dict[str, Any],
@@ -658,6 +678,7 @@ class AuditConformite:
                 recommendation="Vérifier manuellement cette référence.",
             )
     
+    @stage("recommendations")
     def _generate_recommendations(
         self,
         issues: list[AuditIssue],
@@ -714,7 +735,7 @@ Format : liste à puces, une recommandation par ligne, commençant par un emoji
                     "Consulter la liste des problèmes pour identifier les mises à jour nécessaires.",
                 ]
             
-            response = self.model.generate_content(prompt)
+            response = get_llm_gateway().generate_content(self.model, prompt)
             
             # Vérifier que la réponse contient du texte
             if not response or not hasattr(response, 'text'):
@@ -3,30 +3,37 @@ Pilier 5 : Chatbot Avocat
 Hub central conversationnel pour l'assistance juridique
 """
 
+import re
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional
-
-import google.generativeai as genai
+from typing import Any, Collection, Optional
 
 from config.logging_config import get_logger
 from config.settings import get_settings
+from rag.context_packer import ContextPacker, PackedSource, format_packed_context
+from rag.llm_gateway import get_llm_gateway
+from rag.session_index import get_session_index_store
+from rag.text_utils import FRENCH_STOPWORDS, fold_accents, query_terms, stem_fr, tokenize, truncate_text
+from rag.token_budget import metered
 from rag.vertex_search import VertexSearchClient
+from utils.timing import explained, stage
 from api.models import (
     ChatMessage,
     ChatRequest,
     ChatResponse,
     Source,
+    SourceField,
 )
 
 logger = get_logger(__name__)
 settings = get_settings()
 
-# Configuration Gemini avec clé API
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    logger.debug("Gemini configuré avec clé API")
-else:
+# Gemini : modèle créé (et clé API configurée) par la passerelle LLM
+if not settings.GEMINI_API_KEY:
     logger.warning("⚠️ GEMINI_API_KEY non définie dans .env")
 
 
@@ -92,6 +99,222 @@ class ConversationManager:
             logger.debug(f"Conversation {conv_id} effacée")
 
 
+@dataclass
+class RetrievalTurn:
+    """Résultats de recherche mémorisés pour le dernier tour d'une conversation"""
+    
+    query: str
+    results: list[dict[str, Any]]
+    query_stems: set[str]
+    content_stems: set[str] = field(default_factory=set)
+    last_access: float = field(default_factory=time.time)
+
+
+class ConversationRetrievalMemory:
+    """
+    Mémoire de recherche par conversation
+    
+    Conserve les résultats du tour précédent pour :
+    - Réécrire les questions de relance ("Et pour les contrats ?") avec le
+      sujet du tour précédent (heuristique locale, sans appel LLM)
+    - Réutiliser les sources existantes quand elles couvrent déjà la relance
+      et qu'elle renvoie bien au tour précédent (termes communs ou anaphore)
+    - Sinon, lancer une recherche incrémentale et fusionner les résultats
+    
+    Les conversations inactives depuis ttl_seconds sont oubliées, et au plus
+    max_conversations sont gardées (les moins récentes sont évincées).
+    """
+    
+    # Débuts de phrase typiques d'une relance
+    FOLLOW_UP_PREFIXES = (
+        "et ", "et,", "mais ", "aussi", "pareil", "idem", "sinon", "alors ",
+        "qu'en est-il", "qu'en est il", "dans ce cas", "meme question",
+        "pour les ", "pour le ", "pour la ", "pour l'", "en cas de ",
+        "et si ", "et dans ", "et en ", "et pour ",
+    )
+    # Mots renvoyant au tour précédent
+    ANAPHORA = frozenset({
+        "ca", "cela", "ceci", "celui", "celle", "ceux", "celles", "lequel",
+        "laquelle", "lesquels", "lesquelles", "meme", "memes", "precedent",
+        "precedente", "dessus",
+    })
+    MAX_RESULTS = 20
+    MAX_TOPIC_WORDS = 6
+    
+    def __init__(
+        self,
+        coverage_threshold: float = 0.75,
+        max_conversations: int = 1000,
+        ttl_seconds: float = 3600,
+    ):
+        """
+        Args:
+            coverage_threshold: Part des nouveaux termes de la relance devant
+                figurer dans les sources existantes pour éviter une recherche
+            max_conversations: Conversations mémorisées (les moins récentes sont évincées)
+            ttl_seconds: Durée d'inactivité avant oubli d'une conversation
+        """
+        self.coverage_threshold = coverage_threshold
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self._turns: OrderedDict[str, RetrievalTurn] = OrderedDict()
+        self._lock = threading.Lock()
+        self.retrieval_turns = 0
+        self.skipped_turns = 0
+        self.rewritten_turns = 0
+    
+    def previous(self, conv_id: str) -> RetrievalTurn | None:
+        """Résultats mémorisés du tour précédent (ou None)"""
+        with self._lock:
+            self._evict_expired()
+            return self._turns.get(conv_id)
+    
+    def remember(self, conv_id: str, query: str, results: list[dict[str, Any]]) -> None:
+        """
+        Mémorise les résultats d'un tour
+        
+        Args:
+            conv_id: ID de la conversation
+            query: Requête effectivement utilisée (éventuellement réécrite)
+            results: Résultats bruts retenus pour ce tour
+        """
+        results = results[: self.MAX_RESULTS]
+        content_stems: set[str] = set()
+        for doc in results:
+            content_stems.update(
+                stem_fr(w)
+                for w in tokenize(f"{doc.get('title', '')} {doc.get('content', '')}")
+            )
+        turn = RetrievalTurn(
+            query=query,
+            results=results,
+            query_stems=set(query_terms(query)),
+            content_stems=content_stems,
+        )
+        with self._lock:
+            self._turns[conv_id] = turn
+            self._turns.move_to_end(conv_id)
+            self._evict_expired()
+            while len(self._turns) > self.max_conversations:
+                self._turns.popitem(last=False)
+    
+    def _evict_expired(self) -> None:
+        deadline = time.time() - self.ttl_seconds
+        # Les tours sont ordonnés par date de mémorisation
+        while self._turns:
+            conv_id, turn = next(iter(self._turns.items()))
+            if turn.last_access >= deadline:
+                break
+            del self._turns[conv_id]
+    
+    def forget(self, conv_id: str) -> None:
+        """Oublie les résultats mémorisés d'une conversation"""
+        with self._lock:
+            self._turns.pop(conv_id, None)
+    
+    def is_follow_up(self, message: str, previous: RetrievalTurn) -> bool:
+        """
+        Détecte une question de relance
+        
+        Relance : message introduit par une tournure de relance (« Et pour
+        les contrats ? »), ou message court qui reprend un terme du tour
+        précédent ou y renvoie (« ça », « celui-ci »...). Une question
+        courte sans lien avec le tour précédent est une nouvelle question.
+        
+        Args:
+            message: Message de l'utilisateur
+            previous: Tour précédent
+        
+        Returns:
+            True si le message dépend du contexte du tour précédent
+        """
+        folded = fold_accents(message).strip().replace("’", "'")
+        if folded.startswith(self.FOLLOW_UP_PREFIXES):
+            return True
+        
+        terms = query_terms(message)
+        return len(terms) <= 4 and self.refers_to(message, previous)
+    
+    def refers_to(self, message: str, previous: RetrievalTurn) -> bool:
+        """
+        Indique si le message reprend un terme de la requête précédente ou
+        contient une anaphore (condition pour réutiliser ses sources)
+        """
+        if set(query_terms(message)) & previous.query_stems:
+            return True
+        folded = fold_accents(message).replace("’", "'")
+        return bool(set(re.findall(r"\w+", folded)) & self.ANAPHORA)
+    
+    def rewrite(self, message: str, previous: RetrievalTurn) -> str:
+        """
+        Réécrit une relance en y ajoutant le sujet du tour précédent
+        
+        Exemple : "Quelle est la majorité en France ?" puis "Et pour les
+        contrats ?" → "Et pour les contrats majorité France"
+        
+        Args:
+            message: Question de relance
+            previous: Tour précédent
+        
+        Returns:
+            Requête autonome pour la recherche
+        """
+        message_stems = set(query_terms(message))
+        topic_words = []
+        seen: set[str] = set()
+        for word in re.findall(r"\w+", previous.query):
+            folded = fold_accents(word)
+            stem = stem_fr(folded)
+            if (
+                len(folded) > 2
+                and folded not in FRENCH_STOPWORDS
+                and stem not in message_stems
+                and stem not in seen
+            ):
+                topic_words.append(word)
+                seen.add(stem)
+        
+        core = message.strip().rstrip("?!. ").strip()
+        return f"{core} {' '.join(topic_words[: self.MAX_TOPIC_WORDS])}".strip()
+    
+    def coverage(self, message: str, previous: RetrievalTurn) -> float:
+        """
+        Part des nouveaux termes de la relance déjà présents dans les sources
+        
+        Returns:
+            Couverture entre 0 et 1 (1 si la relance n'apporte aucun terme nouveau)
+        """
+        new_terms = set(query_terms(message)) - previous.query_stems
+        if not new_terms:
+            return 1.0
+        return len(new_terms & previous.content_stems) / len(new_terms)
+    
+    def record_turn(self, skipped: bool, rewritten: bool) -> None:
+        """Comptabilise un tour avec RAG"""
+        with self._lock:
+            self.retrieval_turns += 1
+            if skipped:
+                self.skipped_turns += 1
+            if rewritten:
+                self.rewritten_turns += 1
+    
+    def stats(self) -> dict[str, Any]:
+        """
+        Statistiques de réutilisation des recherches
+        
+        Returns:
+            Dict avec nombre de tours, tours sans recherche et ratio
+        """
+        with self._lock:
+            turns = self.retrieval_turns
+            return {
+                "retrieval_turns": turns,
+                "rewritten_turns": self.rewritten_turns,
+                "skipped_retrievals": self.skipped_turns,
+                "skip_ratio": round(self.skipped_turns / turns, 4) if turns else 0.0,
+            }
+
+
 class ChatbotAvocat:
     """
     Chatbot Avocat - Hub central conversationnel
@@ -104,10 +327,25 @@ class ChatbotAvocat:
     - Suggestions d'actions
     """
     
-    def __init__(self):
-        """Initialise le Chatbot Avocat"""
-        self.vertex_client = VertexSearchClient()
+    def __init__(self, vertex_client: VertexSearchClient | None = None):
+        """
+        Initialise le Chatbot Avocat
+        
+        Args:
+            vertex_client: Client Vertex AI Search partagé (défaut : nouveau client)
+        """
+        self.vertex_client = vertex_client or VertexSearchClient()
         self.conversation_manager = ConversationManager()
+        self.retrieval_memory = ConversationRetrievalMemory(
+            coverage_threshold=settings.CHAT_REUSE_COVERAGE_THRESHOLD,
+            max_conversations=settings.CHAT_RETRIEVAL_MEMORY_MAX_CONVERSATIONS,
+            ttl_seconds=settings.CHAT_RETRIEVAL_MEMORY_TTL_SECONDS,
+        )
+        self.context_packer = ContextPacker(
+            max_chars=settings.RAG_CONTEXT_MAX_CHARS,
+            max_chars_per_source=settings.RAG_CONTEXT_MAX_CHARS_PER_SOURCE,
+            near_duplicate_threshold=settings.RAG_NEAR_DUPLICATE_THRESHOLD,
+        )
         
         # Configuration Gemini avec API directe
         try:
@@ -115,7 +353,7 @@ class ChatbotAvocat:
                 logger.warning("⚠️ GEMINI_API_KEY non définie - mode dégradé activé")
                 self.model = None
             else:
-                self.model = genai.GenerativeModel(settings.GEMINI_FLASH_MODEL)
+                self.model = get_llm_gateway().model(settings.GEMINI_FLASH_MODEL)
                 logger.debug(f"✅ Modèle Gemini configuré: {settings.GEMINI_FLASH_MODEL}")
         except Exception as e:
             logger.warning(f"⚠️ Impossible de configurer Gemini: {e}")
@@ -123,6 +361,8 @@ class ChatbotAvocat:
         
         logger.info("✅ ChatbotAvocat initialisé")
     
+    @metered
+    @explained("chat")
     def chat(self, request: ChatRequest) -> ChatResponse:
         """
         Traite une requête de chat
@@ -146,11 +386,28 @@ class ChatbotAvocat:
         context = ""
         
         if request.use_rag:
-            sources, context = self._retrieve_sources(request.message, request.max_sources)
+            sources, context = self._retrieve_sources(
+                request.message,
+                request.max_sources,
+                conv_id=conv_id,
+                fields=request.source_fields,
+                max_content_chars=request.source_max_content_chars,
+            )
+        
+        # Passages du dossier uploadé dans la session
+        dossier_context = ""
+        if request.session_id:
+            dossier_sources, dossier_context = self._retrieve_dossier(
+                request.message,
+                request.session_id,
+                fields=request.source_fields,
+                max_content_chars=request.source_max_content_chars,
+            )
+            sources = dossier_sources + sources
         
         # 4. Construire le prompt avec contexte
         history = self.conversation_manager.get_history(conv_id, max_messages=5)
-        prompt = self._build_prompt(request.message, context, history)
+        prompt = self._build_prompt(request.message, context, history, dossier_context)
         
         # 5. Générer la réponse avec Gemini
         response_text, confidence = self._generate_response(prompt)
@@ -174,10 +431,14 @@ class ChatbotAvocat:
         
         return response
     
+    @stage("retrieval")
     def _retrieve_sources(
         self,
         query: str,
-        max_sources: int
+        max_sources: int,
+        conv_id: str | None = None,
+        fields: Collection[str] | None = None,
+        max_content_chars: int = 300,
     ) -> tuple[list[Source], str]:
         """
         Récupère des sources via RAG
@@ -185,38 +446,21 @@ class ChatbotAvocat:
         Args:
             query: Question de l'utilisateur
             max_sources: Nombre maximum de sources
+            conv_id: ID de la conversation (réutilisation des sources du tour précédent)
+            fields: Champs renvoyés pour chaque source (None : tous)
+            max_content_chars: Longueur maximale de l'extrait de chaque source
         
         Returns:
             Tuple (liste de sources, contexte formaté)
         """
         try:
-            # Recherche dans Vertex AI
-            results = self.vertex_client.search(query, page_size=max_sources)
+            results, query = self._search_for_turn(query, max_sources, conv_id)
             
-            sources = []
-            context_parts = []
-            
-            for i, result in enumerate(results, 1):
-                # Créer l'objet Source
-                source = Source(
-                    type="code" if "article" in result.get("title", "").lower() else "jurisprudence",
-                    reference=result.get("title", ""),
-                    text=result.get("content", "")[:300] + "...",  # Tronquer
-                    relevance=result.get("score", 0.0) or 0.0,
-                )
-                sources.append(source)
-                
-                # Construire le contexte pour le prompt
-                metadata = result.get("metadata", {})
-                breadcrumb = metadata.get("breadcrumb", "")
-                
-                context_parts.append(
-                    f"[Source {i}] {result.get('title', 'N/A')}\n"
-                    f"Référence: {breadcrumb}\n"
-                    f"Contenu: {result.get('content', 'N/A')}\n"
-                )
+            # Déduplication, extraits pertinents et budget de contexte
+            packed = self.context_packer.pack(query, results, max_sources=max_sources)
             
-            context = "\n".join(context_parts)
+            sources = self._build_sources(packed, fields, max_content_chars)
+            context = format_packed_context(packed)
             
             logger.debug(f"✅ {len(sources)} source(s) récupérée(s)")
             
@@ -226,11 +470,130 @@ class ChatbotAvocat:
             logger.warning(f"⚠️ Erreur récupération sources: {e}")
             return [], ""
     
+    @stage("dossier_retrieval")
+    def _retrieve_dossier(
+        self,
+        query: str,
+        session_id: str,
+        fields: Collection[str] | None = None,
+        max_content_chars: int = 300,
+    ) -> tuple[list[Source], str]:
+        """
+        Récupère les passages pertinents du dossier de la session
+        
+        Args:
+            query: Question de l'utilisateur
+            session_id: Session dont le dossier est interrogé
+            fields: Champs renvoyés pour chaque source (None : tous)
+            max_content_chars: Longueur maximale de l'extrait de chaque source
+        
+        Returns:
+            Tuple (liste de sources, contexte formaté)
+        """
+        index = get_session_index_store().get(session_id)
+        if index is None:
+            logger.warning(f"⚠️ Session inconnue ou expirée : {session_id}")
+            return [], ""
+        
+        passages = index.search(query, top_k=settings.SESSION_CHAT_TOP_K)
+        packed = self.context_packer.pack(
+            query,
+            [passage.to_result() for passage in passages],
+            max_chars=settings.SESSION_CONTEXT_MAX_CHARS,
+        )
+        sources = self._build_sources(packed, fields, max_content_chars, source_type="dossier")
+        logger.debug(f"📂 {len(sources)} passage(s) du dossier retenu(s)")
+        return sources, format_packed_context(packed)
+    
+    @staticmethod
+    def _build_sources(
+        packed: list[PackedSource],
+        fields: Collection[str] | None,
+        max_content_chars: int,
+        source_type: str | None = None,
+    ) -> list[Source]:
+        """
+        Sources citées à partir des passages retenus
+        
+        Un extrait exclu (fields) n'est pas copié ; reference est toujours
+        renvoyée, les autres champs exclus sont vides.
+        
+        Args:
+            packed: Passages retenus par le ContextPacker
+            fields: Champs renvoyés (None : tous)
+            max_content_chars: Longueur maximale de l'extrait
+            source_type: Type imposé (défaut : code ou jurisprudence selon le titre)
+        """
+        def keeps(name: str) -> bool:
+            return fields is None or name in fields
+        
+        with_type = keeps(SourceField.TYPE)
+        with_text = keeps(SourceField.TEXT)
+        with_relevance = keeps(SourceField.RELEVANCE)
+        sources = []
+        for source in packed:
+            kind = ""
+            if with_type:
+                kind = source_type or ("code" if "article" in source.title.lower() else "jurisprudence")
+            sources.append(Source(
+                type=kind,
+                reference=source.title,
+                text=truncate_text(source.excerpt, max_content_chars) if with_text else "",
+                relevance=(source.document.get("score", 0.0) or 0.0) if with_relevance else 0.0,
+            ))
+        return sources
+    
+    def _search_for_turn(
+        self,
+        message: str,
+        max_sources: int,
+        conv_id: str | None,
+    ) -> tuple[list[dict[str, Any]], str]:
+        """
+        Obtient les résultats de recherche d'un tour de conversation
+        
+        Pour une relance, la question est réécrite avec le sujet du tour
+        précédent ; si les sources précédentes couvrent déjà la relance,
+        aucune recherche n'est lancée, sinon une recherche incrémentale
+        est fusionnée avec les sources précédentes.
+        
+        Returns:
+            Tuple (résultats bruts, requête effective)
+        """
+        page_size = min(max_sources * 2, 20)
+        memory = self.retrieval_memory
+        previous = memory.previous(conv_id) if conv_id else None
+        
+        if previous is None or not memory.is_follow_up(message, previous):
+            results = self.vertex_client.search(message, page_size=page_size)
+            if conv_id:
+                memory.remember(conv_id, message, results)
+            memory.record_turn(skipped=False, rewritten=False)
+            return results, message
+        
+        query = memory.rewrite(message, previous)
+        coverage = memory.coverage(message, previous)
+        
+        if coverage >= memory.coverage_threshold and memory.refers_to(message, previous):
+            logger.debug(f"♻️ Relance couverte ({coverage:.0%}) : réutilisation des sources")
+            memory.record_turn(skipped=True, rewritten=True)
+            memory.remember(conv_id, query, previous.results)
+            return previous.results, query
+        
+        logger.debug(f"🔁 Relance réécrite : '{query}' (couverture {coverage:.0%})")
+        new_results = self.vertex_client.search(query, page_size=page_size)
+        results = new_results + previous.results
+        memory.remember(conv_id, query, results)
+        memory.record_turn(skipped=False, rewritten=True)
+        return results, query
+    
+    @stage("prompt_build")
     def _build_prompt(
         self,
         question: str,
         context: str,
-        history: list[ChatMessage]
+        history: list[ChatMessage],
+        dossier_context: str = "",
     ) -> str:
         """
         Construit le prompt pour Gemini
@@ -239,6 +602,7 @@ class ChatbotAvocat:
             question: Question de l'utilisateur
             context: Contexte RAG
             history: Historique de conversation
+            dossier_context: Passages du dossier de la session
         
         Returns:
             Prompt complet
@@ -279,6 +643,10 @@ FORMAT DE RÉPONSE:
         if context:
             context_text = f"\n\nSOURCES JURIDIQUES DISPONIBLES:\n{context}\n"
         
+        # Passages du dossier du client
+        if dossier_context:
+            context_text += f"\n\nEXTRAITS DU DOSSIER DU CLIENT:\n{dossier_context}\n"
+        
         # Assemblage final
         prompt = f"""{system_prompt}
 {history_text}
@@ -292,6 +660,7 @@ RÉPONSE:
         
         return prompt
     
+    @stage("generation")
     def _generate_response(self, prompt: str) -> tuple[str, float]:
         """
         Génère une réponse avec Gemini
@@ -311,7 +680,9 @@ RÉPONSE:
             return fallback, 0.0
         
         try:
-            # Configuration de génération
+            # Configuration de génération (module déjà chargé avec le modèle)
+            import google.generativeai as genai
+            
             generation_config = genai.types.GenerationConfig(
                 temperature=0.3,  # Peu créatif (factuel)
                 top_p=0.95,
@@ -320,7 +691,8 @@ RÉPONSE:
             )
             
             # Génération avec Gemini (API directe)
-            response = self.model.generate_content(
+            response = get_llm_gateway().generate_content(
+                self.model,
                 prompt,
                 generation_config=generation_config
             )
@@ -384,6 +756,7 @@ Veuillez consulter les articles mentionnés pour plus de détails."""
         
         return "Sources trouvées mais impossible de les formater."
     
+    @stage("suggestions")
     def _generate_suggestions(self, question: str, response: str) -> list[str]:
         """
         Génère des suggestions d'actions basées sur la conversation
@@ -425,6 +798,7 @@ Veuillez consulter les articles mentionnés pour plus de détails."""
     def clear_conversation(self, conv_id: str) -> None:
         """Efface l'historique d'une conversation"""
         self.conversation_manager.clear_conversation(conv_id)
+        self.retrieval_memory.forget(conv_id)
 
 
 # ============================================================================
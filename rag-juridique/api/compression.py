@@ -0,0 +1,151 @@
+"""
+Compression des réponses (middleware ASGI)
+
+Le codage est négocié selon l'en-tête Accept-Encoding : br si le module
+brotli est installé et accepté par le client, gzip sinon. Seules sont
+compressées les réponses textuelles (JSON, texte, XML) envoyées en un bloc
+et d'au moins min_bytes octets. Les réponses en flux (téléchargements par
+blocs, requêtes Range) et déjà codées passent telles quelles. Au-delà de
+thread_bytes, la compression est faite dans un thread du pool pour ne pas
+bloquer la boucle asynchrone.
+
+Mesures (taille et durée par niveau) : benchmarks/bench_serialization.py
+"""
+
+import gzip
+
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BROTLI = "br"
+GZIP = "gzip"
+
+# Statuts sans corps ou à corps partiel
+_UNCOMPRESSED_STATUSES = frozenset({204, 206, 304})
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Codage à utiliser pour un en-tête Accept-Encoding (None : aucun)
+
+    Un codage de poids nul (q=0) est refusé ; « * » accepte les deux.
+    """
+    if not accept_encoding:
+        return None
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        accepted[coding.strip()] = weight
+
+    def weight_of(coding: str) -> float:
+        return accepted.get(coding, accepted.get("*", 0.0))
+
+    if brotli is not None and weight_of(BROTLI) > 0:
+        return BROTLI
+    if weight_of(GZIP) > 0:
+        return GZIP
+    return None
+
+
+def is_compressible(content_type: str | None) -> bool:
+    """Types textuels dont la compression vaut la peine"""
+    if not content_type:
+        return False
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return (
+        media_type.startswith("text/")
+        or media_type in ("application/json", "application/javascript", "application/xml")
+        or media_type.endswith(("+json", "+xml"))
+    )
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 1, brotli_quality: int = 4) -> bytes:
+    """Compresse un corps de réponse (appel bloquant)"""
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """Compresse les réponses textuelles volumineuses"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_bytes: int = 1024,
+        gzip_level: int = 1,
+        brotli_quality: int = 4,
+        thread_bytes: int = 256 * 1024,
+    ):
+        self.app = app
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.thread_bytes = thread_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Début de réponse retenu jusqu'au premier bloc du corps
+        pending_start: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal pending_start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message.get("headers", []))
+                if (
+                    message["status"] in _UNCOMPRESSED_STATUSES
+                    or "content-encoding" in headers
+                    or not is_compressible(headers.get("content-type"))
+                ):
+                    await send(message)
+                else:
+                    pending_start = message
+                return
+
+            if message["type"] != "http.response.body" or pending_start is None:
+                await send(message)
+                return
+
+            start, pending_start = pending_start, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.min_bytes:
+                # Réponse en flux ou trop petite : transmise telle quelle
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= self.thread_bytes:
+                body = await run_in_threadpool(
+                    compress, body, encoding, self.gzip_level, self.brotli_quality
+                )
+            else:
+                body = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            headers = MutableHeaders(scope=start)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,146 @@
+"""
+Tâches asynchrones des piliers longs (synthèse, audit, machine à actes)
+
+Associe chaque type de tâche au service du pilier correspondant. Les
+workers tournent dans le processus de l'API (JOBS_WORKERS > 0) ou à part :
+
+    python -m api.jobs --workers 4
+"""
+
+import argparse
+from datetime import datetime
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+from api.models import (
+    ActGenerationRequest,
+    AuditRequest,
+    BatchActGenerationRequest,
+    JobKind,
+    JobStatusResponse,
+    SynthesisRequest,
+)
+from api.services import get_services
+from config.logging_config import get_logger
+from config.settings import get_settings
+from utils.job_queue import SUCCEEDED, Job, JobQueue, JobWorkerPool
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+_queue: JobQueue | None = None
+
+
+def get_job_queue() -> JobQueue:
+    """Retourne la file de tâches globale (créée au premier appel)"""
+    global _queue
+    if _queue is None:
+        _queue = JobQueue(
+            settings.JOBS_DB_PATH,
+            result_ttl_seconds=settings.JOBS_RESULT_TTL_HOURS * 3600,
+        )
+    return _queue
+
+
+def submit_job(kind: JobKind, request: BaseModel) -> JobStatusResponse:
+    """
+    Soumet la requête d'un pilier comme tâche asynchrone
+
+    Args:
+        kind: Type de tâche
+        request: Requête du pilier (validée par la route)
+
+    Returns:
+        État initial de la tâche (queued)
+    """
+    queue = get_job_queue()
+    job_id = queue.submit(kind.value, request.model_dump(mode="json"))
+    return job_status(queue.get(job_id))
+
+
+def job_status(job: Job) -> JobStatusResponse:
+    """Convertit une tâche de la file en réponse d'API"""
+
+    def timestamp(value: float | None) -> datetime | None:
+        return datetime.fromtimestamp(value) if value is not None else None
+
+    return JobStatusResponse(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        progress=job.progress,
+        message=job.message,
+        error=job.error,
+        created_at=timestamp(job.created_at),
+        started_at=timestamp(job.started_at),
+        finished_at=timestamp(job.finished_at),
+        expires_at=timestamp(job.expires_at),
+        status_url=f"/api/v1/jobs/{job.id}",
+        result_url=f"/api/v1/jobs/{job.id}/result" if job.status == SUCCEEDED else None,
+    )
+
+
+# Les services sont ceux des routes (conteneur partagé, construits à la
+# première tâche si le préchauffage ne l'a pas déjà fait)
+
+def _run_synthese(payload: dict[str, Any]) -> dict[str, Any]:
+    request = SynthesisRequest.model_validate(payload)
+    return get_services().synthese.synthesize(request).model_dump(mode="json")
+
+
+def _run_audit(payload: dict[str, Any]) -> dict[str, Any]:
+    request = AuditRequest.model_validate(payload)
+    return get_services().audit.audit(request).model_dump(mode="json")
+
+
+def _run_machine_actes(payload: dict[str, Any]) -> dict[str, Any]:
+    request = ActGenerationRequest.model_validate(payload)
+    return get_services().machine_actes.generate(request).model_dump(mode="json")
+
+
+def _run_machine_actes_batch(payload: dict[str, Any]) -> dict[str, Any]:
+    # Même batch_id : une tâche relancée reprend le lot là où il s'est arrêté
+    request = BatchActGenerationRequest.model_validate(payload)
+    return get_services().act_batch_runner.run(request).model_dump(mode="json")
+
+
+JOB_HANDLERS: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+    JobKind.SYNTHESE.value: _run_synthese,
+    JobKind.AUDIT.value: _run_audit,
+    JobKind.MACHINE_ACTES.value: _run_machine_actes,
+    JobKind.MACHINE_ACTES_BATCH.value: _run_machine_actes_batch,
+}
+
+
+def create_worker_pool(workers: int | None = None) -> JobWorkerPool:
+    """
+    Crée le pool de workers des tâches des piliers
+
+    Args:
+        workers: Nombre de threads (défaut : JOBS_WORKERS)
+    """
+    return JobWorkerPool(
+        get_job_queue(),
+        JOB_HANDLERS,
+        workers=workers if workers is not None else settings.JOBS_WORKERS,
+        poll_interval=settings.JOBS_POLL_INTERVAL_SECONDS,
+        stale_after_seconds=settings.JOBS_STALE_AFTER_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    from config.logging_config import setup_logging
+
+    parser = argparse.ArgumentParser(description="Workers des tâches asynchrones")
+    parser.add_argument("--workers", type=int, default=max(settings.JOBS_WORKERS, 1))
+    args = parser.parse_args()
+
+    setup_logging()
+    pool = create_worker_pool(args.workers)
+    pool.start()
+    try:
+        pool.wait()
+    except KeyboardInterrupt:
+        logger.info("🛑 Arrêt des workers...")
+        pool.stop()
@@ -5,11 +5,12 @@ Génération automatique d'actes juridiques par mimétisme intelligent.
 Transforme un acte modèle + données client → nouvel acte personnalisé.
 """
 
+import re
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import google.generativeai as genai
 from loguru import logger
 
 from api.models import (
@@ -17,22 +18,40 @@ from api.models import (
     ActGenerationResponse,
     ActType,
     DataInputFormat,
+    GenerationPath,
     OutputFormat,
 )
 from config.logging_config import setup_logging
 from config.settings import get_settings
+from rag.llm_gateway import get_llm_gateway
+from rag.token_budget import (
+    TIER_FLASH,
+    RoutePlan,
+    get_routing_policy,
+    get_token_estimator,
+    metered,
+)
+from utils.act_fill import FillResult, PlaceholderFiller, parse_client_fields
+from utils.act_renderer import DOCX_MEDIA_TYPE, PDF_MEDIA_TYPE, get_act_renderer
+from utils.download_store import StoredDocument, get_download_store
+from utils.act_templates import BRACKET_RE, MUSTACHE_RE, CompiledTemplate, get_act_template_compiler
+from utils.job_queue import report_progress
+from utils.timing import stage
 
 # Import des prompts centralisés
-from prompts.prompts import PROMPT_ACT_GENERATION, PROMPT_ACT_GENERATION_CUSTOM
+from prompts.prompts import PROMPT_ACT_GENERATION, PROMPT_ACT_GENERATION_CUSTOM, PROMPT_ACT_SECTIONS
 
 setup_logging()
 settings = get_settings()
 
-# Configuration Gemini
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
+# Marge de l'acte généré au-delà de la taille du modèle (données client insérées)
+ACT_OUTPUT_MARGIN_TOKENS = 1024
+
+# Confiance d'un acte complété localement (relecture toujours requise)
+DETERMINISTIC_CONFIDENCE = 0.95
 
 
+@stage("extract_text")
 def extract_text_from_file(file_path: str) -> str:
     """
     Extrait le texte d'un fichier (PDF, DOCX, TXT)
@@ -105,28 +124,39 @@ class MachineActes:
         
         # Configuration Gemini (Flash pour génération d'actes - quota plus élevé)
         if settings.GEMINI_API_KEY:
-            self.model = genai.GenerativeModel(settings.GEMINI_FLASH_MODEL)
+            self.model = get_llm_gateway().model(settings.GEMINI_FLASH_MODEL)
             logger.info(f"✅ Utilisation de {settings.GEMINI_FLASH_MODEL} (quota: 10M tokens/min)")
         else:
             logger.warning("⚠️ GEMINI_API_KEY non définie - génération désactivée")
             self.model = None
         
+        # Durée moyenne d'une rédaction complète par le LLM (temps gagné en local)
+        self.llm_latency_seconds = settings.ACT_LLM_LATENCY_PRIOR_SECONDS
+        
         logger.info("✅ MachineActes initialisé")
     
-    def generate(self, request: ActGenerationRequest) -> ActGenerationResponse:
+    @metered
+    def generate(
+        self,
+        request: ActGenerationRequest,
+        compiled: CompiledTemplate | None = None,
+    ) -> ActGenerationResponse:
         """
         Génère un acte juridique personnalisé
         
         Args:
             request: Requête de génération avec modèle et données
+            compiled: Modèle déjà compilé (fichier uploadé), sinon tiré de la requête
         
         Returns:
             Acte généré avec aperçu et métadonnées
         """
         logger.info(f"🎯 Génération d'acte : {request.act_type.value}")
         
-        # 1. Obtenir le contenu du modèle
-        template = self._get_template_content(request)
+        # 1. Obtenir le modèle compilé (extraction et détection des emplacements en cache)
+        if compiled is None:
+            compiled = self._get_compiled_template(request)
+        template = compiled.text if compiled else ""
         
         if not template:
             logger.error("❌ Aucun modèle fourni")
@@ -139,30 +169,68 @@ class MachineActes:
                 warnings=["❌ Erreur : Aucun modèle fourni"],
             )
         
-        logger.info(f"📄 Modèle chargé ({len(template)} caractères)")
+        logger.info(
+            f"📄 Modèle chargé ({len(template)} caractères, "
+            f"{len(compiled.slots)} emplacement(s))"
+        )
         
         # 2. Préparer les données client
         client_data = self._prepare_client_data(request)
         logger.info(f"📋 Données client préparées")
         
-        # 3. Générer l'acte avec Gemini
-        generated_act, confidence, warnings = self._generate_with_ai(
-            act_type=request.act_type,
-            template=template,
-            client_data=client_data,
-            custom_prompt=request.custom_prompt,
-        )
+        # 3. Remplissage local des emplacements : sans LLM si tous sont renseignés
+        started = time.perf_counter()
+        fill = self._fill_placeholders(request, compiled)
+        
+        if fill is not None and fill.complete:
+            path = GenerationPath.DETERMINISTIC
+            generated_act = fill.assemble()
+            confidence = DETERMINISTIC_CONFIDENCE
+            warnings = self._blank_warnings(fill)
+            logger.info(f"⚡ Acte complété localement ({len(fill.filled)} emplacement(s))")
         
-        # 4. Post-traitement selon format de sortie
-        final_act = self._post_process(
+        elif fill is not None:
+            # 4a. LLM pour les seuls passages restants
+            path = GenerationPath.HYBRID
+            plan = self._plan_sections_route(request, fill, client_data)
+            report_progress(0.2, "Complétion des passages restants")
+            generated_act, confidence, warnings = self._complete_sections_with_ai(
+                act_type=request.act_type,
+                fill=fill,
+                client_data=client_data,
+                estimated_tokens=plan.estimated_input_tokens,
+            )
+        
+        else:
+            # 4b. Routage avant l'appel : taille et coût estimés (modèle complet, sans troncature)
+            path = GenerationPath.LLM
+            plan = self._plan_route(request, template, client_data)
+            
+            # Générer l'acte avec Gemini
+            report_progress(0.2, "Génération de l'acte")
+            generated_act, confidence, warnings = self._generate_with_ai(
+                act_type=request.act_type,
+                compiled=compiled,
+                client_data=client_data,
+                custom_prompt=request.custom_prompt,
+                estimated_tokens=plan.estimated_input_tokens,
+            )
+        
+        time_saved_ms = self._record_latency(path, time.perf_counter() - started, confidence)
+        
+        # 5. Post-traitement selon format de sortie
+        report_progress(0.9, "Mise en forme")
+        final_act, download = self._post_process(
             generated_act,
             request.output_format,
-            request.preserve_formatting
+            request.preserve_formatting,
+            render_template=request.render_template,
+            act_type=request.act_type,
         )
         
-        # 5. Générer l'aperçu (s'assurer qu'il n'est jamais None)
-        if final_act and len(final_act) > 0:
-            preview = final_act[:500] + "..." if len(final_act) > 500 else final_act
+        # 6. Générer l'aperçu sur le texte
+        if generated_act and len(generated_act) > 0:
+            preview = generated_act[:500] + "..." if len(generated_act) > 500 else generated_act
         else:
             preview = ""
         
@@ -175,41 +243,191 @@ class MachineActes:
             validation_required=True,
             output_format=request.output_format,
             warnings=warnings or [],  # Toujours une liste, jamais None
+            template_id=compiled.template_id,
+            template_slots=compiled.slot_names,
+            generation_path=path,
+            filled_slots=fill.filled if fill else [],
+            unmapped_slots=fill.unmapped if fill else [],
+            time_saved_ms=time_saved_ms,
+            download_id=download.id if download else None,
+            download_url=f"/api/v1/download/{download.id}" if download else None,
         )
         
-        logger.success(f"✅ Acte généré (confiance: {confidence:.0%})")
+        logger.success(f"✅ Acte généré ({path.value}, confiance: {confidence:.0%})")
         return response
     
-    def _get_template_content(self, request: ActGenerationRequest) -> str:
+    def _get_compiled_template(self, request: ActGenerationRequest) -> CompiledTemplate | None:
         """
-        Obtient le contenu du modèle (texte ou fichier)
+        Obtient le modèle compilé (texte ou fichier), par empreinte du contenu
         
         Returns:
-            Contenu du modèle (limité à 200K caractères pour éviter dépassement tokens)
+            Modèle compilé, complet (la taille est contrôlée par le routage),
+            None si aucun modèle n'est fourni
         """
-        MAX_TEMPLATE_SIZE = 200000  # ~50K tokens max
+        compiler = get_act_template_compiler()
         
         # Option 1 : Contenu direct
         if request.template_content:
-            template = request.template_content
-            if len(template) > MAX_TEMPLATE_SIZE:
-                logger.warning(f"⚠️ Template trop gros ({len(template)} chars), tronqué à {MAX_TEMPLATE_SIZE}")
-                template = template[:MAX_TEMPLATE_SIZE] + "\n\n[... Template tronqué pour éviter dépassement de tokens ...]"
-            return template
+            return compiler.compile_text(request.template_content)
         
         # Option 2 : Fichier
         if request.template_file:
             try:
-                template = extract_text_from_file(request.template_file)
-                if len(template) > MAX_TEMPLATE_SIZE:
-                    logger.warning(f"⚠️ Template PDF trop gros ({len(template)} chars), tronqué à {MAX_TEMPLATE_SIZE}")
-                    template = template[:MAX_TEMPLATE_SIZE] + "\n\n[... Template tronqué pour éviter dépassement de tokens ...]"
-                return template
+                return compiler.compile_file(request.template_file, extract_text_from_file)
             except Exception as e:
                 logger.error(f"❌ Erreur extraction modèle : {e}")
-                return ""
+                return None
         
-        return ""
+        return None
+    
+    def _plan_route(
+        self,
+        request: ActGenerationRequest,
+        template: str,
+        client_data: str,
+    ) -> RoutePlan:
+        """
+        Vérifie avant l'appel que le modèle tient dans le contexte et le budget
+        
+        L'acte généré est estimé de la taille du modèle.
+        
+        Raises:
+            TokenBudgetError: Modèle trop volumineux ou trop coûteux
+            CostConfirmationRequired: Coût à confirmer (confirm_cost)
+        """
+        estimator = get_token_estimator()
+        prompt = PROMPT_ACT_GENERATION_CUSTOM if request.custom_prompt else PROMPT_ACT_GENERATION
+        return get_routing_policy().plan(
+            "machine_actes",
+            [template, client_data, request.custom_prompt or ""],
+            preferred_tier=TIER_FLASH,
+            output_tokens=estimator.estimate(template) + ACT_OUTPUT_MARGIN_TOKENS,
+            prompt_overhead_tokens=estimator.estimate(prompt),
+            confirmed=request.confirm_cost,
+        )
+    
+    def _fill_placeholders(
+        self,
+        request: ActGenerationRequest,
+        compiled: CompiledTemplate,
+    ) -> FillResult | None:
+        """
+        Complète localement les emplacements du modèle
+        
+        Returns:
+            Acte complété (éventuellement en partie), None si le modèle n'a
+            pas d'emplacements renseignables : rédaction par mimétisme (LLM)
+        """
+        if not request.deterministic_fill or request.custom_prompt:
+            return None
+        if not any(slot.kind in ("bracket", "mustache") for slot in compiled.slots):
+            return None
+        
+        fields = parse_client_fields(request.client_data, request.client_data_format.value)
+        if not fields:
+            return None
+        
+        fill = PlaceholderFiller(fields).fill(compiled.text)
+        if not fill.filled:
+            return None
+        logger.debug(
+            f"🧩 {len(fill.filled)} emplacement(s) complété(s) localement, "
+            f"{len(fill.unresolved)} passage(s) à compléter par le LLM"
+        )
+        return fill
+    
+    @staticmethod
+    def _blank_warnings(fill: FillResult) -> list[str]:
+        if not fill.blanks_left:
+            return []
+        return [f"ℹ️ Blancs laissés à compléter à la main : {', '.join(fill.blanks_left)}"]
+    
+    def _record_latency(self, path: GenerationPath, elapsed: float, confidence: float) -> float | None:
+        """
+        Met à jour la durée moyenne d'une rédaction LLM complète
+        
+        Returns:
+            Temps gagné estimé (ms) pour les chemins local et hybride
+        """
+        if path == GenerationPath.LLM:
+            if confidence > 0:
+                self.llm_latency_seconds = 0.8 * self.llm_latency_seconds + 0.2 * elapsed
+            return None
+        return round(max(self.llm_latency_seconds - elapsed, 0.0) * 1000, 1)
+    
+    def _plan_sections_route(
+        self,
+        request: ActGenerationRequest,
+        fill: FillResult,
+        client_data: str,
+    ) -> RoutePlan:
+        """Routage de la complétion des seuls passages restants"""
+        estimator = get_token_estimator()
+        sections = "\n\n".join(fill.sections[i] for i in fill.unresolved)
+        return get_routing_policy().plan(
+            "machine_actes",
+            [sections, client_data],
+            preferred_tier=TIER_FLASH,
+            output_tokens=estimator.estimate(sections) + ACT_OUTPUT_MARGIN_TOKENS,
+            prompt_overhead_tokens=estimator.estimate(PROMPT_ACT_SECTIONS),
+            confirmed=request.confirm_cost,
+        )
+    
+    def _complete_sections_with_ai(
+        self,
+        act_type: ActType,
+        fill: FillResult,
+        client_data: str,
+        estimated_tokens: int | None = None,
+    ) -> tuple[str, float, list[str]]:
+        """
+        Fait compléter par Gemini les passages que le remplissage local
+        n'a pas pu résoudre ; le reste de l'acte n'est pas envoyé
+        
+        Returns:
+            Tuple (acte complet, confiance, warnings)
+        """
+        warnings = self._blank_warnings(fill)
+        if not self.model:
+            warnings.append(f"⚠️ Gemini non configuré : emplacements non renseignés ({', '.join(fill.unmapped)})")
+            return fill.assemble(), 0.5, warnings
+        
+        with stage("prompt_build"):
+            sections = "\n\n".join(f"<<<PASSAGE {i}>>>\n{fill.sections[i]}" for i in fill.unresolved)
+            prompt = PROMPT_ACT_SECTIONS.format(
+                act_type=act_type.value,
+                client_data=client_data,
+                sections=sections,
+            )
+        
+        try:
+            logger.info(f"🤖 Complétion de {len(fill.unresolved)} passage(s) avec {self.model.model_name}...")
+            response = get_llm_gateway().generate_content(
+                self.model, prompt, estimated_tokens=estimated_tokens
+            )
+        except Exception as e:
+            logger.error(f"❌ Erreur complétion Gemini: {e}")
+            warnings.append(f"Erreur: {e} (passages laissés incomplets)")
+            return fill.assemble(), 0.5, warnings
+        
+        parts = re.split(r"<<<PASSAGE (\d+)>>>[ \t]*\n?", response.text)
+        completed = list(fill.sections)
+        returned = set()
+        for index, text in zip(parts[1::2], parts[2::2]):
+            index = int(index)
+            if index in fill.unresolved:
+                completed[index] = text.strip("\n")
+                returned.add(index)
+        
+        missing = [i for i in fill.unresolved if i not in returned]
+        if missing:
+            warnings.append(f"⚠️ {len(missing)} passage(s) non complété(s) par le LLM")
+        generated_act = fill.assemble(completed)
+        if any(BRACKET_RE.search(completed[i]) or MUSTACHE_RE.search(completed[i]) for i in returned):
+            warnings.append("⚠️ Variables non substituées détectées ([...])")
+        
+        confidence = 0.90 if not missing else 0.75
+        return generated_act, confidence, warnings
     
     def _prepare_client_data(self, request: ActGenerationRequest) -> str:
         """
@@ -248,9 +466,10 @@ class MachineActes:
     def _generate_with_ai(
         self,
         act_type: ActType,
-        template: str,
+        compiled: CompiledTemplate,
         client_data: str,
         custom_prompt: str | None = None,
+        estimated_tokens: int | None = None,
     ) -> tuple[str, float, list[str]]:
         """
         Génère l'acte avec Gemini
@@ -267,28 +486,25 @@ class MachineActes:
         
         warnings = []
         
-        # Choisir le prompt
-        if custom_prompt:
-            # Prompt personnalisé
-            prompt = PROMPT_ACT_GENERATION_CUSTOM.format(
+        # Choisir le prompt (préfixe pré-rendu du modèle + données client)
+        with stage("prompt_build"):
+            prompt = get_act_template_compiler().bind(
+                compiled,
+                client_data,
+                act_type=act_type.value,
                 custom_instructions=custom_prompt,
-                template=template,
-                client_data=client_data,
             )
+        if custom_prompt:
             logger.info("📝 Utilisation du prompt personnalisé")
         else:
-            # Prompt standard
-            prompt = PROMPT_ACT_GENERATION.format(
-                act_type=act_type.value,
-                template=template,
-                client_data=client_data,
-            )
             logger.info("📝 Utilisation du prompt standard")
         
         # Générer avec Gemini
         try:
             logger.info(f"🤖 Génération avec {self.model.model_name}...")
-            response = self.model.generate_content(prompt)
+            response = get_llm_gateway().generate_content(
+                self.model, prompt, estimated_tokens=estimated_tokens
+            )
             generated_act = response.text.strip()
             
             # Vérifications basiques
@@ -315,34 +531,43 @@ class MachineActes:
         self,
         generated_act: str,
         output_format: OutputFormat,
-        preserve_formatting: bool
-    ) -> str:
+        preserve_formatting: bool,
+        render_template: str | None = None,
+        act_type: ActType | None = None,
+    ) -> tuple[str, StoredDocument | None]:
         """
         Post-traitement selon le format de sortie
         
+        PDF et DOCX sont rendus côté serveur avec les styles du template
+        PDF du cabinet (utils.act_renderer), puis copiés par blocs dans le
+        stockage des téléchargements : la réponse ne contient que leur lien.
+        
         Returns:
-            Acte formaté
+            Tuple (acte formaté : texte ou HTML, document PDF/DOCX stocké ou None)
         """
-        # Pour MVP, on retourne le texte tel quel
-        # Dans une version complète, on pourrait :
-        # - Générer PDF avec reportlab
-        # - Générer DOCX avec python-docx
-        # - Générer HTML avec templates
-        
         if output_format == OutputFormat.TEXT:
-            return generated_act
+            return generated_act, None
         
         elif output_format == OutputFormat.HTML:
             # Conversion basique texte → HTML
             html = generated_act.replace("\n\n", "</p><p>")
             html = f"<html><body><p>{html}</p></body></html>"
-            return html
+            return html, None
+        
+        elif not generated_act:
+            return generated_act, None
         
         else:
-            # PDF et DOCX nécessitent des bibliothèques supplémentaires
-            # Pour MVP, on retourne le texte avec un warning
-            logger.warning(f"⚠️ Format {output_format.value} pas encore implémenté, retour texte")
-            return generated_act
+            extension = output_format.value
+            media_type = PDF_MEDIA_TYPE if output_format == OutputFormat.PDF else DOCX_MEDIA_TYPE
+            filename = f"acte_{act_type.value if act_type else 'juridique'}.{extension}"
+            with stage("render"):
+                with get_act_renderer().render(
+                    generated_act, extension, template_name=render_template
+                ) as buffer:
+                    download = get_download_store().put_file(buffer, filename, media_type)
+            logger.info(f"🖨️ Acte rendu en {extension.upper()} ({download.size // 1024} Ko) : {download.id}")
+            return generated_act, download
 
 
 # Point d'entrée pour tests
@@ -0,0 +1,529 @@
+"""
+Machine à Actes : génération par lot
+
+Un modèle + un fichier de N clients (CSV, JSON ou JSONL) → N actes, générés
+avec une concurrence bornée et enregistrés au fil de l'eau.
+
+Chaque lot a son dossier (ACT_BATCH_DIR/<batch_id>) :
+- request.json  : requête d'origine (reprise à l'identique)
+- manifest.json : état de chaque ligne (tentatives, erreur, nom dans l'archive)
+- acts/         : un fichier par acte généré
+- actes.zip     : archive assemblée au téléchargement
+- .lock         : verrou tenu par le runner en cours (un seul à la fois par lot)
+
+Chaque acte est écrit dans son propre fichier (fichier temporaire puis
+renommage atomique) dès sa génération ; le manifeste est enregistré à
+chaque point de reprise (toutes les quelques secondes). Aucun fichier
+existant n'est réécrit : après un arrêt brutal, un acte est soit complet,
+soit absent, et seules les lignes sans fichier sont regénérées. L'archive
+ZIP est construite à la demande, à partir des fichiers des actes, puis
+remplacée atomiquement (le téléchargement ne lit jamais une archive en
+cours d'écriture).
+"""
+
+import csv
+import fcntl
+import io
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from api.machine_actes import MachineActes
+from api.models import (
+    ActGenerationRequest,
+    ActGenerationResponse,
+    BatchActGenerationRequest,
+    BatchActGenerationResponse,
+    BatchRowState,
+    DataInputFormat,
+    OutputFormat,
+)
+from config.logging_config import get_logger
+from config.settings import get_settings
+from rag.text_utils import content_hash, fold_accents
+from rag.token_budget import TokenBudgetError
+from utils.download_store import get_download_store
+from utils.job_queue import report_progress
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+ARCHIVE_NAME = "actes.zip"
+ACTS_DIR = "acts"
+
+# Intervalle entre deux enregistrements du manifeste
+CHECKPOINT_SECONDS = 2.0
+CHECKPOINT_ROWS = 25
+
+# Attente avant une nouvelle tentative (doublée à chaque échec)
+RETRY_BACKOFF_SECONDS = 1.0
+
+
+class BatchError(ValueError):
+    """Lot invalide ou introuvable"""
+
+
+class BatchRunningError(BatchError):
+    """Lot déjà en cours de génération (dans ce processus ou un autre)"""
+
+
+def parse_rows(data: str, data_format: DataInputFormat) -> list[dict[str, str]]:
+    """
+    Lit les lignes clients d'un lot
+
+    Args:
+        data: CSV avec en-tête (séparateur , ; ou tabulation), tableau JSON ou JSONL
+        data_format: Format des données
+
+    Returns:
+        Une table {colonne: valeur} par client
+    """
+    data = data.strip().lstrip("﻿")
+    if data_format == DataInputFormat.CSV:
+        try:
+            dialect = csv.Sniffer().sniff(data.split("\n", 1)[0], delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(io.StringIO(data), dialect=dialect)
+        rows = [
+            {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            for row in reader
+        ]
+        return [row for row in rows if any(row.values())]
+
+    if data_format == DataInputFormat.JSON:
+        if data.startswith("["):
+            rows = json.loads(data)
+        else:
+            rows = [json.loads(line) for line in data.splitlines() if line.strip()]
+        if not all(isinstance(row, dict) for row in rows):
+            raise BatchError("Chaque client doit être un objet JSON")
+        return [{str(k): "" if v is None else str(v) for k, v in row.items()} for row in rows]
+
+    raise BatchError(f"Format de lot non supporté : {data_format.value} (csv ou json)")
+
+
+def row_client_data(row: dict[str, str]) -> str:
+    """Données client d'une ligne, au format de MachineActes._prepare_client_data"""
+    return "\n".join(f"{key}: {value}" for key, value in row.items() if value)
+
+
+_EXTENSIONS = {OutputFormat.HTML: "html", OutputFormat.PDF: "pdf", OutputFormat.DOCX: "docx"}
+
+
+def _act_filename(index: int, row: dict[str, str], field_name: str | None, output_format: OutputFormat) -> str:
+    label = row.get(field_name, "") if field_name else next(iter(row.values()), "")
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", fold_accents(label)).strip("_")[:40]
+    extension = _EXTENSIONS.get(output_format, "txt")
+    return f"{index:04d}_{slug or 'acte'}.{extension}"
+
+
+@dataclass
+class BatchManifest:
+    """État persistant d'un lot"""
+
+    batch_id: str
+    act_type: str
+    rows_hash: str
+    rows: list[dict[str, Any]]
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def count(self, state: BatchRowState) -> int:
+        return sum(1 for row in self.rows if row["status"] == state.value)
+
+    def to_response(self) -> BatchActGenerationResponse:
+        return BatchActGenerationResponse(
+            batch_id=self.batch_id,
+            act_type=self.act_type,
+            total=len(self.rows),
+            succeeded=self.count(BatchRowState.SUCCEEDED),
+            failed=self.count(BatchRowState.FAILED),
+            pending=self.count(BatchRowState.PENDING),
+            rows=self.rows,
+            archive_url=f"/api/v1/machine-actes/batch/{self.batch_id}/archive",
+            created_at=datetime.fromtimestamp(self.created_at),
+            updated_at=datetime.fromtimestamp(self.updated_at),
+        )
+
+
+class ActBatchRunner:
+    """
+    Génération d'actes par lot, reprenable
+
+    Usage:
+        >>> runner = ActBatchRunner(MachineActes())
+        >>> request = runner.create(BatchActGenerationRequest(...))
+        >>> runner.run(request)  # à relancer tel quel après un arrêt
+    """
+
+    def __init__(
+        self,
+        machine: MachineActes,
+        batches_dir: Path | None = None,
+        concurrency: int | None = None,
+        max_retries: int | None = None,
+    ):
+        """
+        Args:
+            machine: Service de génération (un acte par appel)
+            batches_dir: Dossier des lots (défaut : ACT_BATCH_DIR)
+            concurrency: Générations simultanées (défaut : ACT_BATCH_CONCURRENCY)
+            max_retries: Nouvelles tentatives par ligne (défaut : ACT_BATCH_MAX_RETRIES)
+        """
+        self.machine = machine
+        self.batches_dir = Path(batches_dir or settings.ACT_BATCH_DIR)
+        self.concurrency = concurrency or settings.ACT_BATCH_CONCURRENCY
+        self.max_retries = settings.ACT_BATCH_MAX_RETRIES if max_retries is None else max_retries
+        self._manifest_lock = threading.Lock()
+        self._archive_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Dossier du lot
+    # ------------------------------------------------------------------
+
+    def batch_dir(self, batch_id: str) -> Path:
+        if not re.fullmatch(r"[0-9a-f]{32}", batch_id):
+            raise BatchError(f"Identifiant de lot invalide : {batch_id}")
+        return self.batches_dir / batch_id
+
+    def archive_path(self, batch_id: str) -> Path:
+        return self.batch_dir(batch_id) / ARCHIVE_NAME
+
+    def acts_dir(self, batch_id: str) -> Path:
+        return self.batch_dir(batch_id) / ACTS_DIR
+
+    def build_archive(self, batch_id: str) -> Path | None:
+        """
+        Archive ZIP des actes générés (partielle tant que le lot est en cours)
+
+        Reconstruite si un acte a été ajouté depuis la précédente, dans un
+        fichier temporaire renommé atomiquement : un téléchargement en cours
+        garde l'archive qu'il a ouverte.
+
+        Returns:
+            Chemin de l'archive, None si aucun acte n'a été généré
+        """
+        acts_dir = self.acts_dir(batch_id)
+        if not acts_dir.exists():
+            return None
+        path = self.archive_path(batch_id)
+        with self._archive_lock:
+            acts = sorted(entry for entry in acts_dir.iterdir() if not entry.name.endswith(".tmp"))
+            if not acts:
+                return None
+            # Signature des actes archivés (commentaire de l'archive)
+            signature = f"{len(acts)}:{max(entry.stat().st_mtime_ns for entry in acts)}".encode("ascii")
+            if path.exists():
+                try:
+                    with zipfile.ZipFile(path) as current:
+                        if current.comment == signature:
+                            return path
+                except zipfile.BadZipFile:
+                    pass
+            tmp_path = path.with_name(f"{ARCHIVE_NAME}.{threading.get_ident()}.tmp")
+            with zipfile.ZipFile(tmp_path, "w") as archive:
+                for entry in acts:
+                    # PDF et DOCX sont déjà compressés
+                    compression = zipfile.ZIP_STORED if entry.suffix in (".pdf", ".docx") else zipfile.ZIP_DEFLATED
+                    archive.write(entry, entry.name, compress_type=compression)
+                archive.comment = signature
+            tmp_path.replace(path)
+        return path
+
+    def create(self, request: BatchActGenerationRequest) -> BatchActGenerationRequest:
+        """
+        Enregistre un nouveau lot (requête et manifeste initial)
+
+        Les données sont lues dès la soumission pour refuser un fichier
+        invalide avant toute génération.
+
+        Returns:
+            Requête complétée de son batch_id
+
+        Raises:
+            BatchError: Données illisibles, vides ou trop nombreuses
+        """
+        if not (request.template_content or request.template_file):
+            raise BatchError("Un modèle doit être fourni : template_content ou template_file")
+        try:
+            rows = parse_rows(request.rows_data, request.rows_format)
+        except (csv.Error, json.JSONDecodeError) as e:
+            raise BatchError(f"Données clients illisibles : {e}")
+        if not rows:
+            raise BatchError("Aucune ligne client dans les données")
+        if len(rows) > settings.ACT_BATCH_MAX_ROWS:
+            raise BatchError(f"Lot trop volumineux : {len(rows)} lignes (maximum {settings.ACT_BATCH_MAX_ROWS})")
+
+        request = request.model_copy(update={"batch_id": uuid.uuid4().hex})
+        batch_dir = self.batch_dir(request.batch_id)
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        (batch_dir / "request.json").write_text(request.model_dump_json(), encoding="utf-8")
+
+        manifest = BatchManifest(
+            batch_id=request.batch_id,
+            act_type=request.act_type.value,
+            rows_hash=content_hash(request.rows_data),
+            rows=[
+                {
+                    "index": i,
+                    "status": BatchRowState.PENDING.value,
+                    "attempts": 0,
+                    "filename": _act_filename(i, row, request.filename_field, request.output_format),
+                    "confidence": None,
+                    "warnings": [],
+                    "error": None,
+                }
+                for i, row in enumerate(rows, 1)
+            ],
+        )
+        self._save_manifest(manifest)
+        logger.info(f"📦 Lot {request.batch_id} créé : {len(rows)} acte(s) {request.act_type.value}")
+        return request
+
+    @contextmanager
+    def _batch_lock(self, batch_id: str) -> Iterator[None]:
+        """
+        Verrou exclusif du lot (fichier .lock, partagé entre processus)
+
+        Raises:
+            BatchRunningError: Si un autre runner tient déjà le verrou
+        """
+        batch_dir = self.batch_dir(batch_id)
+        if not batch_dir.exists():
+            raise BatchError(f"Lot inconnu : {batch_id}")
+        with open(batch_dir / ".lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise BatchRunningError(f"Lot déjà en cours de génération : {batch_id}")
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def is_running(self, batch_id: str) -> bool:
+        """Indique si un runner génère actuellement le lot"""
+        try:
+            with self._batch_lock(batch_id):
+                return False
+        except BatchRunningError:
+            return True
+
+    def load_request(self, batch_id: str) -> BatchActGenerationRequest:
+        """Requête d'origine d'un lot (pour le reprendre)"""
+        path = self.batch_dir(batch_id) / "request.json"
+        if not path.exists():
+            raise BatchError(f"Lot inconnu : {batch_id}")
+        return BatchActGenerationRequest.model_validate_json(path.read_text(encoding="utf-8"))
+
+    def status(self, batch_id: str) -> BatchActGenerationResponse:
+        """État d'un lot d'après son manifeste"""
+        return self._load_manifest(batch_id).to_response()
+
+    def _load_manifest(self, batch_id: str) -> BatchManifest:
+        path = self.batch_dir(batch_id) / "manifest.json"
+        if not path.exists():
+            raise BatchError(f"Lot inconnu : {batch_id}")
+        return BatchManifest(**json.loads(path.read_text(encoding="utf-8")))
+
+    def _save_manifest(self, manifest: BatchManifest) -> None:
+        with self._manifest_lock:
+            manifest.updated_at = time.time()
+            path = self.batch_dir(manifest.batch_id) / "manifest.json"
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(asdict(manifest), ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(path)
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    def run(self, request: BatchActGenerationRequest) -> BatchActGenerationResponse:
+        """
+        Génère les actes restants d'un lot
+
+        Les lignes déjà générées sont conservées ; les lignes en attente et
+        en échec sont (re)tentées.
+
+        Returns:
+            Manifeste final du lot
+
+        Raises:
+            BatchRunningError: Si le lot est déjà en cours de génération
+        """
+        if not request.batch_id:
+            request = self.create(request)
+        with self._batch_lock(request.batch_id):
+            return self._run(request)
+
+    def _run(self, request: BatchActGenerationRequest) -> BatchActGenerationResponse:
+        batch_id = request.batch_id
+        manifest = self._load_manifest(batch_id)
+        if manifest.rows_hash != content_hash(request.rows_data):
+            raise BatchError(f"Les données ne correspondent pas au lot {batch_id}")
+
+        self._reconcile_acts(manifest)
+        rows = parse_rows(request.rows_data, request.rows_format)
+        todo = [row for row in manifest.rows if row["status"] != BatchRowState.SUCCEEDED.value]
+        total = len(manifest.rows)
+        done = total - len(todo)
+        if todo:
+            logger.info(f"📦 Lot {batch_id} : {len(todo)} acte(s) à générer sur {total}")
+
+        concurrency = request.concurrency or self.concurrency
+        max_retries = self.max_retries if request.max_retries is None else request.max_retries
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"batch-{batch_id[:8]}")
+        buffered: list[dict[str, Any]] = []
+        last_checkpoint = time.monotonic()
+        queue = iter(todo)
+        running: dict[Future, dict[str, Any]] = {}
+
+        def submit_next() -> None:
+            row = next(queue, None)
+            if row is not None:
+                client_data = row_client_data(rows[row["index"] - 1])
+                running[executor.submit(self._generate_row, request, client_data, max_retries)] = row
+
+        try:
+            # Fenêtre bornée : jamais plus de `concurrency` lignes en vol
+            for _ in range(concurrency):
+                submit_next()
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    row = running.pop(future)
+                    response, attempts, error = future.result()
+                    row["attempts"] += attempts
+                    if response is not None:
+                        row.update(confidence=response.confidence, warnings=response.warnings, error=None)
+                        self._write_act(batch_id, row["filename"], response)
+                        buffered.append(row)
+                    else:
+                        row.update(status=BatchRowState.FAILED.value, error=error)
+                        logger.warning(f"⚠️ Lot {batch_id}, ligne {row['index']} en échec : {error}")
+                    done += 1
+                    submit_next()
+
+                if (
+                    len(buffered) >= CHECKPOINT_ROWS
+                    or time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS
+                ):
+                    self._checkpoint(manifest, buffered)
+                    last_checkpoint = time.monotonic()
+                report_progress(done / total, f"{done}/{total} actes")
+        finally:
+            # Annulation ou erreur : les actes terminés sont conservés
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._checkpoint(manifest, buffered)
+
+        result = manifest.to_response()
+        logger.success(
+            f"✅ Lot {batch_id} : {result.succeeded} acte(s) générés, "
+            f"{result.failed} en échec"
+        )
+        return result
+
+    def _generate_row(
+        self,
+        request: BatchActGenerationRequest,
+        client_data: str,
+        max_retries: int,
+    ) -> tuple[ActGenerationResponse | None, int, str | None]:
+        """Génère l'acte d'une ligne (avec nouvelles tentatives)"""
+        act_request = ActGenerationRequest(
+            act_type=request.act_type,
+            template_content=request.template_content,
+            template_file=request.template_file,
+            client_data=client_data,
+            client_data_format=DataInputFormat.TEXT,
+            output_format=request.output_format,
+            render_template=request.render_template,
+            custom_prompt=request.custom_prompt,
+            confirm_cost=request.confirm_cost,
+        )
+        error = None
+        for attempt in range(1, max_retries + 2):
+            try:
+                response = self.machine.generate(act_request)
+            except TokenBudgetError as e:
+                # Refus avant envoi : une nouvelle tentative donnerait le même résultat
+                return None, attempt, str(e)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.confidence > 0 and response.generated_act:
+                    return response, attempt, None
+                error = "; ".join(response.warnings) or "Acte vide"
+            if attempt <= max_retries:
+                time.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        return None, max_retries + 1, error
+
+    @staticmethod
+    def _rendered_path(download_id: str) -> Path:
+        """Blob du PDF/DOCX rendu pour une ligne"""
+        store = get_download_store()
+        document = store.get(download_id)
+        if document is None:
+            raise BatchError(f"Acte rendu introuvable : {download_id}")
+        return store.blob_path(document.sha256)
+
+    def _write_act(self, batch_id: str, filename: str, response: ActGenerationResponse) -> None:
+        """
+        Enregistre l'acte d'une ligne dans son propre fichier (écriture
+        atomique : un arrêt brutal ne laisse qu'un fichier .tmp, ignoré)
+        """
+        acts_dir = self.acts_dir(batch_id)
+        acts_dir.mkdir(exist_ok=True)
+        path = acts_dir / filename
+        tmp_path = path.with_name(f"{filename}.{threading.get_ident()}.tmp")
+        if response.download_id:
+            # PDF/DOCX rendu : copié depuis le stockage des téléchargements
+            shutil.copyfile(self._rendered_path(response.download_id), tmp_path)
+        else:
+            tmp_path.write_text(response.generated_act, encoding="utf-8")
+        with open(tmp_path, "rb") as tmp_file:
+            os.fsync(tmp_file.fileno())
+        tmp_path.replace(path)
+
+    def _checkpoint(self, manifest: BatchManifest, buffered: list[dict[str, Any]]) -> None:
+        """Marque générés les actes enregistrés puis enregistre le manifeste"""
+        for row in buffered:
+            row["status"] = BatchRowState.SUCCEEDED.value
+        buffered.clear()
+        self._save_manifest(manifest)
+
+    def _reconcile_acts(self, manifest: BatchManifest) -> None:
+        """
+        Aligne le manifeste sur les fichiers des actes avant une reprise
+
+        - acte enregistré mais pas marqué généré : marqué généré
+        - acte marqué généré mais absent : à regénérer
+        """
+        acts_dir = self.acts_dir(manifest.batch_id)
+        names: set[str] = set()
+        if acts_dir.exists():
+            for entry in acts_dir.iterdir():
+                if entry.name.endswith(".tmp"):
+                    # Arrêt pendant l'écriture d'un acte
+                    entry.unlink(missing_ok=True)
+                else:
+                    names.add(entry.name)
+
+        for row in manifest.rows:
+            saved = row["filename"] in names
+            if saved and row["status"] != BatchRowState.SUCCEEDED.value:
+                row["status"] = BatchRowState.SUCCEEDED.value
+            elif not saved and row["status"] == BatchRowState.SUCCEEDED.value:
+                row["status"] = BatchRowState.PENDING.value
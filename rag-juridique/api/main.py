@@ -14,21 +14,45 @@ Documentation : http://localhost:8000/docs
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from loguru import logger
 
+from api.jobs import create_worker_pool
+from api.metrics import MetricsMiddleware, metrics_text
 from api.routes import (
     audit,
     chatbot,
     downloads,
+    jobs,
     machine_actes,
+    profiles,
+    sessions,
     super_chercheur,
     synthese,
     templates,
 )
+from api.compression import CompressionMiddleware
+from api.profiling import ProfilingMiddleware
+from api.responses import FastJSONResponse
+from api.services import get_services
+from api.tracing import TracingMiddleware
+from api.uploads import UploadLimitMiddleware
+from api.warmup import get_warmup
 from config.logging_config import setup_logging
 from config.settings import get_settings
+from rag.llm_gateway import get_llm_gateway
+from rag.session_index import get_session_index_store
+from rag.token_budget import get_token_estimator
+from rag.vertex_search import VertexSearchClient
+from utils.act_renderer import get_act_renderer
+from utils.act_templates import get_act_template_compiler
+from utils.download_store import DownloadSweeper, get_download_store
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from utils.pdf_template_manager import get_template_manager
+from utils.scan_pool import shutdown_scan_pool, start_scan_pool
+from utils.tracing import get_span_exporter
 
 # Configuration
 setup_logging()
@@ -50,13 +74,43 @@ async def lifespan(app: FastAPI):
     logger.info(f"📍 Environnement : {settings.LOG_LEVEL}")
     logger.info(f"📊 GCP Project : {settings.GCP_PROJECT_ID}")
     logger.info(f"🤖 Gemini Model : {settings.GEMINI_PRO_MODEL}")
-    logger.success("✅ API prête à recevoir des requêtes")
+    
+    # Préchauffage en arrière-plan (services, sonde Vertex, caches locaux) :
+    # /ready répond 503 jusqu'à sa fin, /health dès maintenant
+    warmup = get_warmup()
+    if settings.SERVICES_WARMUP:
+        warmup.start()
+    else:
+        warmup.disable()
+    
+    # Workers des tâches asynchrones (sinon : python -m api.jobs)
+    job_workers = None
+    if settings.JOBS_WORKERS > 0:
+        job_workers = create_worker_pool()
+        job_workers.start()
+    
+    # Balayage des téléchargements expirés
+    download_sweeper = DownloadSweeper(
+        get_download_store(), interval_seconds=settings.DOWNLOADS_SWEEP_INTERVAL_SECONDS
+    )
+    download_sweeper.start()
+    
+    # Pool de processus de l'analyse de style PDF (spawn, partagé)
+    if settings.PDF_STYLE_WORKERS > 1:
+        start_scan_pool()
+    
+    logger.success("✅ API démarrée (disponibilité : /ready)")
     logger.info("="*70)
     
     yield
     
     # Shutdown
     logger.info("🛑 Arrêt de l'API...")
+    if job_workers is not None:
+        job_workers.stop()
+    download_sweeper.stop()
+    shutdown_scan_pool()
+    get_span_exporter().stop()
     logger.success("✅ API arrêtée proprement")
 
 
@@ -94,8 +148,22 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    # Réponses sans response_model (dictionnaires) sérialisées par orjson
+    default_response_class=FastJSONResponse,
 )
 
+# Taille des corps de requête (uploads coupés dès le dépassement)
+app.add_middleware(UploadLimitMiddleware, max_bytes=settings.UPLOAD_MAX_REQUEST_BYTES)
+
+# Compression br/gzip des réponses textuelles volumineuses
+if settings.RESPONSE_COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        min_bytes=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_level=settings.RESPONSE_COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_COMPRESSION_BROTLI_QUALITY,
+    )
+
 # Configuration CORS
 app.add_middleware(
     CORSMiddleware,
@@ -105,6 +173,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profilage à la demande (X-Profile + X-Admin-Token), absent si désactivé
+profiling_enabled = settings.PROFILING_ENABLED and bool(settings.PROFILING_ADMIN_TOKEN)
+if settings.PROFILING_ENABLED and not profiling_enabled:
+    logger.warning("⚠️ PROFILING_ENABLED sans PROFILING_ADMIN_TOKEN : profilage désactivé")
+if profiling_enabled:
+    app.add_middleware(
+        ProfilingMiddleware,
+        admin_token=settings.PROFILING_ADMIN_TOKEN,
+        mode=settings.PROFILING_MODE,
+        interval_ms=settings.PROFILING_INTERVAL_MS,
+    )
+
+# Métriques des requêtes HTTP (englobe les middlewares précédents)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Trace par requête (X-Trace-Id, logs, spans exportés)
+if settings.TRACING_ENABLED:
+    app.add_middleware(
+        TracingMiddleware,
+        sample_rate=settings.TRACING_SAMPLE_RATE,
+        excluded_paths=settings.TRACING_EXCLUDED_PATHS,
+    )
+
 
 # Route racine
 @app.get("/", tags=["Root"])
@@ -130,6 +222,8 @@ async def root():
         "resources": {
             "templates": "/api/v1/templates",
             "downloads": "/api/v1/download",
+            "jobs": "/api/v1/jobs",
+            "sessions": "/api/v1/sessions",
         }
     }
 
@@ -148,9 +242,46 @@ async def health_check():
         "api": "operational",
         "gemini": "configured" if settings.GEMINI_API_KEY else "not_configured",
         "vertex_ai": "configured" if settings.GCP_PROJECT_ID else "not_configured",
+        "coalescing": {
+            "vertex_search": VertexSearchClient.coalescing_stats(),
+            "gemini": get_llm_gateway().stats(),
+        },
+        "token_estimator": get_token_estimator().stats(),
+        "session_index": get_session_index_store().stats(),
+        "act_templates": get_act_template_compiler().stats(),
+        "act_renderer": get_act_renderer().stats(),
+        "pdf_templates": get_template_manager().stats(),
+        "services": get_services().stats(),
+        "tracing": get_span_exporter().stats(),
     }
 
 
+# Readiness check
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """
+    Disponibilité de l'API (fin du préchauffage du démarrage)
+    
+    Returns:
+        État du préchauffage par étape ; HTTP 503 tant qu'il n'est pas terminé
+    """
+    status = get_warmup().status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+# Métriques (format texte Prometheus)
+async def metrics():
+    """
+    Métriques de l'API : latences par route et par pilier, Vertex AI Search,
+    Gemini (latence, tokens, 429), caches, requêtes en cours, file de tâches
+    """
+    return PlainTextResponse(await run_in_threadpool(metrics_text), media_type=METRICS_CONTENT_TYPE)
+
+
+if settings.METRICS_ENABLED:
+    app.add_api_route("/metrics", metrics, methods=["GET"], tags=["Health"])
+
+
 # Inclusion des routes
 app.include_router(
     machine_actes.router,
@@ -194,6 +325,25 @@ app.include_router(
     tags=["Téléchargements"]
 )
 
+app.include_router(
+    jobs.router,
+    prefix="/api/v1/jobs",
+    tags=["Tâches asynchrones"]
+)
+
+app.include_router(
+    sessions.router,
+    prefix="/api/v1/sessions",
+    tags=["Dossier de session"]
+)
+
+if profiling_enabled:
+    app.include_router(
+        profiles.router,
+        prefix="/api/v1/profiles",
+        tags=["Profils de requêtes"]
+    )
+
 
 # Gestionnaire d'erreurs global
 @app.exception_handler(Exception)
@@ -0,0 +1,217 @@
+"""
+Instrumentation HTTP et métriques lues à la collecte (/metrics)
+
+- MetricsMiddleware : durée, statut et requêtes en cours par route
+  (gabarit du chemin, ex. /api/v1/sessions/{session_id}/files) et par
+  pilier (segment suivant /api/v1/)
+- Métriques collectées à la lecture de /metrics, à partir des statistiques
+  déjà tenues par les composants : succès des caches, coalescence des
+  appels Vertex AI Search et Gemini, profondeur de la file de tâches.
+  Seules les instances globales existantes sont lues : la collecte ne
+  construit rien, et les statistiques des caches sont lues une fois.
+
+Les métriques des dépendances (Vertex AI Search, Gemini) sont observées
+au point d'appel (utils.metrics.Timer).
+"""
+
+import contextvars
+import sys
+import time
+from typing import Any, Iterator
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.services import get_services
+from utils.metrics import (
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    CollectedMetric,
+    Labels,
+    render,
+)
+
+API_PREFIX = "/api/v1/"
+
+_pillars: dict[str, str] = {}
+
+
+def pillar_of(route_path: str) -> str:
+    """Pilier (ou ressource) d'une route : machine-actes, search, audit... ou system"""
+    pillar = _pillars.get(route_path)
+    if pillar is None:
+        if route_path.startswith(API_PREFIX):
+            pillar = route_path[len(API_PREFIX):].split("/", 1)[0] or "system"
+        else:
+            pillar = "system"
+        _pillars[route_path] = pillar
+    return pillar
+
+
+def route_template(scope: Scope) -> str:
+    """
+    Gabarit complet de la route traitée (unmatched si aucune)
+
+    Les versions récentes de FastAPI gardent dans la route le chemin relatif
+    au routeur inclus, et le chemin complet dans le contexte de la route
+    effective (scope["fastapi"]).
+    """
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Mesure les requêtes HTTP (middleware ASGI)
+
+    La route est connue après le routage (scope["route"]) ; une requête
+    sans route correspondante est comptée sous « unmatched ».
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route_path = route_template(scope)
+            pillar = pillar_of(route_path)
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.observe(elapsed, pillar, route_path, method)
+            HTTP_REQUESTS.inc(pillar, route_path, method, str(status))
+
+
+# ==============================================================================
+# MÉTRIQUES COLLECTÉES
+# ==============================================================================
+
+# Valeurs partagées par les métriques d'une même collecte (metrics_text)
+_scrape: contextvars.ContextVar[dict[str, Any] | None] = contextvars.ContextVar(
+    "metrics_scrape", default=None
+)
+
+
+def _existing(module_name: str, attribute: str) -> Any:
+    """Instance globale d'un module déjà importé (None si non construite)"""
+    module = sys.modules.get(module_name)
+    return getattr(module, attribute, None) if module is not None else None
+
+
+def _cache_stats() -> dict[str, tuple[int, int]]:
+    """(succès, échecs) de chaque cache déjà construit, lus une fois par collecte"""
+    scrape = _scrape.get()
+    if scrape is not None and "caches" in scrape:
+        return scrape["caches"]
+
+    caches: dict[str, tuple[int, int]] = {}
+    estimator = _existing("rag.token_budget", "_estimator")
+    if estimator is not None:
+        stats = estimator.stats()
+        caches["token_estimates"] = (stats["hits"], stats["misses"])
+    compiler = _existing("utils.act_templates", "_compiler")
+    if compiler is not None:
+        stats = compiler.stats()
+        caches["act_templates"] = (stats["hits"] + stats["disk_hits"], stats["compilations"])
+    renderer = _existing("utils.act_renderer", "_renderer")
+    if renderer is not None:
+        stats = renderer.stats()
+        caches["act_styles"] = (stats["hits"], stats["compilations"])
+
+    services = get_services()
+    synthese = services.built("synthese")
+    if synthese is not None and synthese.summarizer is not None:
+        stats = synthese.summarizer.cache.stats()
+        caches["chunk_summaries"] = (stats["hits"], stats["misses"])
+    chatbot = services.built("chatbot")
+    if chatbot is not None:
+        # Tours de conversation servis par les résultats de recherche précédents
+        stats = chatbot.stats()
+        skipped = stats["skipped_retrievals"]
+        caches["chat_retrievals"] = (skipped, stats["retrieval_turns"] - skipped)
+    if scrape is not None:
+        scrape["caches"] = caches
+    return caches
+
+
+def _collect_cache_requests() -> Iterator[tuple[Labels, float]]:
+    for cache, (hits, misses) in _cache_stats().items():
+        yield (cache, "hit"), hits
+        yield (cache, "miss"), misses
+
+
+def _collect_cache_hit_ratio() -> Iterator[tuple[Labels, float]]:
+    for cache, (hits, misses) in _cache_stats().items():
+        total = hits + misses
+        yield (cache,), hits / total if total else 0.0
+
+
+def _collect_coalescing() -> Iterator[tuple[Labels, float]]:
+    from rag.llm_gateway import get_llm_gateway
+    from rag.vertex_search import VertexSearchClient
+
+    for dependency, stats in (
+        ("vertex_search", VertexSearchClient.coalescing_stats()),
+        ("gemini", get_llm_gateway().stats()),
+    ):
+        yield (dependency, "executed"), stats["calls"]
+        yield (dependency, "coalesced"), stats["coalesced"]
+
+
+def _collect_job_queue_depth() -> Iterator[tuple[Labels, float]]:
+    queue = _existing("api.jobs", "_queue")
+    if queue is not None:
+        yield (), queue.depth()
+
+
+CollectedMetric(
+    "legalrag_cache_requests_total",
+    "Consultations des caches (hit : servi par le cache)",
+    _collect_cache_requests,
+    ("cache", "result"),
+    type="counter",
+)
+CollectedMetric(
+    "legalrag_cache_hit_ratio",
+    "Part des consultations servies par le cache depuis le démarrage",
+    _collect_cache_hit_ratio,
+    ("cache",),
+)
+CollectedMetric(
+    "legalrag_coalesced_calls_total",
+    "Appels aux dépendances exécutés ou partagés avec un appel identique en cours",
+    _collect_coalescing,
+    ("dependency", "result"),
+    type="counter",
+)
+CollectedMetric(
+    "legalrag_job_queue_depth",
+    "Tâches asynchrones en attente",
+    _collect_job_queue_depth,
+)
+
+
+def metrics_text() -> str:
+    """Exposition des métriques (appel bloquant : lecture de la file de tâches)"""
+    token = _scrape.set({})
+    try:
+        return render()
+    finally:
+        _scrape.reset(token)
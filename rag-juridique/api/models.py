@@ -41,6 +41,29 @@ class DocumentStatus(str, Enum):
     MODIFIE = "MODIFIE"
 
 
+# ============================================================================
+# CONSOMMATION LLM - MODÈLES
+# ============================================================================
+
+class LLMUsage(BaseModel):
+    """Tokens estimés et réels, latences et routage d'une requête"""
+    
+    estimated_input_tokens: int = Field(0, description="Tokens d'entrée estimés localement")
+    input_tokens: Optional[int] = Field(None, description="Tokens d'entrée comptés par Gemini")
+    output_tokens: Optional[int] = Field(None, description="Tokens générés comptés par Gemini")
+    llm_calls: int = Field(0, description="Nombre d'appels LLM")
+    llm_latency_ms: float = Field(0, description="Temps cumulé des appels LLM")
+    latency_ms: float = Field(0, description="Temps total de traitement")
+    route: Optional[dict[str, Any]] = Field(
+        None,
+        description="Plan de routage (modèle, stratégie, coût estimé)"
+    )
+    calls: list[dict[str, Any]] = Field(
+        default_factory=list,
+        description="Détail par appel (modèle, tokens estimés/réels, latence)"
+    )
+
+
 # ============================================================================
 # SUPER-CHERCHEUR - MODÈLES
 # ============================================================================
@@ -82,6 +105,18 @@ class SearchFilters(BaseModel):
     )
 
 
+class SearchResultField(str, Enum):
+    """Champs d'un résultat de recherche (projection)"""
+    ID = "id"
+    TITLE = "title"
+    SCORE = "score"
+    CONTENT = "content"
+    METADATA = "metadata"
+    HIGHLIGHTS = "highlights"
+    HIGHLIGHT_SPANS = "highlight_spans"
+    SNIPPET = "snippet"
+
+
 class SearchRequest(BaseModel):
     """Requête de recherche"""
     
@@ -109,6 +144,42 @@ class SearchRequest(BaseModel):
         True,
         description="Inclure les métadonnées détaillées"
     )
+    include_facets: bool = Field(
+        True,
+        description="Calculer les facettes sur l'ensemble des articles correspondants"
+    )
+    facet_breadcrumb_level: int = Field(
+        1,
+        ge=0,
+        le=5,
+        description="Niveau du fil d'Ariane agrégé dans les facettes (0 = code)"
+    )
+    fields: Optional[list[SearchResultField]] = Field(
+        None,
+        description="Champs renvoyés par résultat (défaut : tous) ; id, title et score toujours renvoyés, un champ exclu est vide et le contenu exclu remplacé par le snippet"
+    )
+    max_content_chars: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Longueur maximale du contenu renvoyé (tronqué, suivi de « ... » et d'un snippet)"
+    )
+    explain: bool = Field(
+        False,
+        description="Retourner le détail des temps par étape (timings)"
+    )
+
+
+class HighlightSpan(BaseModel):
+    """Un extrait mis en évidence, avec la position des termes de la requête"""
+    
+    text: str = Field(..., description="Texte de l'extrait")
+    start: int = Field(..., description="Position de début dans le contenu")
+    end: int = Field(..., description="Position de fin dans le contenu")
+    score: float = Field(..., description="Score de l'extrait")
+    matches: list[list[int]] = Field(
+        default_factory=list,
+        description="Positions [début, fin] des termes, relatives à l'extrait"
+    )
 
 
 class SearchResult(BaseModel):
@@ -126,6 +197,14 @@ class SearchResult(BaseModel):
         None,
         description="Extraits mis en évidence"
     )
+    highlight_spans: Optional[list[HighlightSpan]] = Field(
+        None,
+        description="Extraits mis en évidence avec positions des termes (dans le contenu complet)"
+    )
+    snippet: Optional[str] = Field(
+        None,
+        description="Extrait le plus pertinent (contenu exclu ou tronqué, ou champ demandé)"
+    )
 
 
 class TrendAnalysis(BaseModel):
@@ -155,6 +234,36 @@ class TrendAnalysis(BaseModel):
     )
 
 
+class FacetBucket(BaseModel):
+    """Une valeur de facette et son nombre d'articles"""
+    
+    value: str = Field(..., description="Valeur (code_id, état, année, niveau du fil d'Ariane)")
+    label: Optional[str] = Field(None, description="Libellé (ex : nom du code)")
+    count: int = Field(..., description="Nombre d'articles")
+
+
+class SearchFacets(BaseModel):
+    """Facettes calculées sur l'ensemble des articles correspondant à la recherche"""
+    
+    total: int = Field(0, description="Nombre d'articles correspondants dans le corpus")
+    match_mode: str = Field(
+        "terms",
+        description="terms (filtres + termes de la requête) ou filters (filtres seuls)"
+    )
+    codes: list[FacetBucket] = Field(default_factory=list, description="Répartition par code")
+    status: list[FacetBucket] = Field(default_factory=list, description="Répartition par état")
+    years: list[FacetBucket] = Field(
+        default_factory=list,
+        description="Répartition par année d'entrée en vigueur"
+    )
+    breadcrumb_level: int = Field(1, description="Niveau du fil d'Ariane agrégé")
+    breadcrumb: list[FacetBucket] = Field(
+        default_factory=list,
+        description="Répartition par niveau du fil d'Ariane"
+    )
+    computed_in_ms: float = Field(0, description="Temps de calcul des facettes")
+
+
 class SearchResponse(BaseModel):
     """Réponse de recherche complète"""
     
@@ -175,10 +284,22 @@ class SearchResponse(BaseModel):
         None,
         description="Analyse de tendances"
     )
+    facets: Optional[SearchFacets] = Field(
+        None,
+        description="Facettes sur l'ensemble des articles correspondants"
+    )
     processing_time_ms: float = Field(
         0,
         description="Temps de traitement en millisecondes"
     )
+    timings: Optional[dict[str, Any]] = Field(
+        None,
+        description="Temps par étape (arbre name/duration_ms/attributes/children), si explain"
+    )
+    usage: Optional[LLMUsage] = Field(
+        None,
+        description="Tokens estimés/réels et latences des appels LLM"
+    )
 
 
 # ============================================================================
@@ -196,6 +317,14 @@ class ChatMessage(BaseModel):
     )
 
 
+class SourceField(str, Enum):
+    """Champs d'une source citée par le chatbot (projection)"""
+    TYPE = "type"
+    REFERENCE = "reference"
+    TEXT = "text"
+    RELEVANCE = "relevance"
+
+
 class Source(BaseModel):
     """Une source citée par le chatbot"""
     
@@ -228,6 +357,23 @@ class ChatRequest(BaseModel):
         le=10,
         description="Nombre maximum de sources à citer"
     )
+    session_id: Optional[str] = Field(
+        None,
+        description="Session dont le dossier uploadé est interrogé avec le corpus public"
+    )
+    source_fields: Optional[list[SourceField]] = Field(
+        None,
+        description="Champs renvoyés pour chaque source (défaut : tous) ; reference toujours renvoyée, un champ exclu est vide"
+    )
+    source_max_content_chars: int = Field(
+        300,
+        ge=1,
+        description="Longueur maximale de l'extrait (text) de chaque source"
+    )
+    explain: bool = Field(
+        False,
+        description="Retourner le détail des temps par étape (timings)"
+    )
 
 
 class ChatResponse(BaseModel):
@@ -249,6 +395,14 @@ class ChatResponse(BaseModel):
         le=1,
         description="Niveau de confiance de la réponse"
     )
+    timings: Optional[dict[str, Any]] = Field(
+        None,
+        description="Temps par étape (arbre name/duration_ms/attributes/children), si explain"
+    )
+    usage: Optional[LLMUsage] = Field(
+        None,
+        description="Tokens estimés/réels et latences des appels LLM"
+    )
 
 
 # ============================================================================
@@ -289,6 +443,13 @@ class OutputFormat(str, Enum):
     HTML = "html"                                  # HTML
 
 
+class GenerationPath(str, Enum):
+    """Chemin de génération d'un acte"""
+    LLM = "llm"                                    # Rédaction complète par le LLM
+    DETERMINISTIC = "deterministic"                # Emplacements complétés localement
+    HYBRID = "hybrid"                              # Local + LLM pour les passages restants
+
+
 class ActGenerationRequest(BaseModel):
     """Requête de génération d'acte"""
     
@@ -323,6 +484,10 @@ class ActGenerationRequest(BaseModel):
         default=True,
         description="Préserver la mise en forme du modèle"
     )
+    render_template: Optional[str] = Field(
+        None,
+        description="Template PDF du cabinet appliqué aux sorties PDF/DOCX (défaut : template par défaut)"
+    )
     
     # Templates personnalisés (optionnel)
     custom_prompt: Optional[str] = Field(
@@ -333,13 +498,21 @@ class ActGenerationRequest(BaseModel):
         None,
         description="Nom du template personnalisé (pour sauvegarde)"
     )
+    confirm_cost: bool = Field(
+        False,
+        description="Confirmer l'exécution quand le coût estimé dépasse le seuil de confirmation"
+    )
+    deterministic_fill: bool = Field(
+        True,
+        description="Compléter localement les emplacements du modèle quand les données client le permettent (LLM pour le reste)"
+    )
 
 
 class ActGenerationResponse(BaseModel):
     """Réponse de génération d'acte"""
     
     act_type: ActType = Field(..., description="Type d'acte généré")
-    generated_act: str = Field(..., description="Acte généré (texte ou base64)")
+    generated_act: str = Field(..., description="Acte généré (texte ou HTML ; texte de l'acte pour PDF/DOCX)")
     preview_text: str = Field("", description="Aperçu textuel (premiers 500 chars)")
     confidence: float = Field(
         0.0,
@@ -356,10 +529,139 @@ class ActGenerationResponse(BaseModel):
         default_factory=list,
         description="Avertissements éventuels"
     )
+    template_id: Optional[str] = Field(
+        None,
+        description="Empreinte du modèle compilé (réutilisé tel quel aux générations suivantes)"
+    )
+    template_slots: list[str] = Field(
+        default_factory=list,
+        description="Emplacements variables détectés dans le modèle ([NOM], {{client}}, blancs)"
+    )
+    generation_path: GenerationPath = Field(
+        GenerationPath.LLM,
+        description="Chemin suivi : LLM, remplissage local ou hybride"
+    )
+    filled_slots: list[str] = Field(
+        default_factory=list,
+        description="Emplacements complétés localement"
+    )
+    unmapped_slots: list[str] = Field(
+        default_factory=list,
+        description="Emplacements sans donnée client correspondante (confiés au LLM)"
+    )
+    time_saved_ms: Optional[float] = Field(
+        None,
+        description="Temps gagné estimé par rapport à une rédaction complète par le LLM"
+    )
+    download_id: Optional[str] = Field(
+        None,
+        description="Identifiant du fichier PDF/DOCX rendu dans le stockage des téléchargements"
+    )
+    download_url: Optional[str] = Field(
+        None,
+        description="URL de téléchargement du fichier PDF/DOCX rendu"
+    )
     generated_at: datetime = Field(
         default_factory=datetime.now,
         description="Date de génération"
     )
+    usage: Optional[LLMUsage] = Field(
+        None,
+        description="Tokens estimés/réels et latences des appels LLM"
+    )
+
+
+class ActRenderRequest(BaseModel):
+    """Rendu PDF/DOCX d'un acte (relu ou modifié) aux couleurs du cabinet"""
+    
+    text: str = Field(..., min_length=1, description="Texte de l'acte")
+    output_format: OutputFormat = Field(
+        default=OutputFormat.PDF,
+        description="Format du document (pdf ou docx)"
+    )
+    render_template: Optional[str] = Field(
+        None,
+        description="Template PDF du cabinet (défaut : template par défaut)"
+    )
+    filename: Optional[str] = Field(None, description="Nom du fichier téléchargé (sans extension)")
+
+
+class BatchRowState(str, Enum):
+    """États d'une ligne d'un lot d'actes"""
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class BatchActGenerationRequest(BaseModel):
+    """Génération d'un acte par client à partir d'un modèle et d'un fichier de données"""
+    
+    act_type: ActType = Field(..., description="Type d'acte à générer")
+    template_content: Optional[str] = Field(None, description="Contenu du modèle (texte brut)")
+    template_file: Optional[str] = Field(None, description="Chemin vers fichier modèle (PDF/DOCX)")
+    rows_data: str = Field(
+        ...,
+        min_length=1,
+        description="Données des clients : CSV avec en-tête, tableau JSON ou JSONL (un objet par ligne)"
+    )
+    rows_format: DataInputFormat = Field(
+        default=DataInputFormat.CSV,
+        description="Format des données (csv ou json, JSONL compris)"
+    )
+    output_format: OutputFormat = Field(default=OutputFormat.TEXT, description="Format de sortie des actes")
+    render_template: Optional[str] = Field(None, description="Template PDF du cabinet appliqué aux sorties PDF/DOCX")
+    custom_prompt: Optional[str] = Field(None, description="Prompt personnalisé créé par l'utilisateur")
+    filename_field: Optional[str] = Field(
+        None,
+        description="Colonne utilisée pour nommer les actes dans l'archive (défaut : première colonne)"
+    )
+    concurrency: Optional[int] = Field(
+        None,
+        ge=1,
+        le=16,
+        description="Générations simultanées (défaut : ACT_BATCH_CONCURRENCY)"
+    )
+    max_retries: Optional[int] = Field(
+        None,
+        ge=0,
+        le=5,
+        description="Nouvelles tentatives par ligne en échec (défaut : ACT_BATCH_MAX_RETRIES)"
+    )
+    confirm_cost: bool = Field(
+        False,
+        description="Confirmer l'exécution quand le coût estimé d'un acte dépasse le seuil de confirmation"
+    )
+    batch_id: Optional[str] = Field(
+        None,
+        description="Lot existant à reprendre (attribué à la soumission)"
+    )
+
+
+class BatchRowStatus(BaseModel):
+    """État d'une ligne du lot"""
+    
+    index: int = Field(..., description="Numéro de ligne (à partir de 1)")
+    status: BatchRowState = Field(..., description="État de la ligne")
+    attempts: int = Field(0, description="Tentatives effectuées")
+    filename: Optional[str] = Field(None, description="Nom de l'acte dans l'archive")
+    confidence: Optional[float] = Field(None, description="Confiance de la génération")
+    warnings: list[str] = Field(default_factory=list, description="Avertissements de la génération")
+    error: Optional[str] = Field(None, description="Dernière erreur")
+
+
+class BatchActGenerationResponse(BaseModel):
+    """État d'un lot d'actes (manifeste)"""
+    
+    batch_id: str = Field(..., description="Identifiant du lot")
+    act_type: ActType = Field(..., description="Type d'acte généré")
+    total: int = Field(..., description="Nombre de lignes")
+    succeeded: int = Field(0, description="Actes générés")
+    failed: int = Field(0, description="Lignes en échec")
+    pending: int = Field(0, description="Lignes restant à générer")
+    rows: list[BatchRowStatus] = Field(default_factory=list, description="État de chaque ligne")
+    archive_url: str = Field(..., description="URL de l'archive ZIP des actes générés")
+    created_at: datetime = Field(..., description="Création du lot")
+    updated_at: datetime = Field(..., description="Dernière mise à jour du manifeste")
 
 
 class CustomTemplate(BaseModel):
@@ -440,6 +742,26 @@ class SynthesisRequest(BaseModel):
         "text",
         description="Format de sortie (text ou pdf)"
     )
+    session_id: Optional[str] = Field(
+        None,
+        description="Session dont le dossier uploadé est synthétisé"
+    )
+    session_query: Optional[str] = Field(
+        None,
+        description="Thème ciblé dans le dossier de session (défaut : search_query ou context) ; sans thème, tout le dossier"
+    )
+    map_reduce: Optional[bool] = Field(
+        None,
+        description="Résumer d'abord les extraits du dossier (défaut : automatique selon la taille)"
+    )
+    confirm_cost: bool = Field(
+        False,
+        description="Confirmer l'exécution quand le coût estimé dépasse le seuil de confirmation"
+    )
+    explain: bool = Field(
+        False,
+        description="Retourner le détail des temps par étape (timings)"
+    )
 
 
 class SynthesisResponse(BaseModel):
@@ -467,6 +789,18 @@ class SynthesisResponse(BaseModel):
         default_factory=datetime.now,
         description="Date de génération"
     )
+    map_reduce_stats: Optional[dict[str, Any]] = Field(
+        None,
+        description="Statistiques map-reduce (extraits, extraits en cache, niveaux de fusion)"
+    )
+    timings: Optional[dict[str, Any]] = Field(
+        None,
+        description="Temps par étape (arbre name/duration_ms/attributes/children), si explain"
+    )
+    usage: Optional[LLMUsage] = Field(
+        None,
+        description="Tokens estimés/réels et latences des appels LLM"
+    )
     
     def model_post_init(self, __context) -> None:
         """Initialise synthesized_content depuis summary si non fourni"""
@@ -516,6 +850,10 @@ class AuditRequest(BaseModel):
         True,
         description="Générer un rapport détaillé"
     )
+    explain: bool = Field(
+        False,
+        description="Retourner le détail des temps par étape (timings)"
+    )
     
     @field_validator('contract_text', 'document_content', 'document_file_path', mode='after')
     @classmethod
@@ -575,6 +913,119 @@ class AuditResponse(BaseModel):
         default_factory=list,
         description="Recommandations globales de mise à jour"
     )
+    timings: Optional[dict[str, Any]] = Field(
+        None,
+        description="Temps par étape (arbre name/duration_ms/attributes/children), si explain"
+    )
+    usage: Optional[LLMUsage] = Field(
+        None,
+        description="Tokens estimés/réels et latences des appels LLM"
+    )
+
+
+# ============================================================================
+# DOSSIER DE SESSION - MODÈLES
+# ============================================================================
+
+class SessionDocumentInput(BaseModel):
+    """Un document du dossier à indexer"""
+    
+    title: Optional[str] = Field(None, description="Titre du document")
+    content: str = Field(..., min_length=1, description="Texte du document")
+
+
+class SessionDocumentsRequest(BaseModel):
+    """Documents à ajouter au dossier d'une session"""
+    
+    documents: list[SessionDocumentInput] = Field(
+        default_factory=list,
+        description="Documents à indexer"
+    )
+
+
+class SessionDocumentInfo(BaseModel):
+    """Un document indexé dans la session"""
+    
+    document_id: str = Field(..., description="Identifiant du document dans la session")
+    title: str = Field(..., description="Titre du document")
+    chars: int = Field(0, description="Taille du texte (caractères)")
+    chunks: int = Field(0, description="Nombre de passages indexés")
+
+
+class SessionInfoResponse(BaseModel):
+    """État de l'index d'une session"""
+    
+    session_id: str = Field(..., description="Identifiant de la session (à passer au chat et à la synthèse)")
+    documents: list[SessionDocumentInfo] = Field(default_factory=list, description="Documents indexés")
+    chunks: int = Field(0, description="Nombre total de passages")
+    created_at: datetime = Field(..., description="Création de la session")
+    expires_at: datetime = Field(..., description="Expiration sans nouvelle activité")
+
+
+class SessionSearchRequest(BaseModel):
+    """Recherche dans le dossier d'une session"""
+    
+    query: str = Field(..., min_length=1, description="Question ou thème recherché")
+    top_k: int = Field(8, ge=1, le=50, description="Nombre maximal de passages")
+
+
+class SessionPassageResult(BaseModel):
+    """Un passage du dossier"""
+    
+    document_id: str = Field(..., description="Document d'origine")
+    title: str = Field(..., description="Titre du document")
+    chunk_index: int = Field(..., description="Position du passage dans le document")
+    text: str = Field(..., description="Texte du passage")
+    score: float = Field(0, description="Similarité avec la requête")
+
+
+# ============================================================================
+# TÂCHES ASYNCHRONES - MODÈLES
+# ============================================================================
+
+class JobKind(str, Enum):
+    """Types de tâches asynchrones"""
+    SYNTHESE = "synthese"
+    AUDIT = "audit"
+    MACHINE_ACTES = "machine_actes"
+    MACHINE_ACTES_BATCH = "machine_actes_batch"
+
+
+class JobState(str, Enum):
+    """États d'une tâche asynchrone"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobStatusResponse(BaseModel):
+    """État et progression d'une tâche asynchrone"""
+    
+    job_id: str = Field(..., description="Identifiant de la tâche")
+    kind: JobKind = Field(..., description="Type de tâche")
+    status: JobState = Field(..., description="État de la tâche")
+    progress: float = Field(0, ge=0, le=1, description="Avancement (0-1)")
+    message: Optional[str] = Field(None, description="Étape en cours")
+    error: Optional[str] = Field(None, description="Erreur (tâche en échec)")
+    created_at: datetime = Field(..., description="Date de soumission")
+    started_at: Optional[datetime] = Field(None, description="Début d'exécution")
+    finished_at: Optional[datetime] = Field(None, description="Fin d'exécution")
+    expires_at: Optional[datetime] = Field(None, description="Date d'expiration du résultat")
+    status_url: str = Field(..., description="URL de suivi")
+    result_url: Optional[str] = Field(None, description="URL du résultat (tâche réussie)")
+
+
+class JobResultResponse(BaseModel):
+    """Résultat d'une tâche asynchrone réussie"""
+    
+    job_id: str = Field(..., description="Identifiant de la tâche")
+    kind: JobKind = Field(..., description="Type de tâche")
+    result: dict[str, Any] = Field(
+        ...,
+        description="Réponse du pilier (SynthesisResponse, AuditResponse, ActGenerationResponse ou BatchActGenerationResponse)"
+    )
 
 
 # ============================================================================
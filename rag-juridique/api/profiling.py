@@ -0,0 +1,114 @@
+"""
+Profilage d'une requête à la demande (middleware ASGI)
+
+Une requête portant l'en-tête X-Profile (ou le paramètre ?profile=) et le
+jeton d'administration (X-Admin-Token) est exécutée sous profileur ; le
+profil est enregistré dans PROFILES_DIR et son identifiant renvoyé dans
+l'en-tête X-Profile-Id (téléchargement : GET /api/v1/profiles/{id}).
+
+La valeur demandée choisit le mode (sampling ou cprofile) ; toute autre
+valeur (1, true...) prend PROFILING_MODE. Le middleware n'est installé que
+si PROFILING_ENABLED et PROFILING_ADMIN_TOKEN sont renseignés : désactivé,
+il ne coûte rien.
+"""
+
+import hmac
+from urllib.parse import parse_qs
+
+from fastapi import Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from loguru import logger
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.metrics import route_template
+from config.settings import get_settings
+from utils.profiling import MODES, ProfileSession, ProfileStore, get_profile_store
+
+PROFILE_ID_HEADER = b"x-profile-id"
+
+
+def admin_token_valid(token: str | None, expected: str) -> bool:
+    """Comparaison à temps constant (jeton attendu vide : toujours refusé)"""
+    if not token or not expected:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+
+def require_admin_token(x_admin_token: str | None = Header(None)) -> None:
+    """Dépendance des routes d'administration des profils"""
+    if not admin_token_valid(x_admin_token, get_settings().PROFILING_ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+
+
+def _profile_flag(scope: Scope, headers: Headers) -> str | None:
+    """Valeur de X-Profile ou de ?profile= (None si absent)"""
+    flag = headers.get("x-profile")
+    if flag is None and b"profile=" in scope.get("query_string", b""):
+        values = parse_qs(scope["query_string"].decode("latin-1")).get("profile")
+        flag = values[0] if values else None
+    return flag
+
+
+class ProfilingMiddleware:
+    """Exécute sous profileur les requêtes qui le demandent"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        admin_token: str,
+        mode: str = "sampling",
+        interval_ms: float = 5.0,
+        store: ProfileStore | None = None,
+    ):
+        self.app = app
+        self.admin_token = admin_token
+        self.mode = mode if mode in MODES else "sampling"
+        self.interval_ms = interval_ms
+        self.store = store or get_profile_store()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        flag = _profile_flag(scope, headers)
+        if flag is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not admin_token_valid(headers.get("x-admin-token"), self.admin_token):
+            response = JSONResponse({"detail": "Jeton d'administration invalide"}, status_code=403)
+            await response(scope, receive, send)
+            return
+
+        session = ProfileSession(
+            mode=flag.lower() if flag.lower() in MODES else self.mode,
+            interval_ms=self.interval_ms,
+        )
+        profile_id = None
+
+        def request_name() -> str:
+            return f"{scope['method']} {route_template(scope)}"
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal profile_id
+            if message["type"] == "http.response.start":
+                # Route résolue : l'identifiant porte son gabarit
+                profile_id = self.store.new_id(session.mode, request_name())
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (PROFILE_ID_HEADER, profile_id.encode("ascii")),
+                ]
+            await send(message)
+
+        try:
+            with session.activate():
+                await self.app(scope, receive, send_with_profile_id)
+        finally:
+            try:
+                await run_in_threadpool(self.store.save, session, request_name(), profile_id)
+            except OSError as e:
+                logger.warning(f"⚠️ Profil non enregistré ({request_name()}) : {e}")
@@ -0,0 +1,46 @@
+"""
+Sérialisation rapide des réponses JSON
+
+- FastJSONResponse : classe de réponse par défaut de l'application
+  (orjson au lieu du module json). Elle sert les routes qui renvoient des
+  dictionnaires ou n'ont pas de response_model.
+- model_response : réponse des piliers (recherche, audit, synthèse,
+  chat). Le modèle, construit par le service et donc déjà valide, est
+  sérialisé en une passe par pydantic dans un thread du pool : ni
+  revalidation par FastAPI, ni sérialisation de plusieurs Mo dans la
+  boucle asynchrone.
+
+Mesures : benchmarks/bench_serialization.py
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée par orjson (UTF-8 sans échappement)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def dump_model(model: BaseModel) -> bytes:
+    """Corps JSON d'un modèle (appel bloquant pour les gros modèles)"""
+    return model.__pydantic_serializer__.to_json(model)
+
+
+async def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """
+    Réponse JSON d'un modèle construit par un service
+
+    La route garde son response_model (documentation OpenAPI) ; la réponse
+    renvoyée telle quelle n'est pas revalidée par FastAPI.
+    """
+    body = await run_in_threadpool(dump_model, model)
+    return Response(content=body, status_code=status_code, media_type=JSON_MEDIA_TYPE)
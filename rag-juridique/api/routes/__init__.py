@@ -8,7 +8,10 @@ from api.routes import (
     audit,
     chatbot,
     downloads,
+    jobs,
     machine_actes,
+    profiles,
+    sessions,
     super_chercheur,
     synthese,
     templates,
@@ -22,5 +25,8 @@ __all__ = [
     "chatbot",
     "templates",
     "downloads",
+    "jobs",
+    "sessions",
+    "profiles",
 ]
 
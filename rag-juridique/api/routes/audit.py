@@ -5,15 +5,19 @@ Endpoints pour l'audit de conformité des contrats.
 """
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 
-from api.audit_conformite import AuditConformite
-from api.models import AuditRequest, AuditResponse
+from api.jobs import submit_job
+from api.models import AuditRequest, AuditResponse, JobKind, JobStatusResponse
+from api.responses import model_response
+from api.services import get_services
+from api.uploads import open_upload
 
 router = APIRouter()
 
-# Instance du service
-audit_service = AuditConformite()
+# Services partagés (audit construit au démarrage ou à la première requête)
+services = get_services()
 
 
 @router.post("/", response_model=AuditResponse)
@@ -61,12 +65,13 @@ async def audit_contract(request: AuditRequest):
         # Étape 2: Appel au service d'audit
         logger.info("⚖️ Étape 2: Appel au service d'audit...")
         try:
-            result = audit_service.audit(request)
+            audit_service = await services.aget("audit")
+            result = await run_in_threadpool(audit_service.audit, request)
             logger.info(f"   ✅ Service d'audit terminé")
             logger.info(f"   - {len(result.issues)} problème(s) détecté(s)")
             logger.info(f"   - Score de conformité: {result.conformity_score:.1f}%")
             logger.success(f"✅ Audit terminé avec succès")
-            return result
+            return await model_response(result)
         except Exception as service_error:
             logger.error(f"❌ ERREUR DANS LE SERVICE D'AUDIT")
             logger.error(f"   Type: {type(service_error).__name__}")
@@ -101,6 +106,31 @@ async def audit_contract(request: AuditRequest):
         )
 
 
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_audit_job(request: AuditRequest):
+    """
+    Soumet un audit comme tâche asynchrone (contrats volumineux)
+    
+    Suivre la tâche via GET /api/v1/jobs/{job_id} puis récupérer le
+    rapport via GET /api/v1/jobs/{job_id}/result.
+    
+    Args:
+        request: Requête d'audit (même format que POST /)
+    
+    Returns:
+        État initial de la tâche
+    """
+    if not request.contract_text and not request.document_content and not request.document_file_path:
+        raise HTTPException(
+            status_code=422,
+            detail="Au moins un champ de contenu doit être fourni : contract_text, document_content, ou document_file_path"
+        )
+    
+    job = await run_in_threadpool(submit_job, JobKind.AUDIT, request)
+    logger.info(f"📥 Audit soumis : tâche {job.job_id}")
+    return job
+
+
 @router.post("/from-file", response_model=AuditResponse)
 async def audit_contract_from_file(
     contract_file: UploadFile = File(...),
@@ -121,20 +151,9 @@ async def audit_contract_from_file(
     try:
         logger.info(f"📤 Upload de contrat : {contract_file.filename}")
         
-        # Lire le contenu
-        content = await contract_file.read()
-        
-        # Sauvegarder temporairement
-        import tempfile
-        from pathlib import Path
-        
-        temp_dir = Path(tempfile.mkdtemp())
-        temp_file = temp_dir / contract_file.filename
-        temp_file.write_bytes(content)
-        
-        # Extraire le texte
-        from api.audit_conformite import extract_text_from_file
-        contract_text = extract_text_from_file(str(temp_file))
+        # Extraire le texte (fichier lu sur place, fermé en sortie)
+        async with open_upload(contract_file) as document:
+            contract_text = await run_in_threadpool(document.extract_text)
         
         # Créer la requête
         request = AuditRequest(
@@ -144,15 +163,14 @@ async def audit_contract_from_file(
         )
         
         # Auditer
-        result = audit_service.audit(request)
-        
-        # Nettoyer
-        temp_file.unlink()
-        temp_dir.rmdir()
+        audit_service = await services.aget("audit")
+        result = await run_in_threadpool(audit_service.audit, request)
         
         logger.success(f"✅ Audit terminé depuis fichier")
-        return result
+        return await model_response(result)
     
+    except HTTPException:
+        raise
     except ValueError as e:
         # Erreur de validation (ex: PDF scanné)
         logger.warning(f"⚠️ Validation : {e}")
@@ -178,9 +196,10 @@ async def audit_contract_from_file(
 @router.get("/health")
 async def health():
     """Vérifie que le service d'audit fonctionne"""
+    audit_service = await services.aget("audit")
     return {
         "status": "healthy",
         "service": "Audit et Conformité",
-        "rag_configured": audit_service.search_client is not None
+        "rag_configured": audit_service.vertex_client is not None
     }
 
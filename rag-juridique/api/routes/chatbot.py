@@ -5,15 +5,17 @@ Endpoints pour le chatbot conversationnel avec RAG.
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 
-from api.chatbot_avocat import ChatbotAvocat
 from api.models import ChatRequest, ChatResponse
+from api.responses import model_response
+from api.services import get_services
 
 router = APIRouter()
 
-# Instance du service
-chatbot = ChatbotAvocat()
+# Services partagés (chatbot construit au démarrage ou à la première requête)
+services = get_services()
 
 
 @router.post("/", response_model=ChatResponse)
@@ -38,9 +40,10 @@ async def chat(request: ChatRequest):
     """
     try:
         logger.info(f"💬 Message: \"{request.message[:50]}...\"")
-        response = chatbot.chat(request)
+        chatbot = await services.aget("chatbot")
+        response = await run_in_threadpool(chatbot.chat, request)
         logger.success(f"✅ Réponse générée ({len(response.response)} caractères)")
-        return response
+        return await model_response(response)
     
     except Exception as e:
         logger.error(f"❌ Erreur chatbot : {e}")
@@ -59,7 +62,8 @@ async def clear_conversation(conversation_id: str):
         Confirmation de suppression
     """
     try:
-        chatbot.conversation_manager.clear_conversation(conversation_id)
+        chatbot = await services.aget("chatbot")
+        chatbot.clear_conversation(conversation_id)
         logger.info(f"🗑️ Conversation {conversation_id} effacée")
         return {"message": "Conversation cleared", "conversation_id": conversation_id}
     
@@ -80,6 +84,7 @@ async def get_conversation_history(conversation_id: str):
         Historique des messages
     """
     try:
+        chatbot = await services.aget("chatbot")
         history = chatbot.conversation_manager.get_conversation(conversation_id)
         return {
             "conversation_id": conversation_id,
@@ -95,10 +100,12 @@ async def get_conversation_history(conversation_id: str):
 @router.get("/health")
 async def health():
     """Vérifie que le service de chatbot fonctionne"""
+    chatbot = await services.aget("chatbot")
     return {
         "status": "healthy",
         "service": "Chatbot Avocat",
         "gemini_configured": chatbot.model is not None,
-        "rag_configured": chatbot.search_client is not None
+        "rag_configured": chatbot.vertex_client is not None,
+        "retrieval_reuse": chatbot.retrieval_memory.stats(),
     }
 
@@ -2,170 +2,219 @@
 Routes pour le téléchargement de documents générés
 
 Endpoints pour télécharger les PDFs, DOCX, etc.
+
+Les documents sont conservés en octets bruts sur disque (utils.download_store),
+servis par blocs avec ETag (réponse 304 si inchangé) et requêtes Range
+(reprise d'un téléchargement interrompu). Les documents expirés sont
+supprimés par un balayage en tâche de fond.
 """
 
-import uuid
-from datetime import datetime, timedelta
-from pathlib import Path
+import base64
+import binascii
+import re
+from datetime import datetime
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from loguru import logger
 
+from utils.download_store import StoredDocument, get_download_store
+
 router = APIRouter()
 
-# Stockage temporaire des documents (en production, utiliser une base de données)
-DOCUMENTS_STORAGE = {}
-DOWNLOAD_EXPIRY = timedelta(hours=24)
+# Taille des blocs lus sur disque
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """
+    Intervalle demandé (bornes incluses), None pour le document entier
+
+    Seules les requêtes à un intervalle sont servies en 206 ; les
+    intervalles multiples reçoivent le document entier (RFC 9110).
+
+    Raises:
+        HTTPException: 416 si l'intervalle est hors du document
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def _iter_file(path, start: int, length: int):
+    """Lit [start, start + length) par blocs"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _etag_matches(if_none_match: str, doc: StoredDocument) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or doc.etag in tags
 
 
 @router.post("/store")
 async def store_document(content: str, filename: str, content_type: str = "text/plain"):
     """
     Stocke un document pour téléchargement ultérieur
-    
+
     Args:
         content: Contenu du document (texte ou base64)
         filename: Nom du fichier
         content_type: Type MIME du fichier
-    
+
     Returns:
         ID de téléchargement et URL
     """
+    # Octets bruts : texte en UTF-8, binaires (PDF, DOCX) décodés du base64
+    if content_type.startswith("text/"):
+        data = content.encode("utf-8")
+    else:
+        try:
+            data = base64.b64decode(content, validate=True)
+        except (binascii.Error, ValueError):
+            raise HTTPException(status_code=422, detail="Contenu binaire attendu en base64")
+
     try:
-        # Générer un ID unique
-        doc_id = str(uuid.uuid4())
-        
-        # Stocker
-        DOCUMENTS_STORAGE[doc_id] = {
-            "content": content,
-            "filename": filename,
-            "content_type": content_type,
-            "created_at": datetime.now(),
-            "expires_at": datetime.now() + DOWNLOAD_EXPIRY,
-        }
-        
-        logger.info(f"💾 Document stocké : {doc_id} ({filename})")
-        
-        return {
-            "document_id": doc_id,
-            "download_url": f"/api/v1/download/{doc_id}",
-            "expires_at": DOCUMENTS_STORAGE[doc_id]["expires_at"].isoformat(),
-        }
-    
+        doc = await run_in_threadpool(get_download_store().put, data, filename, content_type)
     except Exception as e:
         logger.error(f"❌ Erreur : {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    logger.info(f"💾 Document stocké : {doc.id} ({doc.filename}, {doc.size} octets)")
+
+    return {
+        "document_id": doc.id,
+        "download_url": f"/api/v1/download/{doc.id}",
+        "expires_at": datetime.fromtimestamp(doc.expires_at).isoformat(),
+        "sha256": doc.sha256,
+    }
+
 
 @router.get("/{document_id}")
-async def download_document(document_id: str):
+async def download_document(
+    document_id: str,
+    range_header: str | None = Header(default=None, alias="Range"),
+    if_none_match: str | None = Header(default=None),
+    if_range: str | None = Header(default=None),
+):
     """
     Télécharge un document par son ID
-    
+
     Args:
         document_id: ID du document
-    
+        range_header: Intervalle d'octets demandé (reprise)
+        if_none_match: ETag déjà détenu par le client (304 si inchangé)
+        if_range: ETag conditionnant l'intervalle
+
     Returns:
-        Fichier à télécharger
+        Fichier à télécharger (200, 206 pour un intervalle, 304 si inchangé)
     """
-    try:
-        # Vérifier l'existence
-        if document_id not in DOCUMENTS_STORAGE:
-            raise HTTPException(status_code=404, detail="Document not found")
-        
-        doc = DOCUMENTS_STORAGE[document_id]
-        
-        # Vérifier l'expiration
-        if datetime.now() > doc["expires_at"]:
-            del DOCUMENTS_STORAGE[document_id]
-            raise HTTPException(status_code=410, detail="Document expired")
-        
-        logger.info(f"⬇️ Téléchargement : {doc['filename']}")
-        
-        # Créer un fichier temporaire
-        import tempfile
-        
-        temp_dir = Path(tempfile.mkdtemp())
-        temp_file = temp_dir / doc["filename"]
-        
-        # Écrire le contenu
-        if doc["content_type"].startswith("text/"):
-            temp_file.write_text(doc["content"], encoding="utf-8")
-        else:
-            # Base64 pour binaires (PDF, DOCX)
-            import base64
-            temp_file.write_bytes(base64.b64decode(doc["content"]))
-        
-        # Retourner le fichier
-        return FileResponse(
-            path=str(temp_file),
-            filename=doc["filename"],
-            media_type=doc["content_type"],
-            headers={
-                "Content-Disposition": f"attachment; filename=\"{doc['filename']}\""
-            }
-        )
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Erreur : {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    store = get_download_store()
+    doc = await run_in_threadpool(store.get, document_id)
+
+    # Vérifier l'existence et l'expiration
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if doc.expired:
+        await run_in_threadpool(store.delete, document_id)
+        raise HTTPException(status_code=410, detail="Document expired")
+
+    path = store.blob_path(doc.sha256)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Document content not found")
+
+    headers = {
+        "ETag": doc.etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=0, must-revalidate",
+        "Content-Disposition": f"attachment; filename=\"{doc.filename}\"",
+    }
+
+    # Contenu adressé par empreinte : l'ETag est exact
+    if if_none_match and _etag_matches(if_none_match, doc):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if range_header and (not if_range or if_range.strip() == doc.etag):
+        byte_range = _parse_range(range_header, doc.size)
+
+    if byte_range is None:
+        logger.info(f"⬇️ Téléchargement : {doc.filename}")
+        start, length, status = 0, doc.size, 200
+    else:
+        start, end = byte_range
+        length, status = end - start + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{doc.size}"
+        logger.info(f"⬇️ Téléchargement partiel : {doc.filename} ({start}-{end})")
+
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=status,
+        media_type=doc.content_type,
+        headers=headers,
+    )
 
 
 @router.delete("/{document_id}")
 async def delete_document(document_id: str):
     """
     Supprime un document stocké
-    
+
     Args:
         document_id: ID du document
-    
+
     Returns:
         Confirmation de suppression
     """
-    try:
-        if document_id in DOCUMENTS_STORAGE:
-            del DOCUMENTS_STORAGE[document_id]
-            logger.info(f"🗑️ Document supprimé : {document_id}")
-            return {"message": "Document deleted", "document_id": document_id}
-        else:
-            raise HTTPException(status_code=404, detail="Document not found")
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"❌ Erreur : {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    if not await run_in_threadpool(get_download_store().delete, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    logger.info(f"🗑️ Document supprimé : {document_id}")
+    return {"message": "Document deleted", "document_id": document_id}
 
 
 @router.get("/cleanup/expired")
 async def cleanup_expired_documents():
     """
     Nettoie les documents expirés
-    
+
+    Le balayage est automatique (DOWNLOADS_SWEEP_INTERVAL_SECONDS) ; cet
+    endpoint déclenche un passage immédiat.
+
     Returns:
         Nombre de documents supprimés
     """
+    store = get_download_store()
     try:
-        now = datetime.now()
-        expired_ids = [
-            doc_id for doc_id, doc in DOCUMENTS_STORAGE.items()
-            if now > doc["expires_at"]
-        ]
-        
-        for doc_id in expired_ids:
-            del DOCUMENTS_STORAGE[doc_id]
-        
-        logger.info(f"🧹 {len(expired_ids)} document(s) expiré(s) supprimé(s)")
-        
-        return {
-            "cleaned": len(expired_ids),
-            "remaining": len(DOCUMENTS_STORAGE)
-        }
-    
+        cleaned = await run_in_threadpool(store.sweep)
+        stats = await run_in_threadpool(store.stats)
     except Exception as e:
         logger.error(f"❌ Erreur : {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    return {
+        "cleaned": cleaned,
+        "remaining": stats["documents"],
+    }
@@ -0,0 +1,90 @@
+"""
+Routes des tâches asynchrones
+
+Suivi, résultat et annulation des tâches soumises via les endpoints
+POST .../jobs des piliers (synthèse, audit, machine à actes).
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+
+from api.jobs import get_job_queue, job_status
+from api.models import JobKind, JobResultResponse, JobState, JobStatusResponse
+from api.responses import model_response
+from utils.job_queue import FAILED, SUCCEEDED
+
+router = APIRouter()
+
+
+@router.get("/", response_model=list[JobStatusResponse])
+async def list_jobs(
+    kind: Optional[JobKind] = None,
+    status: Optional[JobState] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """
+    Liste les tâches les plus récentes
+
+    Args:
+        kind: Filtre sur le type de tâche
+        status: Filtre sur l'état
+        limit: Nombre maximal de tâches
+    """
+    jobs = await run_in_threadpool(
+        get_job_queue().recent,
+        kind.value if kind else None,
+        status.value if status else None,
+        limit,
+    )
+    return [job_status(job) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    État et progression d'une tâche
+
+    Returns:
+        État de la tâche (404 si inconnue ou expirée)
+    """
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Tâche inconnue ou expirée : {job_id}")
+    return job_status(job)
+
+
+@router.get("/{job_id}/result", response_model=JobResultResponse)
+async def get_job_result(job_id: str):
+    """
+    Résultat d'une tâche réussie
+
+    Returns:
+        Réponse du pilier (409 si la tâche n'est pas terminée, 500 si en échec)
+    """
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Tâche inconnue ou expirée : {job_id}")
+    if job.status == FAILED:
+        raise HTTPException(status_code=500, detail=job.error or "Tâche en échec")
+    if job.status != SUCCEEDED:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Résultat indisponible : tâche {job.status} ({job.progress:.0%})",
+        )
+    return await model_response(JobResultResponse(job_id=job.id, kind=job.kind, result=job.result))
+
+
+@router.delete("/{job_id}", response_model=JobStatusResponse)
+async def cancel_job(job_id: str):
+    """
+    Annule une tâche
+
+    Une tâche en attente est annulée immédiatement ; une tâche en cours
+    s'arrête à sa prochaine étape.
+    """
+    job = await run_in_threadpool(get_job_queue().cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Tâche inconnue ou expirée : {job_id}")
+    return job_status(job)
@@ -5,16 +5,33 @@ Endpoints pour la génération automatique d'actes juridiques.
 """
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from loguru import logger
 
-from api.machine_actes import MachineActes
-from api.models import ActGenerationRequest, ActGenerationResponse
+from api.machine_actes_batch import BatchError
+from api.jobs import get_job_queue, submit_job
+from api.services import get_services
+from api.uploads import TXT, open_upload
+from api.models import (
+    ActGenerationRequest,
+    ActGenerationResponse,
+    ActRenderRequest,
+    BatchActGenerationRequest,
+    BatchActGenerationResponse,
+    JobKind,
+    JobStatusResponse,
+    OutputFormat,
+)
+from rag.token_budget import TokenBudgetError
+from utils.act_renderer import DOCX_MEDIA_TYPE, PDF_MEDIA_TYPE, get_act_renderer
+from utils.act_templates import get_act_template_compiler
+from utils.job_queue import QUEUED, RUNNING
 
 router = APIRouter()
 
-# Instance du service
-machine = MachineActes()
+# Services partagés (construits au démarrage ou à la première requête)
+services = get_services()
 
 
 @router.post("/generate", response_model=ActGenerationResponse)
@@ -40,21 +57,45 @@ async def generate_act(request: ActGenerationRequest):
     """
     try:
         logger.info(f"🎯 Requête de génération d'acte : {request.act_type}")
-        result = machine.generate(request)
+        machine = await services.aget("machine_actes")
+        result = await run_in_threadpool(machine.generate, request)
         logger.success(f"✅ Acte généré avec succès (confiance: {result.confidence:.0%})")
         return result
     
+    except TokenBudgetError as e:
+        logger.warning(f"⚠️ Appel LLM refusé avant envoi : {e}")
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
     except Exception as e:
         logger.error(f"❌ Erreur lors de la génération : {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_act_job(request: ActGenerationRequest):
+    """
+    Soumet une génération d'acte comme tâche asynchrone
+    
+    Suivre la tâche via GET /api/v1/jobs/{job_id} puis récupérer l'acte
+    via GET /api/v1/jobs/{job_id}/result.
+    
+    Args:
+        request: Requête de génération (même format que POST /generate)
+    
+    Returns:
+        État initial de la tâche
+    """
+    job = await run_in_threadpool(submit_job, JobKind.MACHINE_ACTES, request)
+    logger.info(f"📥 Génération d'acte {request.act_type} soumise : tâche {job.job_id}")
+    return job
+
+
 @router.post("/generate-from-file")
 async def generate_act_from_file(
     act_type: str = Form(...),
     template_file: UploadFile = File(...),
     client_data: str = Form(...),
     output_format: str = Form(default="text"),
+    render_template: str | None = Form(default=None),
 ):
     """
     Génère un acte à partir d'un fichier template (PDF/DOCX)
@@ -64,6 +105,7 @@ async def generate_act_from_file(
         template_file: Fichier template uploadé
         client_data: Données du client (texte ou JSON)
         output_format: Format de sortie (text, pdf, docx, html)
+        render_template: Template PDF du cabinet (sorties PDF/DOCX)
     
     Returns:
         Acte généré
@@ -71,42 +113,220 @@ async def generate_act_from_file(
     try:
         logger.info(f"📤 Upload de template : {template_file.filename}")
         
-        # Sauvegarder temporairement le fichier
-        import tempfile
-        from pathlib import Path
-        
-        temp_dir = Path(tempfile.mkdtemp())
-        temp_file = temp_dir / template_file.filename
-        
-        with open(temp_file, "wb") as f:
-            content = await template_file.read()
-            f.write(content)
+        # Modèle compilé par empreinte des octets : texte extrait à la première rencontre
+        # seulement (fichier lu sur place, fermé en sortie)
+        compiler = get_act_template_compiler()
+        async with open_upload(template_file) as document:
+            compiled = await run_in_threadpool(
+                lambda: compiler.compile_bytes(document.buffer(), document.extract_text)
+            )
         
         # Créer la requête
-        from api.models import ActType, OutputFormat, DataInputFormat
+        from api.models import ActType, OutputFormat
         
         request = ActGenerationRequest(
             act_type=ActType(act_type),
-            template_file=str(temp_file),
+            template_content=compiled.text,
             client_data=client_data,
             output_format=OutputFormat(output_format),
+            render_template=render_template,
         )
         
         # Générer
-        result = machine.generate(request)
-        
-        # Nettoyer
-        temp_file.unlink()
-        temp_dir.rmdir()
+        machine = await services.aget("machine_actes")
+        result = await run_in_threadpool(machine.generate, request, compiled)
         
         logger.success(f"✅ Acte généré depuis fichier")
         return result
     
+    except TokenBudgetError as e:
+        logger.warning(f"⚠️ Appel LLM refusé avant envoi : {e}")
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur : {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/render")
+async def render_act(request: ActRenderRequest):
+    """
+    Rend un acte (relu ou modifié) en PDF ou DOCX aux couleurs du cabinet
+    
+    Le document est produit dans un tampon borné en mémoire (débordement
+    sur disque pour les actes volumineux) puis envoyé par blocs.
+    
+    Example:
+        ```json
+        {"text": "CONTRAT DE VENTE\\n\\nEntre...", "output_format": "pdf", "render_template": "cabinet_dupont"}
+        ```
+    """
+    if request.output_format not in (OutputFormat.PDF, OutputFormat.DOCX):
+        raise HTTPException(status_code=422, detail="Rendu disponible en pdf ou docx uniquement")
+    
+    fmt = request.output_format.value
+    try:
+        buffer = await run_in_threadpool(
+            get_act_renderer().render, request.text, fmt, request.render_template
+        )
+    except Exception as e:
+        logger.error(f"❌ Erreur de rendu {fmt} : {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    filename = f"{request.filename or 'acte'}.{fmt}"
+    media_type = PDF_MEDIA_TYPE if request.output_format == OutputFormat.PDF else DOCX_MEDIA_TYPE
+    return StreamingResponse(
+        iterate_in_threadpool(_iter_buffer(buffer)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _iter_buffer(buffer, chunk_size: int = 64 * 1024):
+    """Lit le tampon par blocs puis le ferme"""
+    try:
+        while chunk := buffer.read(chunk_size):
+            yield chunk
+    finally:
+        buffer.close()
+
+
+@router.post("/batch", response_model=JobStatusResponse, status_code=202)
+async def submit_act_batch(request: BatchActGenerationRequest):
+    """
+    Génère un acte par client (CSV, JSON ou JSONL) à partir d'un même modèle
+    
+    Le lot est traité comme tâche asynchrone : suivre la tâche via
+    GET /api/v1/jobs/{job_id}, l'état ligne par ligne via
+    GET /batch/{batch_id} et récupérer les actes via GET /batch/{batch_id}/archive.
+    
+    Example:
+        ```json
+        {
+          "act_type": "lease_residential",
+          "template_content": "BAIL D'HABITATION\\n\\nEntre...",
+          "rows_data": "nom,adresse,loyer\\nDUPONT,12 rue de la Paix,850\\n...",
+          "rows_format": "csv",
+          "filename_field": "nom"
+        }
+        ```
+    """
+    try:
+        batch_runner = await services.aget("act_batch_runner")
+        request = await run_in_threadpool(batch_runner.create, request.model_copy(update={"batch_id": None}))
+    except BatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    job = await run_in_threadpool(submit_job, JobKind.MACHINE_ACTES_BATCH, request)
+    logger.info(f"📥 Lot {request.batch_id} soumis : tâche {job.job_id}")
+    return job
+
+
+@router.post("/batch/from-files", response_model=JobStatusResponse, status_code=202)
+async def submit_act_batch_from_files(
+    act_type: str = Form(...),
+    template_file: UploadFile = File(...),
+    data_file: UploadFile = File(...),
+    output_format: str = Form(default="text"),
+    filename_field: str | None = Form(default=None),
+    render_template: str | None = Form(default=None),
+):
+    """
+    Génère un lot d'actes à partir d'un modèle (PDF/DOCX/TXT) et d'un
+    fichier clients (.csv, .json ou .jsonl)
+    """
+    from api.models import ActType, DataInputFormat, OutputFormat
+    
+    try:
+        act_type, output_format = ActType(act_type), OutputFormat(output_format)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    # Le texte du modèle est extrait une fois et conservé dans la requête du lot
+    async with open_upload(template_file) as document:
+        try:
+            template = await run_in_threadpool(document.extract_text)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Modèle illisible : {e}")
+    
+    async with open_upload(data_file, allowed=frozenset({TXT})) as document:
+        rows_data = bytes(document.buffer()).decode("utf-8-sig")
+    
+    data_name = (data_file.filename or "").lower()
+    rows_format = DataInputFormat.CSV if data_name.endswith(".csv") else DataInputFormat.JSON
+    request = BatchActGenerationRequest(
+        act_type=act_type,
+        template_content=template,
+        rows_data=rows_data,
+        rows_format=rows_format,
+        output_format=output_format,
+        filename_field=filename_field,
+        render_template=render_template,
+    )
+    return await submit_act_batch(request)
+
+
+@router.get("/batch/{batch_id}", response_model=BatchActGenerationResponse)
+async def get_act_batch(batch_id: str):
+    """État du lot, ligne par ligne"""
+    try:
+        batch_runner = await services.aget("act_batch_runner")
+        return await run_in_threadpool(batch_runner.status, batch_id)
+    except BatchError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def _batch_job_active(batch_id: str) -> bool:
+    """Indique si une tâche du lot est en attente ou en cours dans la file"""
+    queue = get_job_queue()
+    return any(
+        job.payload.get("batch_id") == batch_id
+        for status in (QUEUED, RUNNING)
+        for job in queue.recent(kind=JobKind.MACHINE_ACTES_BATCH.value, status=status, limit=500)
+    )
+
+
+@router.post("/batch/{batch_id}/resume", response_model=JobStatusResponse, status_code=202)
+async def resume_act_batch(batch_id: str):
+    """
+    Reprend un lot : les actes générés sont conservés, les lignes en
+    attente ou en échec sont (re)tentées
+
+    Returns:
+        Tâche de reprise, 409 si le lot est déjà en cours ou en attente
+    """
+    try:
+        batch_runner = await services.aget("act_batch_runner")
+        request = await run_in_threadpool(batch_runner.load_request, batch_id)
+    except BatchError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if await run_in_threadpool(batch_runner.is_running, batch_id) or await run_in_threadpool(
+        _batch_job_active, batch_id
+    ):
+        raise HTTPException(status_code=409, detail=f"Lot déjà en cours de génération : {batch_id}")
+    
+    job = await run_in_threadpool(submit_job, JobKind.MACHINE_ACTES_BATCH, request)
+    logger.info(f"🔁 Reprise du lot {batch_id} : tâche {job.job_id}")
+    return job
+
+
+@router.get("/batch/{batch_id}/archive")
+async def download_act_batch(batch_id: str):
+    """
+    Archive ZIP des actes générés (partielle tant que le lot est en cours)
+    """
+    try:
+        batch_runner = await services.aget("act_batch_runner")
+        path = await run_in_threadpool(batch_runner.build_archive, batch_id)
+    except BatchError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Aucun acte généré pour le lot {batch_id}")
+    return FileResponse(path, media_type="application/zip", filename=f"actes_{batch_id}.zip")
+
+
 @router.get("/types")
 async def list_act_types():
     """
@@ -145,6 +365,7 @@ async def health():
     """Vérifie que le service de génération d'actes fonctionne"""
     try:
         # Test basique
+        machine = await services.aget("machine_actes")
         return {
             "status": "healthy",
             "service": "Machine à Actes",
@@ -0,0 +1,43 @@
+"""
+Routes des profils de requêtes
+
+Liste et téléchargement des profils enregistrés par le profilage à la
+demande (api.profiling). Jeton d'administration requis (X-Admin-Token).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from api.profiling import require_admin_token
+from utils.profiling import get_profile_store
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/")
+async def list_profiles(limit: int = Query(default=50, ge=1, le=500)):
+    """
+    Liste les profils enregistrés, du plus récent au plus ancien
+
+    Args:
+        limit: Nombre maximal de profils
+    """
+    profiles = await run_in_threadpool(get_profile_store().list_profiles)
+    return [info.to_dict() for info in profiles[:limit]]
+
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str):
+    """
+    Télécharge un profil
+
+    Returns:
+        Profil speedscope (JSON, à ouvrir sur https://www.speedscope.app)
+        ou pstats (python -m pstats), 404 si inconnu
+    """
+    path = get_profile_store().path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profil inconnu : {profile_id}")
+    media_type = "application/json" if profile_id.endswith(".json") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=profile_id)
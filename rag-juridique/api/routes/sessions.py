@@ -0,0 +1,122 @@
+"""
+Routes du dossier de session
+
+Les documents uploadés par l'avocat sont indexés en mémoire le temps de
+la session ; le chatbot et la synthèse y puisent les passages pertinents
+via le champ session_id de leurs requêtes.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from loguru import logger
+
+from api.models import (
+    SessionDocumentsRequest,
+    SessionInfoResponse,
+    SessionPassageResult,
+    SessionSearchRequest,
+)
+from api.uploads import open_upload
+from rag.session_index import SessionIndex, SessionIndexFull, get_session_index_store
+
+router = APIRouter()
+
+
+def _get_session(session_id: str) -> SessionIndex:
+    index = get_session_index_store().get(session_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Session inconnue ou expirée : {session_id}")
+    return index
+
+
+def _session_info(index: SessionIndex) -> SessionInfoResponse:
+    info = index.info(get_session_index_store().ttl_seconds)
+    info["created_at"] = datetime.fromtimestamp(info["created_at"])
+    info["expires_at"] = datetime.fromtimestamp(info["expires_at"])
+    return SessionInfoResponse(**info)
+
+
+async def _add_documents(index: SessionIndex, documents: list[dict[str, str]]) -> list:
+    try:
+        return await run_in_threadpool(get_session_index_store().add_documents, index, documents)
+    except SessionIndexFull as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+@router.post("/", response_model=SessionInfoResponse, status_code=201)
+async def create_session(request: Optional[SessionDocumentsRequest] = None):
+    """
+    Crée une session (éventuellement avec ses premiers documents)
+
+    Returns:
+        Session créée, dont le session_id est à passer au chat et à la synthèse
+    """
+    index = get_session_index_store().create()
+    if request and request.documents:
+        await _add_documents(index, [doc.model_dump() for doc in request.documents])
+    logger.info(f"📂 Session {index.session_id} créée ({len(index.passages)} passages)")
+    return _session_info(index)
+
+
+@router.get("/{session_id}", response_model=SessionInfoResponse)
+async def get_session(session_id: str):
+    """État de l'index d'une session (404 si inconnue ou expirée)"""
+    return _session_info(_get_session(session_id))
+
+
+@router.post("/{session_id}/documents", response_model=SessionInfoResponse)
+async def add_documents(session_id: str, request: SessionDocumentsRequest):
+    """
+    Ajoute des documents texte au dossier de la session
+
+    Example:
+        ```json
+        {"documents": [{"title": "Assignation", "content": "..."}]}
+        ```
+    """
+    index = _get_session(session_id)
+    added = await _add_documents(index, [doc.model_dump() for doc in request.documents])
+    logger.info(f"📂 Session {session_id} : {len(added)} document(s) indexé(s)")
+    return _session_info(index)
+
+
+@router.post("/{session_id}/files", response_model=SessionInfoResponse)
+async def add_files(session_id: str, files: list[UploadFile] = File(...)):
+    """
+    Ajoute des fichiers (PDF, DOCX, TXT) au dossier de la session
+    """
+    index = _get_session(session_id)
+    documents = []
+    for file in files:
+        # Fichier lu sur place, fermé dès son texte extrait
+        async with open_upload(file) as upload:
+            try:
+                text = await run_in_threadpool(upload.extract_text)
+            except Exception as e:
+                logger.error(f"❌ Extraction impossible ({upload.filename}) : {e}")
+                raise HTTPException(status_code=422, detail=f"Fichier illisible : {upload.filename}")
+        documents.append({"title": upload.filename, "content": text})
+
+    added = await _add_documents(index, documents)
+    logger.info(f"📤 Session {session_id} : {len(added)} fichier(s) indexé(s)")
+    return _session_info(index)
+
+
+@router.post("/{session_id}/search", response_model=list[SessionPassageResult])
+async def search_session(session_id: str, request: SessionSearchRequest):
+    """
+    Passages du dossier les plus proches d'une question
+    """
+    index = _get_session(session_id)
+    passages = await run_in_threadpool(index.search, request.query, request.top_k)
+    return [SessionPassageResult(**vars(p)) for p in passages]
+
+
+@router.delete("/{session_id}", status_code=204)
+async def delete_session(session_id: str):
+    """Supprime la session et son index"""
+    if not get_session_index_store().delete(session_id):
+        raise HTTPException(status_code=404, detail=f"Session inconnue ou expirée : {session_id}")
@@ -5,15 +5,17 @@ Endpoints pour la recherche sémantique avancée de jurisprudence.
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 
 from api.models import SearchRequest, SearchResponse
-from api.super_chercheur import SuperChercheur
+from api.responses import model_response
+from api.services import get_services
 
 router = APIRouter()
 
-# Instance du service
-chercheur = SuperChercheur()
+# Services partagés (chercheur construit au démarrage ou à la première requête)
+services = get_services()
 
 
 @router.post("/", response_model=SearchResponse)
@@ -39,9 +41,10 @@ async def search_jurisprudence(request: SearchRequest):
     """
     try:
         logger.info(f"🔍 Recherche: \"{request.query}\"")
-        result = chercheur.search(request)
+        chercheur = await services.aget("chercheur")
+        result = await run_in_threadpool(chercheur.search, request)
         logger.success(f"✅ {len(result.results)} résultat(s) trouvé(s)")
-        return result
+        return await model_response(result)
     
     except Exception as e:
         logger.error(f"❌ Erreur de recherche : {e}")
@@ -51,9 +54,10 @@ async def search_jurisprudence(request: SearchRequest):
 @router.get("/health")
 async def health():
     """Vérifie que le service de recherche fonctionne"""
+    chercheur = await services.aget("chercheur")
     return {
         "status": "healthy",
         "service": "Super-Chercheur",
-        "vertex_search_configured": chercheur.search_client is not None
+        "vertex_search_configured": chercheur.vertex_client is not None
     }
 
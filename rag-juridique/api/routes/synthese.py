@@ -5,15 +5,20 @@ Endpoints pour la synthèse de dossiers procéduraux.
 """
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 
-from api.models import SynthesisRequest, SynthesisResponse, SynthesisType
-from api.synthese_strategie import SynthesisAideStrategie
+from api.jobs import submit_job
+from api.models import JobKind, JobStatusResponse, SynthesisRequest, SynthesisResponse, SynthesisType
+from api.responses import model_response
+from api.services import get_services
+from api.uploads import open_upload
+from rag.token_budget import TokenBudgetError
 
 router = APIRouter()
 
-# Instance du service
-synthese_service = SynthesisAideStrategie()
+# Services partagés (synthèse construite au démarrage ou à la première requête)
+services = get_services()
 
 
 @router.post("/", response_model=SynthesisResponse)
@@ -45,23 +50,28 @@ async def generate_synthesis(request: SynthesisRequest):
         has_documents = (
             (request.documents and len(request.documents) > 0) or
             (request.documents_content and len(request.documents_content) > 0) or
-            (request.documents_files and len(request.documents_files) > 0)
+            (request.documents_files and len(request.documents_files) > 0) or
+            bool(request.session_id)
         )
         
         if not has_documents:
             logger.warning("⚠️ Aucun document fourni pour la synthèse")
             raise HTTPException(
                 status_code=422,
-                detail="Au moins un document doit être fourni : documents, documents_content, ou documents_files"
+                detail="Au moins un document doit être fourni : documents, documents_content, documents_files ou session_id"
             )
         
         logger.info(f"📊 Génération synthèse : {request.synthesis_type}")
-        result = synthese_service.synthesize(request)
+        synthese_service = await services.aget("synthese")
+        result = await run_in_threadpool(synthese_service.synthesize, request)
         logger.success(f"✅ Synthèse générée ({len(result.summary)} caractères)")
-        return result
+        return await model_response(result)
     
     except HTTPException:
         raise
+    except TokenBudgetError as e:
+        logger.warning(f"⚠️ Appel LLM refusé avant envoi : {e}")
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
     except Exception as e:
         logger.error(f"❌ Erreur de synthèse : {e}")
         import traceback
@@ -69,7 +79,33 @@ async def generate_synthesis(request: SynthesisRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/from-files")
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+async def submit_synthesis_job(request: SynthesisRequest):
+    """
+    Soumet une synthèse comme tâche asynchrone
+    
+    La requête rend la main immédiatement ; suivre la tâche via
+    GET /api/v1/jobs/{job_id} puis récupérer la synthèse via
+    GET /api/v1/jobs/{job_id}/result.
+    
+    Args:
+        request: Requête de synthèse (même format que POST /)
+    
+    Returns:
+        État initial de la tâche
+    """
+    if not (request.documents or request.documents_content or request.documents_files or request.session_id):
+        raise HTTPException(
+            status_code=422,
+            detail="Au moins un document doit être fourni : documents, documents_content, documents_files ou session_id"
+        )
+    
+    job = await run_in_threadpool(submit_job, JobKind.SYNTHESE, request)
+    logger.info(f"📥 Synthèse {request.synthesis_type} soumise : tâche {job.job_id}")
+    return job
+
+
+@router.post("/from-files", response_model=SynthesisResponse)
 async def generate_synthesis_from_files(
     synthesis_type: str = Form(...),
     context: str = Form(default=""),
@@ -94,28 +130,14 @@ async def generate_synthesis_from_files(
         # Extraire le contenu de chaque fichier
         documents = []
         for file in files:
-            content = await file.read()
-            
-            # Sauvegarder temporairement
-            import tempfile
-            from pathlib import Path
-            
-            temp_dir = Path(tempfile.mkdtemp())
-            temp_file = temp_dir / file.filename
-            temp_file.write_bytes(content)
-            
-            # Extraire le texte
-            from api.audit_conformite import extract_text_from_file
-            text = extract_text_from_file(str(temp_file))
+            # Fichier lu sur place, fermé dès son texte extrait
+            async with open_upload(file) as upload:
+                text = await run_in_threadpool(upload.extract_text)
             
             documents.append({
-                "title": file.filename,
+                "title": upload.filename,
                 "content": text
             })
-            
-            # Nettoyer
-            temp_file.unlink()
-            temp_dir.rmdir()
         
         # Créer la requête
         from api.models import OutputFormat
@@ -128,11 +150,17 @@ async def generate_synthesis_from_files(
         )
         
         # Générer
-        result = synthese_service.synthesize(request)
+        synthese_service = await services.aget("synthese")
+        result = await run_in_threadpool(synthese_service.synthesize, request)
         
         logger.success(f"✅ Synthèse générée depuis fichiers")
-        return result
+        return await model_response(result)
     
+    except TokenBudgetError as e:
+        logger.warning(f"⚠️ Appel LLM refusé avant envoi : {e}")
+        raise HTTPException(status_code=e.status_code, detail=e.to_detail())
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur : {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -163,9 +191,10 @@ async def list_synthesis_types():
 @router.get("/health")
 async def health():
     """Vérifie que le service de synthèse fonctionne"""
+    synthese_service = await services.aget("synthese")
     return {
         "status": "healthy",
         "service": "Synthèse et Stratégie",
-        "gemini_configured": synthese_service.model is not None
+        "gemini_configured": synthese_service.model_pro is not None
     }
 
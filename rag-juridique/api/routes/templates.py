@@ -5,16 +5,18 @@ Endpoints pour créer, lire, modifier et supprimer des templates PDF.
 """
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from loguru import logger
 
-from utils.pdf_style_analyzer import PDFStyleAnalyzer
-from utils.pdf_template_manager import PDFTemplateManager
+from api.services import get_services
+from api.uploads import PDF, open_upload
+from utils.pdf_template_manager import get_template_manager
 
 router = APIRouter()
 
-# Instances des services
-analyzer = PDFStyleAnalyzer()
-manager = PDFTemplateManager()
+# Instances des services (analyseur de style construit à la première analyse)
+services = get_services()
+manager = get_template_manager()
 
 
 @router.get("/")
@@ -60,7 +62,8 @@ async def get_template(template_name: str):
 @router.post("/analyze")
 async def analyze_pdf_template(
     pdf_file: UploadFile = File(...),
-    template_name: str = Form(...)
+    template_name: str = Form(...),
+    sample_pages: int | None = Form(default=None, ge=1, le=100),
 ):
     """
     Analyse un PDF et génère un template automatiquement (Gemini)
@@ -68,6 +71,8 @@ async def analyze_pdf_template(
     Args:
         pdf_file: Fichier PDF à analyser
         template_name: Nom du template à créer
+        sample_pages: Pages analysées pour repérer en-tête et pied de page
+            (défaut : PDF_STYLE_SAMPLE_PAGES)
     
     Returns:
         Template généré
@@ -75,19 +80,13 @@ async def analyze_pdf_template(
     try:
         logger.info(f"📤 Upload PDF pour analyse : {pdf_file.filename}")
         
-        # Sauvegarder temporairement
-        import tempfile
-        from pathlib import Path
-        
-        temp_dir = Path(tempfile.mkdtemp())
-        temp_file = temp_dir / pdf_file.filename
-        
-        content = await pdf_file.read()
-        temp_file.write_bytes(content)
-        
-        # Analyser avec Gemini
-        logger.info(f"🤖 Analyse du style avec Gemini...")
-        template_config = analyzer.analyze_pdf(temp_file)
+        # Analyser avec Gemini (PDF lu sur place, fermé en sortie)
+        async with open_upload(pdf_file, allowed=frozenset({PDF})) as document:
+            logger.info(f"🤖 Analyse du style avec Gemini...")
+            analyzer = await services.aget("style_analyzer")
+            template_config = await run_in_threadpool(
+                analyzer.analyze_pdf, document.filename, sample_pages, document.buffer()
+            )
         
         # Sauvegarder le template
         manager.save_template(
@@ -95,10 +94,6 @@ async def analyze_pdf_template(
             template_config=template_config,
         )
         
-        # Nettoyer
-        temp_file.unlink()
-        temp_dir.rmdir()
-        
         logger.success(f"✅ Template '{template_name}' créé")
         
         return {
@@ -107,6 +102,8 @@ async def analyze_pdf_template(
             "config": template_config
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur : {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -142,6 +139,7 @@ async def delete_template(template_name: str):
 @router.get("/health")
 async def health():
     """Vérifie que le service de templates fonctionne"""
+    analyzer = await services.aget("style_analyzer")
     return {
         "status": "healthy",
         "service": "Templates PDF",
@@ -0,0 +1,233 @@
+"""
+Conteneur des services de l'API (construits à la première utilisation)
+
+Les piliers ne sont plus instanciés à l'import de leur route :
+- un seul VertexSearchClient (canal gRPC) est partagé par les piliers, et
+  les modèles Gemini par la passerelle LLM (rag.llm_gateway)
+- chaque service est construit une seule fois (verrou par service), à sa
+  première utilisation ou lors du préchauffage parallèle du démarrage
+  (SERVICES_WARMUP)
+- les modules des piliers (google.generativeai, fitz, reportlab...) ne sont
+  importés que par les fabriques : importer api.main reste léger
+
+Usage:
+    >>> services = get_services()
+    >>> response = services.chatbot.chat(request)
+    >>> chatbot = await services.aget("chatbot")  # depuis une route
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from fastapi.concurrency import run_in_threadpool
+
+from config.logging_config import get_logger
+from rag.llm_gateway import LLMGateway, get_llm_gateway
+
+if TYPE_CHECKING:
+    from api.audit_conformite import AuditConformite
+    from api.chatbot_avocat import ChatbotAvocat
+    from api.machine_actes import MachineActes
+    from api.machine_actes_batch import ActBatchRunner
+    from api.super_chercheur import SuperChercheur
+    from api.synthese_strategie import SynthesisAideStrategie
+    from rag.vertex_search import VertexSearchClient
+    from utils.pdf_style_analyzer import PDFStyleAnalyzer
+
+logger = get_logger(__name__)
+
+
+class ServiceContainer:
+    """
+    Services partagés de l'API, construits à la demande
+
+    Attributes:
+        build_ms: Durée de construction de chaque service déjà construit
+    """
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {
+            "search_client": self._build_search_client,
+            "chercheur": self._build_chercheur,
+            "chatbot": self._build_chatbot,
+            "audit": self._build_audit,
+            "machine_actes": self._build_machine_actes,
+            "act_batch_runner": self._build_act_batch_runner,
+            "synthese": self._build_synthese,
+            "style_analyzer": self._build_style_analyzer,
+        }
+        self._instances: dict[str, Any] = {}
+        self._locks = {name: threading.Lock() for name in self._factories}
+        self.build_ms: dict[str, float] = {}
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._factories)
+
+    def get(self, name: str) -> Any:
+        """
+        Service construit (à la première demande, une seule fois)
+
+        Raises:
+            KeyError: Service inconnu
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self.build_ms[name] = (time.perf_counter() - start) * 1000
+                self._instances[name] = instance
+                logger.debug(f"🧩 Service {name} construit en {self.build_ms[name]:.0f} ms")
+        return instance
+
+    def built(self, name: str) -> Any | None:
+        """Service déjà construit, sans le construire (None sinon)"""
+        return self._instances.get(name)
+
+    async def aget(self, name: str) -> Any:
+        """get() depuis la boucle asynchrone : construction éventuelle dans un thread"""
+        instance = self._instances.get(name)
+        if instance is None:
+            instance = await run_in_threadpool(self.get, name)
+        return instance
+
+    def warm_up(self, names: Iterable[str] | None = None, workers: int = 4) -> dict[str, str]:
+        """
+        Construit les services en parallèle (threads)
+
+        Les services dépendant du client de recherche attendent sa
+        construction (verrou) : il n'est créé qu'une fois.
+
+        Args:
+            names: Services à construire (défaut : tous)
+            workers: Threads de construction
+
+        Returns:
+            Erreurs par service (vide si tout est construit)
+        """
+        names = list(names or self._factories)
+        start = time.perf_counter()
+        errors: dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="warmup") as executor:
+            futures = {executor.submit(self.get, name): name for name in names}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    errors[futures[future]] = f"{type(e).__name__}: {e}"
+                    logger.error(f"❌ Service {futures[future]} non construit : {e}")
+        logger.info(
+            f"🔥 {len(names) - len(errors)}/{len(names)} service(s) construit(s) "
+            f"en {(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        return errors
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "built": {name: round(ms, 1) for name, ms in self.build_ms.items()},
+            "pending": [name for name in self._factories if name not in self._instances],
+        }
+
+    # ------------------------------------------------------------------
+    # Services
+    # ------------------------------------------------------------------
+
+    @property
+    def llm_gateway(self) -> LLMGateway:
+        return get_llm_gateway()
+
+    @property
+    def search_client(self) -> "VertexSearchClient":
+        return self.get("search_client")
+
+    @property
+    def chercheur(self) -> "SuperChercheur":
+        return self.get("chercheur")
+
+    @property
+    def chatbot(self) -> "ChatbotAvocat":
+        return self.get("chatbot")
+
+    @property
+    def audit(self) -> "AuditConformite":
+        return self.get("audit")
+
+    @property
+    def machine_actes(self) -> "MachineActes":
+        return self.get("machine_actes")
+
+    @property
+    def act_batch_runner(self) -> "ActBatchRunner":
+        return self.get("act_batch_runner")
+
+    @property
+    def synthese(self) -> "SynthesisAideStrategie":
+        return self.get("synthese")
+
+    @property
+    def style_analyzer(self) -> "PDFStyleAnalyzer":
+        return self.get("style_analyzer")
+
+    # ------------------------------------------------------------------
+    # Fabriques (imports des piliers différés)
+    # ------------------------------------------------------------------
+
+    def _build_search_client(self) -> "VertexSearchClient":
+        from rag.vertex_search import VertexSearchClient
+
+        return VertexSearchClient()
+
+    def _build_chercheur(self) -> "SuperChercheur":
+        from api.super_chercheur import SuperChercheur
+
+        return SuperChercheur(vertex_client=self.search_client)
+
+    def _build_chatbot(self) -> "ChatbotAvocat":
+        from api.chatbot_avocat import ChatbotAvocat
+
+        return ChatbotAvocat(vertex_client=self.search_client)
+
+    def _build_audit(self) -> "AuditConformite":
+        from api.audit_conformite import AuditConformite
+
+        return AuditConformite(vertex_client=self.search_client)
+
+    def _build_machine_actes(self) -> "MachineActes":
+        from api.machine_actes import MachineActes
+
+        return MachineActes()
+
+    def _build_act_batch_runner(self) -> "ActBatchRunner":
+        from api.machine_actes_batch import ActBatchRunner
+
+        return ActBatchRunner(self.machine_actes)
+
+    def _build_synthese(self) -> "SynthesisAideStrategie":
+        from api.synthese_strategie import SynthesisAideStrategie
+
+        return SynthesisAideStrategie(vertex_client=self.search_client)
+
+    def _build_style_analyzer(self) -> "PDFStyleAnalyzer":
+        from utils.pdf_style_analyzer import PDFStyleAnalyzer
+
+        return PDFStyleAnalyzer()
+
+
+_services: ServiceContainer | None = None
+_services_lock = threading.Lock()
+
+
+def get_services() -> ServiceContainer:
+    """Retourne le conteneur global des services"""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None:
+                _services = ServiceContainer()
+    return _services
@@ -4,16 +4,25 @@ Recherche experte avec analyse de tendances et probabilités judiciaires
 """
 
 import time
-from typing import Any
+from typing import Any, Collection
 
 from config.logging_config import get_logger
 from config.settings import get_settings
+from rag.facets import FacetEngine
+from rag.highlighter import HighlightWindow, QueryHighlighter
+from rag.metadata_store import get_metadata_store
+from rag.text_utils import truncate_text
+from rag.token_budget import metered
 from rag.vertex_search import VertexSearchClient
+from utils.timing import explained, stage
 from api.models import (
+    HighlightSpan,
+    SearchFacets,
     SearchFilters,
     SearchRequest,
     SearchResponse,
     SearchResult,
+    SearchResultField,
     TrendAnalysis,
 )
 
@@ -33,11 +42,18 @@ class SuperChercheur:
     - Identification d'arguments clés
     """
     
-    def __init__(self):
-        """Initialise le Super-Chercheur"""
-        self.vertex_client = VertexSearchClient()
+    def __init__(self, vertex_client: VertexSearchClient | None = None):
+        """
+        Initialise le Super-Chercheur
+        
+        Args:
+            vertex_client: Client Vertex AI Search partagé (défaut : nouveau client)
+        """
+        self.vertex_client = vertex_client or VertexSearchClient()
         logger.info("✅ SuperChercheur initialisé")
     
+    @metered
+    @explained("search")
     def search(self, request: SearchRequest) -> SearchResponse:
         """
         Effectue une recherche experte
@@ -65,14 +81,38 @@ class SuperChercheur:
             )
             
             # 3. Transformation des résultats
-            results = self._transform_results(raw_results, request.include_metadata)
+            results = self._transform_results(
+                raw_results,
+                request.include_metadata,
+                request.query,
+                fields=request.fields,
+                max_content_chars=request.max_content_chars,
+            )
             
-            # 4. Analyse de tendances (si demandée)
+            # 4. Facettes sur l'ensemble des articles correspondants
+            facets = None
+            if request.include_facets or request.analyze_trends:
+                facets = self._compute_facets(request, raw_results)
+            
+            # 5. Analyse de tendances (si demandée)
             trends = None
             if request.analyze_trends and len(results) > 0:
-                trends = self._analyze_trends(results, request.query)
+                trend_results = results
+                if request.include_metadata and not self._keeps(request.fields, SearchResultField.METADATA):
+                    # Métadonnées exclues de la réponse, pas de l'analyse
+                    trend_results = [
+                        SearchResult(
+                            id=result.id,
+                            title=result.title,
+                            content="",
+                            score=result.score,
+                            metadata=raw.get("metadata", {}),
+                        )
+                        for result, raw in zip(results, raw_results)
+                    ]
+                trends = self._analyze_trends(trend_results, request.query, facets)
             
-            # 5. Construction de la réponse
+            # 6. Construction de la réponse
             processing_time = (time.time() - start_time) * 1000
             
             response = SearchResponse(
@@ -81,6 +121,7 @@ class SuperChercheur:
                 query=request.query,
                 filters_applied=request.filters.model_dump(exclude_none=True),
                 trends=trends,
+                facets=facets if request.include_facets else None,
                 processing_time_ms=round(processing_time, 2),
             )
             
@@ -92,6 +133,7 @@ class SuperChercheur:
             logger.error(f"❌ Erreur lors de la recherche: {e}")
             raise
     
+    @stage("filter_build")
     def _build_vertex_filters(self, filters: SearchFilters) -> str:
         """
         Construit l'expression de filtre pour Vertex AI
@@ -120,68 +162,162 @@ class SuperChercheur:
         
         return ""
     
+    @staticmethod
+    def _keeps(fields: Collection[str] | None, name: str) -> bool:
+        """Indique si un champ est renvoyé (fields None : tous)"""
+        return fields is None or name in fields
+    
+    @stage("transform")
     def _transform_results(
         self,
         raw_results: list[dict[str, Any]],
-        include_metadata: bool
+        include_metadata: bool,
+        query: str = "",
+        fields: Collection[str] | None = None,
+        max_content_chars: int | None = None,
     ) -> list[SearchResult]:
         """
         Transforme les résultats bruts en SearchResult
         
+        La projection et la troncature sont appliquées avant la construction
+        des modèles : un contenu ou des métadonnées exclus ne sont ni copiés
+        ni validés. Les extraits sont calculés sur le contenu complet, en une
+        passe, et seulement s'ils sont renvoyés ; le meilleur extrait
+        (snippet) remplace un contenu exclu ou complète un contenu tronqué.
+        
         Args:
             raw_results: Résultats bruts de Vertex AI
             include_metadata: Inclure les métadonnées détaillées
+            query: Requête d'origine (extraits mis en évidence)
+            fields: Champs renvoyés (None : tous ; id, title et score toujours)
+            max_content_chars: Longueur maximale du contenu renvoyé
         
         Returns:
             Liste de SearchResult
         """
-        results = []
+        with_content = self._keeps(fields, SearchResultField.CONTENT)
+        with_metadata = include_metadata and self._keeps(fields, SearchResultField.METADATA)
+        with_highlights = self._keeps(fields, SearchResultField.HIGHLIGHTS)
+        with_spans = self._keeps(fields, SearchResultField.HIGHLIGHT_SPANS)
+        with_snippet = (
+            not with_content
+            or max_content_chars is not None
+            or (fields is not None and SearchResultField.SNIPPET in fields)
+        )
+        
+        contents = [raw.get("content", "") or "" for raw in raw_results]
+        windows_per_result: list[list[HighlightWindow] | None] = [None] * len(contents)
+        if with_highlights or with_spans or with_snippet:
+            # Termes de la requête préparés une seule fois ; tous les contenus
+            # de la page sont parcourus en une seule passe
+            with stage("highlight"):
+                highlighter = QueryHighlighter.for_query(query)
+                windows_per_result = highlighter.highlight_many(contents, top_k=3)
         
-        for raw in raw_results:
+        results = []
+        for raw, content, windows in zip(raw_results, contents, windows_per_result):
+            spans = self._extract_highlights(content, windows) if windows is not None else []
             result = SearchResult(
                 id=raw.get("id", ""),
                 title=raw.get("title", "Sans titre"),
-                content=raw.get("content", ""),
+                content=truncate_text(content, max_content_chars) if with_content else "",
                 score=raw.get("score", 0.0) or 0.0,
-                metadata=raw.get("metadata", {}) if include_metadata else {},
-                highlights=self._extract_highlights(raw.get("content", "")),
+                metadata=raw.get("metadata", {}) if with_metadata else {},
+                highlights=[span.text for span in spans] if with_highlights else None,
+                highlight_spans=spans if with_spans else None,
+                snippet=spans[0].text if with_snippet and spans else None,
             )
             results.append(result)
         
         return results
     
-    def _extract_highlights(self, content: str, max_length: int = 150) -> list[str]:
+    def _extract_highlights(
+        self,
+        content: str,
+        windows: list[HighlightWindow],
+        max_length: int = 150,
+    ) -> list[HighlightSpan]:
         """
-        Extrait des extraits pertinents du contenu
+        Convertit les fenêtres pertinentes d'un contenu en extraits
         
         Args:
             content: Contenu textuel
-            max_length: Longueur maximale d'un extrait
+            windows: Fenêtres retenues par QueryHighlighter
+            max_length: Longueur de l'extrait par défaut (aucun terme trouvé)
         
         Returns:
-            Liste d'extraits
+            Liste d'extraits avec positions des termes
         """
         if not content:
             return []
         
-        # Pour l'instant, on prend simplement le début
-        # TODO: Améliorer avec extraction basée sur la query
+        if windows:
+            return [HighlightSpan(**window.to_dict()) for window in windows]
+        
+        # Aucun terme de la requête : début du contenu
         if len(content) <= max_length:
-            return [content]
+            return [HighlightSpan(text=content, start=0, end=len(content), score=0.0)]
+        
+        return [HighlightSpan(
+            text=content[:max_length] + "...",
+            start=0,
+            end=max_length,
+            score=0.0,
+        )]
+    
+    @stage("facets")
+    def _compute_facets(
+        self,
+        request: SearchRequest,
+        raw_results: list[dict[str, Any]],
+    ) -> SearchFacets | None:
+        """
+        Calcule les facettes sur l'instantané des métadonnées
+        
+        Args:
+            request: Requête de recherche (requête, filtres, niveau du fil d'Ariane)
+            raw_results: Résultats bruts de Vertex AI (toujours inclus)
+        
+        Returns:
+            Facettes, ou None si l'instantané n'est pas disponible
+        """
+        store = get_metadata_store()
+        if store is None:
+            return None
         
-        return [content[:max_length] + "..."]
+        try:
+            engine = FacetEngine(store, top_n=settings.FACETS_TOP_N)
+            mask, match_mode = engine.match(
+                request.query,
+                request.filters.model_dump(exclude_none=True),
+                [raw.get("id", "") for raw in raw_results],
+            )
+            data = engine.compute(mask, breadcrumb_level=request.facet_breadcrumb_level)
+            facets = SearchFacets(match_mode=match_mode, **data)
+            logger.info(f"📊 Facettes: {facets.total} articles en {facets.computed_in_ms}ms")
+            return facets
+        except Exception as e:
+            logger.warning(f"⚠️ Erreur calcul des facettes: {e}")
+            return None
     
+    @stage("trends")
     def _analyze_trends(
         self,
         results: list[SearchResult],
-        query: str
+        query: str,
+        facets: SearchFacets | None = None,
     ) -> TrendAnalysis:
         """
         Analyse les tendances jurisprudentielles
         
+        Les comptes et l'évolution temporelle portent sur l'ensemble des
+        articles correspondants (facettes) lorsqu'ils sont disponibles,
+        sinon sur la page de résultats.
+        
         Args:
             results: Résultats de recherche
             query: Requête d'origine
+            facets: Facettes de la recherche (optionnelles)
         
         Returns:
             Analyse de tendances
@@ -190,7 +326,7 @@ class SuperChercheur:
         
         try:
             # 1. Comptage des cas similaires
-            similar_cases_count = len(results)
+            similar_cases_count = facets.total if facets else len(results)
             
             # 2. Estimation de probabilité de succès
             # NOTE: Pour l'instant, estimation basique
@@ -198,13 +334,13 @@ class SuperChercheur:
             success_probability = self._estimate_success_probability(results)
             
             # 3. Identification des arguments clés
-            key_arguments = self._extract_key_arguments(results)
+            key_arguments = self._extract_key_arguments(results, facets)
             
             # 4. Jurisprudence dominante
             dominant_jurisprudence = self._identify_dominant_jurisprudence(results)
             
             # 5. Évolution temporelle
-            temporal_evolution = self._analyze_temporal_evolution(results)
+            temporal_evolution = self._analyze_temporal_evolution(results, facets)
             
             analysis = TrendAnalysis(
                 success_probability=success_probability,
@@ -256,7 +392,11 @@ class SuperChercheur:
         
         return round(probability, 2)
     
-    def _extract_key_arguments(self, results: list[SearchResult]) -> list[str]:
+    def _extract_key_arguments(
+        self,
+        results: list[SearchResult],
+        facets: SearchFacets | None = None,
+    ) -> list[str]:
         """
         Extrait les arguments juridiques clés récurrents
         
@@ -265,10 +405,17 @@ class SuperChercheur:
         
         Args:
             results: Résultats de recherche
+            facets: Facettes de la recherche (divisions les plus représentées)
         
         Returns:
             Liste d'arguments clés
         """
+        if facets and facets.breadcrumb:
+            return [
+                f"{bucket.value} ({bucket.count} articles)"
+                for bucket in facets.breadcrumb[:5]
+            ]
+        
         # Pour l'instant: extraction de mots-clés fréquents
         # TODO: Utiliser NER et analyse sémantique
         
@@ -326,17 +473,24 @@ class SuperChercheur:
     
     def _analyze_temporal_evolution(
         self,
-        results: list[SearchResult]
+        results: list[SearchResult],
+        facets: SearchFacets | None = None,
     ) -> dict[str, Any]:
         """
         Analyse l'évolution temporelle de la jurisprudence
         
         Args:
             results: Résultats de recherche
+            facets: Facettes de la recherche (distribution sur tout le corpus)
         
         Returns:
             Données d'évolution temporelle
         """
+        if facets and facets.years:
+            return FacetEngine.temporal_evolution(
+                {int(bucket.value): bucket.count for bucket in facets.years}
+            )
+        
         # Grouper par année
         yearly_counts: dict[str, int] = {}
         
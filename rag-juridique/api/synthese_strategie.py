@@ -12,7 +12,6 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any
 
-import google.generativeai as genai
 from loguru import logger
 
 from api.models import (
@@ -23,7 +22,21 @@ from api.models import (
 )
 from config.logging_config import setup_logging
 from config.settings import get_settings
+from rag.context_packer import ContextPacker
+from rag.llm_gateway import get_llm_gateway
+from rag.map_reduce import ChunkSummaryCache, MapReduceSummarizer
+from rag.session_index import get_session_index_store
+from rag.token_budget import (
+    TIER_FLASH,
+    TIER_PRO,
+    RoutePlan,
+    get_routing_policy,
+    get_token_estimator,
+    metered,
+)
 from rag.vertex_search import VertexSearchClient
+from utils.job_queue import report_progress
+from utils.timing import explained, stage
 
 # Import des prompts centralisés
 from prompts.prompts import (
@@ -37,11 +50,14 @@ from prompts.prompts import (
 setup_logging()
 settings = get_settings()
 
-# Configuration Gemini
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
+# Types de synthèse demandant un raisonnement approfondi (modèle Pro)
+PRO_SYNTHESIS_TYPES = {SynthesisType.STRATEGIC_NOTE, SynthesisType.TREND_ANALYSIS}
+
+# Taille de réponse attendue d'une synthèse (tokens), pour l'estimation du coût
+SYNTHESIS_OUTPUT_TOKENS = 4096
 
 
+@stage("extract_text")
 def extract_text_from_file(file_path: str) -> str:
     """
     Extrait le texte d'un fichier (PDF, DOCX, TXT)
@@ -112,19 +128,43 @@ class SynthesisAideStrategie:
     - Chronologie procédurale
     """
     
-    def __init__(self):
-        """Initialise le système de synthèse"""
-        self.vertex_client = VertexSearchClient()
+    def __init__(self, vertex_client: VertexSearchClient | None = None):
+        """
+        Initialise le système de synthèse
+        
+        Args:
+            vertex_client: Client Vertex AI Search partagé (défaut : nouveau client)
+        """
+        self.vertex_client = vertex_client or VertexSearchClient()
+        self.context_packer = ContextPacker(
+            max_chars=settings.RAG_CONTEXT_MAX_CHARS,
+            max_chars_per_source=settings.RAG_CONTEXT_MAX_CHARS_PER_SOURCE,
+            near_duplicate_threshold=settings.RAG_NEAR_DUPLICATE_THRESHOLD,
+        )
         
         # Configuration Gemini
         if settings.GEMINI_API_KEY:
-            self.model_pro = genai.GenerativeModel(settings.GEMINI_PRO_MODEL)
-            self.model_flash = genai.GenerativeModel(settings.GEMINI_FLASH_MODEL)
+            self.model_pro = get_llm_gateway().model(settings.GEMINI_PRO_MODEL)
+            self.model_flash = get_llm_gateway().model(settings.GEMINI_FLASH_MODEL)
         else:
             logger.warning("⚠️ GEMINI_API_KEY non définie - synthèse désactivée")
             self.model_pro = None
             self.model_flash = None
         
+        # Map-reduce des dossiers volumineux (extraits résumés par Flash)
+        self.summarizer = MapReduceSummarizer(
+            self.model_flash,
+            chunk_tokens=settings.SYNTHESIS_CHUNK_TOKENS,
+            reduce_tokens=settings.SYNTHESIS_REDUCE_TOKENS,
+            max_workers=settings.SYNTHESIS_MAP_CONCURRENCY,
+            cache=ChunkSummaryCache(
+                settings.SYNTHESIS_CACHE_DIR,
+                max_entries=settings.SYNTHESIS_CACHE_MAX_ENTRIES,
+                max_bytes=settings.SYNTHESIS_CACHE_MAX_BYTES,
+                max_age_days=settings.SYNTHESIS_CACHE_MAX_AGE_DAYS,
+            ),
+        ) if self.model_flash else None
+        
         # Map type → prompt template
         self.prompt_templates = {
             SynthesisType.STRATEGIC_NOTE: PROMPT_STRATEGIC_NOTE,
@@ -136,6 +176,8 @@ class SynthesisAideStrategie:
         
         logger.info("✅ SynthesisAideStrategie initialisé")
     
+    @metered
+    @explained("synthesis")
     def synthesize(self, request: SynthesisRequest) -> SynthesisResponse:
         """
         Génère une synthèse selon le type demandé
@@ -149,6 +191,7 @@ class SynthesisAideStrategie:
         logger.info(f"🎯 Synthèse demandée : {request.synthesis_type.value}")
         
         # 1. Obtenir le contenu des documents
+        report_progress(0.05, "Lecture des documents")
         documents_text = self._get_documents_content(request)
         
         if not documents_text:
@@ -168,10 +211,12 @@ class SynthesisAideStrategie:
         
         # 2. Enrichir avec RAG si demandé
         if request.enrich_with_rag and request.search_query:
+            report_progress(0.2, "Recherche de jurisprudence")
             rag_context = self._enrich_with_rag(request.search_query)
             documents_text.append(f"\n\n--- JURISPRUDENCE PERTINENTE ---\n{rag_context}")
         
         # 3. Générer la synthèse selon le type
+        report_progress(0.3, "Génération de la synthèse")
         result = self._generate_synthesis(
             synthesis_type=request.synthesis_type,
             documents=documents_text,
@@ -181,6 +226,7 @@ class SynthesisAideStrategie:
         logger.success(f"✅ Synthèse générée : {request.synthesis_type.value}")
         return result
     
+    @stage("documents")
     def _get_documents_content(self, request: SynthesisRequest) -> list[str]:
         """
         Obtient le contenu des documents (texte ou fichiers)
@@ -219,9 +265,50 @@ class SynthesisAideStrategie:
                 except Exception as e:
                     logger.warning(f"⚠️ Erreur extraction {file_path}: {e}")
         
+        # Option 4 : Dossier indexé dans la session
+        if request.session_id:
+            documents.extend(self._get_session_documents(request))
+        
         logger.info(f"📚 Total documents extraits : {len(documents)}")
         return documents
     
+    def _get_session_documents(self, request: SynthesisRequest) -> list[str]:
+        """
+        Documents du dossier de la session
+        
+        Avec un thème (session_query, search_query ou context), seuls les
+        passages pertinents sont retenus, regroupés par document dans
+        l'ordre d'upload ; sans thème, le dossier entier est synthétisé.
+        
+        Returns:
+            Liste de textes
+        """
+        index = get_session_index_store().get(request.session_id)
+        if index is None:
+            logger.warning(f"⚠️ Session inconnue ou expirée : {request.session_id}")
+            return []
+        
+        query = request.session_query or request.search_query or request.context
+        if not query:
+            logger.debug(f"📂 Dossier de session complet : {len(index.documents)} document(s)")
+            return [doc.content for doc in index.documents]
+        
+        passages = index.search(query, top_k=settings.SESSION_SYNTHESIS_TOP_K)
+        order = index.document_order()
+        by_document: dict[str, list] = {}
+        for passage in sorted(passages, key=lambda p: (order.get(p.document_id, 0), p.chunk_index)):
+            by_document.setdefault(passage.document_id, []).append(passage)
+        
+        logger.debug(
+            f"📂 Dossier de session : {len(passages)} passage(s) pertinent(s) "
+            f"dans {len(by_document)} document(s)"
+        )
+        return [
+            f"=== {group[0].title} ===\n" + "\n[...]\n".join(p.text for p in group)
+            for group in by_document.values()
+        ]
+    
+    @stage("rag_enrichment")
     def _enrich_with_rag(self, query: str) -> str:
         """
         Enrichit avec de la jurisprudence via RAG
@@ -234,17 +321,19 @@ class SynthesisAideStrategie:
         """
         try:
             logger.info(f"🔍 Enrichissement RAG : '{query}'")
-            results = self.vertex_client.search(query=query, page_size=5)
+            results = self.vertex_client.search(query=query, page_size=10)
             
             if not results:
                 return ""
             
+            # Déduplication et extraits pertinents dans le budget de contexte
+            packed = self.context_packer.pack(query, results, max_sources=5)
+            
             # Formater les résultats
-            context_parts = []
-            for i, result in enumerate(results, 1):
-                title = result.get("title", "Document")
-                content = result.get("content", "")
-                context_parts.append(f"[{i}] {title}\n{content[:500]}...")
+            context_parts = [
+                f"[{i}] {source.title}\n{source.excerpt}"
+                for i, source in enumerate(packed, 1)
+            ]
             
             return "\n\n".join(context_parts)
         
@@ -252,6 +341,7 @@ class SynthesisAideStrategie:
             logger.warning(f"⚠️ Erreur enrichissement RAG: {e}")
             return ""
     
+    @stage("generation")
     def _generate_synthesis(
         self,
         synthesis_type: SynthesisType,
@@ -283,34 +373,47 @@ class SynthesisAideStrategie:
         if not prompt_template:
             raise ValueError(f"Type de synthèse non supporté : {synthesis_type}")
         
-        # Concaténer les documents
-        documents_text = "\n\n---\n\n".join(documents)
+        # Routage avant tout appel : modèle, map-reduce, plafond de coût
+        plan = self._plan_route(synthesis_type, prompt_template, documents, request)
         
-        # Construire le prompt selon le type
-        if synthesis_type == SynthesisType.STRATEGIC_NOTE:
-            prompt = prompt_template.format(documents=documents_text)
-            model = self.model_pro  # Pro pour analyses complexes
-        
-        elif synthesis_type == SynthesisType.TREND_ANALYSIS:
-            prompt = prompt_template.format(
-                jurisprudence=documents_text,
-                query=request.search_query or "Non spécifiée",
-                date_range=f"{request.date_range_start or 'N/A'} - {request.date_range_end or 'N/A'}",
-                jurisdiction=request.jurisdiction or "Toutes",
-            )
-            model = self.model_pro
-        
-        elif synthesis_type == SynthesisType.CLIENT_REPORT:
-            prompt = prompt_template.format(internal_summary=documents_text)
-            model = self.model_flash  # Flash pour vulgarisation
+        # Dossier volumineux : résumés partiels des extraits avant la passe finale
+        map_reduce_stats = None
+        estimated_tokens = plan.estimated_input_tokens
+        if plan.strategy == "map_reduce":
+            estimated_tokens = None
+            try:
+                report_progress(0.35, "Résumé des extraits du dossier")
+                documents, map_reduce_stats = self.summarizer.summarize(documents)
+                report_progress(0.8, "Rédaction de la synthèse")
+            except Exception as e:
+                logger.error(f"❌ Erreur map-reduce, synthèse en un seul appel : {e}")
         
-        elif synthesis_type in [SynthesisType.CASE_SUMMARY, SynthesisType.PROCEDURAL_TIMELINE]:
-            prompt = prompt_template.format(documents=documents_text)
-            model = self.model_flash  # Flash pour résumés
+        with stage("prompt_build"):
+            # Concaténer les documents
+            documents_text = "\n\n---\n\n".join(documents)
+            
+            # Construire le prompt selon le type
+            if synthesis_type == SynthesisType.STRATEGIC_NOTE:
+                prompt = prompt_template.format(documents=documents_text)
+            
+            elif synthesis_type == SynthesisType.TREND_ANALYSIS:
+                prompt = prompt_template.format(
+                    jurisprudence=documents_text,
+                    query=request.search_query or "Non spécifiée",
+                    date_range=f"{request.date_range_start or 'N/A'} - {request.date_range_end or 'N/A'}",
+                    jurisdiction=request.jurisdiction or "Toutes",
+                )
+            
+            elif synthesis_type == SynthesisType.CLIENT_REPORT:
+                prompt = prompt_template.format(internal_summary=documents_text)
+            
+            elif synthesis_type in [SynthesisType.CASE_SUMMARY, SynthesisType.PROCEDURAL_TIMELINE]:
+                prompt = prompt_template.format(documents=documents_text)
+            
+            else:
+                prompt = prompt_template.format(documents=documents_text)
         
-        else:
-            prompt = prompt_template.format(documents=documents_text)
-            model = self.model_flash
+        model = self.model_pro if plan.tier == TIER_PRO else self.model_flash
         
         # Générer avec Gemini
         try:
@@ -325,7 +428,9 @@ class SynthesisAideStrategie:
             if len(prompt) > 1000000:  # ~1M caractères
                 logger.warning(f"⚠️ Prompt très long ({len(prompt)} caractères), risque de dépassement")
             
-            response = model.generate_content(prompt)
+            response = get_llm_gateway().generate_content(
+                model, prompt, estimated_tokens=estimated_tokens
+            )
             
             # Vérifier que la réponse contient du texte
             if not response:
@@ -365,6 +470,7 @@ class SynthesisAideStrategie:
                 recommendations=recommendations,
                 confidence=confidence,
                 generated_at=datetime.now(),
+                map_reduce_stats=map_reduce_stats,
             )
         
         except ValueError as e:
@@ -400,6 +506,45 @@ class SynthesisAideStrategie:
                 generated_at=datetime.now(),
             )
     
+    def _plan_route(
+        self,
+        synthesis_type: SynthesisType,
+        prompt_template: str,
+        documents: list[str],
+        request: SynthesisRequest,
+    ) -> RoutePlan:
+        """
+        Choisit le modèle et la stratégie (appel unique ou map-reduce)
+        
+        Pro pour les notes stratégiques et analyses de tendances, Flash pour
+        les résumés et rapports ; la politique de routage ajuste selon la
+        taille estimée du dossier et le coût.
+        
+        Args:
+            synthesis_type: Type de synthèse
+            prompt_template: Prompt du type (instructions hors documents)
+            documents: Contenu des documents
+            request: Requête (map_reduce explicite, confirm_cost)
+        
+        Returns:
+            Plan de routage
+        
+        Raises:
+            TokenBudgetError: Dossier trop volumineux ou trop coûteux
+            CostConfirmationRequired: Coût à confirmer (confirm_cost)
+        """
+        preferred_tier = TIER_PRO if synthesis_type in PRO_SYNTHESIS_TYPES else TIER_FLASH
+        return get_routing_policy().plan(
+            f"synthesis:{synthesis_type.value}",
+            documents,
+            preferred_tier=preferred_tier,
+            output_tokens=SYNTHESIS_OUTPUT_TOKENS,
+            prompt_overhead_tokens=get_token_estimator().estimate(prompt_template),
+            allow_map_reduce=self.summarizer is not None,
+            map_reduce=request.map_reduce,
+            confirmed=request.confirm_cost,
+        )
+    
     def _extract_key_points(self, text: str) -> list[str]:
         """
         Extrait les points clés d'un texte
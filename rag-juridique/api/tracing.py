@@ -0,0 +1,61 @@
+"""
+Trace de chaque requête HTTP (middleware ASGI)
+
+L'identifiant de trace est repris de l'en-tête W3C traceparent s'il est
+présent, créé sinon ; il est renvoyé dans l'en-tête X-Trace-Id et ajouté
+aux lignes de log de la requête. Les spans ne sont enregistrés que pour
+les requêtes échantillonnées (TRACING_SAMPLE_RATE), jamais pour les sondes
+et la collecte des métriques (TRACING_EXCLUDED_PATHS), appelées en continu.
+"""
+
+from typing import Iterable
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.metrics import route_template
+from utils.tracing import parse_traceparent, sample, start_trace
+
+TRACE_HEADER = b"x-trace-id"
+
+
+class TracingMiddleware:
+    """Ouvre une trace par requête HTTP"""
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0, excluded_paths: Iterable[str] = ()):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.excluded_paths = frozenset(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parse_traceparent(Headers(scope=scope).get("traceparent"))
+        status = 500
+
+        with start_trace(
+            scope["method"],
+            trace_id=trace_id,
+            sampled=scope["path"] not in self.excluded_paths and sample(self.sample_rate),
+            method=scope["method"],
+            path=scope["path"],
+        ) as trace:
+
+            async def send_with_trace_id(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (TRACE_HEADER, trace.trace_id.encode("ascii")),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                if trace.root is not None:
+                    trace.root.name = f"{scope['method']} {route_template(scope)}"
+                    trace.root.attributes["status"] = status
@@ -0,0 +1,224 @@
+"""
+Réception des fichiers uploadés (PDF, DOCX, TXT) à mémoire bornée
+
+- UploadLimitMiddleware : refuse un corps de requête trop volumineux dès
+  l'en-tête Content-Length, ou dès que les octets reçus dépassent la limite
+  (corps transmis par blocs), avant qu'il ne soit entièrement reçu
+- open_upload : le fichier reçu (mis en tampon par Starlette : en mémoire
+  jusqu'à 1 Mo, puis dans un fichier temporaire anonyme) est vérifié
+  (taille, type reconnu à ses premiers octets) puis lu sans copie ni
+  réécriture sur disque : tampon en mémoire ou fichier projeté en mémoire
+  (mmap) pour PyMuPDF, objet fichier pour python-docx. Le fichier est fermé
+  en sortie du bloc, y compris en cas d'erreur.
+
+Usage:
+    >>> async with open_upload(contract_file) as document:
+    ...     text = await run_in_threadpool(document.extract_text)
+"""
+
+import codecs
+import mmap
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import IO, AsyncIterator
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.settings import get_settings
+from utils.timing import stage
+
+# Types de documents acceptés
+PDF = "pdf"
+DOCX = "docx"
+TXT = "txt"
+DOCUMENT_KINDS = frozenset({PDF, DOCX, TXT})
+
+# Octets lus pour reconnaître le type (un PDF peut débuter par quelques octets parasites)
+SNIFF_BYTES = 4096
+
+
+def sniff_kind(head: bytes) -> str | None:
+    """
+    Type d'un document d'après ses premiers octets
+
+    Returns:
+        "pdf", "docx" (archive ZIP), "txt" (UTF-8 sans octet nul), ou None
+    """
+    if b"%PDF-" in head[:1024]:
+        return PDF
+    if head.startswith(b"PK\x03\x04"):
+        return DOCX
+    if b"\x00" not in head:
+        try:
+            # Décodage incrémental : un caractère coupé en fin d'extrait est admis
+            codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+            return TXT
+        except UnicodeDecodeError:
+            return None
+    return None
+
+
+@dataclass
+class UploadedDocument:
+    """
+    Fichier uploadé vérifié, lu sur place
+
+    Attributes:
+        filename: Nom du fichier d'origine
+        kind: Type reconnu ("pdf", "docx", "txt")
+        size: Taille en octets
+        file: Fichier reçu (SpooledTemporaryFile de Starlette)
+    """
+
+    filename: str
+    kind: str
+    size: int
+    file: IO[bytes]
+    _mapping: mmap.mmap | None = field(default=None, repr=False)
+    _views: list[memoryview] = field(default_factory=list, repr=False)
+
+    def buffer(self) -> bytes | memoryview:
+        """
+        Contenu du fichier sans réécriture
+
+        Un petit fichier encore en mémoire est lu tel quel ; un fichier passé
+        sur disque est projeté en mémoire (les pages sont lues à la demande
+        et ne comptent pas dans la mémoire du processus).
+        """
+        if not getattr(self.file, "_rolled", True):
+            self.file.seek(0)
+            return self.file.read()
+        if self._mapping is None:
+            self._mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mapping)
+        self._views.append(view)
+        return view
+
+    def extract_text(self) -> str:
+        """Texte du document (appel bloquant : à exécuter hors de la boucle)"""
+        from api.audit_conformite import extract_text_from_docx, extract_text_from_pdf
+
+        with stage("extract_text", kind=self.kind, bytes=self.size):
+            if self.kind == PDF:
+                return extract_text_from_pdf(self.filename, stream=self.buffer())
+            if self.kind == DOCX:
+                self.file.seek(0)
+                return extract_text_from_docx(self.filename, stream=self.file)
+            return bytes(self.buffer()).decode("utf-8-sig")
+
+    def release(self) -> None:
+        """Libère la projection en mémoire (les documents PyMuPDF doivent être fermés)"""
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        if self._mapping is not None:
+            self._mapping.close()
+            self._mapping = None
+
+
+def _inspect(upload: UploadFile, allowed: frozenset[str], max_bytes: int) -> UploadedDocument:
+    """Taille et type du fichier reçu (lecture des premiers octets seulement)"""
+    filename = upload.filename or "document"
+    file = upload.file
+    size = file.seek(0, 2)
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Fichier trop volumineux : {filename} ({size} octets, maximum {max_bytes})",
+        )
+    if size == 0:
+        raise HTTPException(status_code=422, detail=f"Fichier vide : {filename}")
+
+    file.seek(0)
+    kind = sniff_kind(file.read(SNIFF_BYTES))
+    file.seek(0)
+    if kind not in allowed:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Type de fichier non supporté : {filename} (formats acceptés : {', '.join(sorted(allowed))})",
+        )
+    return UploadedDocument(filename=filename, kind=kind, size=size, file=file)
+
+
+@asynccontextmanager
+async def open_upload(
+    upload: UploadFile,
+    allowed: frozenset[str] = DOCUMENT_KINDS,
+    max_bytes: int | None = None,
+) -> AsyncIterator[UploadedDocument]:
+    """
+    Vérifie un fichier uploadé et le fournit sans copie
+
+    Args:
+        upload: Fichier reçu par FastAPI
+        allowed: Types acceptés (415 sinon)
+        max_bytes: Taille maximale (défaut : UPLOAD_MAX_BYTES ; 413 au-delà)
+
+    Yields:
+        Document vérifié ; le fichier est fermé en sortie du bloc
+
+    Raises:
+        HTTPException: 413 (trop volumineux), 415 (type non reconnu), 422 (vide)
+    """
+    limit = max_bytes if max_bytes is not None else get_settings().UPLOAD_MAX_BYTES
+    document = None
+    try:
+        document = await run_in_threadpool(_inspect, upload, allowed, limit)
+        yield document
+    finally:
+        if document is not None:
+            document.release()
+        await upload.close()
+
+
+class RequestTooLarge(HTTPException):
+    """Corps de requête au-delà de UPLOAD_MAX_REQUEST_BYTES"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(
+            status_code=413,
+            detail=f"Requête trop volumineuse (maximum {max_bytes} octets)",
+        )
+
+
+class UploadLimitMiddleware:
+    """
+    Limite la taille des corps de requête (middleware ASGI)
+
+    Le dépassement est détecté sur l'en-tête Content-Length (413 sans lire
+    le corps) ou au fil des blocs reçus : l'exception levée interrompt
+    l'analyse du formulaire multipart et la route répond 413.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            error = RequestTooLarge(self.max_bytes)
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise RequestTooLarge(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
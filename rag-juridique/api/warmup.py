@@ -0,0 +1,204 @@
+"""
+Préchauffage de l'API au démarrage et état de disponibilité (/ready)
+
+Exécuté dans un thread d'arrière-plan lancé par le lifespan : l'API répond
+à /health (vivacité) dès son démarrage, et à /ready (disponibilité) par
+503 tant que le préchauffage n'est pas terminé ; au-delà de
+WARMUP_TIMEOUT_SECONDS, l'état devient « timed_out » (toujours 503) pour
+signaler une étape bloquée. Étapes, chacune journalisée et chronométrée — l'échec d'une
+étape n'empêche pas les suivantes :
+- services : construction parallèle des services des piliers
+- vertex_probe : requête de sonde (canal gRPC, jeton d'authentification)
+- local_caches : instantané des métadonnées, calibration des tokens,
+  registre des templates PDF et leurs styles compilés, actes modèles
+  compilés du cache disque
+
+Aucune requête utilisateur n'est rejouée : la recherche n'a pas de cache de
+résultats à remplir (le regroupement des requêtes identiques ne vaut que
+pour les requêtes simultanées), la sonde suffit à ouvrir le canal Vertex.
+
+Usage:
+    >>> warmup = get_warmup()
+    >>> warmup.start()
+    >>> warmup.status()["ready"]
+"""
+
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable
+
+from api.services import ServiceContainer, get_services
+from config.logging_config import get_logger
+from config.settings import Settings, get_settings
+
+logger = get_logger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+DISABLED = "disabled"
+TIMED_OUT = "timed_out"
+
+
+@dataclass
+class WarmupStep:
+    """Résultat d'une étape du préchauffage"""
+
+    name: str
+    ok: bool
+    ms: float
+    detail: dict[str, Any] = field(default_factory=dict)
+
+
+class Warmup:
+    """
+    Phase de préchauffage (thread d'arrière-plan) et disponibilité de l'API
+
+    Attributes:
+        steps: Étapes terminées, dans l'ordre
+    """
+
+    def __init__(self, services: ServiceContainer | None = None, settings: Settings | None = None):
+        self.services = services or get_services()
+        self.settings = settings or get_settings()
+        self.steps: list[WarmupStep] = []
+        self.state = PENDING
+        self._started_at: float | None = None
+        self._elapsed_ms: float | None = None
+        self._done = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Lance le préchauffage en arrière-plan"""
+        if self._thread is not None:
+            return
+        self._started_at = time.monotonic()
+        self.state = RUNNING
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def disable(self) -> None:
+        """Pas de préchauffage : l'API est disponible immédiatement"""
+        self.state = DISABLED
+        self._done.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Attend la fin du préchauffage (True si terminé)"""
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def timed_out(self) -> bool:
+        """Préchauffage en cours au-delà de WARMUP_TIMEOUT_SECONDS (service distant bloqué)"""
+        return (
+            not self._done.is_set()
+            and self._started_at is not None
+            and time.monotonic() - self._started_at > self.settings.WARMUP_TIMEOUT_SECONDS
+        )
+
+    def run(self) -> None:
+        """Exécute les étapes dans l'ordre (appel bloquant)"""
+        start = time.perf_counter()
+        try:
+            self._step("services", self._warm_services)
+            if self.settings.WARMUP_PROBE_QUERY:
+                self._step("vertex_probe", self._probe_vertex)
+            self._step("local_caches", self._preload_local_caches)
+        finally:
+            self._elapsed_ms = (time.perf_counter() - start) * 1000
+            self.state = DONE
+            self._done.set()
+
+        failed = [step.name for step in self.steps if not step.ok]
+        if failed:
+            logger.warning(
+                f"⚠️ Préchauffage terminé en {self._elapsed_ms:.0f} ms, étape(s) en échec : {', '.join(failed)}"
+            )
+        else:
+            logger.success(f"🔥 Préchauffage terminé en {self._elapsed_ms:.0f} ms : API prête")
+
+    def _step(self, name: str, action: Callable[[], tuple[bool, dict[str, Any]]]) -> None:
+        start = time.perf_counter()
+        try:
+            ok, detail = action()
+        except Exception as e:
+            ok, detail = False, {"error": f"{type(e).__name__}: {e}"}
+            logger.error(f"❌ Préchauffage ({name}) : {e}")
+        step = WarmupStep(name, ok, round((time.perf_counter() - start) * 1000, 1), detail)
+        self.steps.append(step)
+        logger.info(f"🔥 Préchauffage {name} : {'ok' if ok else 'échec'} en {step.ms:.0f} ms")
+
+    # ------------------------------------------------------------------
+    # Étapes
+    # ------------------------------------------------------------------
+
+    def _warm_services(self) -> tuple[bool, dict[str, Any]]:
+        errors = self.services.warm_up(workers=self.settings.SERVICES_WARMUP_WORKERS)
+        return not errors, {"errors": errors} if errors else {}
+
+    def _probe_vertex(self) -> tuple[bool, dict[str, Any]]:
+        results = self.services.search_client.search(self.settings.WARMUP_PROBE_QUERY, page_size=1)
+        return True, {"results": len(results)}
+
+    def _preload_local_caches(self) -> tuple[bool, dict[str, Any]]:
+        from rag.metadata_store import get_metadata_store
+        from rag.token_budget import get_token_estimator
+        from utils.act_renderer import get_act_renderer
+        from utils.act_templates import get_act_template_compiler
+        from utils.pdf_template_manager import get_template_manager
+
+        def metadata() -> Any:
+            store = get_metadata_store()
+            return len(store) if store is not None else None
+
+        def template_styles() -> int:
+            renderer = get_act_renderer()
+            names = [template["name"] for template in get_template_manager().list_templates()]
+            for name in names:
+                renderer.style(name)
+            return len(names)
+
+        loaders: dict[str, Callable[[], Any]] = {
+            "metadata_articles": metadata,
+            "token_calibrations": lambda: len(get_token_estimator().stats()["scales"]),
+            "pdf_template_styles": template_styles,
+            "act_templates": lambda: get_act_template_compiler().preload(),
+        }
+        detail: dict[str, Any] = {}
+        errors: dict[str, str] = {}
+        for name, load in loaders.items():
+            try:
+                detail[name] = load()
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+                logger.error(f"❌ Préchargement {name} impossible : {e}")
+        if errors:
+            detail["errors"] = errors
+        return not errors, detail
+
+    def status(self) -> dict[str, Any]:
+        """État de disponibilité (réponse de /ready)"""
+        elapsed_ms = self._elapsed_ms
+        if elapsed_ms is None and self._started_at is not None:
+            elapsed_ms = (time.monotonic() - self._started_at) * 1000
+        return {
+            "ready": self.ready,
+            "state": TIMED_OUT if self.timed_out else self.state,
+            "elapsed_ms": round(elapsed_ms, 1) if elapsed_ms is not None else None,
+            "steps": {step.name: asdict(step) for step in self.steps},
+        }
+
+
+_warmup: Warmup | None = None
+
+
+def get_warmup() -> Warmup:
+    """Retourne le préchauffage global de l'API"""
+    global _warmup
+    if _warmup is None:
+        _warmup = Warmup()
+    return _warmup
@@ -0,0 +1,102 @@
+"""
+Benchmark du rendu PDF / DOCX des actes (Machine à Actes)
+
+Mesure le débit (documents/s) pour un acte d'une vingtaine de pages :
+- Premier rendu : compilation des styles du template (polices, logo)
+- Rendus suivants : styles servis par le cache en mémoire
+
+Usage:
+    python benchmarks/bench_act_render.py
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.act_renderer import ActRenderer
+from utils.pdf_template_manager import PDFTemplateManager
+
+ARTICLES = 60
+ROUNDS = 10
+
+CLAUSES = [
+    "Le Bailleur donne à bail au Preneur, qui accepte, les locaux désignés ci-après.",
+    "Le présent bail est consenti pour une durée de neuf années entières et consécutives.",
+    "Le Preneur aura la faculté de donner congé à l'expiration de chaque période triennale.",
+    "Le loyer annuel est fixé à la somme de trente-six mille euros hors taxes et hors charges.",
+    "Le loyer sera révisé chaque année en fonction de la variation de l'indice des loyers commerciaux.",
+    "Le Preneur s'oblige à user des lieux loués paisiblement et conformément à leur destination.",
+    "Toutes les réparations autres que celles de l'article 606 du Code civil sont à la charge du Preneur.",
+    "À défaut de paiement d'un seul terme, le bail sera résilié de plein droit un mois après commandement.",
+]
+
+
+def build_act(rng: random.Random) -> str:
+    """Bail commercial de ~20 pages : titre, articles de 3 à 5 paragraphes"""
+    parts = ["BAIL COMMERCIAL", "Entre les soussignés :\nLa société ALPHA, ci-après « le Bailleur »\nET\nLa société BETA, ci-après « le Preneur »"]
+    for number in range(1, ARTICLES + 1):
+        parts.append(f"ARTICLE {number} - STIPULATIONS")
+        for _ in range(rng.randint(3, 5)):
+            parts.append(" ".join(rng.choice(CLAUSES) for _ in range(rng.randint(2, 4))))
+    parts.append("Fait à Paris, le 1er mars 2025, en deux exemplaires originaux.")
+    return "\n\n".join(parts)
+
+
+def build_logo(path: Path) -> None:
+    """Logo PNG de 1200x400 (décodé une seule fois par le cache des styles)"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (1200, 400), "white")
+    draw = ImageDraw.Draw(image)
+    for x in range(0, 1200, 40):
+        draw.rectangle([x, 0, x + 20, 400], fill=(20, 40, 120 + x % 120))
+    image.save(path)
+
+
+def bench(renderer: ActRenderer, act: str, output_format: str) -> None:
+    """Affiche le premier rendu (styles à compiler) puis le débit à chaud"""
+    renderer._styles.clear()
+    start = time.perf_counter()
+    first = renderer.render_bytes(act, output_format, "cabinet")
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        renderer.render_bytes(act, output_format, "cabinet")
+    elapsed = time.perf_counter() - start
+
+    pages = f"{first.count(b'/Type /Page') - first.count(b'/Type /Pages')} pages" if output_format == "pdf" else ""
+    print(
+        f"{output_format:<5} {len(first) // 1024:>5} Ko {pages:>9}  "
+        f"1er rendu {cold_ms:>7.1f} ms  {ROUNDS / elapsed:>6.2f} documents/s"
+    )
+
+
+def main():
+    rng = random.Random(42)
+    act = build_act(rng)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manager = PDFTemplateManager(templates_dir=temp_dir)
+        config = manager._get_fallback_template()
+        config["header"]["text"] = "CABINET ALPHA - AVOCATS"
+        config["header"]["has_logo"] = True
+        config["footer"]["text"] = "Document confidentiel"
+        logo_path = Path(temp_dir) / "logo.png"
+        build_logo(logo_path)
+        manager.save_template("cabinet", config, logo_path=logo_path)
+
+        renderer = ActRenderer(template_manager=manager)
+        print(f"Acte : {len(act)} caractères, {ARTICLES} articles")
+        bench(renderer, act, "pdf")
+        bench(renderer, act, "docx")
+        print(f"Cache des styles : {renderer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
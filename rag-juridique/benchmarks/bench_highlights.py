@@ -0,0 +1,106 @@
+"""
+Benchmark de l'extraction d'extraits (highlights) du Super-Chercheur
+
+Objectif : < 1 ms par page de 100 résultats (meilleur de 3 séries).
+
+Mesure le temps d'extraction pour une page de 100 résultats :
+- Contenus de type article de code (quelques correspondances par article)
+- Contenus denses (termes de la requête présents dans chaque phrase)
+- Contenus typographiques (apostrophes courbes, guillemets, ligatures œ/æ :
+  repli avec développement des ligatures)
+
+Usage:
+    python benchmarks/bench_highlights.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from rag.highlighter import QueryHighlighter
+
+QUERY = "Résiliation du bail commercial par le preneur"
+HITS = 100
+ROUNDS = 50
+TARGET_MS = 1.0
+
+ARTICLE_SENTENCES = [
+    "Les dispositions du présent chapitre s'appliquent aux baux des immeubles ou locaux dans lesquels un fonds est exploité.",
+    "La durée du contrat de location ne peut être inférieure à neuf ans.",
+    "Toutefois, à défaut de convention contraire, le preneur a la faculté de donner congé à l'expiration d'une période triennale.",
+    "Le congé doit être donné par acte extrajudiciaire au moins six mois à l'avance.",
+    "Les parties peuvent convenir que la révision du loyer interviendra selon des modalités différentes.",
+    "Le bailleur peut refuser le renouvellement du bail, sous réserve de payer une indemnité d'éviction.",
+    "L'action en paiement de l'indemnité se prescrit par deux ans à compter de la date de notification.",
+    "Toute clause prévoyant la résiliation de plein droit ne produit effet qu'un mois après un commandement demeuré infructueux.",
+    "Le juge saisi d'une demande présentée dans les formes peut accorder des délais.",
+    "Les contestations relatives à la fixation du prix sont portées devant le président du tribunal judiciaire.",
+    "Le locataire est tenu d'user de la chose louée raisonnablement et suivant la destination donnée par le contrat.",
+    "Les effets des clauses de résiliation de plein droit sont suspendus pendant le cours des délais accordés.",
+]
+
+DENSE_WORDS = (
+    "le contrat de bail commercial est conclu pour une durée qui ne peut être "
+    "inférieure à neuf ans toutefois le preneur a la faculté de donner congé "
+    "la résiliation intervient par acte extrajudiciaire"
+).split()
+
+
+def build_articles(rng: random.Random) -> list[str]:
+    """Contenus de 8 à 12 phrases tirées d'articles de code"""
+    return [
+        " ".join(rng.choice(ARTICLE_SENTENCES) for _ in range(rng.randint(8, 12)))
+        for _ in range(HITS)
+    ]
+
+
+def build_dense(rng: random.Random) -> list[str]:
+    """Contenus de 200 mots tirés d'un vocabulaire proche de la requête"""
+    return [" ".join(rng.choice(DENSE_WORDS) for _ in range(200)) for _ in range(HITS)]
+
+
+def build_typographic(rng: random.Random) -> list[str]:
+    """Articles en typographie soignée (’ « » œ) : chemin de repli des ligatures"""
+    return [
+        content.replace("'", "’").replace("la chose louée", "l’œuvre louée")
+        + " « Le cœur du bail commercial est la résiliation par le preneur. »"
+        for content in build_articles(rng)
+    ]
+
+
+def bench(name: str, contents: list[str]) -> None:
+    """Affiche le temps moyen d'extraction pour une page de résultats"""
+    highlighter = QueryHighlighter.for_query(QUERY)
+    matches = sum(len(highlighter.find_matches(c)) for c in contents) / len(contents)
+    chars = sum(len(c) for c in contents) / len(contents)
+
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            highlighter = QueryHighlighter.for_query(QUERY)
+            highlighter.highlight_many(contents, top_k=3)
+        best = min(best, time.perf_counter() - start)
+    elapsed_ms = best * 1000 / ROUNDS
+
+    verdict = "OK" if elapsed_ms < TARGET_MS else "DÉPASSÉ"
+    print(
+        f"{name:<12} {chars:>7.0f} car./doc {matches:>5.1f} corresp./doc "
+        f"{elapsed_ms:>7.3f} ms / {HITS} résultats  {verdict}"
+    )
+
+
+def main():
+    rng = random.Random(42)
+    print(f"Requête : {QUERY!r} (objectif : < {TARGET_MS:.0f} ms, meilleur de 3)")
+    bench("articles", build_articles(rng))
+    bench("denses", build_dense(rng))
+    bench("typographie", build_typographic(rng))
+
+
+if __name__ == "__main__":
+    main()
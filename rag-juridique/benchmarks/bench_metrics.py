@@ -0,0 +1,116 @@
+"""
+Micro-benchmark du coût des métriques (objectif : < 5 µs par observation)
+
+Mesure, sur des séries déjà créées :
+- Counter.inc et Histogram.observe avec étiquettes
+- Timer (mesure d'un bloc vide + observation)
+- MetricsMiddleware : surcoût par requête d'une application ASGI vide
+  (requêtes en cours, histogramme, compteur : 4 observations)
+- Exposition (/metrics) du registre rempli
+
+Usage:
+    python benchmarks/bench_metrics.py [--iterations 200000]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.metrics import Counter, Histogram, Registry, Timer
+
+TARGET_US = 5.0
+
+
+def per_call_us(fn, iterations: int) -> float:
+    """Meilleur de 3 séries, en µs par appel"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - start)
+    return best / iterations * 1e6
+
+
+def verdict(us: float, observations: int = 1) -> str:
+    return "OK" if us / observations < TARGET_US else "DÉPASSÉ"
+
+
+async def asgi_overhead_us(requests: int) -> tuple[float, float]:
+    """Durée par requête d'une application ASGI vide, sans et avec le middleware"""
+    from api.metrics import MetricsMiddleware
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def run(handler) -> float:
+        start = time.perf_counter()
+        for _ in range(requests):
+            scope = {"type": "http", "method": "GET", "path": "/api/v1/search/"}
+            await handler(scope, receive, send)
+        return (time.perf_counter() - start) / requests * 1e6
+
+    middleware = MetricsMiddleware(app)
+    bare = min([await run(app) for _ in range(3)])
+    instrumented = min([await run(middleware) for _ in range(3)])
+    return bare, instrumented
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coût des métriques")
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    registry = Registry()
+    counter = Counter("bench_total", "Compteur", ("pillar", "route", "method", "status"), registry=registry)
+    histogram = Histogram("bench_seconds", "Durées", ("pillar", "route", "method"), registry=registry)
+    labels = ("search", "/api/v1/search/", "POST")
+
+    results = {
+        "Counter.inc (4 étiquettes)": per_call_us(lambda: counter.inc(*labels, "200"), n),
+        "Histogram.observe (3 étiquettes)": per_call_us(lambda: histogram.observe(0.042, *labels), n),
+    }
+
+    def timed_block():
+        with Timer(histogram, *labels):
+            pass
+
+    results["Timer (bloc vide)"] = per_call_us(timed_block, n)
+
+    print(f"Objectif : < {TARGET_US:.0f} µs par observation ({n} itérations, meilleur de 3)\n")
+    for name, us in results.items():
+        print(f"  {name:<36} {us:>6.2f} µs  {verdict(us)}")
+
+    bare, instrumented = asyncio.run(asgi_overhead_us(max(n // 10, 1000)))
+    overhead = instrumented - bare
+    print(
+        f"\n  MetricsMiddleware : {overhead:.2f} µs par requête "
+        f"({bare:.2f} → {instrumented:.2f} µs), soit {overhead / 4:.2f} µs par observation  "
+        f"{verdict(overhead, observations=4)}"
+    )
+
+    for route in range(50):
+        for status in ("200", "404", "500"):
+            counter.inc("search", f"/api/v1/route_{route}", "GET", status)
+        histogram.observe(0.1, "search", f"/api/v1/route_{route}", "GET")
+    start = time.perf_counter()
+    text = registry.render()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"\n  Exposition : {len(text.splitlines())} lignes en {elapsed_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
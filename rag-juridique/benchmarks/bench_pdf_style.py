@@ -0,0 +1,157 @@
+"""
+Benchmark de l'extraction de style PDF (PDFStyleAnalyzer)
+
+Sur un PDF de 50 pages à en-tête de cabinet (logo, en-tête, pied de page
+numéroté), compare :
+- L'extraction précédente : trois ouvertures du PDF, deux parcours des
+  blocs, première page seulement, pixmaps décodés pour lire la taille des images
+- L'extraction en une passe (première page, puis échantillons de pages,
+  séquentiels ou répartis sur le pool de processus partagé, démarré
+  avant les mesures comme au lancement de l'API)
+
+Usage:
+    python benchmarks/bench_pdf_style.py
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import fitz  # PyMuPDF
+
+from utils.pdf_style_analyzer import PDFStyleAnalyzer
+from utils.scan_pool import shutdown_scan_pool, start_scan_pool
+
+PAGES = 50
+ROUNDS = 5
+
+SENTENCES = [
+    "Le Preneur s'oblige à user des lieux loués paisiblement et conformément à leur destination.",
+    "Le loyer sera révisé chaque année en fonction de la variation de l'indice des loyers commerciaux.",
+    "Toutes les réparations autres que celles de l'article 606 du Code civil sont à la charge du Preneur.",
+    "À défaut de paiement d'un seul terme, le bail sera résilié de plein droit un mois après commandement.",
+]
+
+
+def build_letterhead_pdf(path: Path) -> None:
+    """PDF de 50 pages : logo haute résolution, en-tête, pied de page numéroté"""
+    from PIL import Image, ImageDraw
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    logo_path = path.with_name("logo.png")
+    image = Image.new("RGB", (2400, 800), "white")
+    draw = ImageDraw.Draw(image)
+    for x in range(0, 2400, 30):
+        draw.rectangle([x, 0, x + 15, 800], fill=(20, 40, 100 + x % 150))
+    image.save(logo_path)
+
+    rng = random.Random(42)
+    width, height = A4
+    pdf = canvas.Canvas(str(path), pagesize=A4)
+    for number in range(1, PAGES + 1):
+        pdf.drawImage(str(logo_path), 60, height - 90, width=150, height=50)
+        pdf.setFont("Times-Bold", 12)
+        pdf.setFillColorRGB(0.1, 0.2, 0.5)
+        pdf.drawRightString(width - 60, height - 60, "CABINET ALPHA - AVOCATS ASSOCIÉS")
+        pdf.setFont("Helvetica", 8)
+        pdf.drawRightString(width - 60, height - 72, "12 rue de la Paix, 75002 Paris")
+        pdf.setFont("Times-Roman", 11)
+        pdf.setFillColorRGB(0, 0, 0)
+        y = height - 150
+        while y > 150:
+            pdf.drawString(72, y, rng.choice(SENTENCES))
+            y -= 16
+        pdf.setFont("Helvetica", 9)
+        pdf.setFillColorRGB(0.4, 0.4, 0.4)
+        pdf.drawCentredString(width / 2, 40, f"Document confidentiel - Page {number} / {PAGES}")
+        pdf.showPage()
+    pdf.save()
+
+
+def legacy_extract(pdf_path: Path) -> None:
+    """Extraction précédente (première page, trois ouvertures, pixmaps décodés)"""
+    doc = fitz.open(str(pdf_path))
+    page = doc[0]
+    blocks = page.get_text("dict")["blocks"]
+    fonts, sizes, colors = set(), set(), set()
+    for block in blocks:
+        if block.get("type") == 0:
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    fonts.add(span.get("font", ""))
+                    sizes.add(round(span.get("size", 0), 1))
+    for block in blocks:
+        if block.get("type") == 0:
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    colors.add(span.get("color", 0))
+    doc.close()
+
+    doc = fitz.open(str(pdf_path))
+    page = doc[0]
+    h = page.rect.height
+    for top, bottom in ((0, 0.15), (0.15, 0.85), (0.85, 1)):
+        page.get_textbox(fitz.Rect(0, h * top, page.rect.width, h * bottom))
+    doc.close()
+
+    doc = fitz.open(str(pdf_path))
+    page = doc[0]
+    for img in page.get_images()[:3]:
+        pix = fitz.Pixmap(doc, img[0])
+        page.get_image_rects(img[0])
+        pix.width, pix.height
+    doc.close()
+
+
+def timed(function, *args, **kwargs) -> float:
+    """Durée moyenne (ms) sur ROUNDS exécutions"""
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        function(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000 / ROUNDS
+
+
+def main():
+    from loguru import logger
+
+    logger.remove()
+    analyzer = PDFStyleAnalyzer.__new__(PDFStyleAnalyzer)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "lettre.pdf"
+        build_letterhead_pdf(pdf_path)
+        print(f"PDF : {PAGES} pages, {pdf_path.stat().st_size // 1024} Ko, {os.cpu_count()} cœur(s)")
+
+        # Pool démarré hors mesure (lancement de l'API)
+        start_scan_pool()
+        analyzer.extract_style_data(pdf_path, sample_pages=PAGES, workers=4)
+
+        baseline = timed(legacy_extract, pdf_path)
+        print(f"{'avant (page 1)':<28} {baseline:>8.1f} ms")
+
+        cases = [
+            ("une passe (page 1)", 1, 1),
+            ("une passe (6 pages)", 6, 1),
+            ("une passe (50 pages)", PAGES, 1),
+            ("50 pages, 4 processus", PAGES, 4),
+        ]
+        for name, sample, workers in cases:
+            elapsed = timed(analyzer.extract_style_data, pdf_path, sample_pages=sample, workers=workers)
+            print(f"{name:<28} {elapsed:>8.1f} ms  (x{baseline / elapsed:.1f})")
+
+        _, structured, images = analyzer.extract_style_data(pdf_path, sample_pages=6, workers=1)
+        print(f"En-tête détecté : {structured['header']!r}")
+        print(f"Pied de page : {structured['footer']!r} (numéros : {structured['has_page_numbers']})")
+        print(f"Images : {images['images']}")
+    shutdown_scan_pool()
+
+
+if __name__ == "__main__":
+    main()
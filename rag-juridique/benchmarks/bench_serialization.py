@@ -0,0 +1,193 @@
+"""
+Benchmark de la sérialisation et de la compression des réponses
+
+Réponses types, construites avec un texte juridique synthétique (mots
+tirés au hasard, pour ne pas surestimer la compression) :
+- recherche : 10 et 100 résultats avec le contenu complet des articles
+- audit : 40 problèmes détectés
+- synthèse : note stratégique avec statistiques map-reduce
+
+Pour chacune :
+- durée de sérialisation : encodeur standard (jsonable_encoder + json,
+  chemin des routes sans response_model avant orjson), FastJSONResponse
+  (jsonable_encoder + orjson), FastAPI (validation + dump_json) et
+  model_response (sérialisation pydantic sans revalidation)
+- octets transmis : brut, gzip (niveaux 1, 5, 9) et br (si le module
+  brotli est installé), avec la durée de compression
+
+Usage:
+    python benchmarks/bench_serialization.py [--iterations 20]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au PATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from api.compression import BROTLI, GZIP, brotli, compress
+from api.models import (
+    AuditIssue,
+    AuditResponse,
+    IssueSeverity,
+    SearchResponse,
+    SearchResult,
+    SynthesisResponse,
+    SynthesisType,
+)
+from api.responses import FastJSONResponse, dump_model
+
+VOCABULARY = (
+    "contrat bail commercial preneur bailleur résiliation clause pénale "
+    "indemnité obligation responsabilité contractuelle délai préavis loyer "
+    "révision article code civil cour cassation chambre arrêt pourvoi moyen "
+    "juridiction tribunal judiciaire appel jugement dommages intérêts faute "
+    "préjudice exécution inexécution force majeure garantie vices cachés "
+    "vendeur acquéreur prescription action nullité consentement dol erreur "
+    "violence cause objet licite conformément aux dispositions de la loi "
+    "du décret sous réserve des stipulations prévues par les parties"
+).split()
+
+
+def legal_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words)).capitalize() + "."
+
+
+def search_response(rng: random.Random, results: int) -> SearchResponse:
+    return SearchResponse(
+        query="résiliation bail commercial",
+        total=results,
+        results=[
+            SearchResult(
+                id=f"LEGIARTI{rng.randrange(10**12):012d}",
+                title=f"Code civil - Article {1100 + i}",
+                content=legal_text(rng, 600),
+                score=rng.random(),
+                metadata={
+                    "code": "Code civil",
+                    "article_num": str(1100 + i),
+                    "date_debut": "2016-10-01",
+                    "etat": "VIGUEUR",
+                },
+                highlights=[legal_text(rng, 30)],
+            )
+            for i in range(results)
+        ],
+        filters_applied={"jurisdiction": "Toutes", "matter": "Toutes"},
+        processing_time_ms=412.5,
+    )
+
+
+def audit_response(rng: random.Random) -> AuditResponse:
+    return AuditResponse(
+        document_title="Contrat de bail commercial",
+        total_references=60,
+        valid_references=20,
+        issues=[
+            AuditIssue(
+                severity=IssueSeverity.HIGH,
+                issue_type="abrogation",
+                article_reference=f"Article {1100 + i} du Code civil",
+                context=legal_text(rng, 60),
+                description=legal_text(rng, 40),
+                current_status="ABROGE",
+                date_abrogation="2016-10-01",
+                recommendation=legal_text(rng, 40),
+            )
+            for i in range(40)
+        ],
+        conformity_score=33.3,
+        recommendations=[legal_text(rng, 30) for _ in range(10)],
+    )
+
+
+def synthesis_response(rng: random.Random) -> SynthesisResponse:
+    summary = "\n\n".join(legal_text(rng, 150) for _ in range(20))
+    return SynthesisResponse(
+        synthesis_id="synth-bench",
+        synthesis_type=list(SynthesisType)[0],
+        summary=summary,
+        synthesized_content=summary,
+        key_points=[legal_text(rng, 25) for _ in range(15)],
+        recommendations=[legal_text(rng, 25) for _ in range(10)],
+        confidence=0.82,
+        map_reduce_stats={"chunks": 48, "cached_chunks": 12, "reduce_levels": 2},
+    )
+
+
+def best_ms(fn, iterations: int) -> tuple[float, object]:
+    """Meilleure durée (ms) sur n exécutions, et le dernier résultat"""
+    best = float("inf")
+    result = None
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def stdlib_json(model) -> bytes:
+    return json.dumps(jsonable_encoder(model), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sérialisation et compression des réponses")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payloads = {
+        "Recherche (10 résultats)": search_response(rng, 10),
+        "Recherche (100 résultats)": search_response(rng, 100),
+        "Audit (40 problèmes)": audit_response(rng),
+        "Synthèse (note stratégique)": synthesis_response(rng),
+    }
+    fast_json = FastJSONResponse(None)
+
+    for name, model in payloads.items():
+        adapter = TypeAdapter(type(model))
+        print(f"\n{name}")
+        print("-" * 72)
+        serializers = {
+            "jsonable_encoder + json": lambda: stdlib_json(model),
+            "FastJSONResponse (jsonable_encoder + orjson)": lambda: fast_json.render(jsonable_encoder(model)),
+            "FastAPI (validation + dump_json)": lambda: adapter.dump_json(
+                adapter.validate_python(model, from_attributes=True)
+            ),
+            "model_response (sans revalidation)": lambda: dump_model(model),
+        }
+        reference = None
+        body = b""
+        for label, fn in serializers.items():
+            elapsed, body = best_ms(fn, args.iterations)
+            reference = reference or elapsed
+            print(f"  {label:<46} {elapsed:>8.2f} ms  x{reference / elapsed:>5.1f}")
+
+        print(f"\n  {'Octets transmis':<46} {len(body):>10,} o")
+        encodings = [(GZIP, level) for level in (1, 5, 9)]
+        if brotli is not None:
+            encodings += [(BROTLI, quality) for quality in (1, 4, 6)]
+        for encoding, level in encodings:
+            elapsed, compressed = best_ms(
+                lambda: compress(body, encoding, gzip_level=level, brotli_quality=level),
+                max(args.iterations // 4, 3),
+            )
+            label = f"{encoding} (niveau {level})"
+            print(
+                f"  {label:<46} {len(compressed):>10,} o  "
+                f"({len(compressed) / len(body):>5.1%}, {elapsed:.2f} ms)"
+            )
+    if brotli is None:
+        print("\n(module brotli non installé : br non mesuré)")
+
+
+if __name__ == "__main__":
+    main()
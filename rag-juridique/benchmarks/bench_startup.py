@@ -0,0 +1,115 @@
+"""
+Benchmark du démarrage de l'API (profil d'import -X importtime)
+
+Chaque mesure est faite dans un processus neuf (démarrage à froid) :
+- Import de api.main : durée totale, modules les plus coûteux (cumul) et
+  modules lourds chargés (SDK Google, PyMuPDF, reportlab...)
+- Avec --warmup : construction des services des piliers, séquentielle puis
+  en parallèle (identifiants GCP requis pour le client Vertex AI Search)
+
+Usage:
+    python benchmarks/bench_startup.py [--top 15] [--rounds 3] [--warmup]
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Modules dont l'import différé est attendu (chargés par les services)
+HEAVY_MODULES = [
+    "google.cloud.discoveryengine_v1",
+    "google.generativeai",
+    "grpc",
+    "fitz",
+    "reportlab.platypus",
+    "docx",
+    "PIL.Image",
+]
+
+WARMUP_SCRIPT = """
+import time
+start = time.perf_counter()
+from api.services import ServiceContainer
+errors = ServiceContainer().warm_up(workers={workers})
+print(f"{{(time.perf_counter() - start) * 1000:.0f}} {{len(errors)}}")
+"""
+
+
+def import_profile(module: str) -> dict[str, tuple[int, int]]:
+    """
+    Temps d'import (propre, cumulé) en µs des modules chargés par l'import
+    de module, dans un processus neuf (démarrage de l'interpréteur exclu)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    lines = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        lines.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+
+    # Sous-arbre du module : les lignes plus profondes qui le précèdent
+    index = max(i for i, line in enumerate(lines) if line[1] == module)
+    root_depth = lines[index][0]
+    profile = {module: (lines[index][2], lines[index][3])}
+    for depth, name, self_us, cumulative_us in reversed(lines[:index]):
+        if depth <= root_depth:
+            break
+        profile[name] = (self_us, cumulative_us)
+    return profile
+
+
+def warmup_ms(workers: int) -> tuple[float, int]:
+    """Construction de tous les services dans un processus neuf"""
+    result = subprocess.run(
+        [sys.executable, "-c", WARMUP_SCRIPT.format(workers=workers)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    elapsed, errors = result.stdout.split()[-2:]
+    return float(elapsed), int(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Démarrage de l'API")
+    parser.add_argument("--top", type=int, default=15, help="Modules affichés")
+    parser.add_argument("--rounds", type=int, default=3, help="Processus mesurés (meilleur temps retenu)")
+    parser.add_argument("--warmup", action="store_true", help="Mesurer aussi la construction des services")
+    args = parser.parse_args()
+
+    profiles = [import_profile("api.main") for _ in range(args.rounds)]
+    best = min(profiles, key=lambda profile: profile["api.main"][1])
+    print(f"Import de api.main : {best['api.main'][1] / 1000:.0f} ms (meilleur de {args.rounds})")
+
+    print(f"\n{'cumul':>9} {'propre':>9}  module")
+    ranked = sorted(best.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us) in ranked[: args.top]:
+        print(f"{cumulative_us / 1000:>7.1f}ms {self_us / 1000:>7.1f}ms  {name}")
+
+    print("\nModules lourds chargés à l'import :")
+    for name in HEAVY_MODULES:
+        print(f"  {name:<34} {'oui' if name in best else 'non (différé)'}")
+
+    if args.warmup:
+        print("\nConstruction des services :")
+        for workers in (1, 4):
+            elapsed, errors = warmup_ms(workers)
+            print(f"  {workers} thread(s) : {elapsed:>7.0f} ms ({errors} erreur(s))")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Test d'endurance des uploads (100 envois simultanés)
+
+Lance l'API (uvicorn, processus séparé) puis envoie en parallèle des PDF
+d'environ 8 Mo (texte + image incompressible) au dossier de session :
+- Pic de mémoire du serveur (VmHWM) rapporté au volume reçu
+- Débit (fichiers/s, Mo/s)
+- Fichiers temporaires restants et descripteurs ouverts après la salve
+  (tampons des uploads dans un dossier temporaire propre au serveur)
+- Refus 413 d'un fichier au-delà de UPLOAD_MAX_BYTES
+
+Les mêmes mesures sont vérifiées par tests/test_upload_soak.py.
+
+Usage:
+    python benchmarks/bench_uploads.py [--uploads 100] [--size-mb 8]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+# Ajouter le répertoire parent au PATH
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+
+
+def build_pdf(size_mb: int) -> bytes:
+    """PDF de 3 pages de texte + une image de bruit (non compressible)"""
+    import fitz  # PyMuPDF
+    from PIL import Image
+
+    side = int((size_mb * 1024 * 1024 / 3) ** 0.5)
+    image = Image.frombytes("RGB", (side, side), os.urandom(side * side * 3))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = Path(temp_dir) / "scan.png"
+        image.save(image_path)
+        doc = fitz.open()
+        for number in range(1, 4):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"CONCLUSIONS - page {number}\nLe demandeur sollicite la résiliation du bail.")
+        doc[0].insert_image(fitz.Rect(72, 200, 520, 650), filename=str(image_path))
+        data = doc.tobytes()
+        doc.close()
+    return data
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid: int, field: str) -> int:
+    """VmRSS / VmHWM (pic) du processus, en Ko (Linux)"""
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1])
+    return 0
+
+
+def open_files(pid: int, directory: Path | None = None) -> int:
+    """Descripteurs ouverts du processus (dans directory seulement si fourni)"""
+    fd_dir = Path(f"/proc/{pid}/fd")
+    if directory is None:
+        return len(os.listdir(fd_dir))
+    count = 0
+    for fd in os.listdir(fd_dir):
+        try:
+            target = os.readlink(fd_dir / fd)
+        except OSError:
+            continue
+        if target.startswith(str(directory)):
+            count += 1
+    return count
+
+
+@dataclass
+class SoakResult:
+    """Mesures d'une salve d'uploads"""
+
+    uploads: int
+    accepted: int
+    received_mb: float
+    elapsed: float
+    rss_idle_mb: float
+    peak_mb: float
+    oversize_status: int
+    leftover_files: int
+    spool_descriptors: int
+    descriptors_idle: int
+    descriptors: int
+
+    @property
+    def peak_growth_mb(self) -> float:
+        return self.peak_mb - self.rss_idle_mb
+
+
+@contextmanager
+def run_server(work_dir: Path, env: dict[str, str] | None = None) -> Iterator[tuple[str, int]]:
+    """
+    Lance l'API (uvicorn) avec ses données et ses fichiers temporaires
+    (tampons des uploads) dans work_dir
+
+    Yields:
+        (URL de base, pid du serveur)
+    """
+    spool_dir = work_dir / "tmp"
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    server_env = {
+        **os.environ,
+        "TMPDIR": str(spool_dir),
+        "DOWNLOADS_DIR": str(work_dir / "downloads"),
+        "JOBS_DB_PATH": str(work_dir / "jobs.db"),
+        "ACT_TEMPLATE_CACHE_DIR": str(work_dir / "act_templates"),
+        "ACT_BATCH_DIR": str(work_dir / "batches"),
+        "TRACE_EXPORT_PATH": str(work_dir / "traces.jsonl"),
+        "LOG_FILE": str(work_dir / "api.log"),
+        "JOBS_WORKERS": "0",
+        "SERVICES_WARMUP": "false",
+        **(env or {}),
+    }
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=Path(__file__).parent.parent,
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        yield f"http://127.0.0.1:{port}", server.pid
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise RuntimeError("L'API n'a pas démarré")
+
+
+async def soak(base_url: str, pid: int, pdf: bytes, uploads: int, max_bytes: int, spool_dir: Path) -> SoakResult:
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        await wait_ready(client)
+        session_id = (await client.post("/api/v1/sessions/")).json()["session_id"]
+        url = f"/api/v1/sessions/{session_id}/files"
+
+        await client.post(url, files={"files": ("chauffe.pdf", pdf)})
+        rss_idle = memory_kb(pid, "VmRSS")
+        fds_idle = open_files(pid)
+
+        async def upload(number: int) -> int:
+            response = await client.post(url, files={"files": (f"piece_{number}.pdf", pdf)})
+            return response.status_code
+
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(upload(n) for n in range(uploads)))
+        elapsed = time.perf_counter() - start
+        peak = memory_kb(pid, "VmHWM")
+
+        oversize = b"%PDF-1.7\n" + b"0" * (max_bytes + 1)
+        response = await client.post(url, files={"files": ("trop_gros.pdf", oversize)})
+
+    # Connexions du client fermées : seuls les fichiers non libérés restent
+    await asyncio.sleep(1)
+    return SoakResult(
+        uploads=uploads,
+        accepted=statuses.count(200),
+        received_mb=uploads * len(pdf) / 1024 / 1024,
+        elapsed=elapsed,
+        rss_idle_mb=rss_idle / 1024,
+        peak_mb=peak / 1024,
+        oversize_status=response.status_code,
+        leftover_files=len(os.listdir(spool_dir)),
+        spool_descriptors=open_files(pid, spool_dir),
+        descriptors_idle=fds_idle,
+        descriptors=open_files(pid),
+    )
+
+
+def run_soak(work_dir: Path, uploads: int, size_mb: int) -> SoakResult:
+    """Salve d'uploads simultanés contre une API lancée pour l'occasion"""
+    from config.settings import get_settings
+
+    pdf = build_pdf(size_mb)
+    with run_server(work_dir) as (base_url, pid):
+        return asyncio.run(
+            soak(base_url, pid, pdf, uploads, get_settings().UPLOAD_MAX_BYTES, work_dir / "tmp")
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endurance des uploads")
+    parser.add_argument("--uploads", type=int, default=100)
+    parser.add_argument("--size-mb", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"PDF : ~{args.size_mb} Mo, {args.uploads} envois simultanés")
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = run_soak(Path(work_dir), args.uploads, args.size_mb)
+
+    print(
+        f"Uploads : {result.accepted}/{result.uploads} acceptés "
+        f"({result.received_mb:.0f} Mo en {result.elapsed:.1f} s)"
+    )
+    print(
+        f"Débit : {result.uploads / result.elapsed:.1f} fichiers/s, "
+        f"{result.received_mb / result.elapsed:.1f} Mo/s"
+    )
+    print(
+        f"Mémoire serveur : {result.rss_idle_mb:.0f} Mo au repos, pic {result.peak_mb:.0f} Mo "
+        f"(volume reçu : {result.received_mb:.0f} Mo)"
+    )
+    print(f"Fichier au-delà de UPLOAD_MAX_BYTES : HTTP {result.oversize_status}")
+    print(
+        f"Fichiers temporaires restants : {result.leftover_files} "
+        f"({result.spool_descriptors} encore ouvert(s) par le serveur)"
+    )
+    print(f"Descripteurs ouverts : {result.descriptors} (au repos : {result.descriptors_idle})")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from pathlib import Path
 from loguru import logger
 
 from config.settings import get_settings
+from utils.tracing import current_trace_id
 
 
 def setup_logging() -> None:
@@ -26,6 +27,9 @@ def setup_logging() -> None:
     # Supprimer le handler par défaut de Loguru
     logger.remove()
     
+    # Identifiant de la trace en cours (requête HTTP, tâche) sur chaque ligne
+    logger.configure(patcher=_add_trace_id)
+    
     # ==============================================================================
     # HANDLER 1 : CONSOLE (avec couleurs et format simplifié)
     # ==============================================================================
@@ -55,6 +59,7 @@ def setup_logging() -> None:
         format=(
             "{time:YYYY-MM-DD HH:mm:ss.SSS} | "
             "{level: <8} | "
+            "{extra[trace_id]} | "
             "{name}:{function}:{line} | "
             "{message}"
         ),
@@ -71,6 +76,10 @@ def setup_logging() -> None:
     logger.debug(f"Fichier de log : {log_file_path.absolute()}")
 
 
+def _add_trace_id(record: dict) -> None:
+    record["extra"].setdefault("trace_id", current_trace_id() or "-")
+
+
 def get_logger(name: str):
     """
     Retourne un logger contextualisé pour un module
@@ -61,6 +61,240 @@ class Settings(BaseSettings):
     GEMINI_PRO_MODEL: str = Field(default="models/gemini-pro-latest")
     GEMINI_FLASH_MODEL: str = Field(default="models/gemini-flash-latest")
     
+    # ==============================================================================
+    # CONTEXTE RAG
+    # ==============================================================================
+    RAG_CONTEXT_MAX_CHARS: int = Field(default=6000, description="Budget de caractères du contexte RAG dans les prompts")
+    RAG_CONTEXT_MAX_CHARS_PER_SOURCE: int = Field(default=1500, description="Taille maximale de l'extrait d'une source")
+    RAG_NEAR_DUPLICATE_THRESHOLD: float = Field(default=0.8, description="Similarité (Jaccard) au-delà de laquelle deux sources sont des doublons")
+    CHAT_REUSE_COVERAGE_THRESHOLD: float = Field(default=0.75, description="Couverture minimale des termes d'une relance par les sources précédentes pour éviter une nouvelle recherche")
+    CHAT_RETRIEVAL_MEMORY_MAX_CONVERSATIONS: int = Field(default=1000, description="Conversations dont les sources du dernier tour sont gardées en mémoire")
+    CHAT_RETRIEVAL_MEMORY_TTL_SECONDS: float = Field(default=3600.0, description="Durée d'inactivité avant oubli des sources d'une conversation")
+    
+    # ==============================================================================
+    # INDEX DE SESSION (DOSSIER UPLOADÉ)
+    # ==============================================================================
+    SESSION_INDEX_TTL_SECONDS: float = Field(default=3600.0, description="Durée d'inactivité avant suppression de l'index d'une session")
+    SESSION_INDEX_MAX_SESSIONS: int = Field(default=200, description="Nombre maximal de sessions indexées en mémoire")
+    SESSION_INDEX_EMBEDDING_DIM: int = Field(default=4096, description="Dimension des vecteurs locaux (hachage des racines)")
+    SESSION_INDEX_CHUNK_TOKENS: int = Field(default=250, description="Taille d'un passage indexé (tokens estimés)")
+    SESSION_INDEX_MAX_CHUNKS: int = Field(default=5000, description="Nombre maximal de passages du dossier d'une session")
+    SESSION_INDEX_MAX_BYTES: int = Field(default=512 * 1024 * 1024, description="Mémoire totale des index de session (les moins récents sont évincés au-delà)")
+    SESSION_CHAT_TOP_K: int = Field(default=6, description="Passages du dossier retenus pour une question du chatbot")
+    SESSION_SYNTHESIS_TOP_K: int = Field(default=40, description="Passages du dossier retenus pour une synthèse ciblée")
+    SESSION_CONTEXT_MAX_CHARS: int = Field(default=4000, description="Budget de caractères des extraits du dossier dans le prompt du chatbot")
+    
+    # ==============================================================================
+    # FACETTES (INSTANTANÉ DES MÉTADONNÉES)
+    # ==============================================================================
+    METADATA_SNAPSHOT_PATH: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "processed" / "metadata_snapshot.npz",
+        description="Instantané colonnaire des métadonnées (python -m rag.metadata_store)"
+    )
+    FACETS_TOP_N: int = Field(default=10, description="Nombre maximal de valeurs par facette")
+    
+    # ==============================================================================
+    # SYNTHÈSE MAP-REDUCE (DOSSIERS VOLUMINEUX)
+    # ==============================================================================
+    SYNTHESIS_MAP_REDUCE_THRESHOLD_TOKENS: int = Field(default=60000, description="Taille du dossier (tokens estimés) au-delà de laquelle la synthèse passe en map-reduce")
+    SYNTHESIS_CHUNK_TOKENS: int = Field(default=6000, description="Taille maximale d'un extrait résumé par Flash (tokens estimés)")
+    SYNTHESIS_REDUCE_TOKENS: int = Field(default=24000, description="Taille maximale des résumés fusionnés en un seul appel (tokens estimés)")
+    SYNTHESIS_MAP_CONCURRENCY: int = Field(default=4, description="Nombre d'appels Flash simultanés pour les extraits")
+    SYNTHESIS_CACHE_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "cache" / "chunk_summaries",
+        description="Cache disque des résumés d'extraits (par empreinte du contenu)"
+    )
+    SYNTHESIS_CACHE_MAX_ENTRIES: int = Field(default=2000, description="Résumés d'extraits gardés en mémoire (LRU)")
+    SYNTHESIS_CACHE_MAX_BYTES: int = Field(default=256 * 1024 * 1024, description="Taille maximale du cache disque des résumés (les moins récemment utilisés sont supprimés)")
+    SYNTHESIS_CACHE_MAX_AGE_DAYS: float = Field(default=30.0, description="Âge (dernière utilisation) au-delà duquel un résumé est supprimé du cache disque")
+    
+    # ==============================================================================
+    # ROUTAGE ET BUDGET DES APPELS LLM
+    # ==============================================================================
+    TOKEN_CALIBRATION_PATH: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "cache" / "token_calibration.json",
+        description="Facteurs de calibration de l'estimateur de tokens par modèle (python -m rag.token_budget)"
+    )
+    LLM_CONTEXT_TOKENS: int = Field(default=1_048_576, description="Fenêtre de contexte des modèles Gemini (tokens)")
+    LLM_MAX_OUTPUT_TOKENS: int = Field(default=65536, description="Plafond de génération d'un appel Gemini (tokens)")
+    LLM_PRO_MIN_INPUT_TOKENS: int = Field(default=1500, description="Entrée (tokens estimés) en deçà de laquelle Flash remplace Pro")
+    LLM_PRO_INPUT_PRICE_PER_MTOK: float = Field(default=1.25, description="Prix Pro en entrée ($ par million de tokens)")
+    LLM_PRO_OUTPUT_PRICE_PER_MTOK: float = Field(default=10.0, description="Prix Pro en sortie ($ par million de tokens)")
+    LLM_FLASH_INPUT_PRICE_PER_MTOK: float = Field(default=0.30, description="Prix Flash en entrée ($ par million de tokens)")
+    LLM_FLASH_OUTPUT_PRICE_PER_MTOK: float = Field(default=2.50, description="Prix Flash en sortie ($ par million de tokens)")
+    LLM_COST_CONFIRM_USD: float = Field(default=0.25, description="Coût estimé d'une requête au-delà duquel confirm_cost est exigé")
+    LLM_COST_MAX_USD: float = Field(default=2.0, description="Coût estimé d'une requête au-delà duquel elle est refusée")
+    
+    # ==============================================================================
+    # MACHINE À ACTES - MODÈLES COMPILÉS
+    # ==============================================================================
+    ACT_TEMPLATE_CACHE_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "cache" / "act_templates",
+        description="Cache disque des actes modèles compilés (par empreinte du contenu)"
+    )
+    ACT_TEMPLATE_CACHE_SIZE: int = Field(default=64, description="Nombre d'actes modèles compilés gardés en mémoire")
+    ACT_TEMPLATE_CACHE_MAX_FILES: int = Field(default=1000, description="Nombre d'actes modèles compilés gardés sur disque (les moins récemment utilisés sont supprimés)")
+    ACT_TEMPLATE_CACHE_MAX_BYTES: int = Field(default=256 * 1024 * 1024, description="Taille maximale du cache disque des actes modèles compilés")
+    ACT_LLM_LATENCY_PRIOR_SECONDS: float = Field(default=8.0, description="Durée de référence d'une rédaction complète par le LLM, avant les premières mesures (temps gagné par le remplissage local)")
+    ACT_BATCH_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "batches",
+        description="Lots d'actes : manifeste, requête et archive ZIP par lot"
+    )
+    ACT_BATCH_CONCURRENCY: int = Field(default=4, description="Générations d'actes simultanées dans un lot")
+    ACT_BATCH_MAX_RETRIES: int = Field(default=2, description="Nouvelles tentatives d'une ligne en échec")
+    ACT_BATCH_MAX_ROWS: int = Field(default=5000, description="Nombre maximal de lignes d'un lot")
+    ACT_RENDER_STYLE_CACHE_SIZE: int = Field(default=32, description="Templates PDF compilés (polices, logo, styles) gardés en mémoire")
+    ACT_RENDER_SPOOL_MAX_BYTES: int = Field(default=8 * 1024 * 1024, description="Taille au-delà de laquelle un acte rendu (PDF/DOCX) est tamponné sur disque")
+    
+    # ==============================================================================
+    # TEMPLATES PDF (REGISTRE ET ANALYSE DE STYLE)
+    # ==============================================================================
+    PDF_TEMPLATES_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "templates" / "pdf_templates",
+        description="Templates PDF des cabinets (default/ et custom/<nom>/)"
+    )
+    PDF_TEMPLATES_POLL_SECONDS: float = Field(default=2.0, description="Délai minimal entre deux vérifications des modifications des templates sur disque")
+    PDF_STYLE_SAMPLE_PAGES: int = Field(default=6, description="Pages échantillonnées pour détecter en-têtes et pieds de page répétés")
+    PDF_STYLE_WORKERS: int = Field(default=4, description="Processus d'analyse des pages échantillonnées (1 : analyse séquentielle)")
+    PDF_STYLE_PARALLEL_MIN_PAGES: int = Field(default=12, description="Nombre de pages échantillonnées à partir duquel l'analyse est parallélisée")
+    
+    # ==============================================================================
+    # TÂCHES ASYNCHRONES (FILE SQLITE)
+    # ==============================================================================
+    JOBS_DB_PATH: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "jobs" / "jobs.sqlite3",
+        description="Fichier SQLite de la file de tâches et des résultats"
+    )
+    JOBS_WORKERS: int = Field(default=2, description="Workers de tâches dans le processus de l'API (0 : workers lancés à part via python -m api.jobs)")
+    JOBS_POLL_INTERVAL_SECONDS: float = Field(default=1.0, description="Attente entre deux consultations d'une file vide")
+    JOBS_RESULT_TTL_HOURS: float = Field(default=24.0, description="Durée de conservation des résultats de tâches")
+    JOBS_STALE_AFTER_SECONDS: float = Field(default=900.0, description="Délai sans progression au-delà duquel une tâche en cours est remise en file")
+    
+    # ==============================================================================
+    # TÉLÉCHARGEMENTS (STOCKAGE ADRESSÉ PAR CONTENU)
+    # ==============================================================================
+    DOWNLOADS_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "downloads",
+        description="Documents à télécharger : blobs SHA-256 et index SQLite"
+    )
+    DOWNLOADS_TTL_HOURS: float = Field(default=24.0, description="Durée de validité d'un lien de téléchargement")
+    DOWNLOADS_SWEEP_INTERVAL_SECONDS: float = Field(default=300.0, description="Intervalle du balayage des documents expirés")
+    
+    # ==============================================================================
+    # UPLOADS (FICHIERS REÇUS)
+    # ==============================================================================
+    UPLOAD_MAX_BYTES: int = Field(default=50 * 1024 * 1024, description="Taille maximale d'un fichier uploadé (413 au-delà)")
+    UPLOAD_MAX_REQUEST_BYTES: int = Field(
+        default=200 * 1024 * 1024,
+        description="Taille maximale d'un corps de requête multipart (coupée dès le dépassement)"
+    )
+    
+    # ==============================================================================
+    # SERVICES (DÉMARRAGE DE L'API)
+    # ==============================================================================
+    SERVICES_WARMUP: bool = Field(
+        default=True,
+        description="Préchauffage au démarrage : services, sonde Vertex, caches locaux "
+                    "(/ready répond 503 jusqu'à la fin ; sinon : tout est construit à la première requête)"
+    )
+    SERVICES_WARMUP_WORKERS: int = Field(default=4, description="Threads du préchauffage des services")
+    WARMUP_PROBE_QUERY: str = Field(
+        default="contrat",
+        description="Requête de sonde Vertex AI Search (ouverture du canal, jeton d'authentification ; vide : aucune)"
+    )
+    WARMUP_TIMEOUT_SECONDS: float = Field(
+        default=120.0,
+        description="Au-delà, /ready signale un préchauffage bloqué (état timed_out, toujours 503)"
+    )
+    
+    # ==============================================================================
+    # MÉTRIQUES (/metrics)
+    # ==============================================================================
+    METRICS_ENABLED: bool = Field(
+        default=True,
+        description="Expose /metrics (format Prometheus) et mesure les requêtes HTTP"
+    )
+    
+    # ==============================================================================
+    # TRAÇAGE DES REQUÊTES
+    # ==============================================================================
+    TRACING_ENABLED: bool = Field(
+        default=True,
+        description="Trace par requête (X-Trace-Id, logs) et export des étapes en spans"
+    )
+    TRACING_SAMPLE_RATE: float = Field(
+        default=0.1,
+        description="Part des requêtes dont les spans sont enregistrés (0 à 1)"
+    )
+    TRACING_EXCLUDED_PATHS: list[str] = Field(
+        default=["/health", "/ready", "/metrics"],
+        description="Chemins jamais échantillonnés (sondes, collecte des métriques) : X-Trace-Id seulement"
+    )
+    TRACE_EXPORT_PATH: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "traces" / "spans.jsonl",
+        description="Spans exportés, un par ligne (rapport : python -m utils.tracing)"
+    )
+    TRACE_EXPORT_MAX_BYTES: int = Field(
+        default=50 * 1024 * 1024,
+        description="Taille au-delà de laquelle le fichier des spans est renommé en .1"
+    )
+    TRACING_OTLP_ENDPOINT: str = Field(
+        default="",
+        description="Collecteur OTLP/HTTP (JSON) recevant aussi les spans (ex. http://localhost:4318/v1/traces)"
+    )
+    
+    # ==============================================================================
+    # COMPRESSION DES RÉPONSES
+    # ==============================================================================
+    RESPONSE_COMPRESSION_ENABLED: bool = Field(
+        default=True,
+        description="Compression br/gzip négociée par Accept-Encoding (réponses JSON et texte)"
+    )
+    RESPONSE_COMPRESSION_MIN_BYTES: int = Field(
+        default=1024,
+        description="Taille en dessous de laquelle une réponse n'est pas compressée"
+    )
+    RESPONSE_COMPRESSION_GZIP_LEVEL: int = Field(
+        default=1,
+        description="Niveau gzip (1 : plus rapide, 9 : plus compact ; ~2x plus lent au niveau 5 pour 15 % de gain)"
+    )
+    RESPONSE_COMPRESSION_BROTLI_QUALITY: int = Field(
+        default=4,
+        description="Qualité brotli (si le module brotli est installé)"
+    )
+    
+    # ==============================================================================
+    # PROFILAGE À LA DEMANDE
+    # ==============================================================================
+    PROFILING_ENABLED: bool = Field(
+        default=False,
+        description="Profil d'une requête sur demande (en-tête X-Profile ou ?profile=1, jeton admin requis)"
+    )
+    PROFILING_ADMIN_TOKEN: str = Field(
+        default="",
+        description="Jeton attendu dans l'en-tête X-Admin-Token (profilage désactivé s'il est vide)"
+    )
+    PROFILING_MODE: str = Field(
+        default="sampling",
+        description="Mode par défaut : sampling (speedscope) ou cprofile (pstats)"
+    )
+    PROFILING_INTERVAL_MS: float = Field(
+        default=5.0,
+        description="Intervalle d'échantillonnage des piles (mode sampling)"
+    )
+    PROFILES_DIR: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / "data" / "profiles",
+        description="Dossier des profils enregistrés"
+    )
+    PROFILES_MAX_FILES: int = Field(
+        default=50,
+        description="Nombre de profils conservés (les plus anciens sont supprimés)"
+    )
+    PROFILES_MAX_BYTES: int = Field(
+        default=200 * 1024 * 1024,
+        description="Taille totale des profils conservés"
+    )
+    
     # ==============================================================================
     # MCP (MODEL CONTEXT PROTOCOL)
     # ==============================================================================
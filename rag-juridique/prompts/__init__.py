@@ -22,6 +22,8 @@ __all__ = [
     "PROMPT_TREND_ANALYSIS",
     "PROMPT_CLIENT_REPORT",
     "PROMPT_CASE_SUMMARY",
+    "PROMPT_CHUNK_SUMMARY",
+    "PROMPT_REDUCE_SUMMARIES",
     
     # Pilier 5 - Chatbot Avocat
     "PROMPT_CHATBOT_SYSTEM",
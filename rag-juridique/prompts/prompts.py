@@ -284,6 +284,42 @@ AJOUTE À LA FIN :
 - Actions en attente
 """
 
+PROMPT_CHUNK_SUMMARY = """Tu es un juriste qui prépare la synthèse d'un dossier volumineux.
+
+EXTRAIT DU DOSSIER (partie {index}/{total}) :
+{chunk}
+
+MISSION :
+Résume cet extrait de façon FIDÈLE et DENSE. Ce résumé sera fusionné avec
+ceux des autres extraits pour rédiger la synthèse finale.
+
+CONSERVE IMPÉRATIVEMENT :
+- Parties, qualités et rôles
+- Dates, délais et montants exacts
+- Actes de procédure et juridictions
+- Articles de loi et jurisprudence cités
+- Arguments et prétentions de chaque partie
+
+RÈGLES :
+- Aucune information absente de l'extrait
+- Bullet points, pas d'introduction ni de conclusion
+"""
+
+PROMPT_REDUCE_SUMMARIES = """Tu es un juriste qui consolide des résumés partiels d'un même dossier.
+
+RÉSUMÉS PARTIELS :
+{summaries}
+
+MISSION :
+Fusionne ces résumés en UN résumé unique, sans perte d'information utile.
+
+RÈGLES :
+- Supprime les redondances, garde les faits, dates, montants et références exacts
+- Signale les contradictions entre résumés
+- Respecte l'ordre chronologique lorsqu'il est identifiable
+- Bullet points, pas d'introduction ni de conclusion
+"""
+
 # ==============================================================================
 # PILIER 5 : CHATBOT AVOCAT
 # ==============================================================================
@@ -407,6 +443,31 @@ Si les instructions personnalisées ne précisent pas certains aspects,
 applique les bonnes pratiques de rédaction juridique française.
 """
 
+PROMPT_ACT_SECTIONS = """Tu es un juriste expert en rédaction d'actes juridiques français.
+
+TYPE D'ACTE : {act_type}
+
+L'acte a été complété automatiquement à partir des données du client. Les
+passages ci-dessous contiennent encore des variables non renseignées
+([...], {{{{...}}}}) ou des accords indéterminés (né(e), Monsieur/Madame...).
+
+DONNÉES DU CLIENT :
+{client_data}
+
+PASSAGES À COMPLÉTER :
+{sections}
+
+MISSION :
+Complète chaque passage à partir des données du client.
+
+RÈGLES ABSOLUES :
+- Réponds UNIQUEMENT avec les passages complétés, chacun précédé de son repère <<<PASSAGE n>>> d'origine
+- NE JAMAIS modifier le texte déjà rédigé, ni ajouter ou retirer de passage
+- NE JAMAIS inventer d'informations absentes des données client : si une donnée manque, laisse la variable telle quelle
+- Accorde en genre et en nombre (il/elle, né/née, Monsieur/Madame)
+- Aucune annotation ou commentaire
+"""
+
 # ==============================================================================
 # UTILITAIRES
 # ==============================================================================
@@ -0,0 +1,291 @@
+"""
+Assemblage du contexte RAG pour les prompts
+
+Transforme les résultats bruts de Vertex AI Search en un contexte compact :
+- Déduplication (article_id, empreinte du contenu, quasi-doublons par shingles)
+- Sélection des phrases pertinentes pour la requête dans chaque article
+- Remplissage glouton d'un budget de caractères, par score décroissant
+"""
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from config.logging_config import get_logger
+from rag.text_utils import (
+    content_hash,
+    jaccard,
+    query_terms,
+    shingles,
+    split_sentences,
+    stem_fr,
+    tokenize,
+)
+
+logger = get_logger(__name__)
+
+# Approximation caractères/token pour le français (Gemini)
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class PackedSource:
+    """Une source retenue dans le contexte, avec son extrait"""
+
+    document: dict[str, Any]
+    excerpt: str
+    score: float
+    duplicates: list[str] = field(default_factory=list)
+
+    @property
+    def title(self) -> str:
+        return self.document.get("title", "") or "N/A"
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        return self.document.get("metadata", {}) or {}
+
+
+class ContextPacker:
+    """
+    Assembleur de contexte pour les prompts RAG
+
+    Usage:
+        >>> packer = ContextPacker(max_chars=6000)
+        >>> packed = packer.pack(query, vertex_results, max_sources=5)
+        >>> for source in packed:
+        >>>     print(source.title, source.excerpt)
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 6000,
+        max_chars_per_source: int = 1500,
+        near_duplicate_threshold: float = 0.8,
+        shingle_size: int = 5,
+    ):
+        """
+        Args:
+            max_chars: Budget total de caractères pour le contexte
+            max_chars_per_source: Taille maximale de l'extrait d'une source
+            near_duplicate_threshold: Similarité de Jaccard au-delà de laquelle
+                deux contenus sont considérés comme des versions du même article
+            shingle_size: Taille des shingles (en mots)
+        """
+        self.max_chars = max_chars
+        self.max_chars_per_source = max_chars_per_source
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.shingle_size = shingle_size
+
+    def pack(
+        self,
+        query: str,
+        results: list[dict[str, Any]],
+        max_sources: int | None = None,
+        max_chars: int | None = None,
+        max_tokens: int | None = None,
+    ) -> list[PackedSource]:
+        """
+        Sélectionne et condense les sources pour un prompt
+
+        Args:
+            query: Requête de l'utilisateur
+            results: Résultats bruts de VertexSearchClient.search
+            max_sources: Nombre maximum de sources retenues
+            max_chars: Budget de caractères (défaut: celui du packer)
+            max_tokens: Budget en tokens (prioritaire sur max_chars)
+
+        Returns:
+            Sources retenues, par score décroissant
+        """
+        budget = max_chars or self.max_chars
+        if max_tokens:
+            budget = max_tokens * CHARS_PER_TOKEN
+
+        terms = query_terms(query)
+        unique = self.deduplicate(results)
+
+        candidates = []
+        for rank, doc in enumerate(unique):
+            excerpt, coverage = self._select_sentences(
+                doc.get("content", "") or "",
+                terms,
+                self.max_chars_per_source,
+            )
+            if not excerpt:
+                continue
+            score = self._score(doc, rank, coverage)
+            candidates.append(PackedSource(
+                document=doc,
+                excerpt=excerpt,
+                score=score,
+                duplicates=doc.get("_duplicates", []),
+            ))
+
+        candidates.sort(key=lambda c: c.score, reverse=True)
+
+        # Remplissage glouton du budget
+        packed: list[PackedSource] = []
+        used = 0
+        for candidate in candidates:
+            if max_sources is not None and len(packed) >= max_sources:
+                break
+            remaining = budget - used
+            if remaining <= 0:
+                break
+            if len(candidate.excerpt) > remaining:
+                # Extrait réduit aux phrases qui tiennent dans le reste du budget
+                candidate.excerpt, _ = self._select_sentences(
+                    candidate.excerpt, terms, remaining
+                )
+                if not candidate.excerpt:
+                    continue
+            packed.append(candidate)
+            used += len(candidate.excerpt)
+
+        logger.debug(
+            f"📦 Contexte : {len(packed)}/{len(results)} source(s), "
+            f"{len(results) - len(unique)} doublon(s), {used}/{budget} caractères"
+        )
+        return packed
+
+    def deduplicate(self, results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Supprime les doublons (même article, même contenu ou quasi-identique)
+
+        Le premier résultat (le mieux classé) est conservé ; les identifiants
+        des doublons écartés sont notés dans sa clé "_duplicates".
+
+        Args:
+            results: Résultats bruts, par pertinence décroissante
+
+        Returns:
+            Résultats uniques (copies superficielles)
+        """
+        kept: list[dict[str, Any]] = []
+        kept_shingles: list[set[int]] = []
+        seen_keys: dict[str, int] = {}
+
+        for doc in results:
+            content = doc.get("content", "") or ""
+            keys = [f"hash:{content_hash(content)}"] if content else []
+            article_key = self._article_key(doc)
+            if article_key:
+                keys.append(article_key)
+
+            index = next((seen_keys[k] for k in keys if k in seen_keys), None)
+
+            doc_shingles = shingles(content, self.shingle_size)
+            if index is None:
+                for i, other in enumerate(kept_shingles):
+                    if jaccard(doc_shingles, other) >= self.near_duplicate_threshold:
+                        index = i
+                        break
+
+            if index is not None:
+                kept[index]["_duplicates"].append(doc.get("id", ""))
+                for k in keys:
+                    seen_keys.setdefault(k, index)
+                continue
+
+            kept.append({**doc, "_duplicates": []})
+            kept_shingles.append(doc_shingles)
+            for k in keys:
+                seen_keys[k] = len(kept) - 1
+
+        return kept
+
+    @staticmethod
+    def _article_key(doc: dict[str, Any]) -> str | None:
+        """Clé d'identité juridique d'un article (indépendante de la source d'ingestion)"""
+        metadata = doc.get("metadata", {}) or {}
+        article_id = metadata.get("article_id")
+        if article_id:
+            return f"article:{article_id}"
+        code_id = metadata.get("code_id")
+        article_num = metadata.get("article_num")
+        if code_id and article_num:
+            etat = metadata.get("etat", "")
+            return f"num:{code_id}:{article_num}:{etat}"
+        return None
+
+    @staticmethod
+    def _select_sentences(
+        content: str,
+        terms: list[str],
+        max_chars: int,
+    ) -> tuple[str, float]:
+        """
+        Extrait les phrases les plus pertinentes pour la requête
+
+        Les phrases sont classées par nombre de termes de la requête qu'elles
+        contiennent, puis restituées dans leur ordre d'origine.
+
+        Returns:
+            Tuple (extrait, couverture des termes de la requête entre 0 et 1)
+        """
+        if not content:
+            return "", 0.0
+        if not terms:
+            return content[:max_chars].strip(), 0.0
+
+        term_set = set(terms)
+        sentences = split_sentences(content)
+        scored = []
+        covered: set[str] = set()
+        for position, sentence in enumerate(sentences):
+            stems = {stem_fr(w) for w in tokenize(sentence)}
+            hits = stems & term_set
+            covered |= hits
+            scored.append((len(hits), position, sentence))
+
+        coverage = len(covered) / len(term_set)
+
+        # Aucune phrase pertinente : début de l'article
+        if not covered:
+            return content[:max_chars].strip(), 0.0
+
+        selected = []
+        used = 0
+        for hits, position, sentence in sorted(scored, key=lambda s: (-s[0], s[1])):
+            if hits == 0 and selected:
+                break
+            if used + len(sentence) + 1 > max_chars:
+                if not selected:
+                    selected.append((position, sentence[:max_chars]))
+                    used = max_chars
+                continue
+            selected.append((position, sentence))
+            used += len(sentence) + 1
+
+        selected.sort()
+        return " ".join(s for _, s in selected), coverage
+
+    @staticmethod
+    def _score(doc: dict[str, Any], rank: int, coverage: float) -> float:
+        """
+        Score combiné : pertinence Vertex (ou rang à défaut) et couverture lexicale
+        """
+        relevance = doc.get("score")
+        if relevance is None:
+            relevance = 1.0 / (1 + rank)
+        return 0.7 * float(relevance) + 0.3 * coverage
+
+
+def format_packed_context(packed: list[PackedSource]) -> str:
+    """
+    Formate les sources retenues pour le prompt du chatbot
+
+    Args:
+        packed: Sources retenues par ContextPacker.pack
+
+    Returns:
+        Contexte formaté ([Source i] titre / référence / contenu)
+    """
+    parts = []
+    for i, source in enumerate(packed, 1):
+        parts.append(
+            f"[Source {i}] {source.title}\n"
+            f"Référence: {source.metadata.get('breadcrumb', '')}\n"
+            f"Contenu: {source.excerpt}\n"
+        )
+    return "\n".join(parts)
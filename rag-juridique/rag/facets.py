@@ -0,0 +1,199 @@
+"""
+Moteur de facettes sur l'instantané colonnaire des métadonnées
+
+Les comptes (par code, état, année, niveau du fil d'Ariane) portent sur
+l'ensemble des articles correspondant à la recherche dans tout le corpus,
+et non sur la seule page de résultats renvoyée par Vertex AI Search.
+Toutes les agrégations sont des np.bincount sur des masques booléens.
+"""
+
+import time
+from typing import Any
+
+import numpy as np
+
+from config.logging_config import get_logger
+from rag.metadata_store import MetadataStore
+
+logger = get_logger(__name__)
+
+# Nombre d'années récentes prises en compte pour la tendance
+TREND_WINDOW_YEARS = 10
+
+
+class FacetEngine:
+    """
+    Agrégations vectorisées sur l'instantané des métadonnées
+
+    Usage:
+        >>> engine = FacetEngine(get_metadata_store())
+        >>> mask, mode = engine.match(query, filters, hit_ids)
+        >>> facets = engine.compute(mask, breadcrumb_level=1)
+    """
+
+    def __init__(self, store: MetadataStore, top_n: int = 10):
+        """
+        Args:
+            store: Instantané des métadonnées
+            top_n: Nombre maximal de valeurs par facette (hors années)
+        """
+        self.store = store
+        self.top_n = top_n
+
+    def match(
+        self,
+        query: str,
+        filters: dict[str, Any] | None = None,
+        hit_ids: list[str] | None = None,
+    ) -> tuple[np.ndarray, str]:
+        """
+        Ensemble des articles correspondant à la recherche
+
+        Filtres de la requête ∧ termes de la requête (titre, fil d'Ariane),
+        en incluant toujours les résultats renvoyés par Vertex AI.
+
+        Args:
+            query: Requête en langage naturel
+            filters: Filtres (code_id, etat, date_min, date_max, article_num_min/max)
+            hit_ids: Identifiants des résultats de la page
+
+        Returns:
+            Tuple (masque, mode : "terms" ou "filters" si aucun terme n'est indexé)
+        """
+        filter_kwargs = {
+            k: v for k, v in (filters or {}).items()
+            if k in {"code_id", "etat", "date_min", "date_max", "article_num_min", "article_num_max"}
+        }
+        filtered = self.store.filter_mask(**filter_kwargs)
+
+        terms_mask = self.store.query_mask(query)
+        if terms_mask is None:
+            return filtered, "filters"
+
+        mask = filtered & terms_mask
+        if hit_ids:
+            hit_rows = self.store.rows_for_ids(hit_ids)
+            # Les résultats sémantiques restent soumis aux filtres
+            mask[hit_rows] |= filtered[hit_rows]
+
+        return mask, "terms"
+
+    def compute(
+        self,
+        mask: np.ndarray,
+        breadcrumb_level: int = 1,
+        top_n: int | None = None,
+    ) -> dict[str, Any]:
+        """
+        Calcule les facettes d'un ensemble d'articles
+
+        Args:
+            mask: Masque des articles retenus
+            breadcrumb_level: Niveau du fil d'Ariane agrégé (0 = code)
+            top_n: Nombre maximal de valeurs par facette
+
+        Returns:
+            Dict avec total, codes, status, years, breadcrumb et
+            temporal_evolution
+        """
+        start = time.perf_counter()
+        store = self.store
+        top_n = top_n or self.top_n
+        level = min(max(breadcrumb_level, 0), store.breadcrumb.shape[1] - 1)
+
+        code_counts = self._bincount(store.code, mask, len(store.code_values))
+        etat_counts = self._bincount(store.etat, mask, len(store.etat_values))
+        level_values = store.breadcrumb_values[level]
+        level_counts = self._bincount(store.breadcrumb[:, level], mask, len(level_values))
+        years = self._year_counts(mask)
+
+        facets = {
+            "total": int(mask.sum()),
+            "codes": self._top_buckets(
+                code_counts, store.code_values, top_n, labels=store.code_names
+            ),
+            "status": self._top_buckets(etat_counts, store.etat_values, top_n),
+            "years": [{"value": str(y), "count": c} for y, c in years.items()],
+            "breadcrumb_level": level,
+            "breadcrumb": self._top_buckets(level_counts, level_values, top_n),
+            "temporal_evolution": self.temporal_evolution(years),
+        }
+        facets["computed_in_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        logger.debug(f"📊 Facettes : {facets['total']} articles en {facets['computed_in_ms']}ms")
+        return facets
+
+    def _year_counts(self, mask: np.ndarray) -> dict[int, int]:
+        """Nombre d'articles par année d'entrée en vigueur"""
+        years = self.store.year[mask]
+        years = years[years > 0]
+        if years.size == 0:
+            return {}
+        first = int(years.min())
+        counts = np.bincount(years - first)
+        nonzero = np.flatnonzero(counts)
+        return {first + int(i): int(counts[i]) for i in nonzero}
+
+    @staticmethod
+    def temporal_evolution(years: dict[int, int]) -> dict[str, Any]:
+        """
+        Distribution annuelle, année de pic et tendance récente
+
+        La tendance est la pente d'une régression linéaire sur les
+        TREND_WINDOW_YEARS dernières années (années sans article comptées à 0).
+
+        Args:
+            years: Nombre d'articles par année
+
+        Returns:
+            Dict avec yearly_distribution, peak_year et trend
+            (vide si aucune date)
+        """
+        if not years:
+            return {}
+
+        last = max(years)
+        window = np.arange(last - TREND_WINDOW_YEARS + 1, last + 1)
+        counts = np.array([years.get(int(y), 0) for y in window], dtype=float)
+        trend = "stable"
+        if np.count_nonzero(counts) >= 2:
+            slope = np.polyfit(window - window[0], counts, 1)[0]
+            # Variation jugée significative au-delà de 5 % de la moyenne par an
+            threshold = 0.05 * max(counts.mean(), 1.0)
+            if slope > threshold:
+                trend = "croissant"
+            elif slope < -threshold:
+                trend = "décroissant"
+
+        return {
+            "yearly_distribution": {str(y): c for y, c in years.items()},
+            "trend": trend,
+            "peak_year": str(max(years, key=years.get)),
+        }
+
+    @staticmethod
+    def _bincount(column: np.ndarray, mask: np.ndarray, size: int) -> np.ndarray:
+        """Nombre d'occurrences de chaque catégorie parmi les lignes retenues"""
+        values = column[mask]
+        values = values[values >= 0]
+        return np.bincount(values, minlength=size)
+
+    @staticmethod
+    def _top_buckets(
+        counts: np.ndarray,
+        values: np.ndarray,
+        top_n: int,
+        labels: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
+        """Valeurs les plus fréquentes, par nombre décroissant"""
+        nonzero = np.flatnonzero(counts)
+        if nonzero.size == 0:
+            return []
+        order = nonzero[np.argsort(-counts[nonzero], kind="stable")][:top_n]
+        return [
+            {
+                "value": str(values[i]),
+                "label": str(labels[i]) if labels is not None else None,
+                "count": int(counts[i]),
+            }
+            for i in order
+        ]
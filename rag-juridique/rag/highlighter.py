@@ -0,0 +1,444 @@
+"""
+Extraction d'extraits pertinents (highlights) pour les résultats de recherche
+
+Les termes de la requête sont normalisés (sans accents, racinisés) une seule
+fois par requête. Les contenus d'une page de résultats sont concaténés et
+repliés en octets latin-1 sans accents ni majuscules (une table de
+traduction, longueur et positions conservées), puis tout est vectorisé
+(numpy) : débuts de mots candidats, comparaison des racines par mots de
+64 bits, fins de mots, puis score et sélection des fenêtres pour tous les
+contenus à la fois. Les fenêtres contenant le plus de termes distincts sont
+retenues, avec la position des correspondances.
+
+Avant l'encodage, la ponctuation typographique hors latin-1 (apostrophes et
+guillemets courbes, espaces fines...) est ramenée à son équivalent ASCII, et
+les ligatures œ/æ sont développées comme dans les requêtes (« cœur » →
+« coeur ») ; seul ce dernier cas change la longueur, les positions sont
+alors reportées sur le texte d'origine.
+"""
+
+import unicodedata
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from rag.text_utils import query_terms
+
+MIN_TERM_LENGTH = 3
+
+
+# Octets marqueurs des ligatures dans le texte replié (développés ensuite)
+_OE = 0x01
+_AE = 0x02
+
+
+def _build_fold_table() -> bytes:
+    """Table latin-1 → minuscule sans accent (un octet pour un octet)"""
+    table = bytearray(range(256))
+    for code in range(256):
+        char = bytes([code]).decode("latin-1").lower()
+        folded = unicodedata.normalize("NFKD", char).encode("ascii", "ignore")
+        if len(folded) == 1:
+            table[code] = folded[0]
+    # Guillemets français : ponctuation comme les guillemets droits
+    table[0xAB] = table[0xBB] = ord('"')
+    # æ/Æ (latin-1) : marqueur de ligature
+    table[0xE6] = table[0xC6] = _AE
+    return bytes(table)
+
+
+_FOLD_TABLE = _build_fold_table()
+# Caractères hors latin-1 remplacés un pour un (les autres deviennent "?")
+_NON_LATIN1 = {
+    "\u2018": "'", "\u2019": "'", "\u201a": "'", "\u201b": "'", "\u2032": "'",
+    "\u201c": '"', "\u201d": '"', "\u201e": '"', "\u2033": '"',
+    "\u2010": "-", "\u2011": "-", "\u2013": "-", "\u2014": "-",
+    "\u2009": " ", "\u200a": " ", "\u202f": " ", "\u2026": ".",
+    "œ": chr(_OE), "Œ": chr(_OE),
+}
+
+
+def _replace_non_latin1(content: str) -> str:
+    """
+    Remplace les caractères de _NON_LATIN1 présents (str.replace : un
+    texte latin-1 est écarté sans parcours)
+    """
+    for char, replacement in _NON_LATIN1.items():
+        if char in content:
+            content = content.replace(char, replacement)
+    return content
+
+
+# Octets considérés comme lettres/chiffres après repli (limites de mots)
+_WORD_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyz0123456789_")
+# Table de recherche : repli, puis tout octet hors mot ramené à l'espace
+_SCAN_TABLE = bytes(
+    code if code in _WORD_BYTES or code in (_OE, _AE) else 0x20 for code in _FOLD_TABLE
+)
+_SPACES = np.uint64(0x2020202020202020)
+_ONES = np.uint64(0x0101010101010101)
+_HIGHS = np.uint64(0x8080808080808080)
+_ONE = np.uint64(1)
+
+
+def _fold(content: str, table: bytes) -> tuple[bytes, np.ndarray | None]:
+    """Repli par une table de traduction (voir fold_bytes), ligatures développées"""
+    folded = _replace_non_latin1(content).encode("latin-1", "replace").translate(table)
+    if _OE not in folded and _AE not in folded:
+        return folded, None
+    markers = np.flatnonzero(np.frombuffer(folded, dtype=np.uint8) - 1 < 2)
+    # Seconde lettre de la k-ième ligature : décalée de k octets insérés avant
+    inserted = markers + np.arange(1, len(markers) + 1)
+    return folded.replace(b"\x01", b"oe").replace(b"\x02", b"ae"), inserted
+
+
+def fold_bytes(content: str) -> tuple[bytes, list[int] | None]:
+    """
+    Replie un contenu en octets minuscules sans accents
+
+    Chaque caractère donne un octet (ponctuation typographique ramenée à
+    l'ASCII, autres caractères hors latin-1 en "?"), sauf les ligatures
+    développées comme dans les requêtes (œ → oe, æ → ae).
+
+    Args:
+        content: Texte brut
+
+    Returns:
+        Tuple (octets repliés, positions des octets insérés par les
+        ligatures, croissantes) ; sans ligature, les positions sont celles
+        du texte (None). Voir original_position.
+    """
+    folded, inserted = _fold(content, _FOLD_TABLE)
+    return folded, None if inserted is None else inserted.tolist()
+
+
+def original_position(pos: int, inserted: list[int]) -> int:
+    """Position dans le texte d'origine d'un octet replié (ligatures développées)"""
+    return pos - bisect_right(inserted, pos)
+
+
+def _word_ends(view: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Premier espace à partir de chaque position (fin du mot en cours)
+
+    Les octets sont lus par 8 (entier 64 bits) ; le premier octet nul de
+    x ^ 0x2020... est repéré par le test classique (x - 0x0101...) & ~x
+    & 0x8080..., exact pour l'octet nul de poids le plus faible.
+    """
+    ends = starts.copy()
+    pending = np.arange(len(starts))
+    while len(pending):
+        x = view[ends[pending]] ^ _SPACES
+        zero = (x - _ONES) & ~x & _HIGHS
+        found = zero != 0
+        # Bit de poids faible 2**(8k + 7) : frexp donne l'exposant 8k + 8
+        low = zero[found]
+        _, exponent = np.frexp((low & (~low + _ONE)).astype(np.float64))
+        done = pending[found]
+        ends[done] += (exponent >> 3) - 1
+        pending = pending[~found]
+        ends[pending] += 8
+    return ends
+
+
+def _needle_chunks(needle: bytes) -> tuple[tuple[int, np.uint64, np.uint64], ...]:
+    """Découpe une racine en mots de 64 bits : (décalage, masque, valeur)"""
+    chunks = []
+    for offset in range(0, len(needle), 8):
+        part = needle[offset:offset + 8]
+        mask = np.uint64((1 << (8 * len(part))) - 1)
+        chunks.append((offset, mask, np.uint64(int.from_bytes(part, "little"))))
+    return tuple(chunks)
+
+
+@dataclass
+class HighlightWindow:
+    """Une fenêtre d'extrait avec la position des correspondances"""
+
+    text: str
+    start: int
+    end: int
+    score: float
+    matches: tuple[tuple[int, int], ...]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "text": self.text,
+            "start": self.start,
+            "end": self.end,
+            "score": self.score,
+            "matches": [list(m) for m in self.matches],
+        }
+
+
+class QueryHighlighter:
+    """
+    Extracteur d'extraits préparé pour une requête
+
+    Usage:
+        >>> highlighter = QueryHighlighter.for_query("résiliation du bail")
+        >>> windows = highlighter.highlight(content, top_k=3)
+        >>> for w in windows:
+        >>>     print(w.text, w.matches)
+    """
+
+    def __init__(
+        self,
+        terms: tuple[str, ...],
+        window_chars: int = 160,
+        max_scan_chars: int = 20000,
+    ):
+        """
+        Args:
+            terms: Racines normalisées des termes de la requête
+            window_chars: Taille d'une fenêtre d'extrait (caractères)
+            max_scan_chars: Nombre maximal de caractères parcourus par contenu
+        """
+        self.terms = terms
+        self.window_chars = window_chars
+        self.max_scan_chars = max_scan_chars
+        self._needles = tuple(t.encode("ascii", "ignore") for t in terms)
+        self._chunks = tuple(_needle_chunks(needle) for needle in self._needles)
+        self._first_bytes = sorted({needle[0] for needle in self._needles if needle})
+        self._lengths = np.array([len(needle) for needle in self._needles], dtype=np.intp)
+        self._padding = b" " * (max(map(len, self._needles), default=0) + 8)
+
+    @classmethod
+    def for_query(cls, query: str, window_chars: int = 160) -> "QueryHighlighter":
+        """
+        Prépare (ou récupère du cache) l'extracteur d'une requête
+
+        Args:
+            query: Requête en langage naturel
+            window_chars: Taille d'une fenêtre d'extrait
+
+        Returns:
+            Extracteur préparé
+        """
+        terms = tuple(t for t in query_terms(query) if len(t) >= MIN_TERM_LENGTH)
+        return _compiled(terms, window_chars)
+
+    def find_matches(self, content: str) -> list[tuple[int, int, int]]:
+        """
+        Localise les mots commençant par une racine de la requête
+
+        Args:
+            content: Contenu textuel
+
+        Returns:
+            Liste triée de (début, fin, indice du terme)
+        """
+        return self.find_matches_many([content])[0]
+
+    def find_matches_many(self, contents: list[str]) -> list[list[tuple[int, int, int]]]:
+        """
+        Localise les termes dans plusieurs contenus en une seule passe
+
+        Args:
+            contents: Contenus textuels (ex : une page de résultats)
+
+        Returns:
+            Pour chaque contenu, liste triée de (début, fin, indice du terme)
+        """
+        per_content: list[list[tuple[int, int, int]]] = [[] for _ in contents]
+        arrays = self._match_arrays(contents)
+        if arrays is None:
+            return per_content
+        starts, ends, terms, docs, offsets = arrays
+        base = offsets[docs]
+        for doc, start, end, term in zip(
+            docs.tolist(), (starts - base).tolist(), (ends - base).tolist(), terms.tolist()
+        ):
+            per_content[doc].append((start, end, term))
+        return per_content
+
+    def _match_arrays(self, contents: list[str]) -> tuple[np.ndarray, ...] | None:
+        """
+        Correspondances de tous les contenus, triées par position
+
+        Les contenus sont concaténés (séparateur neutre) et repliés une fois
+        avec la table de recherche (tout octet hors mot devient un espace).
+        Les débuts de mots commençant par la première lettre d'une racine
+        sont comparés aux racines par mots de 64 bits (lecture non alignée),
+        puis étendus jusqu'à la fin du mot.
+
+        Returns:
+            Tuple (débuts, fins, indices des termes, indices des contenus,
+            début de chaque contenu), positions dans la concaténation des
+            textes d'origine ; None sans correspondance
+        """
+        if not self._first_bytes or not contents:
+            return None
+        limit = self.max_scan_chars
+        folded, inserted = _fold("\0".join(content[:limit] for content in contents), _SCAN_TABLE)
+        size = len(folded)
+        buf = np.frombuffer(b" " + folded + self._padding, dtype=np.uint8)
+        view = np.ndarray(
+            (size + len(self._padding) - 7,), dtype="<u8", buffer=buf, offset=1, strides=(1,)
+        )
+
+        text = buf[1:size + 1]
+        mask = text == self._first_bytes[0]
+        for first in self._first_bytes[1:]:
+            mask |= text == first
+        mask &= buf[:size] == 0x20
+        candidates = np.flatnonzero(mask)
+        keys = view[candidates]
+
+        found_starts = []
+        found_terms = []
+        for term, chunks in enumerate(self._chunks):
+            if not chunks:
+                continue
+            _, chunk_mask, value = chunks[0]
+            hits = candidates[(keys & chunk_mask) == value]
+            for offset, chunk_mask, value in chunks[1:]:
+                hits = hits[(view[hits + offset] & chunk_mask) == value]
+            if len(hits):
+                found_starts.append(hits)
+                found_terms.append(np.full(len(hits), term))
+        if not found_starts:
+            return None
+
+        starts = np.concatenate(found_starts)
+        terms = np.concatenate(found_terms)
+        if len(found_starts) > 1:
+            # Tri stable : à position égale, ordre des termes conservé
+            order = np.argsort(starts, kind="stable")
+            starts, terms = starts[order], terms[order]
+        ends = _word_ends(view, starts + self._lengths[terms])
+        if inserted is not None:
+            # Ligatures développées : positions du texte d'origine
+            starts = starts - np.searchsorted(inserted, starts, "right")
+            ends = ends - np.searchsorted(inserted, ends - 1, "right")
+        offsets = np.cumsum([0] + [min(len(content), limit) + 1 for content in contents[:-1]])
+        docs = np.searchsorted(offsets, starts, "right") - 1
+        return starts, ends, terms, docs, offsets
+
+    def highlight(self, content: str, top_k: int = 3) -> list[HighlightWindow]:
+        """
+        Retourne les meilleures fenêtres d'un contenu
+
+        Args:
+            content: Contenu textuel du résultat
+            top_k: Nombre maximal de fenêtres
+
+        Returns:
+            Fenêtres par score décroissant (vide si aucune correspondance)
+        """
+        return self.highlight_many([content], top_k=top_k)[0]
+
+    def highlight_many(
+        self,
+        contents: list[str],
+        top_k: int = 3,
+    ) -> list[list[HighlightWindow]]:
+        """
+        Retourne les meilleures fenêtres de chaque contenu d'une page de résultats
+
+        Chaque correspondance ouvre une fenêtre jusqu'à la dernière
+        correspondance finissant à moins de window_chars caractères. Le score
+        d'une fenêtre est le nombre de termes distincts qu'elle contient
+        (pondéré) plus le nombre total de correspondances ; les fenêtres sont
+        retenues par score décroissant, sans chevauchement.
+
+        Args:
+            contents: Contenus textuels des résultats
+            top_k: Nombre maximal de fenêtres par contenu
+
+        Returns:
+            Pour chaque contenu, fenêtres par score décroissant
+            (vide si aucune correspondance)
+        """
+        contents = [content or "" for content in contents]
+        windows: list[list[HighlightWindow]] = [[] for _ in contents]
+        arrays = self._match_arrays(contents)
+        if arrays is None or top_k <= 0:
+            return windows
+        starts, ends, terms, docs, offsets = arrays
+        width = self.window_chars
+        count = len(starts)
+        index = np.arange(count)
+
+        # Contenus espacés de width + 1 : une fenêtre ne déborde jamais
+        shift = docs * (width + 1)
+        last = np.searchsorted(ends + shift, starts + shift + width, "right") - 1
+        # Mot plus long que la fenêtre : fenêtre réduite à ce mot
+        long_word = last < index
+        last = np.maximum(last, index)
+        distinct = np.zeros(count, dtype=np.intp)
+        for group in range(0, len(self._needles), 4):
+            # Compteurs cumulés de 4 termes par entier (16 bits par terme) :
+            # la différence donne le nombre d'occurrences de chacun
+            field = terms - group
+            inside = (field >= 0) & (field < 4)
+            present = np.zeros(count + 1, dtype=np.int64)
+            present[1:][inside] = np.int64(1) << (field[inside] * 16)
+            cumulated = present.cumsum()
+            counts = cumulated[last + 1] - cumulated[index]
+            for shift in range(0, 64, 16):
+                distinct += ((counts >> shift) & 0xFFFF) > 0
+        scores = np.where(long_word, 3, distinct * 2 + last - index + 1)
+
+        # Sélection gloutonne : à chaque tour, meilleure fenêtre restante de
+        # chaque contenu, puis exclusion de celles qui la chevauchent
+        order = np.argsort((docs << 32) - scores, kind="stable")
+        owners = docs[order]
+        span_start = starts[order]
+        span_end = ends[last[order]]
+        lengths = np.array([len(content) for content in contents])
+        taken_start = np.full(len(contents), -1)
+        taken_end = np.full(len(contents), -1)
+        available = np.ones(count, dtype=bool)
+        rounds = []
+        for _ in range(top_k):
+            remaining = np.flatnonzero(available)
+            if not len(remaining):
+                break
+            remaining_docs = owners[remaining]
+            head = np.ones(len(remaining), dtype=bool)
+            np.not_equal(remaining_docs[1:], remaining_docs[:-1], out=head[1:])
+            best = remaining[head]
+            doc = remaining_docs[head]
+            first, end = span_start[best], span_end[best]
+            # Centrer la fenêtre sur les correspondances
+            slack = np.maximum(0, width - (end - first)) // 2
+            taken_start[doc] = np.maximum(offsets[doc], first - slack)
+            taken_end[doc] = np.minimum(offsets[doc] + lengths[doc], end + slack)
+            rounds.append((order[best], doc, taken_start[doc], taken_end[doc]))
+            available &= (span_start >= taken_end[owners]) | (span_end <= taken_start[owners])
+
+        selected, doc, window_start, window_end = (np.concatenate(column) for column in zip(*rounds))
+        by_doc = np.argsort(doc, kind="stable")
+        selected, doc = selected[by_doc], doc[by_doc]
+        window_start, window_end = window_start[by_doc], window_end[by_doc]
+        sizes = last[selected] - selected + 1
+        bounds = np.cumsum(sizes)
+        members = np.arange(bounds[-1]) + np.repeat(selected - bounds + sizes, sizes)
+        origin = np.repeat(window_start, sizes)
+        matches = list(zip((starts[members] - origin).tolist(), (ends[members] - origin).tolist()))
+
+        window_start = window_start - offsets[doc]
+        window_end = window_end - offsets[doc]
+        previous = 0
+        for d, w_start, w_end, score, bound in zip(
+            doc.tolist(),
+            window_start.tolist(),
+            window_end.tolist(),
+            scores[selected].astype(float).tolist(),
+            bounds.tolist(),
+        ):
+            windows[d].append(HighlightWindow(
+                contents[d][w_start:w_end], w_start, w_end, score, tuple(matches[previous:bound])
+            ))
+            previous = bound
+        return windows
+
+
+@lru_cache(maxsize=256)
+def _compiled(terms: tuple[str, ...], window_chars: int) -> QueryHighlighter:
+    """Cache des extracteurs préparés (requêtes répétées)"""
+    return QueryHighlighter(terms, window_chars)
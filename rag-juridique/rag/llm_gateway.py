@@ -0,0 +1,157 @@
+"""
+Passerelle centralisée pour les appels aux modèles Gemini
+
+Tous les piliers passent par cette passerelle pour appeler generate_content,
+ce qui permet de coalescer les prompts identiques envoyés simultanément et
+de mesurer les tokens (estimés puis réels) et la latence de chaque appel
+(par requête, et dans les métriques de l'API pour les appels réels).
+
+Les modèles Gemini sont créés par la passerelle (un objet par nom de modèle,
+partagé par les piliers) : google.generativeai n'est importé et configuré
+qu'à la création du premier modèle, pas au démarrage de l'API.
+"""
+
+import threading
+import time
+from typing import Any
+
+from config.settings import get_settings
+
+from rag.token_budget import get_token_estimator, record_call
+from utils.metrics import LLM_ERRORS, LLM_RATE_LIMITED, LLM_REQUEST_SECONDS, LLM_TOKENS, Timer
+from utils.singleflight import SingleFlight
+from utils.timing import stage
+
+
+class LLMGateway:
+    """
+    Passerelle d'appel aux modèles Gemini
+
+    Fonctionnalités:
+    - Coalescence des prompts identiques en cours (un seul appel réel)
+    - Point d'entrée unique pour les appels generate_content
+    - Tokens estimés/réels et latence rattachés à la requête en cours,
+      calibration de l'estimateur sur les comptes réels
+    """
+
+    def __init__(self):
+        """Initialise la passerelle"""
+        self.flights = SingleFlight("gemini")
+        self._models: dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def model(self, model_name: str) -> Any:
+        """
+        Modèle Gemini partagé (créé au premier appel pour ce nom)
+
+        Args:
+            model_name: Nom du modèle (GEMINI_PRO_MODEL, GEMINI_FLASH_MODEL)
+
+        Returns:
+            Instance genai.GenerativeModel
+        """
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                import google.generativeai as genai
+
+                if not self._models:
+                    genai.configure(api_key=get_settings().GEMINI_API_KEY)
+                model = self._models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+    def generate_content(
+        self,
+        model: Any,
+        prompt: Any,
+        generation_config: Any = None,
+        estimated_tokens: int | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Appelle model.generate_content en coalesçant les appels identiques
+
+        Args:
+            model: Instance genai.GenerativeModel
+            prompt: Prompt (texte ou contenu multimodal)
+            generation_config: Configuration de génération (optionnelle)
+            estimated_tokens: Tokens du prompt déjà estimés par l'appelant
+            **kwargs: Arguments additionnels pour generate_content
+
+        Returns:
+            Réponse Gemini (partagée entre les appelants coalescés)
+        """
+        key = (
+            getattr(model, "model_name", repr(model)),
+            prompt if isinstance(prompt, str) else repr(prompt),
+            repr(generation_config),
+            repr(sorted(kwargs.items())),
+        )
+
+        estimator = get_token_estimator()
+        if estimated_tokens is None and isinstance(prompt, str):
+            estimated_tokens = estimator.estimate(prompt, key[0])
+
+        with stage(
+            "llm_generate",
+            model=key[0],
+            prompt_chars=len(prompt) if isinstance(prompt, str) else None,
+            estimated_tokens=estimated_tokens,
+        ):
+            start = time.perf_counter()
+            response = self.flights.do(
+                key,
+                self._call,
+                model,
+                prompt,
+                estimated_tokens,
+                generation_config=generation_config,
+                **kwargs,
+            )
+            latency_ms = (time.perf_counter() - start) * 1000
+
+        record_call(key[0], estimated_tokens or 0, latency_ms, response)
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "prompt_token_count", None)
+        if actual and isinstance(prompt, str):
+            estimator.observe(key[0], prompt, actual)
+        return response
+
+    @staticmethod
+    def _call(model: Any, prompt: Any, estimated_tokens: int | None, **kwargs: Any) -> Any:
+        """Appel réel (une fois par groupe coalescé) : durée, erreurs, 429 et tokens"""
+        model_name = getattr(model, "model_name", repr(model))
+        try:
+            with Timer(LLM_REQUEST_SECONDS, model_name, errors=LLM_ERRORS):
+                response = model.generate_content(prompt, **kwargs)
+        except Exception as e:
+            if _is_rate_limited(e):
+                LLM_RATE_LIMITED.inc(model_name)
+            raise
+
+        if estimated_tokens:
+            LLM_TOKENS.inc(model_name, "estimated_input", amount=estimated_tokens)
+        usage = getattr(response, "usage_metadata", None)
+        for kind, attribute in (("input", "prompt_token_count"), ("output", "candidates_token_count")):
+            count = getattr(usage, attribute, None)
+            if count:
+                LLM_TOKENS.inc(model_name, kind, amount=count)
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        """Statistiques de coalescence des appels Gemini"""
+        return self.flights.stats()
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Refus pour quota (google.api_core ResourceExhausted / TooManyRequests : code 429)"""
+    return getattr(error, "code", None) == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+
+
+# Instance globale (partagée par tous les piliers)
+_gateway = LLMGateway()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Retourne la passerelle LLM globale"""
+    return _gateway
@@ -0,0 +1,362 @@
+"""
+Synthèse map-reduce des dossiers volumineux
+
+- Découpage des documents en extraits bornés en tokens, sur les paragraphes
+- Résumé concurrent des extraits (map, modèle Flash)
+- Fusion hiérarchique des résumés partiels (reduce, modèle Flash)
+- Cache des résumés (extraits et fusions) par empreinte du contenu : relancer
+  une synthèse après l'ajout d'un document ne résume que les nouveaux extraits
+  (mémoire bornée en LRU, dossier disque élagué par âge et par taille)
+
+La passe finale (note stratégique, résumé...) reste à la charge de l'appelant.
+"""
+
+import contextvars
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from config.logging_config import get_logger
+from prompts.prompts import PROMPT_CHUNK_SUMMARY, PROMPT_REDUCE_SUMMARIES
+from rag.llm_gateway import get_llm_gateway
+from rag.text_utils import split_sentences
+from rag.token_budget import get_token_estimator
+from utils.timing import stage
+
+logger = get_logger(__name__)
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+# Version des prompts map : à incrémenter pour invalider le cache
+CHUNK_PROMPT_VERSION = "1"
+
+
+def estimate_tokens(text: str, model_name: str | None = None) -> int:
+    """Estimation du nombre de tokens d'un texte (estimateur calibré par modèle)"""
+    return get_token_estimator().estimate(text, model_name)
+
+
+def chunk_documents(
+    documents: list[str],
+    max_tokens: int,
+    model_name: str | None = None,
+) -> list[str]:
+    """
+    Découpe des documents en extraits d'au plus max_tokens, sur les paragraphes
+
+    Les paragraphes consécutifs d'un même document sont regroupés ; un
+    paragraphe trop long est découpé sur les phrases, puis en tranches.
+    Un extrait ne mélange jamais deux documents (extraits stables quand un
+    document est ajouté au dossier). La taille en caractères d'un extrait
+    découle du nombre de caractères par token du document, d'après
+    l'estimation calibrée du modèle.
+
+    Args:
+        documents: Textes des documents
+        max_tokens: Taille maximale d'un extrait (tokens estimés)
+        model_name: Modèle destinataire des extraits (calibration)
+
+    Returns:
+        Extraits, dans l'ordre des documents
+    """
+    estimator = get_token_estimator()
+    chunks: list[str] = []
+
+    for document in documents:
+        tokens = estimator.estimate(document, model_name)
+        if not tokens:
+            continue
+        max_chars = max(1, max_tokens * len(document) // tokens)
+        pieces: list[str] = []
+        for paragraph in _PARAGRAPH_RE.split(document):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) <= max_chars:
+                pieces.append(paragraph)
+                continue
+            for sentence in split_sentences(paragraph):
+                for start in range(0, len(sentence), max_chars):
+                    pieces.append(sentence[start:start + max_chars])
+
+        current: list[str] = []
+        size = 0
+        for piece in pieces:
+            if current and size + len(piece) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+        if current:
+            chunks.append("\n\n".join(current))
+
+    return chunks
+
+
+class ChunkSummaryCache:
+    """
+    Cache des résumés d'extraits (mémoire + disque), clé = empreinte SHA-256
+    du modèle, de la version du prompt et du contenu de l'extrait
+
+    Les résumés lus sur disque sont « touchés » (date de modification) : le
+    dossier est élagué du moins récemment utilisé au plus récent, au
+    démarrage puis toutes les prune_every écritures.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_entries: int = 2000,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_age_days: float = 30,
+        prune_every: int = 100,
+    ):
+        """
+        Args:
+            cache_dir: Dossier de persistance (None : mémoire seulement)
+            max_entries: Résumés gardés en mémoire (les moins récents sont évincés)
+            max_bytes: Taille maximale du dossier disque
+            max_age_days: Âge (dernière utilisation) au-delà duquel un résumé est supprimé du disque
+            prune_every: Écritures entre deux élagages du dossier
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self.prune_every = prune_every
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self.prune()
+
+    @staticmethod
+    def key(model_name: str, chunk: str) -> str:
+        payload = f"{model_name}\0{CHUNK_PROMPT_VERSION}\0{chunk}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            summary = self._memory.get(key)
+        if summary is None and self.cache_dir is not None:
+            path = self.cache_dir / f"{key}.txt"
+            try:
+                summary = path.read_text(encoding="utf-8")
+                os.utime(path)
+            except FileNotFoundError:
+                summary = None
+        with self._lock:
+            if summary is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._remember(key, summary)
+        return summary
+
+    def put(self, key: str, summary: str) -> None:
+        with self._lock:
+            self._remember(key, summary)
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if self.cache_dir is None:
+            return
+        # Écriture atomique (plusieurs workers peuvent résumer le même extrait)
+        path = self.cache_dir / f"{key}.txt"
+        tmp_path = path.with_name(f"{key}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(summary, encoding="utf-8")
+        tmp_path.replace(path)
+        if prune:
+            self.prune()
+
+    def _remember(self, key: str, summary: str) -> None:
+        """Ajoute un résumé au LRU mémoire (verrou tenu par l'appelant)"""
+        self._memory[key] = summary
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def prune(self) -> int:
+        """
+        Supprime du disque les résumés trop anciens, puis les moins
+        récemment utilisés au-delà de max_bytes
+
+        Returns:
+            Nombre de fichiers supprimés
+        """
+        if self.cache_dir is None or not self._prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            entries = []
+            for path in self.cache_dir.glob("*.txt"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort(reverse=True)
+
+            deadline = time.time() - self.max_age_seconds
+            removed = 0
+            total = 0
+            for mtime, size, path in entries:
+                total += size
+                if mtime < deadline or total > self.max_bytes:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+            if removed:
+                logger.debug(f"🧹 Cache des résumés : {removed} fichier(s) supprimé(s)")
+            return removed
+        finally:
+            self._prune_lock.release()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"summaries": len(self._memory), "hits": self.hits, "misses": self.misses}
+
+
+class MapReduceSummarizer:
+    """
+    Résumé hiérarchique d'un dossier trop volumineux pour un seul prompt
+
+    Usage:
+        >>> summarizer = MapReduceSummarizer(model_flash, cache=ChunkSummaryCache(dir))
+        >>> summaries, stats = summarizer.summarize(documents)
+        >>> prompt = PROMPT_STRATEGIC_NOTE.format(documents="\\n\\n".join(summaries))
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        chunk_tokens: int = 6000,
+        reduce_tokens: int = 24000,
+        max_workers: int = 4,
+        cache: ChunkSummaryCache | None = None,
+    ):
+        """
+        Args:
+            model: Modèle des passes map et reduce (Flash)
+            chunk_tokens: Taille maximale d'un extrait (tokens estimés)
+            reduce_tokens: Taille maximale des résumés fusionnés en un appel
+            max_workers: Appels simultanés
+            cache: Cache des résumés d'extraits
+        """
+        self.model = model
+        self.model_name = getattr(model, "model_name", repr(model))
+        self.chunk_tokens = chunk_tokens
+        self.reduce_tokens = reduce_tokens
+        self.max_workers = max_workers
+        self.cache = cache or ChunkSummaryCache()
+
+    def summarize(self, documents: list[str]) -> tuple[list[str], dict[str, Any]]:
+        """
+        Résume les documents jusqu'à tenir dans reduce_tokens
+
+        Args:
+            documents: Textes des documents du dossier
+
+        Returns:
+            Tuple (résumés partiels à transmettre à la passe finale, statistiques)
+        """
+        chunks = chunk_documents(documents, self.chunk_tokens, self.model_name)
+        stats: dict[str, Any] = {
+            "chunks": len(chunks),
+            "cached_chunks": 0,
+            "map_calls": 0,
+            "reduce_levels": 0,
+            "reduce_calls": 0,
+        }
+
+        with stage("map", chunks=len(chunks)):
+            summaries = self._map(chunks, stats)
+
+        tokens = get_token_estimator().estimate_many
+        while len(summaries) > 1 and tokens(summaries, self.model_name) > self.reduce_tokens:
+            groups = self._group(summaries)
+            if len(groups) == len(summaries):
+                # Chaque résumé dépasse déjà le budget : inutile d'aller plus loin
+                break
+            stats["reduce_levels"] += 1
+            with stage("reduce", level=stats["reduce_levels"], groups=len(groups)):
+                summaries = self._run_concurrently(self._reduce_group, groups)
+            stats["reduce_calls"] += len(groups)
+
+        logger.info(
+            f"🧩 Map-reduce : {stats['chunks']} extrait(s) "
+            f"({stats['cached_chunks']} en cache), {stats['reduce_levels']} niveau(x) de fusion"
+        )
+        return summaries, stats
+
+    def _map(self, chunks: list[str], stats: dict[str, Any]) -> list[str]:
+        """Résume les extraits absents du cache, en parallèle"""
+        keys = [ChunkSummaryCache.key(self.model_name, chunk) for chunk in chunks]
+        summaries: list[str | None] = [self.cache.get(key) for key in keys]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        stats["cached_chunks"] = len(chunks) - len(missing)
+        stats["map_calls"] = len(missing)
+
+        total = len(chunks)
+        computed = self._run_concurrently(
+            lambda i: self._summarize_chunk(chunks[i], i + 1, total),
+            missing,
+        )
+        for i, summary in zip(missing, computed):
+            summaries[i] = summary
+            self.cache.put(keys[i], summary)
+        return [s for s in summaries if s]
+
+    def _summarize_chunk(self, chunk: str, index: int, total: int) -> str:
+        prompt = PROMPT_CHUNK_SUMMARY.format(index=index, total=total, chunk=chunk)
+        response = get_llm_gateway().generate_content(self.model, prompt)
+        return response.text.strip()
+
+    def _reduce_group(self, group: list[str]) -> str:
+        summaries = "\n\n---\n\n".join(group)
+        # Groupes inchangés d'une exécution à l'autre : fusion déjà en cache
+        key = ChunkSummaryCache.key(self.model_name, f"reduce\0{summaries}")
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        prompt = PROMPT_REDUCE_SUMMARIES.format(summaries=summaries)
+        response = get_llm_gateway().generate_content(self.model, prompt)
+        summary = response.text.strip()
+        self.cache.put(key, summary)
+        return summary
+
+    def _group(self, summaries: list[str]) -> list[list[str]]:
+        """Regroupe les résumés consécutifs dans la limite de reduce_tokens"""
+        groups: list[list[str]] = []
+        current: list[str] = []
+        size = 0
+        for summary in summaries:
+            tokens = estimate_tokens(summary, self.model_name)
+            if current and size + tokens > self.reduce_tokens:
+                groups.append(current)
+                current, size = [], 0
+            current.append(summary)
+            size += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    def _run_concurrently(self, fn: Any, items: list[Any]) -> list[Any]:
+        """Applique fn à chaque élément (ordre conservé), contexte de mesure propagé"""
+        if not items:
+            return []
+        if len(items) == 1:
+            return [fn(items[0])]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, fn, item)
+                for item in items
+            ]
+            return [future.result() for future in futures]
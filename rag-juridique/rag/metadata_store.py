@@ -0,0 +1,444 @@
+"""
+Instantané colonnaire des métadonnées du corpus (NumPy)
+
+Construit à partir des exports JSONL de l'ingestion (data/exports), il
+contient une ligne par article avec les colonnes :
+- code_id, etat (catégories encodées en entiers)
+- date_debut, date_fin (entiers AAAAMMJJ) et année de début
+- article_num (texte et partie numérique)
+- fil d'Ariane, un niveau par colonne (catégories encodées)
+- index inversé des termes du titre et du fil d'Ariane
+
+Les filtres et l'appariement des termes de la requête produisent des masques
+booléens vectorisés sur l'ensemble du corpus (voir rag.facets).
+
+Construction :
+    python -m rag.metadata_store
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from config.logging_config import get_logger
+from config.settings import get_settings
+from rag.text_utils import query_terms, stem_fr, tokenize
+
+logger = get_logger(__name__)
+settings = get_settings()
+
+# Nombre de niveaux du fil d'Ariane conservés (Code > Livre > Titre > ...)
+MAX_BREADCRUMB_LEVELS = 6
+BREADCRUMB_SEPARATOR = " > "
+
+_DATE_RE = re.compile(r"^(\d{4})-?(\d{2})?-?(\d{2})?")
+_LEADING_NUMBER_RE = re.compile(r"\d+")
+
+
+def _parse_date(value: Any) -> int:
+    """Date ISO (ou préfixe) → entier AAAAMMJJ, 0 si absente"""
+    if not value:
+        return 0
+    match = _DATE_RE.match(str(value))
+    if not match:
+        return 0
+    year, month, day = match.groups()
+    return int(year) * 10000 + int(month or 1) * 100 + int(day or 1)
+
+
+def _parse_article_num(value: Any) -> int:
+    """Partie numérique d'un numéro d'article ("L1234-5" → 1234), -1 sinon"""
+    match = _LEADING_NUMBER_RE.search(str(value or ""))
+    return int(match.group()) if match else -1
+
+
+def _iter_export_records(export_dir: Path) -> Iterator[dict[str, Any]]:
+    """
+    Parcourt les articles des exports JSONL (formats à champs directs et jsonData)
+
+    Args:
+        export_dir: Dossier des exports
+
+    Yields:
+        Dict à plat (id, title, code_id, etat, dates, breadcrumb...)
+    """
+    for path in sorted(export_dir.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+                if "jsonData" in record:
+                    try:
+                        json_data = json.loads(record["jsonData"])
+                    except (TypeError, json.JSONDecodeError):
+                        continue
+                    flat = {
+                        **(json_data.get("metadata") or {}),
+                        "title": json_data.get("title", ""),
+                    }
+                    flat["id"] = record.get("id", "")
+                    yield flat
+                else:
+                    yield record
+
+
+class _Categories:
+    """Encodage des valeurs catégorielles en entiers (vocabulaire croissant)"""
+
+    def __init__(self):
+        self.index: dict[str, int] = {}
+        self.values: list[str] = []
+
+    def encode(self, value: str) -> int:
+        if not value:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.index[value] = code
+            self.values.append(value)
+        return code
+
+
+class MetadataStore:
+    """
+    Métadonnées du corpus en colonnes NumPy
+
+    Usage:
+        >>> store = MetadataStore.build(settings.EXPORT_DIR)
+        >>> store.save(settings.METADATA_SNAPSHOT_PATH)
+        >>> mask = store.filter_mask(code_id="LEGITEXT000006070721", etat="VIGUEUR")
+        >>> mask &= store.query_mask("résiliation du bail")
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        """
+        Args:
+            columns: Colonnes et vocabulaires (voir build / load)
+        """
+        self.ids = columns["ids"]
+        self.code = columns["code"]
+        self.code_values = columns["code_values"]
+        self.code_names = columns["code_names"]
+        self.etat = columns["etat"]
+        self.etat_values = columns["etat_values"]
+        self.date_debut = columns["date_debut"]
+        self.date_fin = columns["date_fin"]
+        self.year = (self.date_debut // 10000).astype(np.int16)
+        self.article_num = columns["article_num"]
+        self.article_num_int = columns["article_num_int"]
+        self.breadcrumb = columns["breadcrumb"]
+        self.breadcrumb_values = [
+            columns[f"breadcrumb_values_{level}"]
+            for level in range(self.breadcrumb.shape[1])
+        ]
+        self.term_values = columns["term_values"]
+        self.term_offsets = columns["term_offsets"]
+        self.term_rows = columns["term_rows"]
+
+        self._row_by_id = {doc_id: row for row, doc_id in enumerate(self.ids.tolist())}
+        self._code_by_value = {v: i for i, v in enumerate(self.code_values.tolist())}
+        self._etat_by_value = {v: i for i, v in enumerate(self.etat_values.tolist())}
+        self._term_by_value = {v: i for i, v in enumerate(self.term_values.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ------------------------------------------------------------------
+    # Construction / persistance
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, export_dir: Path | None = None) -> "MetadataStore":
+        """
+        Construit l'instantané à partir des exports JSONL de l'ingestion
+
+        Un même article présent dans plusieurs exports n'est conservé
+        qu'une fois (dernier export lu).
+
+        Args:
+            export_dir: Dossier des exports (défaut: settings.EXPORT_DIR)
+
+        Returns:
+            Instantané construit
+        """
+        return cls.from_records(_iter_export_records(export_dir or settings.EXPORT_DIR))
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict[str, Any]]) -> "MetadataStore":
+        """
+        Construit l'instantané à partir d'articles à plat
+
+        Args:
+            records: Dicts avec id, title, code_id, code_name, etat,
+                date_debut, date_fin, breadcrumb, article_num
+
+        Returns:
+            Instantané construit
+        """
+        latest: dict[str, dict[str, Any]] = {}
+        for record in records:
+            doc_id = record.get("id") or record.get("article_id")
+            if doc_id:
+                latest[doc_id] = record
+
+        codes, etats = _Categories(), _Categories()
+        code_names: dict[int, str] = {}
+        levels = [_Categories() for _ in range(MAX_BREADCRUMB_LEVELS)]
+        postings: dict[str, list[int]] = {}
+
+        n = len(latest)
+        code = np.full(n, -1, dtype=np.int32)
+        etat = np.full(n, -1, dtype=np.int16)
+        date_debut = np.zeros(n, dtype=np.int32)
+        date_fin = np.zeros(n, dtype=np.int32)
+        article_num_int = np.full(n, -1, dtype=np.int32)
+        breadcrumb = np.full((n, MAX_BREADCRUMB_LEVELS), -1, dtype=np.int32)
+        ids, article_num = [], []
+
+        for row, (doc_id, record) in enumerate(latest.items()):
+            ids.append(doc_id)
+            code[row] = codes.encode(record.get("code_id") or "")
+            if code[row] >= 0 and record.get("code_name"):
+                code_names.setdefault(int(code[row]), record["code_name"])
+            etat[row] = etats.encode((record.get("etat") or "").upper())
+            date_debut[row] = _parse_date(record.get("date_debut"))
+            date_fin[row] = _parse_date(record.get("date_fin"))
+            num = str(record.get("article_num") or "")
+            article_num.append(num)
+            article_num_int[row] = _parse_article_num(num)
+
+            parts = str(record.get("breadcrumb") or "").split(BREADCRUMB_SEPARATOR)
+            for level, part in enumerate(p.strip() for p in parts if p.strip()):
+                if level >= MAX_BREADCRUMB_LEVELS:
+                    break
+                breadcrumb[row, level] = levels[level].encode(part)
+
+            text = f"{record.get('title', '')} {record.get('breadcrumb', '')}"
+            for stem in {stem_fr(w) for w in tokenize(text)}:
+                postings.setdefault(stem, []).append(row)
+
+        term_values = sorted(postings)
+        offsets = np.zeros(len(term_values) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[t]) for t in term_values])
+        rows = (
+            np.concatenate([np.asarray(postings[t], dtype=np.int32) for t in term_values])
+            if term_values
+            else np.zeros(0, dtype=np.int32)
+        )
+
+        columns = {
+            "ids": np.asarray(ids, dtype=str),
+            "code": code,
+            "code_values": np.asarray(codes.values, dtype=str),
+            "code_names": np.asarray(
+                [code_names.get(i, v) for i, v in enumerate(codes.values)], dtype=str
+            ),
+            "etat": etat,
+            "etat_values": np.asarray(etats.values, dtype=str),
+            "date_debut": date_debut,
+            "date_fin": date_fin,
+            "article_num": np.asarray(article_num, dtype=str),
+            "article_num_int": article_num_int,
+            "breadcrumb": breadcrumb,
+            "term_values": np.asarray(term_values, dtype=str),
+            "term_offsets": offsets,
+            "term_rows": rows,
+        }
+        for level, categories in enumerate(levels):
+            columns[f"breadcrumb_values_{level}"] = np.asarray(categories.values, dtype=str)
+
+        logger.info(
+            f"🗂️ Instantané métadonnées : {n} articles, {len(codes.values)} code(s), "
+            f"{len(term_values)} termes indexés"
+        )
+        return cls(columns)
+
+    def save(self, path: Path) -> None:
+        """
+        Sauvegarde l'instantané (.npz, sans pickle)
+
+        Args:
+            path: Chemin du fichier
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        columns = {
+            "ids": self.ids,
+            "code": self.code,
+            "code_values": self.code_values,
+            "code_names": self.code_names,
+            "etat": self.etat,
+            "etat_values": self.etat_values,
+            "date_debut": self.date_debut,
+            "date_fin": self.date_fin,
+            "article_num": self.article_num,
+            "article_num_int": self.article_num_int,
+            "breadcrumb": self.breadcrumb,
+            "term_values": self.term_values,
+            "term_offsets": self.term_offsets,
+            "term_rows": self.term_rows,
+        }
+        for level, values in enumerate(self.breadcrumb_values):
+            columns[f"breadcrumb_values_{level}"] = values
+
+        # Écriture atomique : les lecteurs ne voient jamais un fichier partiel
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **columns)
+        tmp_path.replace(path)
+        logger.info(f"💾 Instantané métadonnées : {path} ({len(self)} articles)")
+
+    @classmethod
+    def load(cls, path: Path) -> "MetadataStore":
+        """
+        Charge un instantané sauvegardé
+
+        Args:
+            path: Chemin du fichier .npz
+
+        Returns:
+            Instantané chargé
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    # ------------------------------------------------------------------
+    # Masques vectorisés
+    # ------------------------------------------------------------------
+
+    def all_rows(self) -> np.ndarray:
+        """Masque sélectionnant tout le corpus"""
+        return np.ones(len(self), dtype=bool)
+
+    def filter_mask(
+        self,
+        code_id: str | None = None,
+        etat: str | None = None,
+        date_min: str | None = None,
+        date_max: str | None = None,
+        article_num_min: int | None = None,
+        article_num_max: int | None = None,
+    ) -> np.ndarray:
+        """
+        Masque des articles satisfaisant les filtres de recherche
+
+        Les dates filtrent la période de vigueur : un article est retenu
+        s'il était en vigueur à un moment de [date_min, date_max].
+
+        Returns:
+            Masque booléen (une valeur par article)
+        """
+        mask = self.all_rows()
+        if code_id:
+            code = self._code_by_value.get(code_id)
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.code == code
+        if etat:
+            value = etat.value if hasattr(etat, "value") else str(etat)
+            state = self._etat_by_value.get(value.upper())
+            if state is None:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.etat == state
+        if date_min:
+            start = _parse_date(date_min)
+            mask &= (self.date_fin == 0) | (self.date_fin >= start)
+        if date_max:
+            end = _parse_date(date_max)
+            mask &= (self.date_debut == 0) | (self.date_debut <= end)
+        if article_num_min is not None:
+            mask &= self.article_num_int >= article_num_min
+        if article_num_max is not None:
+            mask &= (self.article_num_int >= 0) & (self.article_num_int <= article_num_max)
+        return mask
+
+    def term_rows_for(self, term: str) -> np.ndarray | None:
+        """Lignes dont le titre ou le fil d'Ariane contient la racine (None si inconnue)"""
+        index = self._term_by_value.get(term)
+        if index is None:
+            return None
+        return self.term_rows[self.term_offsets[index]:self.term_offsets[index + 1]]
+
+    def query_mask(self, query: str) -> np.ndarray | None:
+        """
+        Masque des articles dont le titre ou le fil d'Ariane contient
+        les termes de la requête
+
+        Tous les termes connus du vocabulaire doivent être présents ; si
+        aucun article ne les contient tous, un seul suffit.
+
+        Args:
+            query: Requête en langage naturel
+
+        Returns:
+            Masque booléen, ou None si aucun terme n'est indexé
+        """
+        postings = [
+            rows for rows in (self.term_rows_for(t) for t in query_terms(query))
+            if rows is not None
+        ]
+        if not postings:
+            return None
+
+        counts = np.zeros(len(self), dtype=np.int16)
+        for rows in postings:
+            counts[rows] += 1
+        mask = counts == len(postings)
+        if not mask.any():
+            mask = counts > 0
+        return mask
+
+    def rows_for_ids(self, ids: Iterable[str]) -> np.ndarray:
+        """Indices des lignes des identifiants connus"""
+        rows = [self._row_by_id[i] for i in ids if i in self._row_by_id]
+        return np.asarray(rows, dtype=np.int64)
+
+
+_store: MetadataStore | None = None
+_store_mtime: float | None = None
+_missing_logged = False
+
+
+def get_metadata_store() -> MetadataStore | None:
+    """
+    Retourne l'instantané des métadonnées (rechargé si le fichier a changé)
+
+    Returns:
+        Instantané, ou None si aucun instantané n'a été construit
+    """
+    global _store, _store_mtime, _missing_logged
+
+    path = settings.METADATA_SNAPSHOT_PATH
+    try:
+        mtime = path.stat().st_mtime
+    except FileNotFoundError:
+        if not _missing_logged:
+            logger.warning(
+                f"⚠️ Instantané métadonnées absent ({path}) : facettes désactivées "
+                "(construction : python -m rag.metadata_store)"
+            )
+            _missing_logged = True
+        _store, _store_mtime = None, None
+        return None
+
+    if _store is None or mtime != _store_mtime:
+        _store = MetadataStore.load(path)
+        _store_mtime = mtime
+        _missing_logged = False
+        logger.info(f"🗂️ Instantané métadonnées chargé : {len(_store)} articles")
+    return _store
+
+
+if __name__ == "__main__":
+    """Construit l'instantané à partir des exports de l'ingestion"""
+    store = MetadataStore.build(settings.EXPORT_DIR)
+    store.save(settings.METADATA_SNAPSHOT_PATH)
@@ -0,0 +1,453 @@
+"""
+Index éphémère du dossier d'un utilisateur (documents uploadés en session)
+
+Les documents du dossier sont découpés en passages, vectorisés localement
+et gardés en mémoire le temps de la session. Le chatbot et la synthèse
+n'injectent alors dans le prompt que les passages pertinents pour la
+question, au lieu du dossier entier.
+
+- Vectorisation locale sans modèle : hachage signé des racines et bigrammes
+  de racines (TF sous-linéaire), pondération IDF propre au dossier
+- Matrice creuse (coordonnées des seuls termes présents, ~100 par passage
+  au lieu des 4096 colonnes) ; la pondération IDF et la normalisation sont
+  appliquées à la recherche, sans seconde copie de la matrice
+- Recherche par produit matrice-vecteur (cosinus) sur la matrice du dossier
+- Sessions expirées après un délai d'inactivité (TTL), nombre borné (LRU),
+  passages bornés par session et mémoire totale bornée (les sessions les
+  moins récentes sont évincées au-delà du budget)
+"""
+
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from config.logging_config import get_logger
+from rag.map_reduce import chunk_documents
+from rag.text_utils import stem_fr, tokenize
+
+logger = get_logger(__name__)
+
+# Racines mémorisées (vocabulaire d'un dossier très répétitif)
+_stem = lru_cache(maxsize=65536)(stem_fr)
+
+
+class HashingEmbedder:
+    """
+    Vectorisation locale par hachage des racines (sans dépendance ni réseau)
+
+    Usage:
+        >>> embedder = HashingEmbedder(dim=4096)
+        >>> matrix = embedder.embed(["Le bail est résilié", "Le congé du locataire"])
+    """
+
+    def __init__(self, dim: int = 4096):
+        """
+        Args:
+            dim: Dimension des vecteurs (nombre de seaux de hachage)
+        """
+        self.dim = dim
+
+    def features(self, text: str) -> list[str]:
+        """Racines et bigrammes de racines d'un texte"""
+        stems = [_stem(word) for word in tokenize(text)]
+        bigrams = [f"{a}_{b}" for a, b in zip(stems, stems[1:])]
+        return stems + bigrams
+
+    def _counts(self, text: str) -> tuple[np.ndarray, np.ndarray] | None:
+        """Seaux non nuls d'un texte et leur poids TF sous-linéaire"""
+        features = self.features(text)
+        if not features:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode("utf-8")) for f in features),
+            dtype=np.uint32,
+            count=len(features),
+        )
+        # Signe du hachage : limite le biais des collisions
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        buckets, inverse = np.unique(hashes % self.dim, return_inverse=True)
+        counts = np.bincount(inverse, weights=signs)
+        nonzero = counts != 0
+        counts = counts[nonzero]
+        return buckets[nonzero], np.sign(counts) * np.log1p(np.abs(counts))
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Vecteurs de fréquences (TF sous-linéaire) des textes
+
+        Args:
+            texts: Textes à vectoriser
+
+        Returns:
+            Matrice (len(texts), dim) en float32, non normalisée
+        """
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = self._counts(text)
+            if counts is not None:
+                matrix[row, counts[0]] = counts[1]
+        return matrix
+
+    def embed_sparse(self, texts: list[str]) -> "SparseTerms":
+        """
+        Vecteurs TF des textes au format creux (coordonnées)
+
+        Args:
+            texts: Textes à vectoriser
+
+        Returns:
+            Termes non nuls (ligne, colonne, valeur), lignes numérotées à partir de 0
+        """
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            counts = self._counts(text)
+            if counts is None:
+                continue
+            rows.append(np.full(len(counts[0]), row, dtype=np.int32))
+            cols.append(counts[0].astype(np.int32))
+            values.append(counts[1].astype(np.float32))
+        if not rows:
+            return SparseTerms.empty()
+        return SparseTerms(np.concatenate(rows), np.concatenate(cols), np.concatenate(values))
+
+
+@dataclass
+class SparseTerms:
+    """Matrice creuse au format coordonnées (ligne, colonne, valeur)"""
+
+    rows: np.ndarray
+    cols: np.ndarray
+    values: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "SparseTerms":
+        return cls(np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float32))
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.cols.nbytes + self.values.nbytes
+
+    def append(self, other: "SparseTerms", row_offset: int) -> "SparseTerms":
+        """Matrice augmentée des lignes d'une autre (décalées de row_offset)"""
+        return SparseTerms(
+            np.concatenate([self.rows, other.rows + row_offset]),
+            np.concatenate([self.cols, other.cols]),
+            np.concatenate([self.values, other.values]),
+        )
+
+
+class SessionIndexFull(ValueError):
+    """Le dossier d'une session dépasse le nombre maximal de passages"""
+
+
+@dataclass
+class SessionPassage:
+    """Un passage d'un document du dossier"""
+
+    document_id: str
+    title: str
+    chunk_index: int
+    text: str
+    score: float = 0.0
+
+    def to_result(self) -> dict[str, Any]:
+        """Format des résultats de recherche (compatible ContextPacker)"""
+        return {
+            "id": f"{self.document_id}#{self.chunk_index}",
+            "title": f"Dossier — {self.title}",
+            "content": self.text,
+            "score": self.score,
+            "metadata": {"breadcrumb": f"Dossier client > {self.title}", "source": "dossier"},
+        }
+
+
+@dataclass
+class SessionDocument:
+    """Un document uploadé dans la session"""
+
+    document_id: str
+    title: str
+    content: str
+    chunks: int
+
+
+@dataclass
+class SessionIndex:
+    """Passages vectorisés du dossier d'une session"""
+
+    session_id: str
+    embedder: HashingEmbedder
+    chunk_tokens: int = 250
+    max_passages: int = 5000
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+    documents: list[SessionDocument] = field(default_factory=list)
+    passages: list[SessionPassage] = field(default_factory=list)
+    _tf: SparseTerms | None = None
+    # Pondération recalculée après ajout : IDF par colonne, norme par ligne
+    _idf: np.ndarray | None = None
+    _norms: np.ndarray | None = None
+    _text_bytes: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add_documents(self, documents: list[dict[str, str]]) -> list[SessionDocument]:
+        """
+        Découpe, vectorise et ajoute des documents au dossier
+
+        Args:
+            documents: Documents {"title", "content"}
+
+        Returns:
+            Documents ajoutés
+
+        Raises:
+            SessionIndexFull: Si le dossier dépasserait max_passages
+        """
+        added: list[SessionDocument] = []
+        new_passages: list[SessionPassage] = []
+        for doc in documents:
+            content = doc.get("content") or ""
+            if not content.strip():
+                continue
+            document_id = uuid.uuid4().hex[:12]
+            title = doc.get("title") or f"Document {len(self.documents) + len(added) + 1}"
+            chunks = chunk_documents([content], self.chunk_tokens)
+            new_passages.extend(
+                SessionPassage(document_id, title, i, chunk) for i, chunk in enumerate(chunks)
+            )
+            added.append(SessionDocument(document_id, title, content, len(chunks)))
+
+        if not new_passages:
+            return added
+        if len(self.passages) + len(new_passages) > self.max_passages:
+            raise SessionIndexFull(
+                f"Dossier trop volumineux : {len(self.passages) + len(new_passages)} passages "
+                f"(maximum {self.max_passages})"
+            )
+
+        tf = self.embedder.embed_sparse([p.text for p in new_passages])
+        text_bytes = sum(len(doc.content) for doc in added) + sum(len(p.text) for p in new_passages)
+        with self._lock:
+            offset = len(self.passages)
+            self.documents.extend(added)
+            self.passages.extend(new_passages)
+            self._tf = tf if self._tf is None else self._tf.append(tf, offset)
+            self._text_bytes += text_bytes
+            self._idf = self._norms = None
+        return added
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire estimée du dossier (textes et matrice)"""
+        arrays = 0 if self._tf is None else self._tf.nbytes
+        if self._norms is not None:
+            arrays += self._norms.nbytes + self._idf.nbytes
+        return self._text_bytes + arrays
+
+    def _weights(self) -> tuple[SparseTerms, np.ndarray, np.ndarray]:
+        """Matrice TF, poids IDF et normes des lignes pondérées (recalculés après ajout)"""
+        with self._lock:
+            tf = self._tf
+            if self._idf is None:
+                rows = len(self.passages)
+                df = np.bincount(tf.cols, minlength=self.embedder.dim)
+                idf = np.log((1 + rows) / (1 + df)).astype(np.float32) + 1.0
+                weighted = tf.values * idf[tf.cols]
+                norms = np.sqrt(np.bincount(tf.rows, weights=weighted * weighted, minlength=rows))
+                norms[norms == 0] = 1.0
+                self._idf, self._norms = idf, norms.astype(np.float32)
+            return tf, self._idf, self._norms
+
+    def search(self, query: str, top_k: int = 8, min_score: float = 0.05) -> list[SessionPassage]:
+        """
+        Passages du dossier les plus proches de la requête
+
+        Args:
+            query: Question ou thème recherché
+            top_k: Nombre maximal de passages
+            min_score: Similarité cosinus minimale
+
+        Returns:
+            Passages par score décroissant
+        """
+        if self._tf is None or not query.strip():
+            return []
+        tf, idf, norms = self._weights()
+        q = self.embedder.embed([query])[0] * idf
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        # Cosinus : q·(tf·idf) / (|q| |tf·idf|), sur les seuls termes non nuls
+        q *= idf / norm
+        scores = np.bincount(tf.rows, weights=tf.values * q[tf.cols], minlength=len(norms)) / norms
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        passages = self.passages
+        return [
+            SessionPassage(
+                passages[i].document_id,
+                passages[i].title,
+                passages[i].chunk_index,
+                passages[i].text,
+                round(float(scores[i]), 4),
+            )
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+    def document_order(self) -> dict[str, int]:
+        """Rang de chaque document dans le dossier (ordre d'upload)"""
+        return {doc.document_id: i for i, doc in enumerate(self.documents)}
+
+    def info(self, ttl_seconds: float) -> dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "documents": [
+                {"document_id": d.document_id, "title": d.title, "chars": len(d.content), "chunks": d.chunks}
+                for d in self.documents
+            ],
+            "chunks": len(self.passages),
+            "created_at": self.created_at,
+            "expires_at": self.last_access + ttl_seconds,
+        }
+
+
+class SessionIndexStore:
+    """
+    Index des sessions en mémoire, avec expiration et nombre borné
+
+    Usage:
+        >>> store = get_session_index_store()
+        >>> index = store.create()
+        >>> index.add_documents([{"title": "Assignation", "content": "..."}])
+        >>> store.get(index.session_id).search("délai de prescription")
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        max_sessions: int = 200,
+        embedding_dim: int = 4096,
+        chunk_tokens: int = 250,
+        max_passages: int = 5000,
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        """
+        Args:
+            ttl_seconds: Durée d'inactivité avant suppression d'une session
+            max_sessions: Nombre maximal de sessions (les moins récentes sont évincées)
+            embedding_dim: Dimension des vecteurs
+            chunk_tokens: Taille d'un passage (tokens estimés)
+            max_passages: Nombre maximal de passages d'une session
+            max_bytes: Mémoire totale des sessions (les moins récentes sont évincées)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.chunk_tokens = chunk_tokens
+        self.max_passages = max_passages
+        self.max_bytes = max_bytes
+        self.embedder = HashingEmbedder(embedding_dim)
+        self._sessions: OrderedDict[str, SessionIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, session_id: str | None = None) -> SessionIndex:
+        """Crée (ou remplace) une session vide"""
+        index = SessionIndex(
+            session_id or uuid.uuid4().hex,
+            self.embedder,
+            chunk_tokens=self.chunk_tokens,
+            max_passages=self.max_passages,
+        )
+        with self._lock:
+            self._evict_expired()
+            self._sessions[index.session_id] = index
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                logger.debug(f"🧹 Session {evicted} évincée (nombre maximal atteint)")
+        return index
+
+    def add_documents(self, index: SessionIndex, documents: list[dict[str, str]]) -> list[SessionDocument]:
+        """
+        Ajoute des documents à une session, puis applique le budget mémoire
+
+        Raises:
+            SessionIndexFull: Si le dossier dépasserait le nombre maximal de passages
+        """
+        added = index.add_documents(documents)
+        with self._lock:
+            self._enforce_budget(keep=index.session_id)
+        return added
+
+    def get(self, session_id: str) -> SessionIndex | None:
+        """Retourne une session active (prolonge sa durée de vie)"""
+        with self._lock:
+            self._evict_expired()
+            index = self._sessions.get(session_id)
+            if index is not None:
+                index.last_access = time.time()
+                self._sessions.move_to_end(session_id)
+            return index
+
+    def delete(self, session_id: str) -> bool:
+        """Supprime une session"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict_expired(self) -> None:
+        deadline = time.time() - self.ttl_seconds
+        # Les sessions sont ordonnées par dernier accès
+        while self._sessions:
+            session_id, index = next(iter(self._sessions.items()))
+            if index.last_access >= deadline:
+                break
+            del self._sessions[session_id]
+            logger.debug(f"🧹 Session {session_id} expirée")
+
+    def _enforce_budget(self, keep: str) -> None:
+        """Évince les sessions les moins récentes au-delà de max_bytes (sauf keep)"""
+        total = sum(index.nbytes for index in self._sessions.values())
+        for session_id in list(self._sessions):
+            if total <= self.max_bytes:
+                break
+            if session_id == keep:
+                continue
+            total -= self._sessions.pop(session_id).nbytes
+            logger.debug(f"🧹 Session {session_id} évincée (budget mémoire atteint)")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "chunks": sum(len(index.passages) for index in self._sessions.values()),
+                "bytes": sum(index.nbytes for index in self._sessions.values()),
+            }
+
+
+_store: SessionIndexStore | None = None
+
+
+def get_session_index_store() -> SessionIndexStore:
+    """Retourne le stockage global des index de session"""
+    global _store
+    if _store is None:
+        from config.settings import get_settings
+
+        settings = get_settings()
+        _store = SessionIndexStore(
+            ttl_seconds=settings.SESSION_INDEX_TTL_SECONDS,
+            max_sessions=settings.SESSION_INDEX_MAX_SESSIONS,
+            embedding_dim=settings.SESSION_INDEX_EMBEDDING_DIM,
+            chunk_tokens=settings.SESSION_INDEX_CHUNK_TOKENS,
+            max_passages=settings.SESSION_INDEX_MAX_CHUNKS,
+            max_bytes=settings.SESSION_INDEX_MAX_BYTES,
+        )
+    return _store
@@ -0,0 +1,192 @@
+"""
+Utilitaires de normalisation de texte pour la recherche
+
+- Normalisation des requêtes (comparaison de recherches identiques)
+- Suppression des accents, tokenisation et racinisation légère (français)
+- Découpage en phrases et shingles (détection de quasi-doublons)
+"""
+
+import hashlib
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+# Ligatures non décomposées par NFKD
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "OE", "æ": "ae", "Æ": "AE"})
+
+# Mots vides français (ignorés pour la pertinence)
+FRENCH_STOPWORDS = frozenset({
+    "a", "au", "aux", "avec", "ce", "ces", "cet", "cette", "dans", "de", "des",
+    "du", "elle", "en", "est", "et", "etre", "il", "ils", "je", "la", "le", "les",
+    "leur", "lui", "ma", "mais", "me", "meme", "mes", "moi", "mon", "ne", "nos",
+    "notre", "nous", "on", "ou", "par", "pas", "pour", "qu", "que", "qui", "sa",
+    "se", "ses", "son", "sur", "ta", "te", "tes", "toi", "ton", "tu", "un", "une",
+    "vos", "votre", "vous", "y", "d", "l", "j", "m", "n", "s", "t", "c",
+    "quel", "quelle", "quels", "quelles", "comment", "quoi", "sont",
+    "ete", "fait", "peut", "doit", "cas", "alors", "donc", "si", "plus",
+})
+
+# Suffixes retirés par la racinisation légère (du plus long au plus court)
+_FRENCH_SUFFIXES = (
+    "issements", "issement", "ements", "ement", "ations", "ation", "itions",
+    "ition", "ances", "ance", "ences", "ence", "euses", "euse", "eurs", "eur",
+    "trices", "trice", "ives", "ive", "ifs", "if", "elles", "elle", "ites",
+    "ite", "iques", "ique", "ismes", "isme", "istes", "iste", "ables", "able",
+    "ees", "ee", "es", "er", "e", "s", "x",
+)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalise une requête pour comparer des recherches identiques
+
+    Unicode NFC, casse ignorée, espaces superflus supprimés.
+    Les accents sont conservés (ils changent le sens en français juridique).
+
+    Args:
+        query: Requête brute
+
+    Returns:
+        Requête normalisée
+    """
+    query = unicodedata.normalize("NFC", query)
+    return _WHITESPACE_RE.sub(" ", query).strip().casefold()
+
+
+def fold_accents(text: str) -> str:
+    """
+    Supprime les accents et met en minuscules ("Résiliation" → "resiliation")
+
+    Args:
+        text: Texte brut
+
+    Returns:
+        Texte sans accents, en minuscules
+    """
+    text = unicodedata.normalize("NFKD", text.translate(_LIGATURES))
+    return text.encode("ascii", "ignore").decode("ascii").lower()
+
+
+def stem_fr(word: str) -> str:
+    """
+    Racinisation légère d'un mot français déjà sans accents
+
+    Retire un suffixe flexionnel/dérivationnel courant en conservant
+    une racine d'au moins 4 caractères ("resiliations" → "resili").
+
+    Args:
+        word: Mot en minuscules sans accents
+
+    Returns:
+        Racine du mot
+    """
+    if word.endswith("aux") and len(word) > 5:
+        return word[:-3] + "al"
+    for suffix in _FRENCH_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str, remove_stopwords: bool = True) -> list[str]:
+    """
+    Découpe un texte en mots sans accents (minuscules)
+
+    Args:
+        text: Texte brut
+        remove_stopwords: Retirer les mots vides français
+
+    Returns:
+        Liste de mots
+    """
+    words = _WORD_RE.findall(fold_accents(text))
+    if remove_stopwords:
+        return [w for w in words if w not in FRENCH_STOPWORDS and len(w) > 1]
+    return words
+
+
+def query_terms(text: str) -> list[str]:
+    """
+    Termes significatifs (racinisés, dédoublonnés) d'une requête
+
+    Args:
+        text: Requête en langage naturel
+
+    Returns:
+        Racines des termes, dans l'ordre d'apparition
+    """
+    seen: dict[str, None] = {}
+    for word in tokenize(text):
+        seen.setdefault(stem_fr(word), None)
+    return list(seen)
+
+
+def split_sentences(text: str) -> list[str]:
+    """
+    Découpe un texte en phrases (ponctuation forte ou retour à la ligne)
+
+    Args:
+        text: Texte brut
+
+    Returns:
+        Phrases non vides
+    """
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+
+def truncate_text(text: str, max_chars: int | None, suffix: str = "...") -> str:
+    """
+    Tronque un texte à max_chars caractères (suivis de suffix)
+
+    Args:
+        text: Texte complet
+        max_chars: Longueur maximale (None : texte inchangé)
+        suffix: Marque de troncature
+
+    Returns:
+        Texte tronqué, ou le texte lui-même s'il est assez court
+    """
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    return text[:max_chars] + suffix
+
+
+def content_hash(text: str) -> str:
+    """
+    Empreinte d'un contenu, insensible à la casse, aux accents et aux espaces
+
+    Args:
+        text: Contenu textuel
+
+    Returns:
+        Empreinte SHA-1 hexadécimale
+    """
+    normalized = " ".join(tokenize(text, remove_stopwords=False))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def shingles(text: str, size: int = 5) -> set[int]:
+    """
+    Ensemble des shingles (n-grammes de mots) d'un texte, hachés
+
+    Args:
+        text: Contenu textuel
+        size: Nombre de mots par shingle
+
+    Returns:
+        Ensemble de hachages de shingles
+    """
+    words = tokenize(text, remove_stopwords=False)
+    if len(words) <= size:
+        return {hash(tuple(words))} if words else set()
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    """Similarité de Jaccard entre deux ensembles"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
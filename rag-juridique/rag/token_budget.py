@@ -0,0 +1,560 @@
+"""
+Estimation locale des tokens et routage des appels LLM
+
+- TokenEstimator : estimation sans appel réseau (mots, chiffres, symboles),
+  calibrée par modèle sur les comptes réels renvoyés par Gemini
+  (usage_metadata) et mise en cache par empreinte de document
+- RoutingPolicy : choix du modèle, appel unique ou map-reduce, refus ou
+  demande de confirmation au-delà d'un plafond de coût — avant tout appel
+- UsageMeter : tokens estimés/réels et latences d'une requête, renvoyés
+  dans la réponse de chaque pilier (décorateur metered)
+
+Calibration hors ligne (compte exact par l'API count_tokens) :
+    python -m rag.token_budget docs/exemple.txt data/raw/*.txt
+"""
+
+import contextvars
+import functools
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_LETTERS_RE = re.compile(r"[^\W\d_]+")
+_DIGITS_RE = re.compile(r"\d")
+_SYMBOLS_RE = re.compile(r"[^\w\s]")
+
+# Coefficients de base (texte juridique français, tokenizer Gemini) ;
+# un facteur de calibration par modèle corrige l'ensemble
+TOKENS_PER_WORD = 1.35
+TOKENS_PER_DIGIT = 1.0
+TOKENS_PER_SYMBOL = 1.0
+
+# En deçà, le texte est compté directement (hachage plus coûteux que le comptage)
+_CACHE_MIN_CHARS = 4096
+# Poids d'une nouvelle observation dans le facteur de calibration
+_CALIBRATION_ALPHA = 0.1
+
+TIER_PRO = "pro"
+TIER_FLASH = "flash"
+
+
+class TokenEstimator:
+    """
+    Estimation rapide du nombre de tokens d'un texte
+
+    Usage:
+        >>> estimator = get_token_estimator()
+        >>> estimator.estimate(document, model_name="models/gemini-pro-latest")
+    """
+
+    def __init__(self, calibration_path: Path | None = None, cache_size: int = 2048):
+        """
+        Args:
+            calibration_path: Fichier JSON des facteurs de calibration par modèle
+            cache_size: Nombre de documents dont les comptes sont conservés
+        """
+        self.calibration_path = calibration_path
+        self.cache_size = cache_size
+        self._cache: OrderedDict[bytes, float] = OrderedDict()
+        self._scales: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if calibration_path is not None and calibration_path.exists():
+            try:
+                self._scales = json.loads(calibration_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Calibration des tokens illisible ({calibration_path}) : {e}")
+
+    @staticmethod
+    def raw_count(text: str) -> float:
+        """Estimation non calibrée (mots, chiffres et symboles)"""
+        return (
+            TOKENS_PER_WORD * len(_LETTERS_RE.findall(text))
+            + TOKENS_PER_DIGIT * len(_DIGITS_RE.findall(text))
+            + TOKENS_PER_SYMBOL * len(_SYMBOLS_RE.findall(text))
+        )
+
+    def raw(self, text: str) -> float:
+        """Estimation non calibrée, en cache par empreinte pour les longs documents"""
+        if len(text) < _CACHE_MIN_CHARS:
+            return self.raw_count(text)
+
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self._lock:
+            count = self._cache.get(key)
+            if count is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return count
+        count = self.raw_count(text)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = count
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return count
+
+    def scale(self, model_name: str | None) -> float:
+        """Facteur de calibration d'un modèle (1.0 si jamais observé)"""
+        return self._scales.get(model_name or "", 1.0)
+
+    def estimate(self, text: str, model_name: str | None = None) -> int:
+        """
+        Nombre de tokens estimé d'un texte
+
+        Args:
+            text: Texte (document, prompt...)
+            model_name: Modèle cible (calibration propre à chaque modèle)
+
+        Returns:
+            Nombre de tokens estimé
+        """
+        if not text:
+            return 0
+        return int(self.raw(text) * self.scale(model_name)) + 1
+
+    def estimate_many(self, texts: list[str], model_name: str | None = None) -> int:
+        """Somme des estimations de plusieurs textes"""
+        return sum(self.estimate(text, model_name) for text in texts if text)
+
+    def observe(self, model_name: str, text: str, actual_tokens: int) -> None:
+        """
+        Ajuste la calibration d'un modèle à partir d'un compte réel
+
+        Args:
+            model_name: Modèle appelé
+            text: Prompt envoyé
+            actual_tokens: prompt_token_count renvoyé par Gemini
+        """
+        raw = self.raw(text)
+        if raw < 50 or actual_tokens <= 0:
+            return
+        ratio = min(max(actual_tokens / raw, 0.25), 4.0)
+        with self._lock:
+            current = self._scales.get(model_name)
+            self._scales[model_name] = (
+                ratio if current is None
+                else (1 - _CALIBRATION_ALPHA) * current + _CALIBRATION_ALPHA * ratio
+            )
+
+    def save(self) -> None:
+        """Persiste les facteurs de calibration"""
+        if self.calibration_path is None:
+            return
+        self.calibration_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.calibration_path.with_suffix(".tmp")
+        with self._lock:
+            tmp_path.write_text(json.dumps(self._scales, indent=2), encoding="utf-8")
+        tmp_path.replace(self.calibration_path)
+
+    def stats(self) -> dict[str, Any]:
+        """Calibration et efficacité du cache"""
+        with self._lock:
+            return {
+                "scales": dict(self._scales),
+                "cached_documents": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# ============================================================================
+# ROUTAGE
+# ============================================================================
+
+@dataclass
+class ModelTier:
+    """Un modèle candidat et son coût"""
+
+    name: str
+    model_name: str
+    context_tokens: int
+    input_price_per_mtok: float
+    output_price_per_mtok: float
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (
+            input_tokens * self.input_price_per_mtok
+            + output_tokens * self.output_price_per_mtok
+        ) / 1_000_000
+
+
+@dataclass
+class RoutePlan:
+    """Décision de routage prise avant l'appel"""
+
+    task: str
+    tier: str
+    model: str
+    strategy: str
+    estimated_input_tokens: int
+    estimated_output_tokens: int
+    estimated_cost_usd: float
+    requires_confirmation: bool = False
+    reasons: list[str] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class TokenBudgetError(Exception):
+    """Appel LLM refusé avant envoi (taille ou coût)"""
+
+    status_code = 413
+
+    def __init__(self, message: str, plan: RoutePlan):
+        super().__init__(message)
+        self.plan = plan
+
+    def to_detail(self) -> dict[str, Any]:
+        return {"message": str(self), "route": self.plan.to_dict()}
+
+
+class CostConfirmationRequired(TokenBudgetError):
+    """Coût estimé au-delà du seuil de confirmation (relancer avec confirm_cost)"""
+
+    status_code = 409
+
+
+class RoutingPolicy:
+    """
+    Choix du modèle et de la stratégie d'appel à partir des tokens estimés
+
+    Règles, dans l'ordre :
+    1. Les tâches complexes vont au modèle Pro, sauf entrée courte (Flash suffit)
+    2. Map-reduce (extraits résumés par Flash) si demandé, si l'entrée dépasse
+       le seuil, ou si elle ne tient pas dans le contexte du modèle
+    3. Refus au-delà du coût maximal, confirmation au-delà du seuil
+
+    Usage:
+        >>> plan = get_routing_policy().plan("synthesis", documents, TIER_PRO, confirmed=False)
+        >>> model = models[plan.tier]
+    """
+
+    def __init__(
+        self,
+        estimator: TokenEstimator,
+        tiers: dict[str, ModelTier],
+        pro_min_input_tokens: int = 1500,
+        map_reduce_threshold_tokens: int = 60000,
+        chunk_tokens: int = 6000,
+        chunk_summary_tokens: int = 800,
+        reduce_tokens: int = 24000,
+        confirm_cost_usd: float = 0.25,
+        max_cost_usd: float = 2.0,
+        max_output_tokens: int = 65536,
+    ):
+        """
+        Args:
+            estimator: Estimateur de tokens
+            tiers: Modèles candidats par niveau (pro, flash)
+            pro_min_input_tokens: Entrée en deçà de laquelle Flash remplace Pro
+            map_reduce_threshold_tokens: Entrée au-delà de laquelle le map-reduce est retenu
+            chunk_tokens: Taille d'un extrait map-reduce
+            chunk_summary_tokens: Taille estimée du résumé d'un extrait
+            reduce_tokens: Taille maximale de l'entrée de la passe finale
+            confirm_cost_usd: Coût au-delà duquel une confirmation est exigée
+            max_cost_usd: Coût au-delà duquel l'appel est refusé
+            max_output_tokens: Plafond de génération d'un appel (borne l'estimation)
+        """
+        self.estimator = estimator
+        self.tiers = tiers
+        self.pro_min_input_tokens = pro_min_input_tokens
+        self.map_reduce_threshold_tokens = map_reduce_threshold_tokens
+        self.chunk_tokens = chunk_tokens
+        self.chunk_summary_tokens = chunk_summary_tokens
+        self.reduce_tokens = reduce_tokens
+        self.confirm_cost_usd = confirm_cost_usd
+        self.max_cost_usd = max_cost_usd
+        self.max_output_tokens = max_output_tokens
+
+    def plan(
+        self,
+        task: str,
+        texts: list[str],
+        preferred_tier: str = TIER_FLASH,
+        output_tokens: int = 2048,
+        prompt_overhead_tokens: int = 1000,
+        allow_map_reduce: bool = False,
+        map_reduce: bool | None = None,
+        confirmed: bool = False,
+    ) -> RoutePlan:
+        """
+        Décide du modèle et de la stratégie, sans appel réseau
+
+        Args:
+            task: Nom de la tâche (synthesis, machine_actes...)
+            texts: Contenus injectés dans le prompt (documents, modèle, données)
+            preferred_tier: Niveau souhaité pour la tâche
+            output_tokens: Taille de réponse attendue (tokens)
+            prompt_overhead_tokens: Instructions du prompt hors contenus
+            allow_map_reduce: La tâche sait résumer son entrée par extraits
+            map_reduce: Choix explicite de l'appelant (None : automatique)
+            confirmed: Le coût a été confirmé par l'utilisateur
+
+        Returns:
+            Plan retenu
+
+        Raises:
+            TokenBudgetError: Entrée trop volumineuse ou coût au-delà du maximum
+            CostConfirmationRequired: Coût au-delà du seuil, non confirmé
+        """
+        reasons: list[str] = []
+        output_tokens = min(output_tokens, self.max_output_tokens)
+        tier = self.tiers.get(preferred_tier) or self.tiers[TIER_FLASH]
+        input_tokens = self.estimator.estimate_many(texts, tier.model_name) + prompt_overhead_tokens
+
+        if tier.name == TIER_PRO and input_tokens < self.pro_min_input_tokens and TIER_FLASH in self.tiers:
+            tier = self.tiers[TIER_FLASH]
+            reasons.append(f"entrée courte ({input_tokens} tokens) : Flash suffit")
+
+        fits = input_tokens + output_tokens <= tier.context_tokens
+        if map_reduce is None:
+            use_map_reduce = allow_map_reduce and (
+                input_tokens > self.map_reduce_threshold_tokens or not fits
+            )
+            if use_map_reduce:
+                reasons.append(f"entrée volumineuse ({input_tokens} tokens) : map-reduce")
+        else:
+            use_map_reduce = map_reduce and allow_map_reduce
+            if not use_map_reduce and not fits and allow_map_reduce:
+                use_map_reduce = True
+                reasons.append("entrée hors contexte du modèle : map-reduce imposé")
+
+        if use_map_reduce:
+            flash = self.tiers.get(TIER_FLASH, tier)
+            chunks = input_tokens // self.chunk_tokens + 1
+            summaries = chunks * self.chunk_summary_tokens
+            final_input = min(summaries, self.reduce_tokens) + prompt_overhead_tokens
+            cost = (
+                flash.cost(input_tokens, summaries)
+                + (flash.cost(summaries, self.reduce_tokens) if summaries > self.reduce_tokens else 0.0)
+                + tier.cost(final_input, output_tokens)
+            )
+        else:
+            cost = tier.cost(input_tokens, output_tokens)
+
+        plan = RoutePlan(
+            task=task,
+            tier=tier.name,
+            model=tier.model_name,
+            strategy="map_reduce" if use_map_reduce else "single",
+            estimated_input_tokens=input_tokens,
+            estimated_output_tokens=output_tokens,
+            estimated_cost_usd=round(cost, 4),
+            reasons=reasons,
+        )
+
+        if not use_map_reduce and not fits:
+            raise TokenBudgetError(
+                f"Entrée trop volumineuse pour {tier.model_name} "
+                f"({input_tokens} tokens estimés, contexte {tier.context_tokens})",
+                plan,
+            )
+        if cost > self.max_cost_usd:
+            raise TokenBudgetError(
+                f"Coût estimé {cost:.2f} $ au-delà du maximum autorisé ({self.max_cost_usd:.2f} $)",
+                plan,
+            )
+        if cost > self.confirm_cost_usd:
+            plan.requires_confirmation = True
+            if not confirmed:
+                raise CostConfirmationRequired(
+                    f"Coût estimé {cost:.2f} $ : confirmation requise (confirm_cost=true)",
+                    plan,
+                )
+
+        logger.info(
+            f"🧭 Routage {task} : {plan.model} ({plan.strategy}), "
+            f"~{input_tokens} tokens, ~{plan.estimated_cost_usd} $"
+        )
+        record_plan(plan)
+        return plan
+
+
+# ============================================================================
+# MESURE DE CONSOMMATION PAR REQUÊTE
+# ============================================================================
+
+_current_meter: contextvars.ContextVar["UsageMeter | None"] = contextvars.ContextVar(
+    "usage_meter", default=None
+)
+
+
+class UsageMeter:
+    """Tokens estimés et réels, latences des appels LLM d'une requête"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.calls: list[dict[str, Any]] = []
+        self.plans: list[RoutePlan] = []
+        self._lock = threading.Lock()
+
+    def add_call(self, call: dict[str, Any]) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            calls = list(self.calls)
+        known = [c for c in calls if c["input_tokens"] is not None]
+        return {
+            "estimated_input_tokens": sum(c["estimated_input_tokens"] for c in calls),
+            "input_tokens": sum(c["input_tokens"] for c in known) if known else None,
+            "output_tokens": sum(c["output_tokens"] or 0 for c in known) if known else None,
+            "llm_calls": len(calls),
+            "llm_latency_ms": round(sum(c["latency_ms"] for c in calls), 3),
+            "latency_ms": round((time.perf_counter() - self.started_at) * 1000, 3),
+            "route": self.plans[-1].to_dict() if self.plans else None,
+            "calls": calls,
+        }
+
+
+def record_plan(plan: RoutePlan) -> None:
+    """Rattache un plan de routage à la requête en cours"""
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.plans.append(plan)
+
+
+def record_call(
+    model_name: str,
+    estimated_input_tokens: int,
+    latency_ms: float,
+    response: Any,
+) -> None:
+    """Enregistre un appel LLM dans la requête en cours (sans effet hors requête)"""
+    meter = _current_meter.get()
+    if meter is None:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    meter.add_call({
+        "model": model_name,
+        "estimated_input_tokens": estimated_input_tokens,
+        "input_tokens": getattr(usage, "prompt_token_count", None),
+        "output_tokens": getattr(usage, "candidates_token_count", None),
+        "latency_ms": round(latency_ms, 3),
+    })
+
+
+def metered(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Décorateur des points d'entrée des piliers : mesure les appels LLM de
+    la requête et renseigne response.usage
+
+    Usage:
+        >>> @metered
+        >>> @explained("audit")
+        >>> def audit(self, request: AuditRequest) -> AuditResponse:
+        >>>     ...
+    """
+    @functools.wraps(method)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        meter = UsageMeter()
+        token = _current_meter.set(meter)
+        try:
+            response = method(*args, **kwargs)
+        finally:
+            _current_meter.reset(token)
+        if hasattr(response, "usage"):
+            usage = meter.to_dict()
+            validator = getattr(response, "__pydantic_validator__", None)
+            if validator is not None:
+                # Conversion du dict vers le modèle du champ (LLMUsage)
+                validator.validate_assignment(response, "usage", usage)
+            else:
+                response.usage = usage
+        return response
+    return wrapper
+
+
+# ============================================================================
+# INSTANCES GLOBALES
+# ============================================================================
+
+_estimator: TokenEstimator | None = None
+_policy: RoutingPolicy | None = None
+
+
+def get_token_estimator() -> TokenEstimator:
+    """Retourne l'estimateur global (calibration chargée au premier appel)"""
+    global _estimator
+    if _estimator is None:
+        from config.settings import get_settings
+
+        _estimator = TokenEstimator(get_settings().TOKEN_CALIBRATION_PATH)
+    return _estimator
+
+
+def get_routing_policy() -> RoutingPolicy:
+    """Retourne la politique de routage configurée"""
+    global _policy
+    if _policy is None:
+        from config.settings import get_settings
+
+        settings = get_settings()
+        _policy = RoutingPolicy(
+            get_token_estimator(),
+            tiers={
+                TIER_PRO: ModelTier(
+                    TIER_PRO,
+                    settings.GEMINI_PRO_MODEL,
+                    settings.LLM_CONTEXT_TOKENS,
+                    settings.LLM_PRO_INPUT_PRICE_PER_MTOK,
+                    settings.LLM_PRO_OUTPUT_PRICE_PER_MTOK,
+                ),
+                TIER_FLASH: ModelTier(
+                    TIER_FLASH,
+                    settings.GEMINI_FLASH_MODEL,
+                    settings.LLM_CONTEXT_TOKENS,
+                    settings.LLM_FLASH_INPUT_PRICE_PER_MTOK,
+                    settings.LLM_FLASH_OUTPUT_PRICE_PER_MTOK,
+                ),
+            },
+            pro_min_input_tokens=settings.LLM_PRO_MIN_INPUT_TOKENS,
+            map_reduce_threshold_tokens=settings.SYNTHESIS_MAP_REDUCE_THRESHOLD_TOKENS,
+            chunk_tokens=settings.SYNTHESIS_CHUNK_TOKENS,
+            reduce_tokens=settings.SYNTHESIS_REDUCE_TOKENS,
+            confirm_cost_usd=settings.LLM_COST_CONFIRM_USD,
+            max_cost_usd=settings.LLM_COST_MAX_USD,
+            max_output_tokens=settings.LLM_MAX_OUTPUT_TOKENS,
+        )
+    return _policy
+
+
+if __name__ == "__main__":
+    # Calibration sur des documents représentatifs (compte exact via count_tokens)
+    import sys
+
+    import google.generativeai as genai
+
+    from config.logging_config import setup_logging
+    from config.settings import get_settings
+
+    setup_logging()
+    settings = get_settings()
+    genai.configure(api_key=settings.GEMINI_API_KEY)
+    estimator = get_token_estimator()
+
+    for model_name in (settings.GEMINI_PRO_MODEL, settings.GEMINI_FLASH_MODEL):
+        model = genai.GenerativeModel(model_name)
+        for path in sys.argv[1:]:
+            text = Path(path).read_text(encoding="utf-8", errors="replace")
+            actual = model.count_tokens(text).total_tokens
+            before = estimator.estimate(text, model_name)
+            estimator.observe(model_name, text, actual)
+            logger.info(f"{model_name} | {path} : estimé {before}, réel {actual}")
+
+    estimator.save()
+    logger.success(f"✅ Calibration enregistrée : {estimator.stats()['scales']}")
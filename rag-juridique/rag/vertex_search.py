@@ -1,19 +1,35 @@
 """
 Module d'intégration avec Google Vertex AI Search
 Permet d'effectuer des recherches sémantiques dans le corpus juridique
+
+Le SDK Discovery Engine (gRPC, ~1 s d'import) n'est chargé qu'à la création
+du premier client, pas à l'import du module.
 """
 
+import uuid
 from typing import Any
 
-from google.api_core.client_options import ClientOptions
-from google.cloud import discoveryengine_v1 as discoveryengine
-
 from config.logging_config import get_logger
 from config.settings import get_settings
+from rag.text_utils import normalize_query
+from utils.metrics import VERTEX_SEARCH_ERRORS, VERTEX_SEARCH_SECONDS, Timer
+from utils.singleflight import SingleFlight
+from utils.timing import stage
 
 logger = get_logger(__name__)
 settings = get_settings()
 
+# Recherches identiques en cours, partagées entre toutes les instances du client
+_search_flights = SingleFlight("vertex_search")
+
+
+def _clone_results(results: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Copie des résultats remise à chaque appelant (métadonnées incluses)"""
+    return [
+        {**doc, "metadata": dict(doc.get("metadata") or {})}
+        for doc in results
+    ]
+
 
 class VertexSearchClient:
     """
@@ -50,6 +66,9 @@ class VertexSearchClient:
             )
         
         # Initialisation du client Discovery Engine
+        from google.api_core.client_options import ClientOptions
+        from google.cloud import discoveryengine_v1 as discoveryengine
+        
         client_options = ClientOptions(
             api_endpoint=f"{self.location}-discoveryengine.googleapis.com"
             if self.location != "global"
@@ -97,9 +116,52 @@ class VertexSearchClient:
             >>> for doc in results:
             >>>     print(doc['title'], doc['content'][:100])
         """
-        logger.info(f"🔍 Recherche: '{query}'")
+        # Les recherches identiques simultanées partagent un seul appel distant
+        key = (
+            self.serving_config,
+            normalize_query(query),
+            page_size,
+            filter_expression.strip(),
+            order_by.strip(),
+            repr(sorted(kwargs.items())),
+        )
+        with stage("vertex_search", page_size=page_size) as current:
+            results = _search_flights.do(
+                key,
+                self._search_remote,
+                query,
+                page_size,
+                filter_expression,
+                order_by,
+                clone=_clone_results,
+                **kwargs,
+            )
+            if current is not None:
+                # Sans sous-étape : résultat partagé d'une recherche identique en cours
+                current.attributes["coalesced"] = not current.children
+                current.attributes["results"] = len(results)
+        return results
+    
+    def _search_remote(
+        self,
+        query: str,
+        page_size: int,
+        filter_expression: str,
+        order_by: str,
+        **kwargs: Any,
+    ) -> list[dict[str, Any]]:
+        """
+        Exécute la recherche auprès de Vertex AI Search
+        
+        Returns:
+            Liste de documents trouvés avec leurs métadonnées
+        """
+        request_id = uuid.uuid4().hex[:12]
+        logger.info(f"🔍 Recherche [{request_id}]: '{query}'")
+        
+        # Construction de la requête (SDK déjà chargé par __init__)
+        from google.cloud import discoveryengine_v1 as discoveryengine
         
-        # Construction de la requête
         request = discoveryengine.SearchRequest(
             serving_config=self.serving_config,
             query=query,
@@ -111,14 +173,21 @@ class VertexSearchClient:
         
         try:
             # Exécution de la recherche
-            response = self.client.search(request)
+            with stage("remote_call", request_id=request_id) as current, \
+                    Timer(VERTEX_SEARCH_SECONDS, errors=VERTEX_SEARCH_ERRORS):
+                response = self.client.search(request)
+                if current is not None:
+                    current.attributes["attribution_token"] = getattr(
+                        response, "attribution_token", ""
+                    )
             
             # Extraction des résultats
-            results = []
-            for result in response.results:
-                doc_data = self._extract_document_data(result)
-                if doc_data:
-                    results.append(doc_data)
+            with stage("extraction"):
+                results = []
+                for result in response.results:
+                    doc_data = self._extract_document_data(result)
+                    if doc_data:
+                        results.append(doc_data)
             
             logger.success(f"✅ {len(results)} résultats trouvés")
             return results
@@ -127,6 +196,16 @@ class VertexSearchClient:
             logger.error(f"❌ Erreur lors de la recherche: {e}")
             raise
     
+    @staticmethod
+    def coalescing_stats() -> dict[str, Any]:
+        """
+        Statistiques de coalescence des recherches identiques
+        
+        Returns:
+            Dict avec appels réels, appels coalescés et ratio
+        """
+        return _search_flights.stats()
+    
     def search_with_answer(
         self,
         query: str,
@@ -185,6 +264,7 @@ class VertexSearchClient:
                     "content": struct_data.get("content", ""),
                     "title": struct_data.get("title", ""),
                     "metadata": {
+                        "article_id": struct_data.get("article_id", ""),
                         "code_id": struct_data.get("code_id", ""),
                         "code_name": struct_data.get("code_name", ""),
                         "type": struct_data.get("type", ""),
@@ -0,0 +1,53 @@
+"""
+Tests du remplissage déterministe des actes (utils.act_fill)
+"""
+
+from utils.act_fill import PlaceholderFiller, parse_client_fields
+
+
+def test_gender_of_single_named_party():
+    filler = PlaceholderFiller({"vendeur": "Jean Martin", "vendeur_civilite": "M."})
+    result = filler.fill("Le vendeur, Monsieur/Madame [VENDEUR], né(e) à Lyon.")
+    assert result.complete
+    assert result.sections[0] == "Le vendeur, Monsieur Jean Martin, né à Lyon."
+
+
+def test_party_without_civilite_does_not_borrow_other_party_gender():
+    # Régression : le genre connu du vendeur était appliqué à l'acheteur
+    filler = PlaceholderFiller({
+        "vendeur": "Jean Martin",
+        "vendeur_civilite": "M.",
+        "acheteur": "Marie Durand",
+    })
+    result = filler.fill("L'acheteur, Monsieur/Madame [ACHETEUR], né(e) à Paris.")
+    assert not result.complete
+    assert "accord en genre" in result.unmapped
+    assert "Monsieur/Madame" in result.sections[0]
+    assert "né(e)" in result.sections[0]
+
+
+def test_single_known_gender_applies_when_no_party_named():
+    filler = PlaceholderFiller({"civilite": "Mme", "ville": "Paris"})
+    result = filler.fill("Domicilié(e) à [VILLE].")
+    assert result.complete
+    assert result.sections[0] == "Domiciliée à Paris."
+
+
+def test_two_parties_with_different_genders_are_ambiguous():
+    filler = PlaceholderFiller({
+        "vendeur": "Jean Martin",
+        "vendeur_civilite": "M.",
+        "acheteur": "Marie Durand",
+        "acheteur_civilite": "Mme",
+    })
+    result = filler.fill("[VENDEUR] et [ACHETEUR], né(e)s à Paris.")
+    assert not result.complete
+
+
+def test_placeholder_matches_nested_field_in_any_word_order():
+    filler = PlaceholderFiller(parse_client_fields(
+        '{"vendeur": {"nom": "Jean Martin", "adresse": "3 rue Neuve"}}', "json"
+    ))
+    result = filler.fill("[NOM DU VENDEUR], demeurant {{ adresse_du_vendeur }}.")
+    assert result.complete
+    assert result.sections[0] == "Jean Martin, demeurant 3 rue Neuve."
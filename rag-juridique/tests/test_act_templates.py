@@ -0,0 +1,79 @@
+"""Tests du cache des actes modèles compilés (utils.act_templates)"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.act_templates import ActTemplateCompiler
+
+TEMPLATE = "Entre les soussignés [NOM] et {{ acquereur }}, prix : ________"
+
+
+def test_concurrent_bind_keeps_every_prefix(tmp_path):
+    compiler = ActTemplateCompiler(cache_dir=tmp_path)
+    compiled = compiler.compile_text(TEMPLATE)
+    act_types = [f"type_{i}" for i in range(16)]
+    barrier = threading.Barrier(len(act_types))
+
+    def bind(act_type):
+        barrier.wait()
+        return compiler.bind(compiled, "client", act_type=act_type)
+
+    with ThreadPoolExecutor(max_workers=len(act_types)) as pool:
+        prompts = list(pool.map(bind, act_types))
+
+    assert all("client" in prompt for prompt in prompts)
+    expected = {f"standard:{act_type}" for act_type in act_types}
+    assert set(compiled.prefixes) == expected
+    # Le fichier persisté contient tous les préfixes (aucune écriture perdue)
+    data = json.loads((tmp_path / f"{compiled.template_id}.json").read_text(encoding="utf-8"))
+    assert set(data["prefixes"]) == expected
+
+
+def test_bind_replaces_prefixes_instead_of_mutating(tmp_path):
+    compiler = ActTemplateCompiler(cache_dir=tmp_path)
+    compiled = compiler.compile_text(TEMPLATE)
+    before = compiled.prefixes
+    compiler.bind(compiled, "client", act_type="contract_sale")
+    assert before == {}
+    assert list(compiled.prefixes) == ["standard:contract_sale"]
+
+
+def test_disk_cache_keeps_most_recently_used(tmp_path):
+    compiler = ActTemplateCompiler(cache_dir=tmp_path, max_templates=1, max_disk_templates=3, prune_every=1)
+    first = compiler.compile_text(f"{TEMPLATE} 0")
+    path = tmp_path / f"{first.template_id}.json"
+    os.utime(path, (1, 1))
+    for i in range(1, 4):
+        compiler.compile_text(f"{TEMPLATE} {i}")
+        if i == 1:
+            # Relu sur disque (évincé de la mémoire) : redevient récent
+            compiler.compile_text(f"{TEMPLATE} 0")
+    assert len(list(tmp_path.glob("*.json"))) == 3
+    assert path.exists()
+
+
+def test_disk_cache_bounded_in_bytes(tmp_path):
+    compiler = ActTemplateCompiler(cache_dir=tmp_path, max_disk_bytes=1, prune_every=1)
+    compiler.compile_text(TEMPLATE)
+    compiler.compile_text(f"{TEMPLATE} bis")
+    assert list(tmp_path.glob("*.json")) == []
+    # Le cache mémoire sert toujours
+    assert compiler.compile_text(TEMPLATE).text == TEMPLATE
+
+
+def test_compile_bytes_extracts_only_unknown_content(tmp_path):
+    compiler = ActTemplateCompiler(cache_dir=tmp_path)
+    content = b"%PDF-1.7 modele"
+    extractions = []
+
+    def extract():
+        extractions.append(1)
+        return TEMPLATE
+
+    first = compiler.compile_bytes(content, extract)
+    again = compiler.compile_bytes(memoryview(content), extract)
+    assert again is first
+    assert len(extractions) == 1
+    assert [slot.name for slot in first.slots][:2] == ["NOM", "acquereur"]
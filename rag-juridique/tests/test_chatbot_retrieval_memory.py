@@ -0,0 +1,60 @@
+"""
+Tests de la mémoire de recherche du chatbot (api.chatbot_avocat)
+"""
+
+import time
+
+from api.chatbot_avocat import ConversationRetrievalMemory
+
+RESULTS = [
+    {
+        "title": "Code du travail - Article L1234-1",
+        "content": "Le licenciement du salarié ouvre droit à un préavis et à une indemnité "
+                   "de licenciement ; le délai de prescription de l'action est de douze mois.",
+    }
+]
+
+
+def make_memory(**kwargs) -> ConversationRetrievalMemory:
+    memory = ConversationRetrievalMemory(**kwargs)
+    memory.remember("c1", "Quelles sont les conditions du licenciement économique ?", RESULTS)
+    return memory
+
+
+def test_short_unrelated_question_is_not_a_follow_up():
+    memory = make_memory()
+    previous = memory.previous("c1")
+    # Termes présents dans les sources, mais aucun lien avec la requête précédente
+    assert not memory.is_follow_up("Délai de prescription ?", previous)
+
+
+def test_short_question_reusing_previous_terms_is_a_follow_up():
+    memory = make_memory()
+    previous = memory.previous("c1")
+    assert memory.is_follow_up("Licenciement pour faute ?", previous)
+    assert memory.is_follow_up("Et pour les cadres ?", previous)
+    assert memory.is_follow_up("Quel préavis pour celui-ci ?", previous)
+
+
+def test_sources_reused_only_with_overlap():
+    memory = make_memory()
+    previous = memory.previous("c1")
+    # Relance introduite par « et » couverte par les sources mais sans lien
+    # avec la requête précédente : pas de réutilisation
+    assert memory.coverage("Et le délai de prescription ?", previous) >= memory.coverage_threshold
+    assert not memory.refers_to("Et le délai de prescription ?", previous)
+    assert memory.refers_to("Et le préavis de ce licenciement ?", previous)
+
+
+def test_conversations_are_bounded():
+    memory = make_memory(max_conversations=2)
+    memory.remember("c2", "bail commercial", [])
+    memory.remember("c3", "bail d'habitation", [])
+    assert memory.previous("c1") is None
+    assert memory.previous("c3") is not None
+
+
+def test_conversations_expire():
+    memory = make_memory(ttl_seconds=60)
+    memory.previous("c1").last_access = time.time() - 120
+    assert memory.previous("c1") is None
@@ -0,0 +1,29 @@
+"""
+Tests du stockage des téléchargements (utils.download_store)
+"""
+
+import io
+
+from utils.download_store import DownloadStore
+
+
+def test_put_file_streams_into_blob(tmp_path):
+    store = DownloadStore(tmp_path)
+    data = b"%PDF-1.4 " + b"x" * 200_000
+    doc = store.put_file(io.BytesIO(data), "acte.pdf", "application/pdf", chunk_size=4096)
+
+    assert doc.size == len(data)
+    assert store.blob_path(doc.sha256).read_bytes() == data
+    assert store.get(doc.id).filename == "acte.pdf"
+    assert not list(store.incoming_dir.iterdir())
+
+
+def test_put_file_deduplicates_with_put(tmp_path):
+    store = DownloadStore(tmp_path)
+    first = store.put(b"contenu identique", "a.txt", "text/plain")
+    second = store.put_file(io.BytesIO(b"contenu identique"), "b.txt", "text/plain")
+
+    assert first.sha256 == second.sha256
+    assert first.id != second.id
+    assert store.stats()["blobs"] == 1
+    assert not list(store.incoming_dir.iterdir())
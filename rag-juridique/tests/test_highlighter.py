@@ -0,0 +1,64 @@
+"""
+Tests de l'extraction d'extraits (rag.highlighter)
+"""
+
+from rag.highlighter import QueryHighlighter, fold_bytes, original_position
+
+
+def matched_words(query: str, content: str) -> list[str]:
+    highlighter = QueryHighlighter.for_query(query)
+    return [content[start:end] for start, end, _ in highlighter.find_matches(content)]
+
+
+def test_fold_keeps_positions():
+    content = "L’Article « Résiliation » — délai"
+    folded, inserted = fold_bytes(content)
+    assert inserted is None
+    assert folded == b'l\'article " resiliation " - delai'
+
+
+def test_fold_expands_ligatures():
+    folded, inserted = fold_bytes("Cœur, Æ")
+    assert folded == b"coeur, ae"
+    assert [original_position(pos, inserted) for pos in range(len(folded))] == [0, 1, 1, 2, 3, 4, 5, 6, 6]
+
+
+def test_ligatures_match_query_terms():
+    content = "Au cœur du litige, le curriculum vitæ et l’œuvre du salarié."
+    assert matched_words("coeur", content) == ["cœur"]
+    assert matched_words("cœur", content) == ["cœur"]
+    assert matched_words("oeuvre", content) == ["œuvre"]
+
+
+def test_positions_after_ligature_point_to_original_text():
+    contents = ["Le sœur", "Les mœurs et l’article 1240 du code civil"]
+    highlighter = QueryHighlighter.for_query("article code")
+    matches = highlighter.find_matches_many(contents)
+    assert matches[0] == []
+    assert [contents[1][s:e] for s, e, _ in matches[1]] == ["article", "code"]
+
+
+def test_typographic_apostrophe_and_quotes():
+    content = "Vu l’article 1103 et la clause dite «résolutoire»."
+    assert matched_words("article résolutoire", content) == ["article", "résolutoire"]
+
+
+def test_highlight_window_text_contains_match():
+    content = "Préambule. " * 30 + "Le cœur du contrat est la clause de résiliation."
+    windows = QueryHighlighter.for_query("coeur résiliation").highlight(content, top_k=1)
+    assert windows
+    window = windows[0]
+    assert [window.text[s:e] for s, e in window.matches] == ["cœur", "résiliation"]
+
+
+def test_long_roots_and_words_across_contents():
+    contents = [
+        "La constitutionnalité de la loi",
+        None,
+        "Contrôle de constitutionnalité : anticonstitutionnellement, inconstitutionnel.",
+    ]
+    highlighter = QueryHighlighter.for_query("constitutionnalité")
+    windows = highlighter.highlight_many(contents, top_k=3)
+    assert windows[1] == []
+    assert [[w.text[s:e] for s, e in w.matches] for w in windows[0]] == [["constitutionnalité"]]
+    assert [contents[2][s:e] for s, e, _ in highlighter.find_matches(contents[2])] == ["constitutionnalité"]
@@ -0,0 +1,126 @@
+"""
+Tests de la génération d'actes par lot (api.machine_actes_batch)
+"""
+
+import json
+import threading
+import zipfile
+
+import pytest
+
+from api.machine_actes_batch import ActBatchRunner, BatchRunningError
+from api.models import ActGenerationResponse, ActType, BatchActGenerationRequest
+
+
+class BlockingMachine:
+    """Génère un acte factice après le signal `release`"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def generate(self, request):
+        self.started.set()
+        self.release.wait(5)
+        return ActGenerationResponse(
+            act_type=request.act_type,
+            generated_act="ACTE",
+            output_format=request.output_format,
+            confidence=0.9,
+            warnings=[],
+        )
+
+
+def make_request() -> BatchActGenerationRequest:
+    return BatchActGenerationRequest(
+        act_type=ActType.CONTRACT_SALE,
+        template_content="CONTRAT DE VENTE entre [NOM] et ...",
+        rows_data="nom\nDupont\nMartin\n",
+    )
+
+
+def test_second_runner_on_same_batch_is_refused(tmp_path):
+    machine = BlockingMachine()
+    runner = ActBatchRunner(machine, batches_dir=tmp_path, concurrency=1, max_retries=0)
+    request = runner.create(make_request())
+    thread = threading.Thread(target=runner.run, args=(request,))
+    thread.start()
+    try:
+        assert machine.started.wait(5)
+        assert runner.is_running(request.batch_id)
+        with pytest.raises(BatchRunningError):
+            ActBatchRunner(machine, batches_dir=tmp_path).run(request)
+    finally:
+        machine.release.set()
+        thread.join(10)
+
+    assert not runner.is_running(request.batch_id)
+    assert runner.status(request.batch_id).succeeded == 2
+
+
+class CountingMachine:
+    """Génère un acte factice par ligne et compte les appels"""
+
+    def __init__(self, fail_after: int | None = None):
+        self.calls = 0
+        self.fail_after = fail_after
+
+    def generate(self, request):
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise KeyboardInterrupt  # arrêt brutal du processus
+        return ActGenerationResponse(
+            act_type=request.act_type,
+            generated_act=f"ACTE\n{request.client_data}",
+            output_format=request.output_format,
+            confidence=0.9,
+            warnings=[],
+        )
+
+
+def make_rows_request(rows: int) -> BatchActGenerationRequest:
+    return BatchActGenerationRequest(
+        act_type=ActType.CONTRACT_SALE,
+        template_content="CONTRAT DE VENTE entre [NOM] et ...",
+        rows_data="nom\n" + "\n".join(f"Client{i}" for i in range(rows)) + "\n",
+    )
+
+
+def test_crash_mid_batch_keeps_generated_acts(tmp_path):
+    crashing = CountingMachine(fail_after=40)
+    runner = ActBatchRunner(crashing, batches_dir=tmp_path, concurrency=1, max_retries=0)
+    request = runner.create(make_rows_request(60))
+    with pytest.raises(KeyboardInterrupt):
+        runner.run(request)
+    # Arrêt avant tout enregistrement du manifeste (kill -9) et acte
+    # interrompu pendant son écriture
+    manifest_path = tmp_path / request.batch_id / "manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    for row in manifest["rows"]:
+        row["status"] = "pending"
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    (runner.acts_dir(request.batch_id) / "0041_client40.txt.123.tmp").write_text("ACT")
+
+    machine = CountingMachine()
+    result = ActBatchRunner(machine, batches_dir=tmp_path, concurrency=2, max_retries=0).run(request)
+
+    assert machine.calls == 20
+    assert result.succeeded == 60
+    assert not list(runner.acts_dir(request.batch_id).glob("*.tmp"))
+
+
+def test_archive_is_rebuilt_when_acts_are_added(tmp_path):
+    runner = ActBatchRunner(CountingMachine(), batches_dir=tmp_path, concurrency=1, max_retries=0)
+    request = runner.create(make_rows_request(3))
+    assert runner.build_archive(request.batch_id) is None
+
+    runner.run(request)
+    path = runner.build_archive(request.batch_id)
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ["0001_client0.txt", "0002_client1.txt", "0003_client2.txt"]
+        assert archive.read("0002_client1.txt").decode("utf-8") == "ACTE\nnom: Client1"
+    assert runner.build_archive(request.batch_id).stat().st_mtime_ns == path.stat().st_mtime_ns
+
+    (runner.acts_dir(request.batch_id) / "0004_extra.txt").write_text("ACTE")
+    with zipfile.ZipFile(runner.build_archive(request.batch_id)) as archive:
+        assert len(archive.namelist()) == 4
@@ -0,0 +1,67 @@
+"""
+Tests du cache des résumés d'extraits (rag.map_reduce)
+"""
+
+import os
+import time
+
+from rag.map_reduce import ChunkSummaryCache, chunk_documents, estimate_tokens
+
+
+def test_memory_is_bounded_lru(tmp_path):
+    cache = ChunkSummaryCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    assert cache.stats()["summaries"] == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+
+
+def test_disk_hit_survives_memory_eviction(tmp_path):
+    cache = ChunkSummaryCache(tmp_path, max_entries=1)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+
+
+def test_prune_removes_old_files(tmp_path):
+    cache = ChunkSummaryCache(tmp_path, max_age_days=1)
+    cache.put("old", "résumé ancien")
+    cache.put("new", "résumé récent")
+    two_days_ago = time.time() - 2 * 86400
+    os.utime(tmp_path / "old.txt", (two_days_ago, two_days_ago))
+
+    assert cache.prune() == 1
+    assert not (tmp_path / "old.txt").exists()
+    assert (tmp_path / "new.txt").exists()
+
+
+def test_prune_keeps_most_recently_used_within_size(tmp_path):
+    cache = ChunkSummaryCache(tmp_path, max_bytes=250)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.put(key, "x" * 100)
+        stamp = time.time() - 100 + i
+        os.utime(tmp_path / f"{key}.txt", (stamp, stamp))
+
+    cache.prune()
+    assert sorted(path.stem for path in tmp_path.glob("*.txt")) == ["b", "c"]
+
+
+def test_prune_runs_every_n_writes(tmp_path):
+    cache = ChunkSummaryCache(tmp_path, max_bytes=150, prune_every=3)
+    for key in ("a", "b", "c"):
+        cache.put(key, "x" * 100)
+        time.sleep(0.01)
+    assert len(list(tmp_path.glob("*.txt"))) == 1
+
+
+def test_chunks_follow_calibrated_token_estimate():
+    # Texte chiffré : bien plus de tokens par caractère que la prose
+    document = "\n\n".join(
+        f"Article {i} : 12 345,67 € au 01/02/2024 (réf. 98-765-432)." for i in range(200)
+    )
+    chunks = chunk_documents([document], max_tokens=300)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 330 for chunk in chunks)
@@ -0,0 +1,30 @@
+"""
+Tests des métriques collectées à la lecture de /metrics (api.metrics)
+"""
+
+import rag.token_budget as token_budget
+import utils.act_templates as act_templates
+from api.metrics import metrics_text
+
+
+class CountingCompiler:
+    def __init__(self):
+        self.calls = 0
+
+    def stats(self):
+        self.calls += 1
+        return {"hits": 3, "disk_hits": 1, "compilations": 2}
+
+
+def test_scrape_reads_existing_caches_once_without_building(monkeypatch):
+    compiler = CountingCompiler()
+    monkeypatch.setattr(act_templates, "_compiler", compiler)
+    monkeypatch.setattr(token_budget, "_estimator", None)
+
+    text = metrics_text()
+
+    assert compiler.calls == 1
+    assert 'legalrag_cache_requests_total{cache="act_templates",result="hit"} 4' in text
+    assert 'legalrag_cache_hit_ratio{cache="act_templates"}' in text
+    assert 'cache="token_estimates"' not in text
+    assert token_budget._estimator is None
@@ -0,0 +1,16 @@
+"""Tests de l'extraction de style PDF (utils.pdf_style_analyzer)"""
+
+from utils.pdf_style_analyzer import PDFStyleAnalyzer
+
+
+def test_pdf_without_pages_gives_default_style():
+    analyzer = PDFStyleAnalyzer.__new__(PDFStyleAnalyzer)
+    technical, structured, images = analyzer._merge_pages([], total_pages=0)
+
+    assert technical["page_dimensions"]["format"] == "A4"
+    assert technical["text_margins"] == {"top": 72.0, "bottom": 72.0, "left": 72.0, "right": 72.0}
+    assert technical["total_pages"] == 0
+    assert technical["sampled_pages"] == []
+    assert technical["body_font_size"] is None
+    assert structured["header"] == "" and structured["footer"] == ""
+    assert images == {"images": []}
@@ -0,0 +1,41 @@
+"""Tests du profilage à la demande (utils.profiling)"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from utils import profiling
+from utils.profiling import CPROFILE, ProfileSession
+from utils.timing import StageTimer, stage
+
+
+def busy(n: int) -> int:
+    with stage("busy"):
+        return sum(i * i for i in range(n))
+
+
+def test_cprofile_session_covers_pool_threads():
+    session = ProfileSession(mode=CPROFILE)
+    with session.activate():
+        with StageTimer("test"):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                futures = [pool.submit(copy_context().run, busy, 20000) for _ in range(4)]
+                results = [future.result() for future in futures]
+
+    assert len(set(results)) == 1
+    stats = session.stats()
+    assert stats is not None
+    # Corps de busy(), exécuté dans les threads du pool
+    assert any(filename.endswith("test_profiling.py") for filename, _, _ in stats.stats)
+    assert profiling.ACTIVE == 0
+
+
+def test_attach_failure_does_not_break_the_stage(monkeypatch):
+    session = ProfileSession(mode=CPROFILE)
+
+    def fail():
+        raise ValueError("Another profiling tool is already active")
+
+    with session.activate():
+        monkeypatch.setattr(session, "attach", fail)
+        with StageTimer("test"):
+            assert busy(10) == 285
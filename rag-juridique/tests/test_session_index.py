@@ -0,0 +1,49 @@
+"""
+Tests de l'index éphémère du dossier de session (rag.session_index)
+"""
+
+import pytest
+
+from rag.session_index import HashingEmbedder, SessionIndex, SessionIndexFull, SessionIndexStore
+
+DOCUMENTS = [
+    {"title": "Bail", "content": "Le preneur doit payer le loyer au bailleur à chaque échéance. " * 40},
+    {"title": "Congé", "content": "Le congé du locataire est délivré par acte d'huissier. " * 40},
+]
+
+
+def test_search_ranks_matching_document_first():
+    index = SessionIndex("s", HashingEmbedder(dim=1024))
+    index.add_documents(DOCUMENTS)
+    passages = index.search("congé délivré au locataire", top_k=3)
+    assert passages
+    assert passages[0].title == "Congé"
+    assert passages == sorted(passages, key=lambda p: -p.score)
+
+
+def test_term_matrix_is_sparse():
+    index = SessionIndex("s", HashingEmbedder(dim=4096))
+    index.add_documents(DOCUMENTS)
+    dense_bytes = len(index.passages) * 4096 * 4
+    assert index._tf.nbytes < dense_bytes / 10
+
+
+def test_passage_cap_per_session():
+    index = SessionIndex("s", HashingEmbedder(dim=1024), chunk_tokens=50, max_passages=5)
+    with pytest.raises(SessionIndexFull):
+        index.add_documents(DOCUMENTS)
+    assert not index.passages
+
+
+def test_memory_budget_evicts_least_recent_sessions():
+    probe = SessionIndex("probe", HashingEmbedder(dim=1024))
+    probe.add_documents(DOCUMENTS)
+    store = SessionIndexStore(embedding_dim=1024, max_bytes=int(probe.nbytes * 2.5))
+
+    sessions = [store.create() for _ in range(3)]
+    for index in sessions:
+        store.add_documents(index, DOCUMENTS)
+
+    assert store.get(sessions[0].session_id) is None
+    assert store.get(sessions[2].session_id) is sessions[2]
+    assert store.stats()["bytes"] <= store.max_bytes
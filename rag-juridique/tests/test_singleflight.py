@@ -0,0 +1,51 @@
+"""Tests de la coalescence des appels identiques (utils.singleflight)"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.singleflight import SingleFlight
+
+
+def test_leader_and_waiters_receive_private_copies():
+    flights = SingleFlight("test")
+    started = threading.Event()
+    release = threading.Event()
+    shared = []
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        result = [{"id": "a", "metadata": {"score": 1}}]
+        shared.append(result)
+        return result
+
+    def clone(results):
+        return [{**doc, "metadata": dict(doc["metadata"])} for doc in results]
+
+    def call():
+        results = flights.do("q", fetch, clone=clone)
+        # Chaque appelant modifie sa copie pendant que les autres copient
+        results[0]["metadata"]["score"] += 1
+        results.append({"id": "local"})
+        return results
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(call)
+        assert started.wait(5)
+        waiters = [pool.submit(call) for _ in range(3)]
+        while flights.stats()["coalesced"] < 3:
+            threading.Event().wait(0.001)
+        release.set()
+        outcomes = [leader.result()] + [waiter.result() for waiter in waiters]
+
+    assert flights.stats()["calls"] == 1
+    assert shared == [[{"id": "a", "metadata": {"score": 1}}]]
+    for results in outcomes:
+        assert results == [{"id": "a", "metadata": {"score": 2}}, {"id": "local"}]
+
+
+def test_without_clone_all_callers_share_the_result():
+    flights = SingleFlight("test")
+    result = flights.do("q", lambda: {"value": 1})
+    assert result == {"value": 1}
+    assert flights.in_flight() == 0
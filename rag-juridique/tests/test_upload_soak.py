@@ -0,0 +1,29 @@
+"""
+Test d'endurance des uploads : salve de 100 envois simultanés contre l'API
+lancée dans un processus séparé (benchmarks/bench_uploads.py)
+"""
+
+import sys
+
+import pytest
+
+from benchmarks.bench_uploads import run_soak
+
+UPLOADS = 100
+SIZE_MB = 8
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="mesures lues dans /proc")
+def test_upload_soak_bounded_memory_and_no_leftover_spool_files(tmp_path):
+    result = run_soak(tmp_path, uploads=UPLOADS, size_mb=SIZE_MB)
+
+    assert result.accepted == UPLOADS
+    assert result.oversize_status == 413
+    # Tampons sur disque au-delà de 1 Mo : le pic ne suit pas le volume reçu
+    assert result.peak_growth_mb < result.received_mb / 2, (
+        f"pic +{result.peak_growth_mb:.0f} Mo pour {result.received_mb:.0f} Mo reçus"
+    )
+    # Tampons des uploads supprimés et fermés
+    assert result.leftover_files == 0
+    assert result.spool_descriptors == 0
+    assert result.descriptors <= result.descriptors_idle + 2
@@ -0,0 +1,33 @@
+"""Tests de l'état de disponibilité du préchauffage (api.warmup)"""
+
+import threading
+from types import SimpleNamespace
+
+from api.warmup import DONE, TIMED_OUT, Warmup
+
+
+def make_warmup(timeout: float) -> tuple[Warmup, threading.Event]:
+    release = threading.Event()
+    services = SimpleNamespace(warm_up=lambda workers: release.wait() and {})
+    settings = SimpleNamespace(
+        WARMUP_TIMEOUT_SECONDS=timeout,
+        SERVICES_WARMUP_WORKERS=1,
+        WARMUP_PROBE_QUERY="",
+    )
+    warmup = Warmup(services=services, settings=settings)
+    warmup._preload_local_caches = lambda: (True, {})
+    return warmup, release
+
+
+def test_blocked_warmup_times_out_without_becoming_ready():
+    warmup, release = make_warmup(timeout=0.0)
+    warmup.start()
+    status = warmup.status()
+    assert not status["ready"]
+    assert status["state"] == TIMED_OUT
+
+    release.set()
+    assert warmup.wait(5)
+    status = warmup.status()
+    assert status["ready"]
+    assert status["state"] == DONE
@@ -0,0 +1,486 @@
+"""
+Remplissage déterministe des actes modèles (sans LLM)
+
+Quand les emplacements d'un modèle ([NOM], {{client}}, blancs libellés)
+correspondent aux champs des données client, l'acte est complété
+localement : instantané, gratuit et reproductible. Seuls les paragraphes
+restant incomplets (emplacement sans donnée, accord indéterminé) sont
+confiés au LLM.
+
+Mises en forme :
+- dates : "2025-12-18", "18/12/2025" → "18 décembre 2025" (1er du mois)
+- montants : "75000" → "75 000" ; [PRIX EN LETTRES] ou {{ prix|lettres }}
+  → "soixante-quinze mille euros"
+- accords : né(e), domicilié(e), Monsieur/Madame, il/elle... selon la
+  civilité de la partie citée dans le paragraphe
+"""
+
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from rag.text_utils import fold_accents
+from utils.act_templates import BLANK_RE, BRACKET_RE, MUSTACHE_RE, blank_label
+
+MONTHS_FR = [
+    "janvier", "février", "mars", "avril", "mai", "juin",
+    "juillet", "août", "septembre", "octobre", "novembre", "décembre",
+]
+
+_UNITS = [
+    "zéro", "un", "deux", "trois", "quatre", "cinq", "six", "sept", "huit", "neuf",
+    "dix", "onze", "douze", "treize", "quatorze", "quinze", "seize",
+]
+_TENS = {2: "vingt", 3: "trente", 4: "quarante", 5: "cinquante", 6: "soixante"}
+
+# Mots de liaison ignorés pour rapprocher emplacements et champs ([NOM DU VENDEUR] ↔ nom_vendeur)
+_CONNECTORS = {"de", "du", "des", "la", "le", "les", "l", "d"}
+
+_AMOUNT_HINTS = ("prix", "montant", "loyer", "somme", "capital", "salaire", "indemnite", "depot", "charges", "honoraires")
+_WORDS_SUFFIXES = ("_en_lettres", "_lettres")
+_FIGURES_SUFFIXES = ("_en_chiffres", "_chiffres")
+_FILTERS = {"lettres": "words", "chiffres": "figures", "date": "date"}
+
+_NUMERIC_RE = re.compile(r"^[\d\s  .,]+(?:€|eur|euros)?$", re.IGNORECASE)
+_CURRENCY_AFTER_RE = re.compile(r"\s*(?:euros?\b|€)", re.IGNORECASE)
+_CURRENCY_END_RE = re.compile(r"\s*(?:d'euros|euros?)$")
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%Y-%m-%dT%H:%M:%S")
+
+# Accords en genre
+_GENDER_KEYS = ("civilite", "sexe", "genre", "titre")
+_MASCULINE = {"m", "m.", "mr", "monsieur", "homme", "h", "masculin"}
+_FEMININE = {"mme", "madame", "mlle", "mademoiselle", "femme", "f", "feminin"}
+# Rôles des parties : un paragraphe qui en cite un dont le genre est inconnu
+# n'emprunte pas celui d'une autre partie
+_PARTY_ROLES = frozenset({
+    "vendeur", "acheteur", "acquereur", "bailleur", "preneur", "locataire",
+    "proprietaire", "client", "employeur", "salarie", "cedant", "cessionnaire",
+    "mandant", "mandataire", "donateur", "donataire", "emprunteur", "preteur",
+    "debiteur", "creancier", "caution", "associe", "gerant", "epoux", "epouse",
+    "demandeur", "defendeur", "requerant", "beneficiaire", "partie", "prestataire",
+})
+_INCLUSIVE_RE = re.compile(r"\b([A-Za-zÀ-ÿ]+)\((e|ne|le)\)")
+_GENDER_PAIRS = {
+    "Monsieur/Madame": ("Monsieur", "Madame"),
+    "M./Mme": ("M.", "Mme"),
+    "il/elle": ("il", "elle"),
+    "Il/Elle": ("Il", "Elle"),
+    "le/la": ("le", "la"),
+    "Le/La": ("Le", "La"),
+    "celui/celle": ("celui", "celle"),
+    "du/de la": ("du", "de la"),
+    "au/à la": ("au", "à la"),
+}
+_PAIR_RE = re.compile(
+    r"(?<![\w/])(" + "|".join(re.escape(pair) for pair in _GENDER_PAIRS) + r")(?![\w/])"
+)
+
+
+# ==============================================================================
+# MISES EN FORME
+# ==============================================================================
+
+def _below_100(n: int) -> str:
+    if n < 17:
+        return _UNITS[n]
+    if n < 20:
+        return "dix-" + _UNITS[n - 10]
+    tens, unit = divmod(n, 10)
+    if tens == 7:
+        return "soixante et onze" if unit == 1 else "soixante-" + _below_100(10 + unit)
+    if tens == 8:
+        return "quatre-vingts" if unit == 0 else "quatre-vingt-" + _UNITS[unit]
+    if tens == 9:
+        return "quatre-vingt-" + _below_100(10 + unit)
+    if unit == 0:
+        return _TENS[tens]
+    if unit == 1:
+        return f"{_TENS[tens]} et un"
+    return f"{_TENS[tens]}-{_UNITS[unit]}"
+
+
+def _below_1000(n: int) -> str:
+    hundreds, rest = divmod(n, 100)
+    parts = []
+    if hundreds == 1:
+        parts.append("cent")
+    elif hundreds > 1:
+        parts.append(f"{_UNITS[hundreds]} {'cents' if rest == 0 else 'cent'}")
+    if rest:
+        parts.append(_below_100(rest))
+    return " ".join(parts)
+
+
+def number_to_words(n: int) -> str:
+    """
+    Nombre entier en toutes lettres (orthographe traditionnelle des actes)
+
+    >>> number_to_words(75000)
+    'soixante-quinze mille'
+    >>> number_to_words(280)
+    'deux cent quatre-vingts'
+    """
+    if n == 0:
+        return "zéro"
+    if n < 0:
+        return "moins " + number_to_words(-n)
+
+    parts = []
+    for value, name in ((10**9, "milliard"), (10**6, "million")):
+        count, n = divmod(n, value)
+        if count:
+            parts.append(f"{number_to_words(count)} {name}{'s' if count > 1 else ''}")
+    thousands, n = divmod(n, 1000)
+    if thousands == 1:
+        parts.append("mille")
+    elif thousands:
+        # "cent" et "vingt" restent invariables devant "mille"
+        words = _below_1000(thousands)
+        parts.append(re.sub(r"(cent|vingt)s$", r"\1", words) + " mille")
+    if n:
+        parts.append(_below_1000(n))
+    return " ".join(parts)
+
+
+def parse_amount(value: str) -> Decimal | None:
+    """Montant numérique ("75 000", "1.250,50 €", "850") ; None si non numérique"""
+    value = value.strip()
+    if not value or not _NUMERIC_RE.match(value):
+        return None
+    digits = re.sub(r"(?i)€|euros?|eur|[\s  ]", "", value)
+    # Le dernier séparateur suivi de 1 ou 2 chiffres est décimal
+    match = re.match(r"^(.*?)[.,](\d{1,2})$", digits)
+    if match:
+        digits = re.sub(r"[.,]", "", match.group(1)) + "." + match.group(2)
+    else:
+        digits = re.sub(r"[.,]", "", digits)
+    try:
+        return Decimal(digits)
+    except InvalidOperation:
+        return None
+
+
+def format_amount(amount: Decimal) -> str:
+    """Montant en chiffres ("75 000", "1 250,50")"""
+    units = int(amount)
+    cents = int((amount - units) * 100)
+    text = f"{units:,}".replace(",", " ")
+    return f"{text},{cents:02d}" if cents else text
+
+
+def amount_to_words(amount: Decimal, currency: str = "euro") -> str:
+    """
+    Montant en toutes lettres
+
+    >>> amount_to_words(Decimal("75000"))
+    'soixante-quinze mille euros'
+    >>> amount_to_words(Decimal("2000000.5"))
+    "deux millions d'euros et cinquante centimes"
+    """
+    units = int(amount)
+    cents = int((amount - units) * 100)
+    words = number_to_words(units)
+    if units >= 10**6 and units % 10**6 == 0:
+        words += f" d'{currency}s"
+    else:
+        words += f" {currency}{'s' if units > 1 else ''}"
+    if cents:
+        words += f" et {number_to_words(cents)} centime{'s' if cents > 1 else ''}"
+    return words
+
+
+def parse_date(value: str) -> date | None:
+    """Date numérique ("2025-12-18", "18/12/2025") ; None sinon"""
+    value = value.strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def format_date_fr(value: date) -> str:
+    """Date en toutes lettres ("18 décembre 2025", "1er janvier 2026")"""
+    day = "1er" if value.day == 1 else str(value.day)
+    return f"{day} {MONTHS_FR[value.month - 1]} {value.year}"
+
+
+# ==============================================================================
+# DONNÉES CLIENT
+# ==============================================================================
+
+def normalize_key(name: str) -> str:
+    """Clé comparable d'un champ ou d'un emplacement ("Nom du vendeur" → "nom_du_vendeur")"""
+    return re.sub(r"[^a-z0-9]+", "_", fold_accents(name)).strip("_")
+
+
+def _loose_key(key: str) -> frozenset[str]:
+    """Mots d'une clé hors mots de liaison, sans ordre ("nom_du_vendeur" ↔ "vendeur_nom")"""
+    return frozenset(part for part in key.split("_") if part and part not in _CONNECTORS)
+
+
+def _flatten(data: dict, prefix: str = "") -> dict[str, str]:
+    fields: dict[str, str] = {}
+    for key, value in data.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            fields.update(_flatten(value, name))
+        elif value is not None:
+            fields[name] = str(value)
+    return fields
+
+
+def parse_client_fields(client_data: str, data_format: str) -> dict[str, str]:
+    """
+    Champs des données client
+
+    Args:
+        client_data: Données brutes de la requête
+        data_format: Format (json, csv : première ligne, text/form : "clé : valeur")
+
+    Returns:
+        Champs par clé normalisée (vide si les données ne sont pas structurées)
+    """
+    raw: dict[str, str] = {}
+    if data_format == "json":
+        try:
+            parsed = json.loads(client_data)
+        except json.JSONDecodeError:
+            parsed = None
+        if isinstance(parsed, dict):
+            raw = _flatten(parsed)
+    elif data_format == "csv":
+        rows = list(csv.DictReader(io.StringIO(client_data.strip())))
+        if rows:
+            raw = {k: v for k, v in rows[0].items() if k and v}
+    else:
+        for line in client_data.splitlines():
+            match = re.match(r"^\s*[-•*]?\s*([^:=]{1,60}?)\s*[:=]\s*(.+?)\s*$", line)
+            if match:
+                raw[match.group(1)] = match.group(2)
+
+    return {normalize_key(key): value.strip() for key, value in raw.items() if normalize_key(key)}
+
+
+def detect_genders(fields: dict[str, str]) -> dict[str, str]:
+    """
+    Genre de chaque partie décrite par les données client
+
+    La partie est le reste de la clé de civilité ("vendeur_civilite",
+    "civilite_acheteur" → vendeur, acheteur ; "civilite" → ""), ou la clé
+    d'une valeur commençant par Monsieur / Madame.
+
+    Returns:
+        Genre ("m", "f") par partie
+    """
+    genders: dict[str, str] = {}
+    for key, value in fields.items():
+        folded = fold_accents(value).strip()
+        parts = key.split("_")
+        gender_parts = [part for part in parts if part in _GENDER_KEYS]
+        if gender_parts:
+            party = "_".join(part for part in parts if part not in _GENDER_KEYS)
+            if folded in _MASCULINE:
+                genders[party] = "m"
+            elif folded in _FEMININE:
+                genders[party] = "f"
+        elif re.match(r"^(monsieur|m\.)\s", folded):
+            genders[key] = "m"
+        elif re.match(r"^(madame|mme|mademoiselle)\s", folded):
+            genders[key] = "f"
+    return genders
+
+
+def has_agreement_markers(text: str) -> bool:
+    return bool(_INCLUSIVE_RE.search(text) or _PAIR_RE.search(text))
+
+
+def apply_agreement(text: str, gender: str) -> str:
+    """Résout les formes d'accord (né(e) → né / née, Monsieur/Madame → ...)"""
+    feminine = gender == "f"
+    text = _INCLUSIVE_RE.sub(lambda m: m.group(1) + (m.group(2) if feminine else ""), text)
+    return _PAIR_RE.sub(lambda m: _GENDER_PAIRS[m.group(1)][1 if feminine else 0], text)
+
+
+# ==============================================================================
+# REMPLISSAGE
+# ==============================================================================
+
+@dataclass
+class FillResult:
+    """Acte complété localement, paragraphe par paragraphe"""
+
+    sections: list[str]
+    separators: list[str]
+    unresolved: list[int] = field(default_factory=list)
+    filled: list[str] = field(default_factory=list)
+    unmapped: list[str] = field(default_factory=list)
+    blanks_left: list[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.unresolved
+
+    def assemble(self, sections: list[str] | None = None) -> str:
+        sections = sections or self.sections
+        parts = []
+        for section, separator in zip(sections, self.separators):
+            parts.append(section)
+            parts.append(separator)
+        return "".join(parts)
+
+
+class PlaceholderFiller:
+    """
+    Complète les emplacements d'un modèle à partir des champs client
+
+    Usage:
+        >>> filler = PlaceholderFiller(parse_client_fields(data, "json"))
+        >>> result = filler.fill(compiled.text)
+        >>> if result.complete: acte = result.assemble()
+    """
+
+    def __init__(self, fields: dict[str, str]):
+        self.fields = fields
+        self._loose = {
+            loose: value for key, value in fields.items() if (loose := _loose_key(key))
+        }
+        self.genders = detect_genders(fields)
+
+    def gender_for(self, keys: list[str]) -> str | None:
+        """
+        Genre à appliquer à un paragraphe, d'après les emplacements qu'il contient
+
+        Returns:
+            Genre de l'unique partie citée ; à défaut de partie citée, genre
+            commun à toutes les parties connues ; None si l'accord est ambigu
+            ou si une partie citée n'a pas de civilité connue
+        """
+        referenced = {
+            gender
+            for party, gender in self.genders.items()
+            if party and any(key == party or party in key.split("_") for key in keys)
+        }
+        named_roles = {part for key in keys for part in key.split("_") if part in _PARTY_ROLES}
+        for role in named_roles:
+            role_genders = {gender for party, gender in self.genders.items() if role in party.split("_")}
+            if not role_genders:
+                # Partie citée sans civilité : l'accord est confié au LLM
+                return None
+            referenced |= role_genders
+        if len(referenced) == 1:
+            return referenced.pop()
+        if referenced:
+            return None
+        known = set(self.genders.values())
+        return known.pop() if len(known) == 1 else None
+
+    def lookup(self, name: str) -> str | None:
+        """Valeur mise en forme d'un emplacement (None si aucun champ ne correspond)"""
+        name, _, filter_name = name.partition("|")
+        key = normalize_key(name)
+        kind = _FILTERS.get(filter_name.strip().lower())
+
+        value = self._find(key)
+        if value is None and kind is None:
+            # [PRIX EN LETTRES] → champ "prix" en toutes lettres
+            for suffixes, suffix_kind in ((_WORDS_SUFFIXES, "words"), (_FIGURES_SUFFIXES, "figures")):
+                for suffix in suffixes:
+                    if key.endswith(suffix):
+                        key, kind = key[: -len(suffix)], suffix_kind
+                        value = self._find(key)
+                        break
+                if kind:
+                    break
+        if value is None:
+            return None
+        return self._format(key, value, kind)
+
+    def _find(self, key: str) -> str | None:
+        for candidate in (key, f"{key}_nom"):
+            # [VENDEUR] ↔ {"vendeur": {"nom": ...}}
+            if candidate in self.fields:
+                return self.fields[candidate]
+            loose = _loose_key(candidate)
+            value = self._loose.get(loose) if loose else None
+            if value is not None:
+                return value
+        return None
+
+    def _format(self, key: str, value: str, kind: str | None) -> str:
+        if kind in ("words", "figures"):
+            amount = parse_amount(value)
+            if amount is None:
+                return value
+            return amount_to_words(amount) if kind == "words" else format_amount(amount)
+        if kind == "date" or "date" in key:
+            parsed = parse_date(value)
+            return format_date_fr(parsed) if parsed else value
+        if any(hint in key for hint in _AMOUNT_HINTS):
+            amount = parse_amount(value)
+            return format_amount(amount) if amount is not None else value
+        return value
+
+    def fill(self, text: str) -> FillResult:
+        """
+        Complète le modèle paragraphe par paragraphe
+
+        Un paragraphe reste « non résolu » s'il contient un emplacement
+        [..] / {{..}} sans champ correspondant, ou des accords alors que
+        le genre est inconnu. Les blancs sans champ restent à compléter à
+        la main (signatures, mentions manuscrites).
+        """
+        pieces = re.split(r"(\n\s*\n)", text)
+        sections, separators = pieces[0::2], pieces[1::2] + [""]
+        result = FillResult(sections=[], separators=separators)
+
+        for index, section in enumerate(sections):
+            missing: list[str] = []
+            keys: list[str] = []
+
+            def replace_slot(match: re.Match) -> str:
+                name = re.sub(r"\s+", "", match.group(1)) if match.re is MUSTACHE_RE else match.group(1).strip()
+                keys.append(normalize_key(name.partition("|")[0]))
+                value = self.lookup(name)
+                if value is None:
+                    missing.append(name)
+                    return match.group(0)
+                result.filled.append(name)
+                # "[PRIX EN LETTRES] euros" : la devise n'est pas répétée
+                if _CURRENCY_AFTER_RE.match(match.string, match.end()):
+                    value = _CURRENCY_END_RE.sub("", value)
+                return value
+
+            def replace_blank(match: re.Match) -> str:
+                label = blank_label(match.string, match.start())
+                value = self.lookup(label) if label else None
+                if value is None:
+                    result.blanks_left.append(label or "blanc")
+                    return match.group(0)
+                result.filled.append(label)
+                return value
+
+            filled = BRACKET_RE.sub(replace_slot, section)
+            filled = MUSTACHE_RE.sub(replace_slot, filled)
+            if has_agreement_markers(filled):
+                gender = self.gender_for(keys)
+                if gender:
+                    filled = apply_agreement(filled, gender)
+                else:
+                    missing.append("accord en genre")
+            filled = BLANK_RE.sub(replace_blank, filled)
+
+            if missing:
+                result.unresolved.append(index)
+                result.unmapped.extend(missing)
+            result.sections.append(filled)
+
+        result.filled = list(dict.fromkeys(result.filled))
+        result.unmapped = list(dict.fromkeys(result.unmapped))
+        result.blanks_left = list(dict.fromkeys(result.blanks_left))
+        return result
@@ -0,0 +1,491 @@
+"""
+Rendu PDF / DOCX des actes générés, aux couleurs du cabinet
+
+Applique la configuration d'un template PDF (PDFTemplateManager) : format
+et marges de page, en-tête (logo, texte), pied de page (numéros de page),
+polices, tailles et couleurs des titres et du corps.
+
+- Les styles (polices, logo décodé, styles de paragraphe) sont compilés une
+  fois par template et gardés en mémoire (LRU par empreinte du template :
+  une configuration ou un logo modifié donne une nouvelle entrée)
+- Le document est écrit dans un tampon SpooledTemporaryFile : en mémoire
+  pour un acte courant, sur disque au-delà du seuil (ACT_RENDER_SPOOL_MAX_BYTES)
+- reportlab et python-docx ne sont importés qu'au premier rendu
+"""
+
+import io
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any
+from xml.sax.saxutils import escape
+
+from loguru import logger
+
+from utils.pdf_template_manager import PDFTemplateManager, get_template_manager
+
+if TYPE_CHECKING:
+    from reportlab.lib.colors import Color
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.utils import ImageReader
+
+PDF_MEDIA_TYPE = "application/pdf"
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Clé du template de secours (aucun template enregistré sous ce nom)
+FALLBACK_STYLE_KEY = "fallback"
+
+# Résolution du logo compilé (impression)
+LOGO_DPI = 200
+
+# Titres d'articles, de parties... : "ARTICLE 2 - PRIX", "TITRE I", lignes en capitales
+_HEADING_RE = re.compile(r"^(ARTICLE|Article|TITRE|CHAPITRE|SECTION|PARTIE)\b|^[A-ZÀ-Ý0-9 '’.,:()/-]{4,80}$")
+
+
+def _pdf_font(name: str | None, bold: bool = False) -> str:
+    """Police PDF standard la plus proche (les 14 polices de base, sans fichier)"""
+    folded = (name or "").lower()
+    if "times" in folded or "garamond" in folded or ("serif" in folded and "sans" not in folded):
+        base, bold_name = "Times-Roman", "Times-Bold"
+    elif "courier" in folded or "mono" in folded:
+        base, bold_name = "Courier", "Courier-Bold"
+    else:
+        base, bold_name = "Helvetica", "Helvetica-Bold"
+    return bold_name if bold or "bold" in folded else base
+
+
+def _color(value: str | None, default: str = "#000000") -> "Color":
+    from reportlab.lib import colors
+
+    try:
+        return colors.HexColor(value or default)
+    except (ValueError, TypeError):
+        return colors.HexColor(default)
+
+
+@dataclass
+class CompiledStyle:
+    """Styles d'un template, prêts pour le rendu"""
+
+    key: str
+    config: dict[str, Any]
+    pagesize: tuple[float, float]
+    margins: tuple[float, float, float, float]  # haut, bas, gauche, droite
+    title: "ParagraphStyle"
+    heading: "ParagraphStyle"
+    body: "ParagraphStyle"
+    header: "ParagraphStyle"
+    footer: "ParagraphStyle"
+    logo: "ImageReader | None" = None
+    logo_bytes: bytes | None = None
+    logo_size: tuple[float, float] = (0.0, 0.0)
+
+
+def compile_style(config: dict[str, Any], key: str, logo_bytes: bytes | None = None) -> CompiledStyle:
+    """
+    Compile la configuration d'un template en styles de rendu
+
+    Args:
+        config: Configuration (PDFTemplateManager.load_template)
+        key: Empreinte de la configuration
+        logo_bytes: Contenu du logo déjà chargé (sinon lu depuis logo_path)
+    """
+    from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+    from reportlab.lib.pagesizes import A4, LETTER, landscape
+    from reportlab.lib.styles import ParagraphStyle
+
+    alignments = {"left": TA_LEFT, "center": TA_CENTER, "right": TA_RIGHT, "justify": TA_JUSTIFY}
+    page = config.get("page", {})
+    styles = config.get("styles", {})
+    header = config.get("header", {})
+    footer = config.get("footer", {})
+
+    pagesize = {"a4": A4, "letter": LETTER}.get(str(page.get("format", "A4")).lower(), A4)
+    if page.get("orientation") == "landscape":
+        pagesize = landscape(pagesize)
+
+    body_size = float(styles.get("body_size", 11))
+    title_size = float(styles.get("title_size", 16))
+    line_spacing = float(styles.get("line_spacing", 1.5))
+
+    body = ParagraphStyle(
+        "ActBody",
+        fontName=_pdf_font(styles.get("body_font")),
+        fontSize=body_size,
+        leading=body_size * line_spacing,
+        textColor=_color(styles.get("body_color")),
+        alignment=TA_JUSTIFY,
+        spaceAfter=body_size * 0.6,
+    )
+    title = ParagraphStyle(
+        "ActTitle",
+        parent=body,
+        fontName=_pdf_font(styles.get("title_font"), bold=True),
+        fontSize=title_size,
+        leading=title_size * 1.25,
+        textColor=_color(styles.get("title_color")),
+        alignment=TA_CENTER,
+        spaceAfter=title_size,
+    )
+    heading = ParagraphStyle(
+        "ActHeading",
+        parent=body,
+        fontName=_pdf_font(styles.get("title_font") or styles.get("body_font"), bold=True),
+        fontSize=body_size + 1,
+        leading=(body_size + 1) * 1.3,
+        textColor=_color(styles.get("title_color")),
+        alignment=TA_LEFT,
+        spaceBefore=body_size * 0.6,
+        spaceAfter=body_size * 0.3,
+        keepWithNext=True,
+    )
+    header_size = float(header.get("font_size", 12))
+    header_style = ParagraphStyle(
+        "ActHeader",
+        fontName=_pdf_font(header.get("font"), bold=True),
+        fontSize=header_size,
+        leading=header_size * 1.2,
+        textColor=_color(header.get("color")),
+        alignment=alignments.get(header.get("alignment", "center"), TA_CENTER),
+    )
+    footer_size = float(footer.get("font_size", 9))
+    footer_style = ParagraphStyle(
+        "ActFooter",
+        fontName=_pdf_font(styles.get("body_font")),
+        fontSize=footer_size,
+        leading=footer_size * 1.2,
+        textColor=_color(footer.get("color"), "#666666"),
+        alignment=alignments.get(footer.get("alignment", "center"), TA_CENTER),
+    )
+
+    compiled = CompiledStyle(
+        key=key,
+        config=config,
+        pagesize=pagesize,
+        margins=(
+            float(page.get("margin_top", 72)),
+            float(page.get("margin_bottom", 72)),
+            float(page.get("margin_left", 72)),
+            float(page.get("margin_right", 72)),
+        ),
+        title=title,
+        heading=heading,
+        body=body,
+        header=header_style,
+        footer=footer_style,
+    )
+
+    logo_path = config.get("logo_path")
+    if (logo_bytes or logo_path) and header.get("has_logo", True):
+        try:
+            compiled.logo_bytes, compiled.logo, compiled.logo_size = _compile_logo(
+                logo_bytes or Path(logo_path).read_bytes(), compiled.margins[0]
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Logo illisible ({logo_path}) : {e}")
+    return compiled
+
+
+def _compile_logo(source: bytes, margin_top: float) -> tuple[bytes, "ImageReader", tuple[float, float]]:
+    """
+    Logo réduit à sa taille d'affichage (dans la marge haute)
+
+    L'image est rééchantillonnée à LOGO_DPI puis réencodée une fois : le PDF
+    ne recompresse plus une image pleine résolution à chaque document.
+    """
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+
+    with Image.open(io.BytesIO(source)) as image:
+        image.load()
+        width, height = image.size
+        # Logo dans la marge haute (au plus 70 % de sa hauteur)
+        scale = min(1.0, margin_top * 0.7 / height) if height else 1.0
+        display = (width * scale, height * scale)
+        pixels = (max(1, round(display[0] * LOGO_DPI / 72)), max(1, round(display[1] * LOGO_DPI / 72)))
+        if pixels[0] < width:
+            image = image.resize(pixels, Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA")
+        out = io.BytesIO()
+        image.save(out, format="PNG", optimize=False)
+
+    data = out.getvalue()
+    reader = ImageReader(io.BytesIO(data))
+    reader.getRGBData()  # décodage une fois pour toutes (rendus concurrents)
+    return data, reader, display
+
+
+def split_blocks(text: str) -> list[tuple[str, str]]:
+    """
+    Découpe l'acte en blocs typés (title, heading, body)
+
+    Le titre est la première ligne non vide si elle est en capitales.
+    """
+    blocks: list[tuple[str, str]] = []
+    for raw in re.split(r"\n\s*\n", text.strip()):
+        lines = [line.strip() for line in raw.splitlines() if line.strip()]
+        if not lines:
+            continue
+        # Une ligne de titre suivie de texte : titre puis corps
+        if len(lines) > 1 and _HEADING_RE.match(lines[0]):
+            blocks.append(("heading", lines[0]))
+            lines = lines[1:]
+        paragraph = "\n".join(lines)
+        kind = "heading" if len(lines) == 1 and _HEADING_RE.match(lines[0]) else "body"
+        blocks.append((kind, paragraph))
+
+    if blocks and blocks[0][0] == "heading":
+        blocks[0] = ("title", blocks[0][1])
+    return blocks
+
+
+class ActRenderer:
+    """
+    Rendu PDF / DOCX avec cache des styles compilés
+
+    Usage:
+        >>> renderer = get_act_renderer()
+        >>> with renderer.render(acte, "pdf", template_name="cabinet_dupont") as buffer:
+        ...     data = buffer.read()
+    """
+
+    def __init__(
+        self,
+        template_manager: PDFTemplateManager | None = None,
+        max_styles: int = 32,
+        spool_max_bytes: int = 8 * 1024 * 1024,
+    ):
+        """
+        Args:
+            template_manager: Gestionnaire des templates PDF
+            max_styles: Nombre de templates compilés gardés en mémoire
+            spool_max_bytes: Taille au-delà de laquelle le tampon passe sur disque
+        """
+        self.template_manager = template_manager or get_template_manager()
+        self.max_styles = max_styles
+        self.spool_max_bytes = spool_max_bytes
+        self._styles: OrderedDict[str, CompiledStyle] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.compilations = 0
+
+    def style(self, template_name: str | None = None) -> CompiledStyle:
+        """Styles compilés d'un template (défaut : template par défaut)"""
+        # Empreinte tenue à jour par le registre (configuration + logo)
+        entry = self.template_manager.get_template(template_name)
+        key = entry.fingerprint if entry is not None else FALLBACK_STYLE_KEY
+
+        with self._lock:
+            compiled = self._styles.get(key)
+            if compiled is not None:
+                self._styles.move_to_end(key)
+                self.hits += 1
+                return compiled
+
+        if entry is not None:
+            compiled = compile_style(entry.to_config(), key, logo_bytes=entry.logo_bytes)
+        else:
+            compiled = compile_style(self.template_manager.load_template(template_name), key)
+        with self._lock:
+            self.compilations += 1
+            self._styles[key] = compiled
+            while len(self._styles) > self.max_styles:
+                self._styles.popitem(last=False)
+        logger.debug(f"🎨 Styles compilés : {template_name or 'default'}")
+        return compiled
+
+    def render(self, text: str, output_format: str, template_name: str | None = None) -> IO[bytes]:
+        """
+        Rend un acte
+
+        Args:
+            text: Texte de l'acte
+            output_format: "pdf" ou "docx"
+            template_name: Template PDF du cabinet (None : défaut)
+
+        Returns:
+            Tampon positionné au début (à fermer par l'appelant)
+        """
+        style = self.style(template_name)
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+        try:
+            if output_format == "pdf":
+                self._render_pdf(text, style, buffer)
+            elif output_format == "docx":
+                self._render_docx(text, style, buffer)
+            else:
+                raise ValueError(f"Format de rendu non supporté : {output_format}")
+        except BaseException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return buffer
+
+    def render_bytes(self, text: str, output_format: str, template_name: str | None = None) -> bytes:
+        with self.render(text, output_format, template_name) as buffer:
+            return buffer.read()
+
+    # ------------------------------------------------------------------
+    # PDF (reportlab)
+    # ------------------------------------------------------------------
+
+    def _render_pdf(self, text: str, style: CompiledStyle, out: IO[bytes]) -> None:
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+        top, bottom, left, right = style.margins
+        doc = SimpleDocTemplate(
+            out,
+            pagesize=style.pagesize,
+            topMargin=top,
+            bottomMargin=bottom,
+            leftMargin=left,
+            rightMargin=right,
+            title=text.strip().split("\n", 1)[0][:120],
+        )
+        story = []
+        paragraph_styles = {"title": style.title, "heading": style.heading, "body": style.body}
+        for kind, block in split_blocks(text):
+            markup = escape(block).replace("\n", "<br/>")
+            story.append(Paragraph(markup, paragraph_styles[kind]))
+        if not story:
+            story.append(Spacer(1, 1))
+
+        def decorate(canvas, document):
+            self._draw_page_decorations(canvas, document, style)
+
+        doc.build(story, onFirstPage=decorate, onLaterPages=decorate)
+
+    @staticmethod
+    def _draw_page_decorations(canvas, doc, style: CompiledStyle) -> None:
+        from reportlab.platypus import Paragraph
+
+        header = style.config.get("header", {})
+        footer = style.config.get("footer", {})
+        width, height = style.pagesize
+        top, bottom, left, right = style.margins
+        canvas.saveState()
+
+        if style.logo is not None:
+            logo_width, logo_height = style.logo_size
+            position = header.get("logo_position", "left")
+            x = {"center": (width - logo_width) / 2, "right": width - right - logo_width}.get(position, left)
+            canvas.drawImage(
+                style.logo, x, height - top + (top - logo_height) / 2,
+                width=logo_width, height=logo_height, mask="auto",
+            )
+
+        if header.get("text"):
+            paragraph = Paragraph(escape(header["text"]), style.header)
+            _, h = paragraph.wrap(width - left - right, top)
+            paragraph.drawOn(canvas, left, height - top / 2 - h / 2)
+
+        footer_text = footer.get("text", "")
+        if footer.get("has_page_numbers", True):
+            page = f"Page {doc.page}"
+            footer_text = f"{footer_text} — {page}" if footer_text else page
+        if footer_text:
+            paragraph = Paragraph(escape(footer_text), style.footer)
+            _, h = paragraph.wrap(width - left - right, bottom)
+            paragraph.drawOn(canvas, left, bottom / 2 - h / 2)
+
+        canvas.restoreState()
+
+    # ------------------------------------------------------------------
+    # DOCX (python-docx)
+    # ------------------------------------------------------------------
+
+    def _render_docx(self, text: str, style: CompiledStyle, out: IO[bytes]) -> None:
+        from docx import Document
+        from docx.enum.section import WD_ORIENT
+        from docx.enum.text import WD_ALIGN_PARAGRAPH
+        from docx.shared import Pt, RGBColor
+
+        config = style.config
+        styles = config.get("styles", {})
+        header_config = config.get("header", {})
+        footer_config = config.get("footer", {})
+        alignments = {
+            "left": WD_ALIGN_PARAGRAPH.LEFT,
+            "center": WD_ALIGN_PARAGRAPH.CENTER,
+            "right": WD_ALIGN_PARAGRAPH.RIGHT,
+        }
+
+        def rgb(value: str | None) -> RGBColor:
+            color = _color(value)
+            return RGBColor(int(color.red * 255), int(color.green * 255), int(color.blue * 255))
+
+        document = Document()
+        section = document.sections[0]
+        section.page_width, section.page_height = Pt(style.pagesize[0]), Pt(style.pagesize[1])
+        if style.pagesize[0] > style.pagesize[1]:
+            section.orientation = WD_ORIENT.LANDSCAPE
+        top, bottom, left, right = style.margins
+        section.top_margin, section.bottom_margin = Pt(top), Pt(bottom)
+        section.left_margin, section.right_margin = Pt(left), Pt(right)
+
+        normal = document.styles["Normal"]
+        normal.font.name = styles.get("body_font") or "Helvetica"
+        normal.font.size = Pt(float(styles.get("body_size", 11)))
+        normal.font.color.rgb = rgb(styles.get("body_color"))
+        normal.paragraph_format.line_spacing = float(styles.get("line_spacing", 1.5))
+
+        if style.logo_bytes:
+            run = section.header.paragraphs[0].add_run()
+            run.add_picture(io.BytesIO(style.logo_bytes), height=Pt(style.logo_size[1]))
+        if header_config.get("text"):
+            paragraph = section.header.add_paragraph(header_config["text"])
+            paragraph.alignment = alignments.get(header_config.get("alignment"), WD_ALIGN_PARAGRAPH.CENTER)
+            for run in paragraph.runs:
+                run.font.bold = True
+                run.font.size = Pt(float(header_config.get("font_size", 12)))
+                run.font.color.rgb = rgb(header_config.get("color"))
+        if footer_config.get("text"):
+            paragraph = section.footer.paragraphs[0]
+            paragraph.text = footer_config["text"]
+            paragraph.alignment = alignments.get(footer_config.get("alignment"), WD_ALIGN_PARAGRAPH.CENTER)
+            for run in paragraph.runs:
+                run.font.size = Pt(float(footer_config.get("font_size", 9)))
+                run.font.color.rgb = rgb(footer_config.get("color") or "#666666")
+
+        title_size = Pt(float(styles.get("title_size", 16)))
+        heading_size = Pt(float(styles.get("body_size", 11)) + 1)
+        for kind, block in split_blocks(text):
+            paragraph = document.add_paragraph()
+            run = paragraph.add_run(block)
+            if kind == "title":
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+                run.font.bold, run.font.size = True, title_size
+                run.font.color.rgb = rgb(styles.get("title_color"))
+            elif kind == "heading":
+                paragraph.paragraph_format.keep_with_next = True
+                run.font.bold, run.font.size = True, heading_size
+                run.font.color.rgb = rgb(styles.get("title_color"))
+            else:
+                paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+        document.save(out)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"styles": len(self._styles), "hits": self.hits, "compilations": self.compilations}
+
+
+_renderer: ActRenderer | None = None
+
+
+def get_act_renderer() -> ActRenderer:
+    """Retourne le moteur de rendu global"""
+    global _renderer
+    if _renderer is None:
+        from config.settings import get_settings
+
+        settings = get_settings()
+        _renderer = ActRenderer(
+            max_styles=settings.ACT_RENDER_STYLE_CACHE_SIZE,
+            spool_max_bytes=settings.ACT_RENDER_SPOOL_MAX_BYTES,
+        )
+    return _renderer
@@ -0,0 +1,411 @@
+"""
+Compilation des actes modèles de la Machine à Actes
+
+Un cabinet réutilise les mêmes quelques modèles des milliers de fois : le
+modèle est compilé une seule fois par empreinte de contenu (texte extrait,
+emplacements variables détectés, préfixe de prompt pré-rendu), puis gardé
+en mémoire (LRU) et sur disque. Une génération ne fait plus que lier les
+données client au prompt. Le dossier disque est borné (nombre de modèles et
+taille) : les moins récemment utilisés sont supprimés.
+
+Emplacements détectés :
+- [NOM], [DATE DE NAISSANCE] : crochets en majuscules
+- {{client}}, {{ date_signature }} : moustaches ({{ prix|lettres }} : avec filtre)
+- ________, ........, ………… : blancs à compléter (libellé = mots qui précèdent)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from loguru import logger
+
+from prompts.prompts import PROMPT_ACT_GENERATION, PROMPT_ACT_GENERATION_CUSTOM
+
+# Version du format compilé (invalide les fichiers persistés si elle change)
+COMPILER_VERSION = 2
+
+# Empreinte des prompts : les préfixes pré-rendus en dépendent
+PROMPT_FINGERPRINT = hashlib.sha256(
+    f"{PROMPT_ACT_GENERATION}\0{PROMPT_ACT_GENERATION_CUSTOM}".encode("utf-8")
+).hexdigest()[:16]
+
+# Découpage des prompts autour des données client (seule partie variable)
+_STANDARD_HEAD, _, STANDARD_TAIL = PROMPT_ACT_GENERATION.partition("{client_data}")
+_CUSTOM_HEAD, _, CUSTOM_TAIL = PROMPT_ACT_GENERATION_CUSTOM.partition("{client_data}")
+
+# Emplacements : [NOM], {{client}} / {{ prix|lettres }}, blancs
+BRACKET_RE = re.compile(r"\[([A-ZÀ-ÖØ-Þ][A-ZÀ-ÖØ-Þ0-9 _'’./-]{0,48})\]")
+MUSTACHE_RE = re.compile(r"\{\{\s*([\w.]+(?:\s*\|\s*\w+)?)\s*\}\}")
+BLANK_RE = re.compile(r"_{4,}|\.{6,}|…{3,}")
+_LABEL_RE = re.compile(r"([A-Za-zÀ-ÿ'’][\wÀ-ÿ'’ ]{0,40}?)\s*[:：]?\s*$")
+
+
+@dataclass
+class TemplateSlot:
+    """Un emplacement variable de l'acte modèle"""
+
+    name: str
+    kind: str  # bracket | mustache | blank
+    marker: str
+    occurrences: int = 1
+
+
+@dataclass
+class CompiledTemplate:
+    """Acte modèle compilé (indépendant des données client)"""
+
+    template_id: str
+    text: str
+    slots: list[TemplateSlot] = field(default_factory=list)
+    prefixes: dict[str, str] = field(default_factory=dict)
+    prompt_fingerprint: str = PROMPT_FINGERPRINT
+    version: int = COMPILER_VERSION
+
+    @property
+    def slot_names(self) -> list[str]:
+        return [slot.name for slot in self.slots]
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CompiledTemplate":
+        data = dict(data)
+        data["slots"] = [TemplateSlot(**slot) for slot in data.get("slots", [])]
+        return cls(**data)
+
+
+def template_hash(content: str | bytes | memoryview) -> str:
+    """Empreinte SHA-256 du contenu d'un modèle (texte ou octets du fichier)"""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def blank_label(text: str, position: int) -> str | None:
+    """Libellé d'un blanc : mots entre le début de ligne (ou le blanc précédent) et le blanc"""
+    line_start = text.rfind("\n", 0, position) + 1
+    before = BLANK_RE.split(text[line_start:position])[-1]
+    label = _LABEL_RE.search(before)
+    return label.group(1).strip() if label else None
+
+
+def detect_slots(text: str) -> list[TemplateSlot]:
+    """
+    Détecte les emplacements variables d'un acte modèle
+
+    Args:
+        text: Texte du modèle
+
+    Returns:
+        Emplacements par ordre d'apparition (un par nom)
+    """
+    found: dict[tuple[str, str], tuple[int, TemplateSlot]] = {}
+
+    def add(position: int, name: str, kind: str, marker: str) -> None:
+        key = (kind, name)
+        if key in found:
+            found[key][1].occurrences += 1
+        else:
+            found[key] = (position, TemplateSlot(name, kind, marker))
+
+    for match in BRACKET_RE.finditer(text):
+        add(match.start(), match.group(1).strip(), "bracket", match.group(0))
+    for match in MUSTACHE_RE.finditer(text):
+        add(match.start(), re.sub(r"\s+", "", match.group(1)), "mustache", match.group(0))
+    for match in BLANK_RE.finditer(text):
+        name = blank_label(text, match.start()) or f"blanc {len(found) + 1}"
+        add(match.start(), name, "blank", match.group(0))
+
+    return [slot for _, slot in sorted(found.values(), key=lambda item: item[0])]
+
+
+class ActTemplateCompiler:
+    """
+    Cache des actes modèles compilés (LRU en mémoire + fichiers JSON)
+
+    Usage:
+        >>> compiler = get_act_template_compiler()
+        >>> compiled = compiler.compile_text(template)
+        >>> prompt = compiler.bind(compiled, client_data, act_type="contract_sale")
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        max_templates: int = 64,
+        max_disk_templates: int = 1000,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+        prune_every: int = 50,
+    ):
+        """
+        Args:
+            cache_dir: Dossier de persistance (None : mémoire seulement)
+            max_templates: Nombre de modèles compilés gardés en mémoire
+            max_disk_templates: Nombre de modèles gardés sur disque
+            max_disk_bytes: Taille maximale du dossier disque
+            prune_every: Écritures entre deux élagages du dossier
+        """
+        self.cache_dir = cache_dir
+        self.max_templates = max_templates
+        self.max_disk_templates = max_disk_templates
+        self.max_disk_bytes = max_disk_bytes
+        self.prune_every = prune_every
+        self._memory: OrderedDict[str, CompiledTemplate] = OrderedDict()
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.compilations = 0
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            self.prune()
+
+    def compile_text(self, text: str) -> CompiledTemplate:
+        """Modèle compilé à partir de son texte"""
+        return self._get_or_compile(template_hash(text), lambda: text)
+
+    def compile_file(self, file_path: str | Path, extract: Callable[[str], str]) -> CompiledTemplate:
+        """
+        Modèle compilé à partir d'un fichier (PDF, DOCX, TXT)
+
+        L'empreinte porte sur les octets du fichier : l'extraction du texte
+        n'est faite qu'à la première rencontre du contenu.
+
+        Args:
+            file_path: Chemin du fichier
+            extract: Fonction d'extraction du texte (extract_text_from_file)
+        """
+        return self.compile_bytes(Path(file_path).read_bytes(), lambda: extract(str(file_path)))
+
+    def compile_bytes(self, content: bytes | memoryview, extract: Callable[[], str]) -> CompiledTemplate:
+        """
+        Modèle compilé à partir des octets d'un fichier (upload lu sur place)
+
+        Args:
+            content: Octets du fichier
+            extract: Extraction du texte, appelée seulement si le modèle est inconnu
+        """
+        return self._get_or_compile(template_hash(content), extract)
+
+    def _get_or_compile(self, template_id: str, load_text: Callable[[], str]) -> CompiledTemplate:
+        with self._lock:
+            compiled = self._memory.get(template_id)
+            if compiled is not None:
+                self._memory.move_to_end(template_id)
+                self.hits += 1
+                return compiled
+
+        compiled = self._load(template_id)
+        if compiled is not None:
+            self.disk_hits += 1
+        else:
+            text = load_text()
+            compiled = CompiledTemplate(template_id, text, detect_slots(text))
+            self.compilations += 1
+            logger.debug(
+                f"🧩 Modèle {template_id[:12]} compilé : {len(text)} caractères, "
+                f"{len(compiled.slots)} emplacement(s)"
+            )
+            self._save(compiled)
+            self._prune_if_due()
+
+        self._remember(compiled)
+        return compiled
+
+    def _remember(self, compiled: CompiledTemplate) -> None:
+        with self._lock:
+            self._memory[compiled.template_id] = compiled
+            self._memory.move_to_end(compiled.template_id)
+            while len(self._memory) > self.max_templates:
+                self._memory.popitem(last=False)
+
+    def bind(
+        self,
+        compiled: CompiledTemplate,
+        client_data: str,
+        act_type: str | None = None,
+        custom_instructions: str | None = None,
+    ) -> str:
+        """
+        Prompt de génération : préfixe pré-rendu + données client + fin fixe
+
+        Équivaut à PROMPT_ACT_GENERATION(_CUSTOM).format(...), sans
+        recopier le modèle à chaque appel. Un nouveau préfixe remplace le
+        dictionnaire des préfixes (copie sur écriture) et est persisté sous
+        le verrou : ni lecture d'un dictionnaire en cours de modification,
+        ni écriture disque d'un état plus ancien après un plus récent.
+
+        Args:
+            compiled: Modèle compilé
+            client_data: Données client formatées
+            act_type: Type d'acte (prompt standard)
+            custom_instructions: Instructions personnalisées (prompt personnalisé)
+        """
+        if custom_instructions:
+            # Préfixe propre aux instructions : non persisté
+            prefix = _CUSTOM_HEAD.format(
+                custom_instructions=custom_instructions,
+                template=compiled.text,
+            )
+            return prefix + client_data + CUSTOM_TAIL
+
+        key = f"standard:{act_type}"
+        prefix = compiled.prefixes.get(key)
+        if prefix is None:
+            prefix = _STANDARD_HEAD.format(act_type=act_type, template=compiled.text)
+            with self._lock:
+                if key in compiled.prefixes:
+                    prefix = compiled.prefixes[key]
+                else:
+                    compiled.prefixes = {**compiled.prefixes, key: prefix}
+                    self._save(compiled)
+            self._prune_if_due()
+        return prefix + client_data + STANDARD_TAIL
+
+    def preload(self, limit: int | None = None) -> int:
+        """
+        Charge en mémoire les modèles compilés du cache disque
+
+        Les plus récemment écrits d'abord, dans la limite de max_templates.
+
+        Args:
+            limit: Nombre maximal de modèles chargés (défaut : max_templates)
+
+        Returns:
+            Nombre de modèles chargés
+        """
+        if self.cache_dir is None:
+            return 0
+        limit = min(limit or self.max_templates, self.max_templates)
+        try:
+            paths = sorted(
+                self.cache_dir.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True
+            )
+        except OSError as e:
+            logger.warning(f"⚠️ Cache des modèles compilés illisible : {e}")
+            return 0
+
+        loaded = 0
+        # Du plus ancien au plus récent : le plus récent finit en tête du LRU
+        for path in reversed(paths[:limit]):
+            with self._lock:
+                if path.stem in self._memory:
+                    continue
+            compiled = self._load(path.stem)
+            if compiled is not None:
+                self._remember(compiled)
+                loaded += 1
+        return loaded
+
+    def _path(self, template_id: str) -> Path:
+        return self.cache_dir / f"{template_id}.json"
+
+    def _load(self, template_id: str) -> CompiledTemplate | None:
+        if self.cache_dir is None:
+            return None
+        path = self._path(template_id)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            compiled = CompiledTemplate.from_dict(data)
+            # Date d'utilisation : élagage du moins récemment utilisé
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ Modèle compilé illisible ({template_id[:12]}) : {e}")
+            return None
+        if compiled.version != COMPILER_VERSION:
+            return None
+        if compiled.prompt_fingerprint != PROMPT_FINGERPRINT:
+            # Prompts modifiés : seuls les préfixes sont à refaire
+            compiled.prefixes = {}
+            compiled.prompt_fingerprint = PROMPT_FINGERPRINT
+        return compiled
+
+    def _save(self, compiled: CompiledTemplate) -> None:
+        if self.cache_dir is None:
+            return
+        # Écriture atomique (plusieurs workers peuvent compiler le même modèle)
+        path = self._path(compiled.template_id)
+        tmp_path = path.with_name(f"{compiled.template_id}.{threading.get_ident()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(compiled.to_dict(), ensure_ascii=False), encoding="utf-8")
+            tmp_path.replace(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Persistance du modèle compilé impossible : {e}")
+        self._writes += 1
+
+    def _prune_if_due(self) -> None:
+        if self.cache_dir is not None and self._writes >= self.prune_every:
+            self._writes = 0
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Supprime du disque les modèles les moins récemment utilisés au-delà
+        de max_disk_templates ou de max_disk_bytes
+
+        Returns:
+            Nombre de fichiers supprimés
+        """
+        if self.cache_dir is None or not self._prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            entries = []
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort(reverse=True)
+
+            removed = 0
+            total = 0
+            for index, (_, size, path) in enumerate(entries):
+                total += size
+                if index >= self.max_disk_templates or total > self.max_disk_bytes:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+            if removed:
+                logger.debug(f"🧹 Cache des modèles compilés : {removed} fichier(s) supprimé(s)")
+            return removed
+        finally:
+            self._prune_lock.release()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "templates": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "compilations": self.compilations,
+            }
+
+
+_compiler: ActTemplateCompiler | None = None
+
+
+def get_act_template_compiler() -> ActTemplateCompiler:
+    """Retourne le cache global des actes modèles compilés"""
+    global _compiler
+    if _compiler is None:
+        from config.settings import get_settings
+
+        settings = get_settings()
+        _compiler = ActTemplateCompiler(
+            cache_dir=settings.ACT_TEMPLATE_CACHE_DIR,
+            max_templates=settings.ACT_TEMPLATE_CACHE_SIZE,
+            max_disk_templates=settings.ACT_TEMPLATE_CACHE_MAX_FILES,
+            max_disk_bytes=settings.ACT_TEMPLATE_CACHE_MAX_BYTES,
+        )
+    return _compiler
@@ -0,0 +1,349 @@
+"""
+Stockage des documents à télécharger (sur disque, adressé par contenu)
+
+Les documents générés (PDF, DOCX, texte) sont conservés en octets bruts,
+partagés entre les workers et conservés au redémarrage :
+
+- blobs/ab/cd/<sha256> : contenu, nommé par son empreinte SHA-256 (deux
+  documents identiques ne sont stockés qu'une fois)
+- downloads.sqlite3 : une ligne par document téléchargeable (nom, type MIME,
+  expiration) pointant vers son blob
+- incoming/ : fichiers en cours d'écriture par put_file (empreinte calculée
+  pendant la copie, puis renommés en blob)
+- Un balayeur en tâche de fond supprime les documents expirés et les
+  blobs qui ne sont plus référencés
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator
+
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    id TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_sha ON downloads (sha256);
+CREATE INDEX IF NOT EXISTS idx_downloads_expiry ON downloads (expires_at);
+"""
+
+# Fichiers temporaires d'écriture abandonnés (processus interrompu)
+_STALE_TMP_SECONDS = 3600
+
+
+@dataclass
+class StoredDocument:
+    """Document téléchargeable"""
+
+    id: str
+    sha256: str
+    size: int
+    filename: str
+    content_type: str
+    created_at: float
+    expires_at: float
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "StoredDocument":
+        return cls(**{key: row[key] for key in row.keys()})
+
+    @property
+    def expired(self) -> bool:
+        return time.time() > self.expires_at
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256}"'
+
+
+class DownloadStore:
+    """
+    Blobs adressés par contenu + index SQLite des documents
+
+    Chaque opération ouvre sa propre connexion : le stockage est utilisable
+    depuis n'importe quel thread ou processus partageant le dossier.
+
+    Usage:
+        >>> store = get_download_store()
+        >>> doc = store.put(pdf_bytes, "acte.pdf", "application/pdf")
+        >>> store.blob_path(doc.sha256).read_bytes()
+    """
+
+    def __init__(self, root: Path, ttl_seconds: float = 86400):
+        """
+        Args:
+            root: Dossier du stockage (blobs/ et downloads.sqlite3)
+            ttl_seconds: Durée de validité d'un lien de téléchargement
+        """
+        self.root = root
+        self.blobs_dir = root / "blobs"
+        self.incoming_dir = root / "incoming"
+        self.db_path = root / "downloads.sqlite3"
+        self.ttl_seconds = ttl_seconds
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def blob_path(self, sha256: str) -> Path:
+        """Chemin du blob : deux niveaux de sous-dossiers (256 × 256)"""
+        return self.blobs_dir / sha256[:2] / sha256[2:4] / sha256
+
+    def put(
+        self,
+        data: bytes,
+        filename: str,
+        content_type: str,
+        ttl_seconds: float | None = None,
+    ) -> StoredDocument:
+        """
+        Enregistre un document (le contenu n'est écrit que s'il est nouveau)
+
+        Args:
+            data: Contenu brut
+            filename: Nom du fichier téléchargé
+            content_type: Type MIME
+            ttl_seconds: Durée de validité (défaut : celle du stockage)
+        """
+        doc = self._insert(hashlib.sha256(data).hexdigest(), len(data), filename, content_type, ttl_seconds)
+        path = self.blob_path(doc.sha256)
+        if path.exists():
+            logger.debug(f"♻️ Contenu déjà stocké : {doc.sha256[:12]}")
+        else:
+            self._write_blob(path, data)
+        return doc
+
+    def put_file(
+        self,
+        stream: IO[bytes],
+        filename: str,
+        content_type: str,
+        ttl_seconds: float | None = None,
+        chunk_size: int = 64 * 1024,
+    ) -> StoredDocument:
+        """
+        Enregistre un document lu par blocs (sans le charger en mémoire)
+
+        Le flux est copié dans incoming/ en calculant son empreinte, puis le
+        fichier devient le blob (ou est supprimé si le contenu est déjà stocké).
+
+        Args:
+            stream: Flux binaire positionné au début (non fermé)
+            filename: Nom du fichier téléchargé
+            content_type: Type MIME
+            ttl_seconds: Durée de validité (défaut : celle du stockage)
+            chunk_size: Taille des blocs copiés
+        """
+        digest = hashlib.sha256()
+        size = 0
+        tmp_path = self.incoming_dir / f"{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                while chunk := stream.read(chunk_size):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            doc = self._insert(digest.hexdigest(), size, filename, content_type, ttl_seconds)
+            path = self.blob_path(doc.sha256)
+            if path.exists():
+                logger.debug(f"♻️ Contenu déjà stocké : {doc.sha256[:12]}")
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return doc
+
+    def _insert(
+        self,
+        sha256: str,
+        size: int,
+        filename: str,
+        content_type: str,
+        ttl_seconds: float | None,
+    ) -> StoredDocument:
+        """Ajoute la ligne d'un document (avant d'écrire son blob)"""
+        now = time.time()
+        doc = StoredDocument(
+            id=str(uuid.uuid4()),
+            sha256=sha256,
+            size=size,
+            filename=Path(filename).name or "document",
+            content_type=content_type,
+            created_at=now,
+            expires_at=now + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds),
+        )
+        # La ligne d'abord : un balayage concurrent ne supprime plus ce blob
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO downloads (id, sha256, size, filename, content_type, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc.id, doc.sha256, doc.size, doc.filename, doc.content_type, doc.created_at, doc.expires_at),
+            )
+        return doc
+
+    def _write_blob(self, path: Path, data: bytes) -> None:
+        """Écriture atomique (fichier temporaire renommé)"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def get(self, document_id: str) -> StoredDocument | None:
+        """Document par identifiant (expiré compris ; None si inconnu)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM downloads WHERE id = ?", (document_id,)).fetchone()
+        return StoredDocument.from_row(row) if row else None
+
+    def delete(self, document_id: str) -> bool:
+        """Supprime un document (et son blob s'il n'est plus référencé)"""
+        return self._delete_where("id = ?", (document_id,)) > 0
+
+    def sweep(self) -> int:
+        """
+        Supprime les documents expirés, les blobs orphelins et les fichiers
+        temporaires abandonnés
+
+        Returns:
+            Nombre de documents supprimés
+        """
+        removed = self._delete_where("expires_at < ?", (time.time(),))
+        cutoff = time.time() - _STALE_TMP_SECONDS
+        for tmp_path in [*self.blobs_dir.glob("*/*/*.tmp"), *self.incoming_dir.glob("*.tmp")]:
+            try:
+                if tmp_path.stat().st_mtime < cutoff:
+                    tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+        if removed:
+            logger.info(f"🧹 {removed} document(s) expiré(s) supprimé(s)")
+        return removed
+
+    def _delete_where(self, condition: str, params: tuple) -> int:
+        # Blobs supprimés dans la transaction : un put concurrent du même
+        # contenu attend le verrou, puis réécrit le blob manquant
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(f"SELECT id, sha256 FROM downloads WHERE {condition}", params).fetchall()
+                if not rows:
+                    conn.execute("COMMIT")
+                    return 0
+                conn.executemany("DELETE FROM downloads WHERE id = ?", [(row["id"],) for row in rows])
+                for sha256 in {row["sha256"] for row in rows}:
+                    still_used = conn.execute(
+                        "SELECT 1 FROM downloads WHERE sha256 = ? LIMIT 1", (sha256,)
+                    ).fetchone()
+                    if not still_used:
+                        self.blob_path(sha256).unlink(missing_ok=True)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def stats(self) -> dict[str, int]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS documents, COUNT(DISTINCT sha256) AS blobs, "
+                "COALESCE(SUM(size), 0) AS logical_bytes FROM downloads"
+            ).fetchone()
+            stored = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM downloads)"
+            ).fetchone()[0]
+        return {
+            "documents": row["documents"],
+            "blobs": row["blobs"],
+            "logical_bytes": row["logical_bytes"],
+            "stored_bytes": stored,
+        }
+
+
+class DownloadSweeper:
+    """
+    Balayage périodique des documents expirés (thread de fond)
+
+    Usage:
+        >>> sweeper = DownloadSweeper(get_download_store(), interval_seconds=300)
+        >>> sweeper.start()
+        >>> ...
+        >>> sweeper.stop()
+    """
+
+    def __init__(self, store: DownloadStore, interval_seconds: float = 300):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Démarre le balayage (un premier passage immédiat)"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="download-sweeper", daemon=True)
+        self._thread.start()
+        logger.info(f"🧹 Balayage des téléchargements toutes les {self.interval_seconds:.0f} s")
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.store.sweep()
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"❌ Balayage des téléchargements impossible : {e}")
+            self._stop.wait(self.interval_seconds)
+
+
+_store: DownloadStore | None = None
+
+
+def get_download_store() -> DownloadStore:
+    """Retourne le stockage global des téléchargements"""
+    global _store
+    if _store is None:
+        from config.settings import get_settings
+
+        settings = get_settings()
+        _store = DownloadStore(
+            root=settings.DOWNLOADS_DIR,
+            ttl_seconds=settings.DOWNLOADS_TTL_HOURS * 3600,
+        )
+    return _store
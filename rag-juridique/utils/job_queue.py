@@ -0,0 +1,465 @@
+"""
+File de tâches asynchrones (SQLite, sans broker externe)
+
+Les traitements longs (note stratégique, audit volumineux, génération
+d'acte) sont soumis comme tâches : la requête HTTP rend la main
+immédiatement, un pool de workers (dans le processus de l'API ou lancé à
+part via `python -m api.jobs`) exécute la tâche et persiste son résultat.
+
+- Une table SQLite (mode WAL) sert de file et de stockage des résultats
+- Réservation atomique d'une tâche par un worker (BEGIN IMMEDIATE)
+- Progression et annulation coopératives via report_progress() (contextvars)
+- Expiration des résultats et reprise des tâches d'un worker disparu
+"""
+
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from config.logging_config import get_logger
+from utils.tracing import start_trace
+
+logger = get_logger(__name__)
+
+# États d'une tâche
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_expiry ON jobs (expires_at);
+"""
+
+_current_job: contextvars.ContextVar["JobContext | None"] = contextvars.ContextVar(
+    "current_job", default=None
+)
+
+
+class JobCancelled(BaseException):
+    """
+    Annulation demandée pendant l'exécution d'une tâche
+
+    Hérite de BaseException (comme asyncio.CancelledError) pour traverser
+    les `except Exception` des piliers, qui poursuivent sur erreur.
+    """
+
+
+@dataclass
+class Job:
+    """Une tâche et son état"""
+
+    id: str
+    kind: str
+    status: str
+    payload: dict[str, Any]
+    result: Any
+    error: str | None
+    progress: float
+    message: str | None
+    cancel_requested: bool
+    created_at: float
+    started_at: float | None
+    finished_at: float | None
+    expires_at: float | None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"],
+            kind=row["kind"],
+            status=row["status"],
+            payload=json.loads(row["payload"]),
+            result=json.loads(row["result"]) if row["result"] is not None else None,
+            error=row["error"],
+            progress=row["progress"],
+            message=row["message"],
+            cancel_requested=bool(row["cancel_requested"]),
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            expires_at=row["expires_at"],
+        )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+
+class JobQueue:
+    """
+    File de tâches persistée dans SQLite
+
+    Chaque opération ouvre sa propre connexion : la file est utilisable
+    depuis n'importe quel thread ou processus partageant le fichier.
+
+    Usage:
+        >>> queue = JobQueue(Path("data/jobs/jobs.sqlite3"))
+        >>> job_id = queue.submit("synthese", request.model_dump(mode="json"))
+        >>> queue.get(job_id).status
+    """
+
+    def __init__(self, db_path: Path, result_ttl_seconds: float = 86400):
+        """
+        Args:
+            db_path: Fichier SQLite de la file
+            result_ttl_seconds: Durée de conservation des tâches terminées
+        """
+        self.db_path = db_path
+        self.result_ttl_seconds = result_ttl_seconds
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def submit(self, kind: str, payload: dict[str, Any]) -> str:
+        """
+        Ajoute une tâche à la file
+
+        Args:
+            kind: Type de tâche (synthese, audit, machine_actes)
+            payload: Paramètres de la tâche (sérialisables en JSON)
+
+        Returns:
+            Identifiant de la tâche
+        """
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(payload, ensure_ascii=False), time.time()),
+            )
+        logger.info(f"📥 Tâche {kind} soumise : {job_id}")
+        return job_id
+
+    def get(self, job_id: str) -> Job | None:
+        """Retourne une tâche (None si inconnue ou expirée)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def recent(self, kind: str | None = None, status: str | None = None, limit: int = 50) -> list[Job]:
+        """Tâches les plus récentes, éventuellement filtrées par type et état"""
+        clauses, params = [], []
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def depth(self) -> int:
+        """Nombre de tâches en attente"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+
+    def claim(self, worker: str, kinds: list[str] | None = None) -> Job | None:
+        """
+        Réserve la plus ancienne tâche en attente
+
+        Args:
+            worker: Identifiant du worker
+            kinds: Types de tâches acceptés (None : tous)
+
+        Returns:
+            Tâche réservée (passée en running), ou None si la file est vide
+        """
+        kind_clause = ""
+        params: list[Any] = [QUEUED]
+        if kinds:
+            kind_clause = f"AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT id FROM jobs WHERE status = ? {kind_clause} "
+                    "ORDER BY created_at LIMIT 1",
+                    params,
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                now = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, started_at = ?, heartbeat_at = ? "
+                    "WHERE id = ?",
+                    (RUNNING, worker, now, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def update_progress(self, job_id: str, progress: float, message: str | None = None) -> bool:
+        """
+        Enregistre la progression d'une tâche en cours
+
+        Returns:
+            True si l'annulation de la tâche a été demandée
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, message = COALESCE(?, message), heartbeat_at = ? "
+                "WHERE id = ?",
+                (min(max(progress, 0.0), 1.0), message, time.time(), job_id),
+            )
+            row = conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def complete(self, job_id: str, result: Any) -> None:
+        """Marque une tâche réussie et persiste son résultat"""
+        self._finish(job_id, SUCCEEDED, result=json.dumps(result, ensure_ascii=False), progress=1.0)
+
+    def fail(self, job_id: str, error: str) -> None:
+        """Marque une tâche en échec"""
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        result: str | None = None,
+        error: str | None = None,
+        progress: float | None = None,
+    ) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, "
+                "progress = COALESCE(?, progress), finished_at = ?, expires_at = ? "
+                "WHERE id = ? AND status = ?",
+                (status, result, error, progress, now, now + self.result_ttl_seconds, job_id, RUNNING),
+            )
+
+    def cancel(self, job_id: str) -> Job | None:
+        """
+        Annule une tâche
+
+        Une tâche en attente est annulée immédiatement ; une tâche en cours
+        l'est à son prochain report_progress().
+
+        Returns:
+            Tâche mise à jour (None si inconnue)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, cancel_requested = 1, finished_at = ?, expires_at = ? "
+                "WHERE id = ? AND status = ?",
+                (CANCELLED, now, now + self.result_ttl_seconds, job_id, QUEUED),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?",
+                (job_id, RUNNING),
+            )
+        return self.get(job_id)
+
+    def mark_cancelled(self, job_id: str) -> None:
+        """Constate l'annulation d'une tâche en cours"""
+        self._finish(job_id, CANCELLED, error="Annulée à la demande")
+
+    def purge_expired(self) -> int:
+        """Supprime les tâches terminées dont le résultat a expiré"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (time.time(),),
+            )
+        if cursor.rowcount:
+            logger.info(f"🧹 {cursor.rowcount} tâche(s) expirée(s) supprimée(s)")
+        return cursor.rowcount
+
+    def requeue_stale(self, stale_after_seconds: float) -> int:
+        """
+        Remet en file les tâches d'un worker disparu (sans signe de vie)
+
+        Args:
+            stale_after_seconds: Délai sans progression au-delà duquel
+                une tâche en cours est considérée abandonnée
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, progress = 0 "
+                "WHERE status = ? AND heartbeat_at < ? AND cancel_requested = 0",
+                (QUEUED, RUNNING, time.time() - stale_after_seconds),
+            )
+        if cursor.rowcount:
+            logger.warning(f"⚠️ {cursor.rowcount} tâche(s) abandonnée(s) remise(s) en file")
+        return cursor.rowcount
+
+
+@dataclass
+class JobContext:
+    """Tâche en cours d'exécution dans le contexte courant"""
+
+    queue: JobQueue
+    job_id: str
+
+
+def report_progress(progress: float, message: str | None = None) -> None:
+    """
+    Signale l'avancement de la tâche en cours (sans effet hors tâche)
+
+    Point d'annulation coopératif : lève JobCancelled si l'annulation de
+    la tâche a été demandée.
+
+    Args:
+        progress: Avancement entre 0 et 1
+        message: Étape en cours (ex : "Vérification des références")
+    """
+    context = _current_job.get()
+    if context is None:
+        return
+    if context.queue.update_progress(context.job_id, progress, message):
+        raise JobCancelled(context.job_id)
+
+
+class JobWorkerPool:
+    """
+    Pool de workers (threads) consommant la file
+
+    Usage:
+        >>> pool = JobWorkerPool(queue, handlers={"synthese": run_synthese}, workers=2)
+        >>> pool.start()
+        >>> ...
+        >>> pool.stop()
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: dict[str, Callable[[dict[str, Any]], Any]],
+        workers: int = 2,
+        poll_interval: float = 1.0,
+        stale_after_seconds: float = 600,
+    ):
+        """
+        Args:
+            queue: File de tâches
+            handlers: Fonction d'exécution par type de tâche (payload → résultat JSON)
+            workers: Nombre de threads
+            poll_interval: Attente entre deux consultations d'une file vide (secondes)
+            stale_after_seconds: Délai de reprise des tâches abandonnées
+        """
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after_seconds = stale_after_seconds
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._prefix = uuid.uuid4().hex[:8]
+
+    def start(self) -> None:
+        """Démarre les workers"""
+        self.queue.requeue_stale(self.stale_after_seconds)
+        self.queue.purge_expired()
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                args=(f"{self._prefix}-{i}",),
+                name=f"job-worker-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"⚙️ {self.workers} worker(s) de tâches démarré(s)")
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Arrête les workers (la tâche en cours se termine ou sera reprise)"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def wait(self) -> None:
+        """Bloque jusqu'à l'arrêt des workers (worker lancé à part)"""
+        for thread in self._threads:
+            while thread.is_alive():
+                thread.join(1.0)
+
+    def _run(self, worker: str) -> None:
+        kinds = list(self.handlers)
+        last_purge = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker, kinds)
+            except sqlite3.Error as e:
+                logger.error(f"❌ File de tâches indisponible : {e}")
+                job = None
+            if job is None:
+                if time.monotonic() - last_purge > 60:
+                    self.queue.purge_expired()
+                    last_purge = time.monotonic()
+                self._stop.wait(self.poll_interval)
+                continue
+            self.execute(job)
+
+    def execute(self, job: Job) -> None:
+        """Exécute une tâche réservée et enregistre son issue"""
+        logger.info(f"▶️ Tâche {job.kind} {job.id} démarrée")
+        token = _current_job.set(JobContext(self.queue, job.id))
+        try:
+            with start_trace(f"job {job.kind}", job_id=job.id):
+                result = self.handlers[job.kind](job.payload)
+            self.queue.complete(job.id, result)
+            logger.success(f"✅ Tâche {job.kind} {job.id} terminée")
+        except JobCancelled:
+            self.queue.mark_cancelled(job.id)
+            logger.info(f"⏹️ Tâche {job.kind} {job.id} annulée")
+        except Exception as e:
+            self.queue.fail(job.id, f"{type(e).__name__}: {e}")
+            logger.error(f"❌ Tâche {job.kind} {job.id} en échec : {e}")
+        finally:
+            _current_job.reset(token)
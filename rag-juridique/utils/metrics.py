@@ -0,0 +1,320 @@
+"""
+Métriques de l'API au format texte Prometheus (sans dépendance externe)
+
+- Counter, Gauge, Histogram : une série par valeurs d'étiquettes, déclarées
+  une fois au niveau du module (catalogue en fin de fichier). Une
+  observation coûte une recherche de dictionnaire et une incrémentation
+  sous verrou, soit moins de 5 µs (benchmarks/bench_metrics.py)
+- CollectedMetric : valeurs lues au moment de la collecte (statistiques des
+  caches, profondeur de la file de tâches) : aucun coût hors collecte
+- Timer : durée d'un bloc observée dans un histogramme, erreurs comptées
+  par type d'exception
+- render : exposition de toutes les métriques (route /metrics)
+
+Les étiquettes sont passées par position, dans l'ordre de déclaration.
+
+Usage:
+    >>> with Timer(VERTEX_SEARCH_SECONDS, errors=VERTEX_SEARCH_ERRORS):
+    ...     response = self.client.search(request)
+    >>> LLM_TOKENS.inc(model_name, "input", amount=1200)
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Iterable, Iterator
+
+from config.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bornes (secondes) des histogrammes de latence
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+Labels = tuple[str, ...]
+Sample = tuple[str, Labels, float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    """Ensemble des métriques exposées"""
+
+    def __init__(self):
+        self._metrics: dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric") -> None:
+        """
+        Raises:
+            ValueError: Nom de métrique déjà enregistré
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrique déjà enregistrée : {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Toutes les métriques au format texte Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: list[str] = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                logger.warning(f"⚠️ Collecte de la métrique {metric.name} impossible : {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in samples:
+                names = metric.labelnames + (("le",) if len(labels) > len(metric.labelnames) else ())
+                label_text = ",".join(f'{name}="{_escape(str(v))}"' for name, v in zip(names, labels))
+                series = f"{metric.name}{suffix}{{{label_text}}}" if label_text else f"{metric.name}{suffix}"
+                lines.append(f"{series} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """Métrique nommée, à étiquettes, enregistrée à sa création"""
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        registry: Registry | None = None,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _check(self, labels: Labels) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} : {len(self.labelnames)} étiquette(s) attendue(s) "
+                f"({', '.join(self.labelnames)}), {len(labels)} reçue(s)"
+            )
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Compteur croissant"""
+
+    type = "counter"
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            value = self._values.get(labels)
+            if value is None:
+                self._check(labels)
+                value = 0.0
+            self._values[labels] = value + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield "", labels, value
+
+
+class Gauge(Counter):
+    """Valeur instantanée (requêtes en cours...)"""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            if labels not in self._values:
+                self._check(labels)
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Distribution de valeurs (durées en secondes)
+
+    Chaque série est une liste : un compte par borne (+Inf compris), puis
+    la somme des valeurs ; les comptes cumulés sont calculés à la collecte.
+    """
+
+    type = "histogram"
+
+    def __init__(self, *args: Any, buckets: Iterable[float] = LATENCY_BUCKETS, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[Labels, list[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                self._check(labels)
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            all_series = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in all_series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                yield "_bucket", labels + (_format_value(bound),), cumulative
+            yield "_sum", labels, series[-1]
+            yield "_count", labels, cumulative
+
+
+class CollectedMetric(Metric):
+    """
+    Métrique lue à la collecte
+
+    Args:
+        collect: Fonction renvoyant les couples (valeurs d'étiquettes, valeur)
+        type: "gauge" ou "counter"
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Iterable[tuple[Labels, float]]],
+        labelnames: Iterable[str] = (),
+        type: str = "gauge",
+        registry: Registry | None = None,
+    ):
+        super().__init__(name, help, labelnames, registry)
+        self.type = type
+        self.collect = collect
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in self.collect():
+            yield "", tuple(labels), value
+
+
+class Timer:
+    """
+    Mesure la durée d'un bloc (histogramme) et compte ses erreurs
+
+    Les erreurs sont comptées avec les étiquettes de l'histogramme suivies
+    du nom de l'exception.
+
+    Args:
+        histogram: Histogramme des durées (secondes)
+        *labels: Valeurs des étiquettes de l'histogramme
+        errors: Compteur des erreurs (optionnel)
+    """
+
+    __slots__ = ("histogram", "labels", "errors", "started_at", "elapsed")
+
+    def __init__(self, histogram: Histogram, *labels: str, errors: Counter | None = None):
+        self.histogram = histogram
+        self.labels = labels
+        self.errors = errors
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "Timer":
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self.elapsed = time.perf_counter() - self.started_at
+        self.histogram.observe(self.elapsed, *self.labels)
+        if exc_type is not None and self.errors is not None:
+            self.errors.inc(*self.labels, exc_type.__name__)
+
+
+def render() -> str:
+    """Exposition du registre global"""
+    return REGISTRY.render()
+
+
+# ==============================================================================
+# CATALOGUE
+# ==============================================================================
+
+# Requêtes HTTP (api.metrics.MetricsMiddleware)
+HTTP_REQUESTS = Counter(
+    "legalrag_http_requests_total",
+    "Requêtes HTTP traitées",
+    ("pillar", "route", "method", "status"),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "legalrag_http_request_duration_seconds",
+    "Durée des requêtes HTTP (jusqu'à la fin de la réponse)",
+    ("pillar", "route", "method"),
+)
+HTTP_IN_FLIGHT = Gauge("legalrag_http_requests_in_flight", "Requêtes HTTP en cours")
+
+# Vertex AI Search (appels réels, hors recherches coalescées)
+VERTEX_SEARCH_SECONDS = Histogram(
+    "legalrag_vertex_search_duration_seconds",
+    "Durée des appels à Vertex AI Search",
+)
+VERTEX_SEARCH_ERRORS = Counter(
+    "legalrag_vertex_search_errors_total",
+    "Appels à Vertex AI Search en erreur, par type d'exception",
+    ("error",),
+)
+
+# Gemini (appels réels, hors prompts coalescés)
+LLM_REQUEST_SECONDS = Histogram(
+    "legalrag_llm_request_duration_seconds",
+    "Durée des appels generate_content",
+    ("model",),
+    buckets=LLM_LATENCY_BUCKETS,
+)
+LLM_ERRORS = Counter(
+    "legalrag_llm_errors_total",
+    "Appels generate_content en erreur, par type d'exception",
+    ("model", "error"),
+)
+LLM_RATE_LIMITED = Counter(
+    "legalrag_llm_rate_limited_total",
+    "Appels generate_content refusés pour quota (HTTP 429)",
+    ("model",),
+)
+LLM_TOKENS = Counter(
+    "legalrag_llm_tokens_total",
+    "Tokens des appels generate_content (estimated_input : estimation locale)",
+    ("model", "kind"),
+)
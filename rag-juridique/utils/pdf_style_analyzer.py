@@ -3,23 +3,172 @@ Analyseur automatique de style PDF avec Gemini
 
 Ce module utilise PyMuPDF pour extraire les métadonnées techniques du PDF,
 puis Gemini pour analyser le style et générer un template JSON automatiquement.
+
+L'extraction ouvre le PDF une fois et parcourt chaque page échantillonnée en
+une seule passe ; les en-têtes et pieds de page sont les lignes répétées
+d'une page à l'autre. Les gros échantillons sont répartis sur le pool de
+processus partagé (utils.scan_pool).
 """
 
 import json
+import os
+import re
+from collections import Counter
 from pathlib import Path
 from typing import Any
 
 import fitz  # PyMuPDF
-import google.generativeai as genai
 from loguru import logger
 
 from config.settings import get_settings
+from rag.llm_gateway import get_llm_gateway
+from utils.scan_pool import get_scan_pool
 
 settings = get_settings()
 
-# Configuration Gemini
-if settings.GEMINI_API_KEY:
-    genai.configure(api_key=settings.GEMINI_API_KEY)
+# Zones de la page (part de la hauteur) : en-tête au-dessus, pied de page en dessous
+HEADER_ZONE = 0.15
+FOOTER_ZONE = 0.85
+
+# Extraction "dict" sans le contenu binaire des images (décrites via get_image_info)
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+_DIGITS_RE = re.compile(r"\d+")
+
+def sample_page_indices(total_pages: int, sample_pages: int) -> list[int]:
+    """Pages échantillonnées : la première, puis réparties régulièrement jusqu'à la dernière"""
+    if total_pages <= sample_pages:
+        return list(range(total_pages))
+    if sample_pages <= 1:
+        return [0]
+    step = (total_pages - 1) / (sample_pages - 1)
+    return sorted({round(i * step) for i in range(sample_pages)})
+
+
+def scan_page(page: "fitz.Page") -> dict[str, Any]:
+    """
+    Parcourt une page une seule fois : polices, tailles et couleurs
+    (pondérées par le nombre de caractères), texte par zone, marges du
+    corps de texte et images (dimensions lues dans le PDF, pixels non décodés)
+    """
+    width, height = page.rect.width, page.rect.height
+    fonts, sizes, colors = Counter(), Counter(), Counter()
+    zones: dict[str, list[str]] = {"header": [], "body": [], "footer": []}
+    x0, y0, x1, y1 = width, height, 0.0, 0.0
+    
+    for block in page.get_text("dict", flags=_TEXT_FLAGS)["blocks"]:
+        if block.get("type") != 0:  # Bloc de texte uniquement
+            continue
+        for line in block.get("lines", []):
+            text = ""
+            for span in line.get("spans", []):
+                chars = len(span.get("text", "").strip())
+                if not chars:
+                    continue
+                text += span["text"]
+                if span.get("font"):
+                    fonts[span["font"]] += chars
+                if span.get("size"):
+                    sizes[round(span["size"], 1)] += chars
+                if span.get("color"):
+                    colors[span["color"]] += chars
+            text = text.strip()
+            if not text:
+                continue
+            bx0, by0, bx1, by1 = line["bbox"]
+            center = (by0 + by1) / 2
+            zone = "header" if center < height * HEADER_ZONE else "footer" if center > height * FOOTER_ZONE else "body"
+            zones[zone].append(text)
+            if zone == "body":  # Marges : cadre du corps de texte
+                x0, y0, x1, y1 = min(x0, bx0), min(y0, by0), max(x1, bx1), max(y1, by1)
+    
+    # Dimensions lues dans le dictionnaire de l'image (xref), position dans le
+    # flux de la page : ni get_image_info ni Pixmap, qui décodent les pixels
+    images = []
+    for item in page.get_images(full=True):
+        xref, _, img_width, img_height = item[:4]
+        try:
+            rect = page.get_image_bbox(item)
+            position = {"x": rect.x0, "y": rect.y0, "width": rect.width, "height": rect.height}
+        except Exception:
+            position = None
+        images.append({"xref": xref, "width": img_width, "height": img_height, "position": position})
+    
+    return {
+        "number": page.number,
+        "width": width,
+        "height": height,
+        "fonts": fonts,
+        "sizes": sizes,
+        "colors": colors,
+        "header": zones["header"],
+        "body": "\n".join(zones["body"]),
+        "footer": zones["footer"],
+        "margins": {
+            "top": y0 if y1 else 72.0,
+            "bottom": height - y1 if y1 else 72.0,
+            "left": x0 if x1 else 72.0,
+            "right": width - x1 if x1 else 72.0,
+        },
+        "images": images,
+    }
+
+
+def _empty_page() -> dict[str, Any]:
+    """Page vide au format A4 (PDF sans page)"""
+    return {
+        "number": 0,
+        "width": 595.0,
+        "height": 842.0,
+        "fonts": Counter(),
+        "sizes": Counter(),
+        "colors": Counter(),
+        "header": [],
+        "body": "",
+        "footer": [],
+        "margins": {"top": 72.0, "bottom": 72.0, "left": 72.0, "right": 72.0},
+        "images": [],
+    }
+
+
+def _scan_pages(pdf_path: str, indices: list[int]) -> list[dict[str, Any]]:
+    """Analyse d'une partie de l'échantillon dans un processus (une ouverture du PDF)"""
+    with fitz.open(pdf_path) as doc:
+        return [scan_page(doc[i]) for i in indices]
+
+
+def _repeated_lines(pages: list[dict[str, Any]], zone: str) -> tuple[list[str], bool]:
+    """
+    Lignes d'une zone répétées sur au moins la moitié des pages échantillonnées
+    
+    Les nombres sont neutralisés pour reconnaître "Page 3 / 50" d'une page à
+    l'autre.
+    
+    Returns:
+        (lignes de la première page qui se répètent, numérotation détectée)
+    """
+    if len(pages) < 2:
+        return [], False
+    
+    seen: Counter = Counter()
+    variants: dict[str, set[str]] = {}
+    for page in pages:
+        for line in set(page[zone]):
+            key = _DIGITS_RE.sub("#", " ".join(line.split()))
+            seen[key] += 1
+            variants.setdefault(key, set()).add(line)
+    
+    threshold = max(2, (len(pages) + 1) // 2)
+    repeated = {key for key, count in seen.items() if count >= threshold}
+    numbered = any("#" in key and len(variants[key]) > 1 for key in repeated)
+    
+    lines = []
+    for page in pages:
+        lines = [line for line in page[zone] if _DIGITS_RE.sub("#", " ".join(line.split())) in repeated]
+        if lines:
+            break
+    return lines, numbered
+
 
 
 class PDFStyleAnalyzer:
@@ -38,36 +187,39 @@ class PDFStyleAnalyzer:
     def __init__(self):
         """Initialise l'analyseur"""
         if settings.GEMINI_API_KEY:
-            self.model = genai.GenerativeModel(settings.GEMINI_PRO_MODEL)
+            self.model = get_llm_gateway().model(settings.GEMINI_PRO_MODEL)
         else:
             logger.warning("⚠️ GEMINI_API_KEY non définie")
             self.model = None
     
-    def analyze_pdf(self, pdf_path: str | Path) -> dict[str, Any]:
+    def analyze_pdf(
+        self,
+        pdf_path: str | Path,
+        sample_pages: int | None = None,
+        stream: bytes | memoryview | None = None,
+    ) -> dict[str, Any]:
         """
         Analyse complète d'un PDF
         
         Args:
-            pdf_path: Chemin vers le PDF
+            pdf_path: Chemin vers le PDF (nom du fichier si stream est fourni)
+            sample_pages: Pages échantillonnées (défaut : PDF_STYLE_SAMPLE_PAGES)
+            stream: Contenu du PDF en mémoire ou projeté (upload)
         
         Returns:
             JSON de configuration du template
         """
         pdf_path = Path(pdf_path)
         
-        if not pdf_path.exists():
+        if stream is None and not pdf_path.exists():
             raise FileNotFoundError(f"PDF introuvable : {pdf_path}")
         
         logger.info(f"📄 Analyse du PDF : {pdf_path.name}")
         
-        # 1. Extraction des métadonnées techniques
-        technical_data = self._extract_technical_data(pdf_path)
-        
-        # 2. Extraction du texte structuré
-        structured_text = self._extract_structured_text(pdf_path)
-        
-        # 3. Extraction des images (logos)
-        images_data = self._extract_images(pdf_path)
+        # 1-3. Métadonnées techniques, texte par zones et images : une seule passe
+        technical_data, structured_text, images_data = self.extract_style_data(
+            pdf_path, sample_pages=sample_pages, stream=stream
+        )
         
         # 4. Analyse avec Gemini pour détecter le style
         style_config = self._analyze_with_gemini(
@@ -79,156 +231,134 @@ class PDFStyleAnalyzer:
         logger.success(f"✅ Analyse terminée : {pdf_path.name}")
         return style_config
     
-    def _extract_technical_data(self, pdf_path: Path) -> dict[str, Any]:
+    def extract_style_data(
+        self,
+        pdf_path: str | Path,
+        sample_pages: int | None = None,
+        workers: int | None = None,
+        stream: bytes | memoryview | None = None,
+    ) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
         """
-        Extrait les métadonnées techniques du PDF
+        Extrait les données de style d'un échantillon de pages
+        
+        Le PDF est ouvert une fois ; chaque page est parcourue une seule fois
+        (polices, tailles, couleurs et zones dans la même boucle). Les images
+        sont décrites sans décoder leurs pixels. Au-delà de
+        PDF_STYLE_PARALLEL_MIN_PAGES pages, l'échantillon est réparti sur le
+        pool de processus partagé (chaque part ouvre le PDF une fois) ; un
+        PDF reçu en mémoire (stream) est toujours parcouru dans le processus
+        courant.
+        
+        Args:
+            pdf_path: Chemin vers le PDF (nom du fichier si stream est fourni)
+            sample_pages: Pages échantillonnées (défaut : PDF_STYLE_SAMPLE_PAGES)
+            workers: Parts de l'échantillon (défaut : PDF_STYLE_WORKERS, au plus
+                les processus du pool)
+            stream: Contenu du PDF en mémoire ou projeté (upload)
         
         Returns:
-            Données techniques (polices, couleurs, marges)
+            (données techniques, texte structuré, images)
+        """
+        sample_pages = sample_pages or settings.PDF_STYLE_SAMPLE_PAGES
+        workers = min(workers or settings.PDF_STYLE_WORKERS, os.cpu_count() or 1)
+        if stream is not None:
+            workers = 1
+        
+        source = {"stream": stream, "filetype": "pdf"} if stream is not None else {"filename": str(pdf_path)}
+        with fitz.open(**source) as doc:
+            total_pages = len(doc)
+            indices = sample_page_indices(total_pages, sample_pages)
+            parallel = workers > 1 and len(indices) >= settings.PDF_STYLE_PARALLEL_MIN_PAGES
+            if not parallel:
+                pages = [scan_page(doc[i]) for i in indices]
+        
+        if parallel:
+            # PyMuPDF n'est pas utilisable depuis plusieurs threads : processus
+            executor, pool_workers = get_scan_pool()
+            workers = min(workers, pool_workers)
+            chunks = [indices[i::workers] for i in range(workers)]
+            scanned = executor.map(_scan_pages, [str(pdf_path)] * workers, chunks)
+            pages = sorted((p for chunk in scanned for p in chunk), key=lambda p: p["number"])
+        
+        logger.info(
+            f"🔍 {len(pages)}/{total_pages} page(s) analysée(s)"
+            f"{f' ({workers} processus)' if parallel else ''}"
+        )
+        return self._merge_pages(pages, total_pages)
+    
+    def _merge_pages(
+        self,
+        pages: list[dict[str, Any]],
+        total_pages: int,
+    ) -> tuple[dict[str, Any], dict[str, Any], dict[str, Any]]:
         """
-        logger.info("🔍 Extraction des métadonnées techniques...")
-        
-        doc = fitz.open(str(pdf_path))
-        
-        # Analyser la première page (pour le style général)
-        first_page = doc[0]
-        
-        # Dimensions de la page
-        page_rect = first_page.rect
-        width = page_rect.width
-        height = page_rect.height
-        
-        # Extraire les polices utilisées
-        fonts = set()
-        font_sizes = set()
-        
-        blocks = first_page.get_text("dict")["blocks"]
-        for block in blocks:
-            if block.get("type") == 0:  # Bloc de texte
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        font = span.get("font", "")
-                        size = span.get("size", 0)
-                        if font:
-                            fonts.add(font)
-                        if size:
-                            font_sizes.add(round(size, 1))
-        
-        # Extraire les couleurs
-        colors = set()
-        for block in blocks:
-            if block.get("type") == 0:
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        color = span.get("color", 0)
-                        if color:
-                            colors.add(color)
-        
-        # Récupérer le nombre de pages AVANT de fermer
-        total_pages = len(doc)
-        
-        doc.close()
+        Agrège les pages échantillonnées (lignes répétées = en-tête / pied de page)
+
+        Un PDF sans page donne le style par défaut (A4, marges de 72 pt).
+        """
+        sampled_pages = [page["number"] + 1 for page in pages]
+        if not pages:
+            pages = [_empty_page()]
+        first = pages[0]
+        fonts, sizes, colors = Counter(), Counter(), Counter()
+        for page in pages:
+            fonts.update(page["fonts"])
+            sizes.update(page["sizes"])
+            colors.update(page["colors"])
+        
+        header_lines, header_numbered = _repeated_lines(pages, "header")
+        footer_lines, footer_numbered = _repeated_lines(pages, "footer")
+        
+        margins = {
+            side: round(min(page["margins"][side] for page in pages), 1)
+            for side in ("top", "bottom", "left", "right")
+        }
         
         technical_data = {
             "page_dimensions": {
-                "width": width,
-                "height": height,
-                "format": self._detect_page_format(width, height)
+                "width": first["width"],
+                "height": first["height"],
+                "format": self._detect_page_format(first["width"], first["height"])
             },
-            "fonts": list(fonts)[:5],  # Top 5 polices
-            "font_sizes": sorted(list(font_sizes), reverse=True)[:5],
-            "colors": [self._color_to_hex(c) for c in list(colors)[:5]],
+            "fonts": [font for font, _ in fonts.most_common(5)],  # Top 5 polices
+            "font_sizes": sorted((size for size, _ in sizes.most_common(5)), reverse=True),
+            "body_font_size": sizes.most_common(1)[0][0] if sizes else None,
+            "colors": [self._color_to_hex(c) for c, _ in colors.most_common(5)],
+            "text_margins": margins,
             "total_pages": total_pages,
+            "sampled_pages": sampled_pages,
         }
         
-        logger.info(f"   • Format : {technical_data['page_dimensions']['format']}")
-        logger.info(f"   • Polices : {len(fonts)} différentes")
-        logger.info(f"   • Couleurs : {len(colors)} différentes")
-        
-        return technical_data
-    
-    def _extract_structured_text(self, pdf_path: Path) -> dict[str, Any]:
-        """
-        Extrait le texte structuré (en-tête, corps, pied de page)
-        
-        Returns:
-            Texte structuré par zones
-        """
-        logger.info("📝 Extraction du texte structuré...")
-        
-        doc = fitz.open(str(pdf_path))
-        first_page = doc[0]
-        page_height = first_page.rect.height
-        
-        # Diviser la page en zones
-        header_zone = fitz.Rect(0, 0, first_page.rect.width, page_height * 0.15)
-        body_zone = fitz.Rect(0, page_height * 0.15, first_page.rect.width, page_height * 0.85)
-        footer_zone = fitz.Rect(0, page_height * 0.85, first_page.rect.width, page_height)
-        
-        # Extraire le texte par zone
-        header_text = first_page.get_textbox(header_zone).strip()
-        body_text = first_page.get_textbox(body_zone).strip()[:500]  # 500 premiers chars
-        footer_text = first_page.get_textbox(footer_zone).strip()
-        
-        doc.close()
-        
         structured = {
-            "header": header_text,
-            "body_preview": body_text,
-            "footer": footer_text,
+            "header": "\n".join(header_lines) if header_lines else "\n".join(first["header"]),
+            "body_preview": first["body"][:500],  # 500 premiers chars
+            "footer": "\n".join(footer_lines) if footer_lines else "\n".join(first["footer"]),
+            "repeated_header": bool(header_lines),
+            "repeated_footer": bool(footer_lines),
+            "has_page_numbers": header_numbered or footer_numbered,
         }
         
-        logger.info(f"   • En-tête : {len(header_text)} caractères")
-        logger.info(f"   • Pied de page : {len(footer_text)} caractères")
-        
-        return structured
-    
-    def _extract_images(self, pdf_path: Path) -> dict[str, Any]:
-        """
-        Extrait les images (logos) du PDF
-        
-        Returns:
-            Informations sur les images
-        """
-        logger.info("🖼️ Extraction des images...")
-        
-        doc = fitz.open(str(pdf_path))
-        first_page = doc[0]
-        
-        images = []
-        image_list = first_page.get_images()
-        
-        for img_index, img in enumerate(image_list[:3]):  # Max 3 premières images
-            xref = img[0]
-            
-            # Récupérer l'image
-            pix = fitz.Pixmap(doc, xref)
-            
-            # Position de l'image
-            img_rects = first_page.get_image_rects(xref)
-            if img_rects:
-                rect = img_rects[0]
-                position = {
-                    "x": rect.x0,
-                    "y": rect.y0,
-                    "width": rect.width,
-                    "height": rect.height,
-                }
-            else:
-                position = None
-            
-            images.append({
-                "index": img_index,
-                "width": pix.width,
-                "height": pix.height,
-                "position": position,
-            })
-        
-        doc.close()
+        # Images de la première page (logos), avec leur récurrence dans l'échantillon
+        occurrences = Counter(xref for page in pages for xref in {img["xref"] for img in page["images"]})
+        images = [
+            {
+                "index": i,
+                "width": img["width"],
+                "height": img["height"],
+                "position": img["position"],
+                "repeated_on_pages": occurrences[img["xref"]],
+            }
+            for i, img in enumerate(first["images"][:3])  # Max 3 premières images
+        ]
         
+        logger.info(f"   • Format : {technical_data['page_dimensions']['format']}")
+        logger.info(f"   • Polices : {len(fonts)} différentes")
+        logger.info(f"   • Couleurs : {len(colors)} différentes")
+        logger.info(f"   • En-tête : {len(structured['header'])} caractères")
+        logger.info(f"   • Pied de page : {len(structured['footer'])} caractères")
         logger.info(f"   • {len(images)} image(s) détectée(s)")
         
-        return {"images": images}
+        return technical_data, structured, {"images": images}
     
     def _analyze_with_gemini(
         self,
@@ -244,7 +374,7 @@ class PDFStyleAnalyzer:
         """
         if not self.model:
             logger.warning("⚠️ Gemini non configuré, retour template basique")
-            return self._generate_basic_template(technical_data, structured_text)
+            return self._generate_basic_template(technical_data, structured_text, images_data)
         
         logger.info("🤖 Analyse du style avec Gemini...")
         
@@ -259,6 +389,8 @@ DONNÉES TECHNIQUES :
 TEXTE STRUCTURÉ :
 En-tête : {structured_text.get('header', '')}
 Pied de page : {structured_text.get('footer', '')}
+Répétés sur les pages analysées : en-tête {structured_text.get('repeated_header', False)}, pied de page {structured_text.get('repeated_footer', False)}
+Numéros de page détectés : {structured_text.get('has_page_numbers', False)}
 Aperçu corps : {structured_text.get('body_preview', '')[:200]}...
 
 IMAGES :
@@ -315,7 +447,7 @@ IMPORTANT :
 """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = get_llm_gateway().generate_content(self.model, prompt)
             json_text = response.text.strip()
             
             # Nettoyer le JSON (retirer les ``` si présents)
@@ -336,24 +468,26 @@ IMPORTANT :
         except Exception as e:
             logger.error(f"❌ Erreur Gemini : {e}")
             logger.warning("⚠️ Retour au template basique")
-            return self._generate_basic_template(technical_data, structured_text)
+            return self._generate_basic_template(technical_data, structured_text, images_data)
     
     def _generate_basic_template(
         self,
         technical_data: dict,
-        structured_text: dict
+        structured_text: dict,
+        images_data: dict | None = None
     ) -> dict[str, Any]:
         """
         Génère un template basique sans Gemini
         
         Returns:
-            Template minimal
+            Template minimal (marges, taille du corps et numérotation mesurées)
         """
+        margins = technical_data.get("text_margins", {})
         return {
             "template_name": "Template basique",
             "document_type": "autre",
             "header": {
-                "has_logo": False,
+                "has_logo": bool(images_data and images_data.get("images")),
                 "text": structured_text.get("header", ""),
                 "font": technical_data["fonts"][0] if technical_data["fonts"] else "Arial",
                 "font_size": 12,
@@ -364,23 +498,23 @@ IMPORTANT :
                 "text": structured_text.get("footer", ""),
                 "font_size": 9,
                 "color": "#666666",
-                "has_page_numbers": True,
+                "has_page_numbers": structured_text.get("has_page_numbers", True),
                 "alignment": "center"
             },
             "page": {
                 "format": technical_data["page_dimensions"]["format"],
                 "orientation": "portrait",
-                "margin_top": 72,
-                "margin_bottom": 72,
-                "margin_left": 72,
-                "margin_right": 72
+                "margin_top": margins.get("top", 72),
+                "margin_bottom": margins.get("bottom", 72),
+                "margin_left": margins.get("left", 72),
+                "margin_right": margins.get("right", 72)
             },
             "styles": {
                 "title_font": technical_data["fonts"][0] if technical_data["fonts"] else "Arial",
                 "title_size": max(technical_data["font_sizes"]) if technical_data["font_sizes"] else 16,
                 "title_color": "#000000",
                 "body_font": technical_data["fonts"][0] if technical_data["fonts"] else "Arial",
-                "body_size": 11,
+                "body_size": technical_data.get("body_font_size") or 11,
                 "body_color": "#000000",
                 "line_spacing": 1.5
             }
@@ -2,16 +2,88 @@
 Gestionnaire de templates PDF
 
 Stocke, charge et gère les templates PDF personnalisés.
+
+Les configurations et logos sont chargés une fois dans un registre en
+mémoire (recherche par nom en O(1), liste précalculée). Le registre
+surveille les dates de modification des dossiers (au plus une fois par
+PDF_TEMPLATES_POLL_SECONDS) pour prendre en compte les modifications
+faites par un autre processus ; les écritures sont atomiques.
 """
 
+import copy
+import hashlib
 import json
+import os
 import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 from loguru import logger
 
+CONFIG_FILE = "template.json"
+METADATA_FILE = "metadata.json"
+
+
+@dataclass
+class TemplateEntry:
+    """Template chargé en mémoire"""
+
+    name: str
+    directory: Path
+    config: dict[str, Any]
+    metadata: dict[str, Any] = field(default_factory=dict)
+    logo_path: Path | None = None
+    logo_bytes: bytes | None = None
+    listed: bool = True
+    signature: tuple = ()
+    fingerprint: str = ""
+
+    @property
+    def is_default(self) -> bool:
+        return self.name == "default"
+
+    def to_config(self) -> dict[str, Any]:
+        """Configuration au format de load_template (copie, chemin du logo inclus)"""
+        config = copy.deepcopy(self.config)
+        if self.logo_path is not None:
+            config["logo_path"] = str(self.logo_path)
+        return config
+
+    def listing(self) -> dict[str, Any]:
+        """Entrée de list_templates"""
+        if self.is_default:
+            return {"name": "default", "path": str(self.directory), "is_default": True}
+        return {"name": self.name, "path": str(self.directory), "is_default": False, **self.metadata}
+
+
+def _dir_signature(directory: Path) -> tuple:
+    """Dates de modification du dossier et de ses fichiers (détection des changements)"""
+    try:
+        with os.scandir(directory) as entries:
+            files = tuple(sorted(
+                (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                for entry in entries
+                if entry.is_file() and not entry.name.endswith(".tmp")
+            ))
+        return (directory.stat().st_mtime_ns, files)
+    except FileNotFoundError:
+        return ()
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Écrit un fichier via un fichier temporaire renommé (jamais lu à moitié écrit)"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
 
 class PDFTemplateManager:
     """
@@ -30,22 +102,170 @@ class PDFTemplateManager:
             └── ...
     """
     
-    def __init__(self, templates_dir: str | Path = "templates/pdf_templates"):
+    def __init__(self, templates_dir: str | Path = "templates/pdf_templates", poll_interval: float = 2.0):
         """
         Initialise le gestionnaire
         
         Args:
             templates_dir: Répertoire racine des templates
+            poll_interval: Délai minimal entre deux vérifications du disque (secondes)
         """
         self.templates_dir = Path(templates_dir)
         self.default_dir = self.templates_dir / "default"
         self.custom_dir = self.templates_dir / "custom"
+        self.poll_interval = poll_interval
         
         # Créer les répertoires
         self.default_dir.mkdir(parents=True, exist_ok=True)
         self.custom_dir.mkdir(parents=True, exist_ok=True)
         
-        logger.info(f"✅ TemplateManager initialisé : {self.templates_dir}")
+        # Registre : nom → template, liste précalculée
+        self._entries: dict[str, TemplateEntry] = {}
+        self._snapshot: list[dict[str, Any]] = []
+        self._custom_signature: int | None = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self.reloads = 0
+        self._refresh(force=True)
+        
+        logger.info(f"✅ TemplateManager initialisé : {self.templates_dir} ({len(self._entries)} template(s))")
+    
+    # ------------------------------------------------------------------
+    # Registre en mémoire
+    # ------------------------------------------------------------------
+    
+    def _refresh(self, force: bool = False) -> None:
+        """Recharge les templates modifiés sur disque (au plus une fois par poll_interval)"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.poll_interval:
+            return
+        with self._lock:
+            if not force and now - self._checked_at < self.poll_interval:
+                return
+            self._checked_at = now
+            
+            # Dossiers des templates (ajouts / suppressions : date du dossier custom)
+            custom_signature = self.custom_dir.stat().st_mtime_ns if self.custom_dir.exists() else 0
+            if force or custom_signature != self._custom_signature:
+                directories = {d.name: d for d in self._scan_custom_dirs()}
+                self._custom_signature = custom_signature
+            else:
+                directories = {name: e.directory for name, e in self._entries.items() if not e.is_default}
+            directories["default"] = self.default_dir
+            
+            entries: dict[str, TemplateEntry] = {}
+            changed = force or set(directories) != set(self._entries)
+            for name, directory in directories.items():
+                signature = _dir_signature(directory)
+                current = self._entries.get(name)
+                if current is not None and current.signature == signature:
+                    entries[name] = current
+                    continue
+                entry = self._load_entry(name, directory, signature)
+                if entry is not None:
+                    entries[name] = entry
+                changed = True
+            
+            if changed:
+                self._install(entries)
+    
+    def _scan_custom_dirs(self) -> list[Path]:
+        try:
+            return [
+                d for d in self.custom_dir.iterdir()
+                if d.is_dir() and not d.name.startswith(".")
+            ]
+        except FileNotFoundError:
+            return []
+    
+    def _load_entry(self, name: str, directory: Path, signature: tuple) -> TemplateEntry | None:
+        """Lit la configuration, les métadonnées et le logo d'un template"""
+        config_path = directory / CONFIG_FILE
+        try:
+            config = json.loads(config_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Template illisible ({name}) : {e}")
+            return None
+        
+        # Un template personnalisé sans métadonnées est chargeable mais non listé
+        metadata, listed = {}, True
+        if name != "default":
+            try:
+                metadata = json.loads((directory / METADATA_FILE).read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                listed = False
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Métadonnées illisibles ({name}) : {e}")
+                listed = False
+        
+        logo_files = sorted(p for p in directory.glob("logo.*") if not p.name.endswith(".tmp"))
+        logo_path = logo_files[0] if logo_files else None
+        logo_bytes = None
+        if logo_path is not None:
+            try:
+                logo_bytes = logo_path.read_bytes()
+            except OSError:
+                logo_path = None
+        
+        digest = hashlib.sha256(json.dumps(config, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        if logo_bytes:
+            digest.update(logo_bytes)
+        
+        self.reloads += 1
+        return TemplateEntry(
+            name=name,
+            directory=directory,
+            config=config,
+            metadata=metadata,
+            logo_path=logo_path,
+            logo_bytes=logo_bytes,
+            listed=listed,
+            signature=signature,
+            fingerprint=digest.hexdigest(),
+        )
+    
+    def _install(self, entries: dict[str, TemplateEntry]) -> None:
+        """Remplace le registre et recalcule la liste (échange de références)"""
+        snapshot = []
+        if "default" in entries:
+            snapshot.append(entries["default"].listing())
+        for name in sorted(entries):
+            entry = entries[name]
+            if not entry.is_default and entry.listed:
+                snapshot.append(entry.listing())
+        self._entries = entries
+        self._snapshot = snapshot
+    
+    def _update_entry(self, name: str, directory: Path | None) -> None:
+        """Met à jour une entrée après une écriture locale (sans attendre le prochain contrôle)"""
+        with self._lock:
+            entries = dict(self._entries)
+            entries.pop(name, None)
+            if directory is not None:
+                entry = self._load_entry(name, directory, _dir_signature(directory))
+                if entry is not None:
+                    entries[name] = entry
+            if self.custom_dir.exists():
+                self._custom_signature = self.custom_dir.stat().st_mtime_ns
+            self._install(entries)
+    
+    def get_template(self, template_name: str | None = None) -> TemplateEntry | None:
+        """
+        Template du registre (None si inconnu)
+        
+        L'entrée est partagée : ne pas modifier sa configuration
+        (load_template en renvoie une copie).
+        """
+        self._refresh()
+        return self._entries.get(self._normalize(template_name))
+    
+    @staticmethod
+    def _normalize(template_name: str | None) -> str:
+        if template_name is None or template_name == "default":
+            return "default"
+        return template_name.lower().replace(" ", "_")
     
     def save_template(
         self,
@@ -77,19 +297,21 @@ class PDFTemplateManager:
         
         template_dir.mkdir(parents=True, exist_ok=True)
         
-        # Sauvegarder la configuration
-        config_path = template_dir / "template.json"
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(template_config, f, indent=2, ensure_ascii=False)
+        # Sauvegarder la configuration (écriture atomique)
+        config_path = template_dir / CONFIG_FILE
+        _write_atomic(config_path, json.dumps(template_config, indent=2, ensure_ascii=False).encode("utf-8"))
         
         logger.info(f"✅ Template sauvegardé : {config_path}")
         
-        # Copier le logo si fourni
+        # Copier le logo si fourni (remplace un logo d'une autre extension)
         if logo_path:
             logo_path = Path(logo_path)
             if logo_path.exists():
                 logo_dest = template_dir / f"logo{logo_path.suffix}"
-                shutil.copy(logo_path, logo_dest)
+                _write_atomic(logo_dest, logo_path.read_bytes())
+                for previous in template_dir.glob("logo.*"):
+                    if previous != logo_dest and not previous.name.endswith(".tmp"):
+                        previous.unlink(missing_ok=True)
                 logger.info(f"✅ Logo copié : {logo_dest}")
         
         # Sauvegarder les métadonnées
@@ -100,10 +322,10 @@ class PDFTemplateManager:
             "has_logo": logo_path is not None,
         }
         
-        metadata_path = template_dir / "metadata.json"
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        metadata_path = template_dir / METADATA_FILE
+        _write_atomic(metadata_path, json.dumps(metadata, indent=2, ensure_ascii=False).encode("utf-8"))
         
+        self._update_entry("default" if is_default else template_name, template_dir)
         return template_dir
     
     def load_template(
@@ -117,66 +339,27 @@ class PDFTemplateManager:
             template_name: Nom du template (None = défaut)
         
         Returns:
-            Configuration du template
+            Configuration du template (copie, avec logo_path si un logo existe)
         """
-        if template_name is None or template_name == "default":
-            # Template par défaut
-            template_dir = self.default_dir
-        else:
-            # Template personnalisé
-            template_name = template_name.lower().replace(" ", "_")
-            template_dir = self.custom_dir / template_name
-        
-        config_path = template_dir / "template.json"
+        entry = self.get_template(template_name)
         
-        if not config_path.exists():
+        if entry is None:
             logger.warning(f"⚠️ Template introuvable : {template_name}")
             return self._get_fallback_template()
         
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        
-        # Ajouter le chemin du logo s'il existe
-        logo_files = list(template_dir.glob("logo.*"))
-        if logo_files:
-            config["logo_path"] = str(logo_files[0])
-        
-        logger.info(f"✅ Template chargé : {template_name or 'default'}")
-        return config
+        logger.debug(f"✅ Template chargé : {template_name or 'default'}")
+        return entry.to_config()
     
     def list_templates(self) -> list[dict[str, Any]]:
         """
         Liste tous les templates disponibles
         
         Returns:
-            Liste des templates avec métadonnées
+            Liste des templates avec métadonnées (liste précalculée partagée,
+            à ne pas modifier)
         """
-        templates = []
-        
-        # Template par défaut
-        default_config = self.default_dir / "template.json"
-        if default_config.exists():
-            templates.append({
-                "name": "default",
-                "path": str(self.default_dir),
-                "is_default": True,
-            })
-        
-        # Templates personnalisés
-        for template_dir in self.custom_dir.iterdir():
-            if template_dir.is_dir():
-                metadata_path = template_dir / "metadata.json"
-                if metadata_path.exists():
-                    with open(metadata_path, "r") as f:
-                        metadata = json.load(f)
-                    templates.append({
-                        "name": template_dir.name,
-                        "path": str(template_dir),
-                        "is_default": False,
-                        **metadata
-                    })
-        
-        return templates
+        self._refresh()
+        return self._snapshot
     
     def delete_template(self, template_name: str) -> bool:
         """
@@ -199,10 +382,17 @@ class PDFTemplateManager:
             logger.warning(f"⚠️ Template introuvable : {template_name}")
             return False
         
-        shutil.rmtree(template_dir)
+        # Renommage atomique hors du registre, puis suppression du contenu
+        trash_dir = self.custom_dir / f".deleted-{template_name}-{uuid.uuid4().hex}"
+        os.replace(template_dir, trash_dir)
+        self._update_entry(template_name, None)
+        shutil.rmtree(trash_dir, ignore_errors=True)
         logger.success(f"✅ Template supprimé : {template_name}")
         return True
     
+    def stats(self) -> dict[str, Any]:
+        return {"templates": len(self._entries), "reloads": self.reloads}
+    
     def _get_fallback_template(self) -> dict[str, Any]:
         """
         Retourne un template de secours minimal
@@ -250,6 +440,23 @@ class PDFTemplateManager:
         }
 
 
+_manager: PDFTemplateManager | None = None
+
+
+def get_template_manager() -> PDFTemplateManager:
+    """Retourne le registre global des templates PDF"""
+    global _manager
+    if _manager is None:
+        from config.settings import get_settings
+
+        settings = get_settings()
+        _manager = PDFTemplateManager(
+            templates_dir=settings.PDF_TEMPLATES_DIR,
+            poll_interval=settings.PDF_TEMPLATES_POLL_SECONDS,
+        )
+    return _manager
+
+
 # Point d'entrée pour tests
 if __name__ == "__main__":
     from config.logging_config import setup_logging
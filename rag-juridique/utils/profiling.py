@@ -0,0 +1,383 @@
+"""
+Profilage à la demande d'une requête
+
+Deux modes, sur les seuls threads qui travaillent pour la requête :
+- sampling (défaut) : un thread relève toutes les interval_ms la pile de
+  ces threads (sys._current_frames) ; profil au format speedscope
+  (https://www.speedscope.app, un profil « sampled » par thread)
+- cprofile (repli) : un profileur déterministe par thread, fusionnés en
+  un fichier pstats (python -m pstats, snakeviz...). À partir de Python
+  3.12, un seul profileur peut être actif dans le processus et il couvre
+  tous les threads : la session l'active une fois, pour toute sa durée
+  (une seconde session cprofile simultanée n'enregistre rien).
+
+Les threads sont rattachés à la session par utils.timing.stage() : le
+thread de la boucle (ouverture de la session), puis les threads du pool
+(run_in_threadpool) et des exécuteurs qui copient le contexte (map-reduce)
+dès leur première étape. Le thread de la boucle étant partagé, son profil
+peut contenir le travail de requêtes concurrentes. Sans session active, le
+coût se limite à la lecture d'un entier dans stage().
+
+Les profils sont écrits dans un dossier borné (nombre de fichiers et
+taille totale : les plus anciens sont supprimés).
+
+Usage:
+    >>> session = ProfileSession(mode="sampling", interval_ms=5)
+    >>> with session.activate():
+    ...     handle_request()
+    >>> info = get_profile_store().save(session, "POST /api/v1/synthese/")
+"""
+
+import cProfile
+import json
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from types import FrameType
+from typing import Any, Iterator
+
+from loguru import logger
+
+SAMPLING = "sampling"
+CPROFILE = "cprofile"
+MODES = (SAMPLING, CPROFILE)
+
+EXTENSIONS = {SAMPLING: ".speedscope.json", CPROFILE: ".pstats"}
+
+# Python 3.12+ : cProfile repose sur sys.monitoring (un seul outil actif,
+# tous les threads observés)
+PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+# Sessions en cours (lu par utils.timing.stage : aucun travail si 0)
+ACTIVE = 0
+_active_lock = threading.Lock()
+
+_current_session: ContextVar["ProfileSession | None"] = ContextVar("profile_session", default=None)
+
+
+class ProfileSession:
+    """
+    Profil d'une requête en cours
+
+    Attributes:
+        mode: "sampling" ou "cprofile" (repli automatique sur cprofile si
+            l'interpréteur n'expose pas sys._current_frames)
+        duration_ms: Durée de la session (une fois terminée)
+    """
+
+    def __init__(self, mode: str = SAMPLING, interval_ms: float = 5.0):
+        if mode == SAMPLING and not hasattr(sys, "_current_frames"):
+            mode = CPROFILE
+        self.mode = mode
+        self.interval = max(interval_ms, 0.5) / 1000
+        self.duration_ms = 0.0
+        self._threads: dict[int, int] = {}
+        self._names: dict[int, str] = {}
+        self._profilers: dict[int, cProfile.Profile] = {}
+        self._process_profiler: cProfile.Profile | None = None
+        self._stats: pstats.Stats | None = None
+        self._lock = threading.Lock()
+        # Échantillonnage : piles agrégées par thread, index des cadres
+        self._frames: dict[tuple[str, str, int], int] = {}
+        self._stacks: dict[int, dict[tuple[int, ...], float]] = {}
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    @contextmanager
+    def activate(self) -> Iterator["ProfileSession"]:
+        """Profile le contexte courant (et les threads qui s'y rattachent)"""
+        global ACTIVE
+        token = _current_session.set(self)
+        with _active_lock:
+            ACTIVE += 1
+        start = time.perf_counter()
+        if self.mode == SAMPLING:
+            self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._sampler.start()
+        elif PROCESS_WIDE_CPROFILE:
+            self._enable_process_profiler()
+        self.attach()
+        try:
+            yield self
+        finally:
+            self.detach()
+            if self._process_profiler is not None:
+                self._process_profiler.disable()
+                self._stats = pstats.Stats(self._process_profiler)
+                self._process_profiler = None
+            self.duration_ms = (time.perf_counter() - start) * 1000
+            if self._sampler is not None:
+                self._stop.set()
+                self._sampler.join()
+            with _active_lock:
+                ACTIVE -= 1
+            _current_session.reset(token)
+
+    def _enable_process_profiler(self) -> None:
+        """Active le profileur unique du processus (Python 3.12+)"""
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Autre session cprofile (ou autre outil) déjà active
+            logger.warning(f"⚠️ Profil cprofile impossible : {e}")
+            return
+        self._process_profiler = profiler
+
+    # ------------------------------------------------------------------
+    # Rattachement des threads
+    # ------------------------------------------------------------------
+
+    def attach(self) -> None:
+        """Rattache le thread courant (appels imbriqués comptés)"""
+        ident = threading.get_ident()
+        with self._lock:
+            count = self._threads.get(ident, 0)
+            self._threads[ident] = count + 1
+            self._names.setdefault(ident, threading.current_thread().name)
+        if count == 0 and self.mode == CPROFILE and not PROCESS_WIDE_CPROFILE:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                with self._lock:
+                    self._threads.pop(ident, None)
+                raise
+            self._profilers[ident] = profiler
+
+    def detach(self) -> None:
+        """Détache le thread courant à la sortie de son dernier appel"""
+        ident = threading.get_ident()
+        with self._lock:
+            count = self._threads.get(ident, 0) - 1
+            if count > 0:
+                self._threads[ident] = count
+                return
+            self._threads.pop(ident, None)
+            profiler = self._profilers.pop(ident, None)
+        if profiler is not None:
+            profiler.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+
+    # ------------------------------------------------------------------
+    # Échantillonnage
+    # ------------------------------------------------------------------
+
+    def _sample(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight_ms = (now - last) * 1000
+            last = now
+            frames = sys._current_frames()
+            with self._lock:
+                idents = list(self._threads)
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self._record(ident, frame, weight_ms)
+            del frames
+
+    def _record(self, ident: int, frame: FrameType, weight_ms: float) -> None:
+        # Boucle asynchrone en attente d'événements : pas de travail
+        if frame.f_code.co_filename.endswith("selectors.py"):
+            return
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            index = self._frames.get(key)
+            if index is None:
+                index = self._frames[key] = len(self._frames)
+            stack.append(index)
+            frame = frame.f_back
+        stack.reverse()
+        stacks = self._stacks.setdefault(ident, {})
+        key = tuple(stack)
+        stacks[key] = stacks.get(key, 0.0) + weight_ms
+
+    def speedscope(self, name: str) -> dict[str, Any]:
+        """Profil échantillonné au format speedscope"""
+        frames = [None] * len(self._frames)
+        for (function, filename, line), index in self._frames.items():
+            frames[index] = {"name": function, "file": filename, "line": line}
+        profiles = []
+        for ident, stacks in self._stacks.items():
+            total = sum(stacks.values())
+            profiles.append({
+                "type": "sampled",
+                "name": f"{self._names.get(ident, ident)} ({name})",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(total, 3),
+                "samples": [list(stack) for stack in stacks],
+                "weights": [round(weight, 3) for weight in stacks.values()],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "legal-rag",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def stats(self) -> pstats.Stats | None:
+        """Statistiques cProfile fusionnées des threads (mode cprofile)"""
+        return self._stats
+
+
+def current_session() -> ProfileSession | None:
+    return _current_session.get()
+
+
+# ==============================================================================
+# STOCKAGE DES PROFILS
+# ==============================================================================
+
+_PROFILE_ID_RE = re.compile(r"^[\w.-]+\.(speedscope\.json|pstats)$")
+
+
+@dataclass
+class ProfileInfo:
+    """Profil enregistré"""
+
+    profile_id: str
+    mode: str
+    size: int
+    created_at: str
+    name: str = ""
+    duration_ms: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class ProfileStore:
+    """
+    Dossier des profils, borné en nombre et en taille
+
+    Le nom du fichier sert d'identifiant ; un fichier .meta.json à côté
+    garde le nom de la requête et sa durée.
+    """
+
+    def __init__(self, directory: Path, max_files: int = 50, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def new_id(self, mode: str, name: str) -> str:
+        """Identifiant daté d'un profil (nom de la requête simplifié)"""
+        slug = re.sub(r"[^\w]+", "-", name).strip("-").lower()[:60] or "requete"
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        return f"{stamp}-{slug}-{uuid.uuid4().hex[:8]}{EXTENSIONS[mode]}"
+
+    def save(self, session: ProfileSession, name: str, profile_id: str | None = None) -> ProfileInfo:
+        """
+        Écrit le profil d'une session terminée (appel bloquant)
+
+        Args:
+            session: Session terminée
+            name: Nom de la requête (méthode et route)
+            profile_id: Identifiant déjà annoncé au client (défaut : nouveau)
+        """
+        profile_id = profile_id or self.new_id(session.mode, name)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / profile_id
+        tmp_path = path.with_name(f"{profile_id}.{threading.get_ident()}.tmp")
+        if session.mode == SAMPLING:
+            tmp_path.write_text(json.dumps(session.speedscope(name)), encoding="utf-8")
+        else:
+            stats = session.stats()
+            if stats is None:
+                stats = pstats.Stats(cProfile.Profile())
+            stats.dump_stats(tmp_path)
+        tmp_path.replace(path)
+
+        info = ProfileInfo(
+            profile_id=profile_id,
+            mode=session.mode,
+            size=path.stat().st_size,
+            created_at=datetime.now().isoformat(timespec="seconds"),
+            name=name,
+            duration_ms=round(session.duration_ms, 1),
+        )
+        self._meta_path(profile_id).write_text(json.dumps(info.to_dict(), ensure_ascii=False), encoding="utf-8")
+        logger.info(f"🔬 Profil enregistré : {profile_id} ({name}, {info.duration_ms:.0f} ms)")
+        self._prune()
+        return info
+
+    def path(self, profile_id: str) -> Path | None:
+        """Chemin d'un profil (None si l'identifiant est invalide ou inconnu)"""
+        if not _PROFILE_ID_RE.match(profile_id):
+            return None
+        path = self.directory / profile_id
+        return path if path.is_file() else None
+
+    def list_profiles(self) -> list[ProfileInfo]:
+        """Profils enregistrés, du plus récent au plus ancien"""
+        infos = []
+        for path in self._profiles():
+            try:
+                data = json.loads(self._meta_path(path.name).read_text(encoding="utf-8"))
+                info = ProfileInfo(**data)
+                info.size = path.stat().st_size
+            except (OSError, ValueError, TypeError):
+                stat = path.stat()
+                info = ProfileInfo(
+                    profile_id=path.name,
+                    mode=SAMPLING if path.name.endswith(EXTENSIONS[SAMPLING]) else CPROFILE,
+                    size=stat.st_size,
+                    created_at=datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+                )
+            infos.append(info)
+        return infos
+
+    def _meta_path(self, profile_id: str) -> Path:
+        return self.directory / f".{profile_id}.meta.json"
+
+    def _profiles(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        paths = [path for path in self.directory.iterdir() if _PROFILE_ID_RE.match(path.name)]
+        return sorted(paths, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def _prune(self) -> None:
+        """Supprime les profils les plus anciens au-delà des limites"""
+        with self._lock:
+            total = 0
+            for index, path in enumerate(self._profiles()):
+                total += path.stat().st_size
+                if index >= self.max_files or total > self.max_bytes:
+                    path.unlink(missing_ok=True)
+                    self._meta_path(path.name).unlink(missing_ok=True)
+
+
+_store: ProfileStore | None = None
+
+
+def get_profile_store() -> ProfileStore:
+    """Retourne le dossier global des profils"""
+    global _store
+    if _store is None:
+        from config.settings import get_settings
+
+        settings = get_settings()
+        _store = ProfileStore(
+            settings.PROFILES_DIR,
+            max_files=settings.PROFILES_MAX_FILES,
+            max_bytes=settings.PROFILES_MAX_BYTES,
+        )
+    return _store
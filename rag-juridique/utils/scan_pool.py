@@ -0,0 +1,69 @@
+"""
+Pool de processus partagé de l'analyse de style PDF
+
+PyMuPDF n'étant pas utilisable depuis plusieurs threads, les gros
+échantillons de pages sont répartis entre processus
+(utils.pdf_style_analyzer). Le pool est unique, démarré avec l'API
+(contexte spawn : aucun fork d'un processus qui a déjà des threads) et
+arrêté avec elle.
+
+Ce module n'importe pas PyMuPDF : api.main l'importe sans charger fitz
+(import différé des dépendances lourdes).
+"""
+
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config.settings import get_settings
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_scan_pool() -> tuple[ProcessPoolExecutor, int]:
+    """
+    Pool de processus partagé (créé au premier appel)
+
+    Returns:
+        (pool, nombre de processus)
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool_workers = max(1, min(get_settings().PDF_STYLE_WORKERS, os.cpu_count() or 1))
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool, _pool_workers
+
+
+def _preload_worker() -> int:
+    """Importe l'analyseur (et PyMuPDF) dans un processus du pool"""
+    importlib.import_module("utils.pdf_style_analyzer")
+    return os.getpid()
+
+
+def start_scan_pool() -> None:
+    """
+    Démarre le pool au lancement de l'API
+
+    Une tâche de préchargement par processus : les processus sont lancés
+    et importent l'analyseur en arrière-plan plutôt qu'à la première analyse.
+    """
+    pool, workers = get_scan_pool()
+    for _ in range(workers):
+        pool.submit(_preload_worker)
+
+
+def shutdown_scan_pool() -> None:
+    """Arrête le pool de processus (arrêt de l'API)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,104 @@
+"""
+Coalescence des appels identiques en cours (single-flight)
+
+Quand plusieurs requêtes identiques arrivent en même temps (ex : actualité
+juridique, des dizaines d'avocats posent la même question), un seul appel
+réel est effectué. Les autres appelants attendent le résultat de l'appel
+« leader » et le reçoivent à leur tour.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Partage un même appel en cours entre tous les appelants d'une même clé
+
+    Seuls les appels *simultanés* sont coalescés : dès que l'appel leader
+    est terminé, la clé est libérée et l'appel suivant repart vers le service
+    distant (pas de cache).
+
+    Usage:
+        >>> flights = SingleFlight("vertex_search")
+        >>> results = flights.do(key, client.search, query)
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Nom du groupe (pour les logs et statistiques)
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight: dict[Hashable, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[..., Any],
+        *args: Any,
+        clone: Callable[[Any], Any] | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Exécute fn(*args, **kwargs) ou attend l'appel identique déjà en cours
+
+        Args:
+            key: Clé identifiant l'appel (requête normalisée, prompt...)
+            fn: Fonction à exécuter par le leader
+            clone: Copie optionnelle du résultat remis à chaque appelant,
+                leader compris : le résultat partagé n'est jamais renvoyé
+                tel quel et reste intact pendant que les autres le copient
+
+        Returns:
+            Résultat de l'appel (l'exception du leader est propagée à tous)
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            result = future.result()
+            return clone(result) if clone else result
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return clone(result) if clone else result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def in_flight(self) -> int:
+        """Nombre d'appels distincts actuellement en cours"""
+        with self._lock:
+            return len(self._in_flight)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Statistiques de coalescence
+
+        Returns:
+            Dict avec appels réels, appels coalescés et ratio
+        """
+        total = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight(),
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+        }
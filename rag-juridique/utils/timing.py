@@ -0,0 +1,199 @@
+"""
+Mesure du temps par étape d'une requête (mode « explain »)
+
+Un StageTimer ouvert au début du traitement d'une requête devient l'étape
+courante (contextvars). Les étapes imbriquées — y compris celles posées
+dans VertexSearchClient ou LLMGateway — s'y rattachent sans passer le
+minuteur en paramètre. Sans minuteur actif, stage() ne mesure rien.
+stage() s'utilise aussi comme décorateur de méthode.
+
+Une trace de requête (utils.tracing) ouvre elle aussi un minuteur : les
+points d'entrée des piliers (explained) y deviennent une étape.
+
+Pendant un profilage à la demande (utils.profiling), chaque étape et
+chaque minuteur rattachent leur thread au profil de la requête.
+
+Usage:
+    >>> with StageTimer("search", enabled=request.explain) as timer:
+    >>>     with stage("filter_build"):
+    >>>         ...
+    >>>     with stage("vertex_search", page_size=10) as s:
+    >>>         ...
+    >>> response.timings = timer.to_dict()
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from loguru import logger
+
+from utils import profiling as _profiling
+
+_current_stage: ContextVar["Stage | None"] = ContextVar("current_stage", default=None)
+
+
+@dataclass
+class Stage:
+    """Une étape mesurée et ses sous-étapes"""
+
+    name: str
+    attributes: dict[str, Any] = field(default_factory=dict)
+    children: list["Stage"] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+    duration_ms: float | None = None
+
+    def close(self) -> None:
+        self.duration_ms = round((time.perf_counter() - self.started_at) * 1000, 3)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class StageTimer:
+    """
+    Racine de l'arbre des temps d'une requête
+
+    Inactif (enabled=False), il ne crée aucune étape et to_dict() renvoie None.
+    """
+
+    def __init__(self, name: str, enabled: bool = True, **attributes: Any):
+        """
+        Args:
+            name: Nom de l'opération (search, chat, audit, synthesis...)
+            enabled: Mesurer les étapes (explain demandé)
+            **attributes: Attributs de l'étape racine
+        """
+        self.enabled = enabled
+        self.root = Stage(name, dict(attributes)) if enabled else None
+        self._token = None
+        self._profile = None
+
+    def __enter__(self) -> "StageTimer":
+        if _profiling.ACTIVE:
+            self._profile = _attach_profile()
+        if self.root is not None:
+            self.root.started_at = time.perf_counter()
+            self._token = _current_stage.set(self.root)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.root is not None:
+            self.root.close()
+            _current_stage.reset(self._token)
+            self._token = None
+        if self._profile is not None:
+            self._profile.detach()
+            self._profile = None
+
+    def to_dict(self) -> dict[str, Any] | None:
+        """Arbre des temps (None si inactif)"""
+        if self.root is None:
+            return None
+        if self.root.duration_ms is None:
+            self.root.close()
+        return self.root.to_dict()
+
+
+def _attach_profile() -> "_profiling.ProfileSession | None":
+    """
+    Rattache le thread courant au profil de la requête
+
+    Un échec du profileur est journalisé et ignoré : le profilage ne fait
+    jamais échouer la requête.
+    """
+    session = _profiling.current_session()
+    if session is None:
+        return None
+    try:
+        session.attach()
+    except Exception as e:
+        logger.warning(f"⚠️ Rattachement au profil impossible : {e}")
+        return None
+    return session
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[Stage | None]:
+    """
+    Mesure une étape rattachée à l'étape courante
+
+    Args:
+        name: Nom de l'étape
+        **attributes: Attributs (modèle, identifiant de requête, tailles...)
+
+    Yields:
+        L'étape créée (pour compléter ses attributs), ou None si aucun
+        minuteur n'est actif
+    """
+    # Profil à la demande : rattache le thread (pool, exécuteur) à la session
+    session = _attach_profile() if _profiling.ACTIVE else None
+    try:
+        parent = _current_stage.get()
+        if parent is None:
+            yield None
+            return
+
+        current = Stage(name, dict(attributes))
+        parent.children.append(current)
+        token = _current_stage.set(current)
+        try:
+            yield current
+        except BaseException as e:
+            current.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            current.close()
+            _current_stage.reset(token)
+    finally:
+        if session is not None:
+            session.detach()
+
+
+def explain_enabled() -> bool:
+    """Indique si un minuteur est actif dans le contexte courant (explain ou trace)"""
+    return _current_stage.get() is not None
+
+
+def explained(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Décorateur des points d'entrée des piliers : ouvre un StageTimer si
+    request.explain est demandé et renseigne response.timings
+
+    Dans une trace en cours, le point d'entrée en devient une étape, dont
+    le sous-arbre est renvoyé dans response.timings si explain est demandé.
+
+    Args:
+        name: Nom de l'opération (search, chat, audit, synthesis)
+
+    Usage:
+        >>> @explained("audit")
+        >>> def audit(self, request: AuditRequest) -> AuditResponse:
+        >>>     ...
+    """
+    def decorator(method: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(method)
+        def wrapper(self: Any, request: Any, *args: Any, **kwargs: Any) -> Any:
+            explain = getattr(request, "explain", False)
+            if _current_stage.get() is not None:
+                with stage(name) as current:
+                    response = method(self, request, *args, **kwargs)
+                if explain and hasattr(response, "timings"):
+                    response.timings = current.to_dict()
+                return response
+
+            with StageTimer(name, enabled=explain) as timer:
+                response = method(self, request, *args, **kwargs)
+            if timer.enabled and hasattr(response, "timings"):
+                response.timings = timer.to_dict()
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,421 @@
+"""
+Traces des requêtes : identifiant de trace et export des étapes en spans
+
+Une trace (start_trace) est ouverte pour chaque requête HTTP par le
+TracingMiddleware (api/tracing.py) et pour chaque tâche asynchrone.
+L'identifiant de trace est propagé par contextvars (repris dans les logs),
+et les étapes mesurées par utils.timing.stage() — extraction de texte,
+recherches Vertex AI Search, construction des prompts, appels Gemini... —
+forment l'arbre de ses spans. En fin de trace, l'arbre est remis à
+l'exportateur (thread d'arrière-plan, file bornée : jamais bloquant) :
+- fichier JSONL local (un span par ligne, TRACE_EXPORT_PATH)
+- collecteur OTLP/HTTP au format JSON (TRACING_OTLP_ENDPOINT, optionnel)
+
+Rapport des traces les plus lentes (arbre « flamme » en texte) :
+    python -m utils.tracing --slowest 5 [--name synthese] [--file spans.jsonl]
+"""
+
+import json
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Iterator
+
+from loguru import logger
+
+from utils.timing import Stage, StageTimer
+
+_current_trace_id: ContextVar[str | None] = ContextVar("trace_id", default=None)
+
+_TRACEPARENT_RE = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-[0-9a-f]{16}-[0-9a-f]{2}$")
+
+
+def current_trace_id() -> str | None:
+    """Identifiant de la trace en cours (None hors requête)"""
+    return _current_trace_id.get()
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def parse_traceparent(header: str | None) -> str | None:
+    """Identifiant de trace d'un en-tête W3C traceparent (None s'il est invalide)"""
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if match is None or match.group(1) == "0" * 32:
+        return None
+    return match.group(1)
+
+
+class Trace:
+    """
+    Trace en cours : identifiant et arbre des étapes
+
+    Attributes:
+        trace_id: Identifiant (32 caractères hexadécimaux)
+        timer: Racine de l'arbre des étapes (inactive si la trace n'est pas
+            échantillonnée)
+    """
+
+    def __init__(self, name: str, trace_id: str, sampled: bool, **attributes: Any):
+        self.trace_id = trace_id
+        self.timer = StageTimer(name, enabled=sampled, **attributes)
+        self.started_ns = 0
+
+    @property
+    def root(self) -> Stage | None:
+        return self.timer.root
+
+    def spans(self) -> list[dict[str, Any]]:
+        """Spans de la trace (parcours en profondeur, parent avant enfants)"""
+        if self.root is None:
+            return []
+        origin = self.root.started_at
+        spans: list[dict[str, Any]] = []
+
+        def visit(current: Stage, parent_id: str | None) -> None:
+            span_id = uuid.uuid4().hex[:16]
+            spans.append({
+                "trace_id": self.trace_id,
+                "span_id": span_id,
+                "parent_span_id": parent_id,
+                "name": current.name,
+                "start_ns": self.started_ns + int((current.started_at - origin) * 1e9),
+                "duration_ms": current.duration_ms or 0.0,
+                "attributes": current.attributes,
+            })
+            for child in list(current.children):
+                visit(child, span_id)
+
+        visit(self.root, None)
+        return spans
+
+
+@contextmanager
+def start_trace(
+    name: str,
+    trace_id: str | None = None,
+    sampled: bool = True,
+    exporter: "SpanExporter | None" = None,
+    **attributes: Any,
+) -> Iterator[Trace]:
+    """
+    Ouvre une trace pour le contexte courant
+
+    Args:
+        name: Nom du span racine (complété par l'appelant via trace.root)
+        trace_id: Identifiant reçu (traceparent) ; nouveau sinon
+        sampled: Enregistrer les spans (sinon : identifiant seulement)
+        exporter: Exportateur (défaut : global)
+        **attributes: Attributs du span racine
+
+    Yields:
+        La trace (exportée à la sortie du bloc, y compris en cas d'erreur)
+    """
+    trace = Trace(name, trace_id or new_trace_id(), sampled, **attributes)
+    token = _current_trace_id.set(trace.trace_id)
+    try:
+        with trace.timer:
+            trace.started_ns = time.time_ns()
+            yield trace
+    finally:
+        _current_trace_id.reset(token)
+        if trace.root is not None:
+            (exporter or get_span_exporter()).export(trace.spans())
+
+
+def sample(rate: float) -> bool:
+    """Décision d'échantillonnage d'une trace"""
+    return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+
+# ==============================================================================
+# EXPORT
+# ==============================================================================
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: list[dict[str, Any]], service_name: str = "legal-rag-api") -> dict[str, Any]:
+    """Spans au format OTLP/JSON (ExportTraceServiceRequest)"""
+    otlp_spans = []
+    for span in spans:
+        end_ns = span["start_ns"] + int(span["duration_ms"] * 1e6)
+        otlp_span = {
+            "traceId": span["trace_id"],
+            "spanId": span["span_id"],
+            "name": span["name"],
+            # 2 : SERVER (racine), 1 : INTERNAL
+            "kind": 2 if span["parent_span_id"] is None else 1,
+            "startTimeUnixNano": str(span["start_ns"]),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in span["attributes"].items() if value is not None
+            ],
+            "status": {"code": 2} if "error" in span["attributes"] else {},
+        }
+        if span["parent_span_id"]:
+            otlp_span["parentSpanId"] = span["parent_span_id"]
+        otlp_spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "legal-rag"}, "spans": otlp_spans}],
+        }]
+    }
+
+
+class SpanExporter:
+    """
+    Export des spans en arrière-plan (JSONL local et/ou collecteur OTLP)
+
+    Les traces terminées sont déposées dans une file bornée : si le thread
+    d'export est en retard, les traces en excès sont abandonnées (comptées)
+    plutôt que de ralentir les requêtes.
+    """
+
+    def __init__(
+        self,
+        path: Path | None,
+        otlp_endpoint: str = "",
+        max_file_bytes: int = 50 * 1024 * 1024,
+        max_pending: int = 1000,
+    ):
+        """
+        Args:
+            path: Fichier JSONL (None : pas d'export local)
+            otlp_endpoint: URL OTLP/HTTP (ex. http://localhost:4318/v1/traces)
+            max_file_bytes: Au-delà, le fichier est renommé en .1 (remplacé)
+            max_pending: Traces en attente d'export au plus
+        """
+        self.path = path
+        self.otlp_endpoint = otlp_endpoint
+        self.max_file_bytes = max_file_bytes
+        self._queue: queue.Queue[list[dict[str, Any]] | None] = queue.Queue(maxsize=max_pending)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def export(self, spans: list[dict[str, Any]]) -> None:
+        """Dépose les spans d'une trace (non bloquant)"""
+        if not spans or (self.path is None and not self.otlp_endpoint):
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            traces = [batch]
+            # Regroupe les traces déjà en attente (une écriture, un envoi)
+            while len(traces) < 100:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write(traces)
+                    return
+                traces.append(item)
+            self._write(traces)
+
+    def _write(self, traces: list[list[dict[str, Any]]]) -> None:
+        spans = [span for trace in traces for span in trace]
+        try:
+            if self.path is not None:
+                self._append(spans)
+            if self.otlp_endpoint:
+                self._post(spans)
+            self.exported += len(traces)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"⚠️ Export de {len(traces)} trace(s) impossible : {e}")
+
+    def _append(self, spans: list[dict[str, Any]]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if self.path.stat().st_size > self.max_file_bytes:
+                self.path.replace(self.path.with_name(self.path.name + ".1"))
+        except FileNotFoundError:
+            pass
+        lines = "".join(json.dumps(span, ensure_ascii=False, default=str) + "\n" for span in spans)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _post(self, spans: list[dict[str, Any]]) -> None:
+        import httpx
+
+        response = httpx.post(self.otlp_endpoint, json=to_otlp(spans), timeout=5.0)
+        response.raise_for_status()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Exporte les traces en attente puis arrête le thread"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "exported": self.exported,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+_exporter: SpanExporter | None = None
+_exporter_lock = threading.Lock()
+
+
+def get_span_exporter() -> SpanExporter:
+    """Retourne l'exportateur global (configuré par les settings)"""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                from config.settings import get_settings
+
+                settings = get_settings()
+                _exporter = SpanExporter(
+                    settings.TRACE_EXPORT_PATH,
+                    otlp_endpoint=settings.TRACING_OTLP_ENDPOINT,
+                    max_file_bytes=settings.TRACE_EXPORT_MAX_BYTES,
+                )
+    return _exporter
+
+
+# ==============================================================================
+# RAPPORT (CLI)
+# ==============================================================================
+
+def load_traces(path: Path) -> dict[str, list[dict[str, Any]]]:
+    """Spans d'un fichier JSONL regroupés par trace"""
+    traces: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                span = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            traces[span["trace_id"]].append(span)
+    return traces
+
+
+def render_flame(spans: list[dict[str, Any]], width: int = 40) -> str:
+    """
+    Arbre d'une trace en texte : durée, part de la racine et barre placée
+    sur la ligne de temps de la trace
+
+    Args:
+        spans: Spans d'une trace
+        width: Largeur de la ligne de temps (caractères)
+    """
+    children: dict[str | None, list[dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        children[span["parent_span_id"]].append(span)
+    roots = children.get(None) or []
+    if not roots:
+        return ""
+    root = roots[0]
+    origin = root["start_ns"]
+    total_ms = max(root["duration_ms"], 1e-6)
+
+    lines = []
+
+    def visit(span: dict[str, Any], depth: int) -> None:
+        offset_ms = (span["start_ns"] - origin) / 1e6
+        start = min(int(offset_ms / total_ms * width), width - 1)
+        length = max(1, round(span["duration_ms"] / total_ms * width))
+        bar = (" " * start + "█" * length)[:width].ljust(width)
+        attributes = {
+            key: value for key, value in span["attributes"].items()
+            if key in ("model", "page_size", "results", "coalesced", "kind", "status", "error")
+        }
+        details = " ".join(f"{key}={value}" for key, value in attributes.items())
+        lines.append(
+            f"{span['duration_ms']:>10.1f} ms {span['duration_ms'] / total_ms:>5.0%} |{bar}| "
+            f"{'  ' * depth}{span['name']} {details}".rstrip()
+        )
+        for child in sorted(children.get(span["span_id"], []), key=lambda s: s["start_ns"]):
+            visit(child, depth + 1)
+
+    visit(root, 0)
+    return "\n".join(lines)
+
+
+def main() -> None:
+    import argparse
+    from datetime import datetime
+
+    from config.settings import get_settings
+
+    parser = argparse.ArgumentParser(description="Traces les plus lentes (arbre flamme en texte)")
+    parser.add_argument("--file", type=Path, default=None, help="Fichier JSONL (défaut : TRACE_EXPORT_PATH)")
+    parser.add_argument("--slowest", type=int, default=5, help="Nombre de traces affichées")
+    parser.add_argument("--name", default=None, help="Filtre sur le nom du span racine (ex. synthese)")
+    parser.add_argument("--width", type=int, default=40, help="Largeur de la ligne de temps")
+    args = parser.parse_args()
+
+    path = args.file or get_settings().TRACE_EXPORT_PATH
+    if not path.exists():
+        print(f"Aucune trace : {path}")
+        return
+
+    roots = []
+    traces = load_traces(path)
+    for spans in traces.values():
+        root = next((span for span in spans if span["parent_span_id"] is None), None)
+        if root is not None and (args.name is None or args.name in root["name"]):
+            roots.append(root)
+    roots.sort(key=lambda span: span["duration_ms"], reverse=True)
+
+    print(f"{len(roots)} trace(s) dans {path}, {min(args.slowest, len(roots))} plus lente(s)\n")
+    for root in roots[: args.slowest]:
+        started = datetime.fromtimestamp(root["start_ns"] / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"trace {root['trace_id']}  {started}  {root['name']}  {root['duration_ms']:.1f} ms")
+        print(render_flame(traces[root["trace_id"]], width=args.width))
+        print()
+
+
+if __name__ == "__main__":
+    main()